@@ -0,0 +1,125 @@
+import tempfile
+import time
+import uuid
+from typing import Any, List
+
+import click
+import numpy as np
+import pyarrow as pa
+
+from leettools.common.duckdb.duckdb_client import DuckDBClient
+from leettools.core.repo._impl.duckdb.vector_store_duckdb_schema import (
+    VectorDuckDBSchema,
+)
+from leettools.core.schemas.segment import Segment
+from leettools.settings import SystemSettings
+
+"""
+Rows/sec of the embedding inserts into a dense vector table, comparing the old
+VALUES statement with one bound parameter per value and the Arrow bulk insert
+used by VectorStoreDuckDBDense._batch_upsert_embeddings.
+
+Run from the root leettools directory:
+
+    % python -m eval.perf.bench_bulk_insert -n 20000 -d 384 -d 1536
+"""
+
+
+def _create_table(client: DuckDBClient, dim: int) -> str:
+    return client.create_table_if_not_exists(
+        schema_name="bench_schema",
+        table_name=f"kb_{uuid.uuid4().hex}_dense_vectors",
+        columns=VectorDuckDBSchema.get_schema(dim),
+    )
+
+
+def _column_values(num_rows: int, embeddings: np.ndarray) -> List[List[Any]]:
+    return [
+        [
+            embeddings[i].tolist(),
+            f"content {i}",
+            i,
+            "",
+            f"doc-{i // 10}",
+            f"sink-{i // 100}",
+            f"seg-{i}",
+        ]
+        for i in range(num_rows)
+    ]
+
+
+COLUMN_LIST = [
+    Segment.FIELD_EMBEDDINGS,
+    Segment.FIELD_CONTENT,
+    Segment.FIELD_CREATED_TIMESTAMP_IN_MS,
+    Segment.FIELD_LABEL_TAG,
+    Segment.FIELD_DOCUMENT_UUID,
+    Segment.FIELD_DOCSINK_UUID,
+    Segment.FIELD_SEGMENT_UUID,
+]
+
+
+def _bench_values(
+    client: DuckDBClient, dim: int, num_rows: int, batch_size: int
+) -> float:
+    table_name = _create_table(client, dim)
+    embeddings = np.random.rand(num_rows, dim).astype(np.float32)
+    rows = _column_values(num_rows, embeddings)
+    start = time.perf_counter()
+    for i in range(0, num_rows, batch_size):
+        client._batch_insert_values(table_name, COLUMN_LIST, rows[i : i + batch_size])
+    return num_rows / (time.perf_counter() - start)
+
+
+def _bench_arrow(
+    client: DuckDBClient, dim: int, num_rows: int, batch_size: int
+) -> float:
+    table_name = _create_table(client, dim)
+    embeddings = np.random.rand(num_rows, dim).astype(np.float32)
+    start = time.perf_counter()
+    for i in range(0, num_rows, batch_size):
+        batch = embeddings[i : i + batch_size]
+        ids = range(i, i + len(batch))
+        arrow_table = pa.table(
+            {
+                Segment.FIELD_EMBEDDINGS: pa.FixedSizeListArray.from_arrays(
+                    pa.array(batch.reshape(-1)), dim
+                ),
+                Segment.FIELD_CONTENT: [f"content {j}" for j in ids],
+                Segment.FIELD_CREATED_TIMESTAMP_IN_MS: list(ids),
+                Segment.FIELD_LABEL_TAG: [""] * len(batch),
+                Segment.FIELD_DOCUMENT_UUID: [f"doc-{j // 10}" for j in ids],
+                Segment.FIELD_DOCSINK_UUID: [f"sink-{j // 100}" for j in ids],
+                Segment.FIELD_SEGMENT_UUID: [f"seg-{j}" for j in ids],
+            }
+        )
+        client.bulk_insert_into_table(table_name, arrow_table)
+    return num_rows / (time.perf_counter() - start)
+
+
+@click.command()
+@click.option("-n", "--num-rows", default=20000, help="Rows for the Arrow insert.")
+@click.option(
+    "--values-rows",
+    default=500,
+    help="Rows for the VALUES insert, which is much slower.",
+)
+@click.option("-d", "--dimension", "dimensions", multiple=True, default=[384, 1536])
+@click.option("-b", "--batch-size", default=100, help="Rows per insert statement.")
+def bench(
+    num_rows: int, values_rows: int, dimensions: List[int], batch_size: int
+) -> None:
+    settings = SystemSettings(DUCKDB_PATH=tempfile.mkdtemp(), DUCKDB_FILE="bench.db")
+    client = DuckDBClient(settings)
+    for dim in dimensions:
+        values_rate = _bench_values(client, dim, values_rows, batch_size)
+        arrow_rate = _bench_arrow(client, dim, num_rows, batch_size)
+        click.echo(
+            f"dim={dim:<5} VALUES: {values_rate:10.1f} rows/s  "
+            f"Arrow: {arrow_rate:10.1f} rows/s  "
+            f"speedup: {arrow_rate / values_rate:6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,69 @@
+import multiprocessing
+import resource
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+import click
+
+from leettools.eds.pipeline.convert.parser import create_parser
+from leettools.settings import SystemSettings
+
+"""
+Time and peak RSS of the docling conversion of a PDF, comparing the default
+parser_docling, which renders and saves the page, table, and picture images, with
+the text-only parser_docling_text, converting the whole document at once and in
+page batches.
+
+Each run is in a new process so that the peak RSS is not shared between the runs.
+The time includes the conversion only, not the loading of the models.
+
+Run from the root leettools directory, e.g. with a 300-page PDF:
+
+    % python -m eval.perf.bench_docling -f /path/to/300-pages.pdf -b 0 -b 50
+"""
+
+PARSER_MODULES = ["parser_docling", "parser_docling_text"]
+
+
+def _run_one(parser_module: str, file_path: str, batch_size: int) -> Tuple[float, int]:
+    settings = SystemSettings(docling_page_batch_size=batch_size)
+    parser = create_parser(settings, parser_module)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        target_path = Path(tmp_dir) / f"{Path(file_path).stem}.md"
+        start = time.perf_counter()
+        content = parser.file2md(file_path, target_path)
+        elapsed = time.perf_counter() - start
+    if content == "":
+        raise RuntimeError(f"Failed to convert {file_path} with {parser_module}.")
+    # ru_maxrss is in KB on Linux
+    return elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+@click.command()
+@click.option("-f", "--file", "file_path", required=True, help="The PDF to convert.")
+@click.option(
+    "-b",
+    "--batch-size",
+    "batch_sizes",
+    multiple=True,
+    default=[0, 50],
+    help="Pages per conversion batch, 0 converts the whole document at once.",
+)
+def bench(file_path: str, batch_sizes: List[int]) -> None:
+    mp_context = multiprocessing.get_context("spawn")
+    for parser_module in PARSER_MODULES:
+        for batch_size in batch_sizes:
+            with mp_context.Pool(1) as pool:
+                elapsed, max_rss_kb = pool.apply(
+                    _run_one, (parser_module, file_path, batch_size)
+                )
+            click.echo(
+                f"{parser_module:<20} batch={batch_size:<4} "
+                f"time: {elapsed:8.1f} s  peak RSS: {max_rss_kb / 1024:8.1f} MB"
+            )
+
+
+if __name__ == "__main__":
+    bench()
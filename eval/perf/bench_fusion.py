@@ -0,0 +1,157 @@
+import statistics
+import time
+from typing import Callable, Dict, List
+
+import click
+import numpy as np
+
+from leettools.core.repo.vector_store import VectorSearchResult, VectorType
+from leettools.eds.rag.search.fusion import (
+    FUSION_MIN_MAX,
+    FUSION_RRF,
+    FUSION_Z_SCORE,
+    FusionOptions,
+    fuse_search_results,
+)
+
+"""
+Micro-benchmark for the hybrid search score fusion.
+
+Compares the dict-based relative score fusion the hybrid searchers used before
+(one normalized dict per leg and a VectorSearchResult per candidate, then a sort)
+with the vectorized fusion in leettools.eds.rag.search.fusion, on two result lists
+of the given size with the given overlap.
+
+Run from the root leettools directory:
+
+    % python -m eval.perf.bench_fusion -n 10000 --overlap 0.3 -k 20
+"""
+
+
+def _legacy_fusion(
+    dense_list: List[VectorSearchResult],
+    sparse_list: List[VectorSearchResult],
+    dense_weight: float = 0.6,
+    sparse_weight: float = 0.4,
+) -> List[VectorSearchResult]:
+    def _normalize(scores_dict: Dict[str, float]) -> Dict[str, float]:
+        if not scores_dict:
+            return scores_dict
+        min_score = min(scores_dict.values())
+        range_score = max(scores_dict.values()) - min_score
+        if range_score == 0.0:
+            return {k: 0.0 for k in scores_dict}
+        return {k: (v - min_score) / range_score for k, v in scores_dict.items()}
+
+    dense_dict = {r.segment_uuid: r.search_score for r in dense_list}
+    sparse_dict = {r.segment_uuid: r.search_score for r in sparse_list}
+    normalized_dense = _normalize(dense_dict)
+    normalized_sparse = _normalize(sparse_dict)
+    common_uuids = set(dense_dict.keys()) & set(sparse_dict.keys())
+    fused: Dict[str, VectorSearchResult] = {}
+    for result in dense_list + sparse_list:
+        if result.segment_uuid in fused:
+            continue
+        fused[result.segment_uuid] = VectorSearchResult(
+            segment_uuid=result.segment_uuid,
+            vector_type=(
+                VectorType.COMMON
+                if result.segment_uuid in common_uuids
+                else result.vector_type
+            ),
+            search_score=dense_weight * normalized_dense.get(result.segment_uuid, 0.0)
+            + sparse_weight * normalized_sparse.get(result.segment_uuid, 0.0),
+        )
+    results = list(fused.values())
+    results.sort(key=lambda x: x.search_score, reverse=True)
+    return results
+
+
+def _make_lists(num_candidates: int, overlap: float, seed: int):
+    rng = np.random.default_rng(seed)
+    num_common = int(num_candidates * overlap)
+    dense_uuids = [f"seg-{i}" for i in range(num_candidates)]
+    sparse_uuids = dense_uuids[:num_common] + [
+        f"seg-{i}" for i in range(num_candidates, 2 * num_candidates - num_common)
+    ]
+    rng.shuffle(sparse_uuids)
+    dense_list = [
+        VectorSearchResult(
+            segment_uuid=uuid, search_score=float(score), vector_type=VectorType.DENSE
+        )
+        for uuid, score in zip(dense_uuids, np.sort(rng.random(num_candidates))[::-1])
+    ]
+    sparse_list = [
+        VectorSearchResult(
+            segment_uuid=uuid,
+            search_score=float(score),
+            vector_type=VectorType.SPARSE,
+        )
+        for uuid, score in zip(
+            sparse_uuids, np.sort(rng.exponential(10.0, num_candidates))[::-1]
+        )
+    ]
+    return dense_list, sparse_list
+
+
+def _time(func: Callable[[], List[VectorSearchResult]], repeat: int) -> List[float]:
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def _report(name: str, latencies: List[float]) -> None:
+    ordered = sorted(latencies)
+    click.echo(
+        f"{name:<24} p50={statistics.median(ordered) * 1000:8.2f}ms "
+        f"min={ordered[0] * 1000:8.2f}ms "
+        f"mean={statistics.mean(ordered) * 1000:8.2f}ms"
+    )
+
+
+@click.command()
+@click.option("-n", "--num-candidates", default=10000, help="Results per leg.")
+@click.option("--overlap", default=0.3, help="Fraction of results in both legs.")
+@click.option("-k", "--top-k", default=20, help="Results kept after the fusion.")
+@click.option("-r", "--repeat", default=20, help="Runs per method.")
+def bench(num_candidates: int, overlap: float, top_k: int, repeat: int) -> None:
+    dense_list, sparse_list = _make_lists(num_candidates, overlap, seed=42)
+    click.echo(
+        f"Fusing {len(dense_list)} dense and {len(sparse_list)} sparse results, "
+        f"overlap {overlap}, top_k {top_k}"
+    )
+
+    legacy = _legacy_fusion(dense_list, sparse_list)
+    fused = fuse_search_results(dense_list, sparse_list)
+    assert [r.segment_uuid for r in legacy[:top_k]] == [
+        r.segment_uuid for r in fused[:top_k]
+    ], "the vectorized min-max fusion should rank the same as the legacy one"
+
+    _report(
+        "legacy dict min-max",
+        _time(lambda: _legacy_fusion(dense_list, sparse_list)[:top_k], repeat),
+    )
+    for method in [FUSION_MIN_MAX, FUSION_Z_SCORE, FUSION_RRF]:
+        options = FusionOptions(method=method)
+        _report(
+            f"numpy {method}",
+            _time(
+                lambda: fuse_search_results(dense_list, sparse_list, options), repeat
+            ),
+        )
+        _report(
+            f"numpy {method} limit={top_k}",
+            _time(
+                lambda: fuse_search_results(
+                    dense_list, sparse_list, options, limit=top_k
+                ),
+                repeat,
+            ),
+        )
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,146 @@
+import statistics
+import time
+from typing import List, Set, Tuple
+
+import click
+import duckdb
+import numpy as np
+
+"""
+Recall-vs-latency benchmark for the DuckDB dense vector store.
+
+Compares the exact full-table cosine scan used by VectorStoreDuckDBDense with the
+HNSW index from the vss extension (EDS_DUCKDB_VECTOR_INDEX_TYPE=hnsw) on random
+vectors, using the same SQL statements as the store.
+
+Run from the root leettools directory:
+
+    % python -m eval.perf.bench_vector_index -n 200000 -d 384 --ef 32 --ef 64 --ef 128
+"""
+
+TABLE_NAME = "bench.kb_bench_dense_vectors"
+INDEX_NAME = "bench_kb_bench_dense_vectors_hnsw"
+
+
+def _create_table(conn: duckdb.DuckDBPyConnection, num_vectors: int, dim: int) -> None:
+    conn.execute("CREATE SCHEMA IF NOT EXISTS bench")
+    sql = f"""
+        CREATE TABLE {TABLE_NAME} AS
+        SELECT
+            'seg-' || i::VARCHAR AS segment_uuid,
+            list_transform(range({dim}), x -> random()::FLOAT - 0.5)::FLOAT[{dim}]
+                AS embeddings
+        FROM range({num_vectors}) t(i)
+    """
+    conn.execute(sql)
+
+
+def _exact_search(
+    conn: duckdb.DuckDBPyConnection, query: np.ndarray, dim: int, top_k: int
+) -> Tuple[List[str], float]:
+    sql = f"""
+        SELECT segment_uuid,
+            array_cosine_similarity(embeddings, CAST(? AS FLOAT[{dim}]))
+                AS similarity_metric
+        FROM {TABLE_NAME}
+        ORDER BY similarity_metric DESC LIMIT ?
+    """
+    start = time.perf_counter()
+    rows = conn.execute(sql, [query.tolist(), top_k]).fetchall()
+    return [row[0] for row in rows], time.perf_counter() - start
+
+
+def _ann_search(
+    conn: duckdb.DuckDBPyConnection, query: np.ndarray, dim: int, top_k: int
+) -> Tuple[List[str], float]:
+    vector_literal = ",".join(str(float(x)) for x in query)
+    sql = f"""
+        SELECT segment_uuid,
+            array_cosine_distance(
+                embeddings, CAST([{vector_literal}] AS FLOAT[{dim}])
+            ) AS distance_metric
+        FROM {TABLE_NAME}
+        ORDER BY distance_metric LIMIT ?
+    """
+    start = time.perf_counter()
+    rows = conn.execute(sql, [top_k]).fetchall()
+    return [row[0] for row in rows], time.perf_counter() - start
+
+
+def _percentile(latencies: List[float], pct: float) -> float:
+    ordered = sorted(latencies)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx] * 1000
+
+
+def _report(name: str, latencies: List[float], recall: float) -> None:
+    click.echo(
+        f"{name:<16} recall@k={recall:.4f} "
+        f"p50={_percentile(latencies, 50):8.2f}ms "
+        f"p99={_percentile(latencies, 99):8.2f}ms "
+        f"mean={statistics.mean(latencies) * 1000:8.2f}ms"
+    )
+
+
+@click.command()
+@click.option("-n", "--num-vectors", default=100000, help="Number of vectors.")
+@click.option("-d", "--dimension", default=384, help="Dimension of the vectors.")
+@click.option("-q", "--num-queries", default=100, help="Number of queries.")
+@click.option("-k", "--top-k", default=20, help="Number of results per query.")
+@click.option("--ef", "ef_list", multiple=True, type=int, default=[32, 64, 128, 256])
+@click.option("--m", "hnsw_m", default=16, help="M of the HNSW index.")
+@click.option("--ef-construction", default=128, help="ef_construction of the index.")
+def bench(
+    num_vectors: int,
+    dimension: int,
+    num_queries: int,
+    top_k: int,
+    ef_list: List[int],
+    hnsw_m: int,
+    ef_construction: int,
+) -> None:
+    conn = duckdb.connect()
+    conn.execute("SELECT setseed(0.42)")
+
+    click.echo(f"Creating {num_vectors} vectors with dimension {dimension} ...")
+    _create_table(conn, num_vectors, dimension)
+
+    rng = np.random.default_rng(42)
+    queries = rng.random((num_queries, dimension), dtype=np.float32) - 0.5
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    exact_results: List[Set[str]] = []
+    exact_latencies: List[float] = []
+    for query in queries:
+        uuids, latency = _exact_search(conn, query, dimension, top_k)
+        exact_results.append(set(uuids))
+        exact_latencies.append(latency)
+    _report("exact", exact_latencies, 1.0)
+
+    try:
+        conn.execute("INSTALL vss; LOAD vss;")
+    except Exception as e:
+        click.echo(f"The vss extension is not available, skip the HNSW runs: {e}")
+        return
+
+    start = time.perf_counter()
+    sql = f"""
+        CREATE INDEX {INDEX_NAME} ON {TABLE_NAME} USING HNSW (embeddings)
+        WITH (metric = 'cosine', M = {hnsw_m}, ef_construction = {ef_construction})
+    """
+    conn.execute(sql)
+    click.echo(f"Built the HNSW index in {time.perf_counter() - start:.2f}s")
+
+    for ef in ef_list:
+        conn.execute(f"SET hnsw_ef_search = {max(ef, top_k)}")
+        latencies: List[float] = []
+        hits = 0
+        for i, query in enumerate(queries):
+            uuids, latency = _ann_search(conn, query, dimension, top_k)
+            hits += len(exact_results[i] & set(uuids))
+            latencies.append(latency)
+        _report(f"hnsw ef={ef}", latencies, hits / (top_k * num_queries))
+
+
+if __name__ == "__main__":
+    bench()
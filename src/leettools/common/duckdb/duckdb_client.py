@@ -1,8 +1,16 @@
+import json
+import re
+import threading
+import time
+from concurrent.futures import Future
 from pathlib import Path
+from queue import Queue
 from threading import Lock
-from typing import Any, ClassVar, Dict, List, Optional
+from typing import Any, ClassVar, Dict, List, Optional, Tuple
 
 import duckdb
+import pyarrow as pa
+from pydantic import BaseModel
 
 from leettools.common import exceptions
 from leettools.common.logging import logger
@@ -14,7 +22,64 @@ class SingletonMetaDuckDB(SingletonMeta):
     _lock: Lock = Lock()
 
 
+class LockWaitStats(BaseModel):
+    """Wait time statistics of a lock or a queue used by the DuckDBClient."""
+
+    count: int = 0
+    total_wait_ms: float = 0.0
+    max_wait_ms: float = 0.0
+
+    def record(self, wait_ms: float) -> None:
+        self.count += 1
+        self.total_wait_ms += wait_ms
+        if wait_ms > self.max_wait_ms:
+            self.max_wait_ms = wait_ms
+
+    def avg_wait_ms(self) -> float:
+        if self.count == 0:
+            return 0.0
+        return self.total_wait_ms / self.count
+
+
+STATS_WRITE_QUEUE = "write_queue"
+STATS_TABLE_LOCK = "table_lock"
+
+# the name of the registered relation used by bulk inserts
+BULK_INSERT_SOURCE = "_leettools_bulk_insert_source"
+
+# DuckDB column types that can be filled from Arrow arrays directly
+ARROW_TYPE_MAP: Dict[str, pa.DataType] = {
+    "VARCHAR": pa.string(),
+    "JSON": pa.string(),
+    "BOOLEAN": pa.bool_(),
+    "TINYINT": pa.int8(),
+    "SMALLINT": pa.int16(),
+    "INTEGER": pa.int32(),
+    "BIGINT": pa.int64(),
+    "UBIGINT": pa.uint64(),
+    "FLOAT": pa.float32(),
+    "DOUBLE": pa.float64(),
+    "TIMESTAMP": pa.timestamp("us"),
+    "FLOAT[]": pa.list_(pa.float32()),
+}
+
+# fixed-size float arrays such as FLOAT[384] used for embeddings
+FLOAT_ARRAY_TYPE_PATTERN = re.compile(r"^FLOAT\[(\d+)\]$")
+
+
 class DuckDBClient(metaclass=SingletonMetaDuckDB):
+    """
+    The process-wide client of the DuckDB database.
+
+    DuckDB supports concurrent readers on the same database instance, so each
+    thread runs its queries on its own cursor without any table lock. All
+    the mutations (insert, update, delete) go through a single writer thread
+    in the order they are submitted, the caller blocks until its statement is
+    finished and gets the exception raised by the statement if any.
+
+    Use get_stats() to get the time spent waiting for the writer and the
+    table locks.
+    """
 
     # mapping from defined schema to existing stored type if different
     # see [Readme.md](./Readme.md) for more details
@@ -50,6 +115,18 @@ class DuckDBClient(metaclass=SingletonMetaDuckDB):
             self.created_tables: Dict[str, str] = {}
             self._lock = Lock()
             self.table_locks = {}
+            # each thread reuses its own cursor for the read queries
+            self._local = threading.local()
+            self._stats_lock = Lock()
+            self._wait_stats: Dict[str, LockWaitStats] = {
+                STATS_WRITE_QUEUE: LockWaitStats(),
+                STATS_TABLE_LOCK: LockWaitStats(),
+            }
+            # table name to its column types, used to build the Arrow tables
+            self._column_types: Dict[str, Dict[str, str]] = {}
+            self._write_queue: Queue[
+                Tuple[str, Optional[List[Any]], Optional[Any], bool, Future, float]
+            ] = Queue()
 
             logger().info(f"Connecting to DuckDB at {self.db_path}")
 
@@ -61,6 +138,11 @@ class DuckDBClient(metaclass=SingletonMetaDuckDB):
                     operation_desc="Error connecting to DuckDB", error=str(e)
                 )
 
+            self._writer_thread = threading.Thread(
+                target=self._writer_loop, name="duckdb-writer", daemon=True
+            )
+            self._writer_thread.start()
+
     def _get_table_lock(self, table_name: str) -> Lock:
         """Retrieve or create a lock for the specified table, ensuring thread safety."""
         with self._lock:
@@ -68,12 +150,196 @@ class DuckDBClient(metaclass=SingletonMetaDuckDB):
                 self.table_locks[table_name] = Lock()
             return self.table_locks[table_name]
 
+    def _acquire_table_lock(self, table_name: str) -> Lock:
+        """Acquire the lock for the table and record the wait time."""
+        table_lock = self._get_table_lock(table_name)
+        start_time = time.perf_counter()
+        table_lock.acquire()
+        self._record_wait(STATS_TABLE_LOCK, start_time)
+        return table_lock
+
+    def _record_wait(self, stats_name: str, start_time: float) -> None:
+        wait_ms = (time.perf_counter() - start_time) * 1000
+        with self._stats_lock:
+            self._wait_stats[stats_name].record(wait_ms)
+
+    def _get_cursor(self) -> duckdb.DuckDBPyConnection:
+        """Get the cursor of the current thread, create one if needed."""
+        cursor = getattr(self._local, "cursor", None)
+        if cursor is None:
+            cursor = self.conn.cursor()
+            self._local.cursor = cursor
+        return cursor
+
+    def _writer_loop(self) -> None:
+        """Run the submitted mutations one by one on the writer cursor."""
+        cursor = self.conn.cursor()
+        while True:
+            sql, value_list, source, fetch, future, submitted_at = (
+                self._write_queue.get()
+            )
+            self._record_wait(STATS_WRITE_QUEUE, submitted_at)
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if source is not None:
+                    cursor.register(BULK_INSERT_SOURCE, source)
+                try:
+                    if fetch:
+                        result = self._fetch_all(cursor, sql, value_list)
+                    elif value_list is not None:
+                        cursor.execute(sql, value_list)
+                        result = None
+                    else:
+                        cursor.execute(sql)
+                        result = None
+                finally:
+                    if source is not None:
+                        cursor.unregister(BULK_INSERT_SOURCE)
+                future.set_result(result)
+            except Exception as e:
+                future.set_exception(e)
+
+    def _execute_write(
+        self,
+        sql: str,
+        value_list: List[Any] = None,
+        source: Any = None,
+        fetch: bool = False,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Submit a mutation to the writer and wait for it to finish.
+
+        If source is specified, it is registered as BULK_INSERT_SOURCE on the
+        writer cursor while the statement runs. If fetch is True, the rows
+        returned by the statement are returned as dictionaries.
+        """
+        future: Future = Future()
+        self._write_queue.put(
+            (sql, value_list, source, fetch, future, time.perf_counter())
+        )
+        return future.result()
+
+    def _get_column_types(self, table_name: str) -> Dict[str, str]:
+        with self._lock:
+            column_types = self._column_types.get(table_name)
+        if column_types is not None:
+            return column_types
+
+        rows = (
+            self._get_cursor()
+            .execute(f"SELECT name, type FROM pragma_table_info('{table_name}')")
+            .fetchall()
+        )
+        column_types = {row[0]: row[1].upper() for row in rows}
+        with self._lock:
+            self._column_types[table_name] = column_types
+        return column_types
+
+    def _rows_to_arrow(
+        self, table_name: str, column_list: List[str], values: List[List[Any]]
+    ) -> Optional[pa.Table]:
+        """
+        Convert the rows to an Arrow table using the column types of the table.
+
+        Returns None if some column can't be converted, the caller should use
+        the VALUES statement instead.
+        """
+        column_types = self._get_column_types(table_name)
+        arrays: Dict[str, pa.Array] = {}
+        for i, column_name in enumerate(column_list):
+            column_type = column_types.get(column_name)
+            if column_type is None:
+                return None
+            match = FLOAT_ARRAY_TYPE_PATTERN.match(column_type)
+            if match is not None:
+                arrow_type = pa.list_(pa.float32(), int(match.group(1)))
+            else:
+                arrow_type = ARROW_TYPE_MAP.get(column_type)
+            if arrow_type is None:
+                return None
+
+            column_values = [row[i] for row in values]
+            if column_type == "JSON":
+                column_values = [
+                    (
+                        value
+                        if value is None or isinstance(value, str)
+                        else json.dumps(value, separators=(",", ":"))
+                    )
+                    for value in column_values
+                ]
+            try:
+                arrays[column_name] = pa.array(column_values, type=arrow_type)
+            except (pa.ArrowException, TypeError) as e:
+                logger().noop(
+                    f"Can't convert column {column_name} to Arrow: {e}", noop_lvl=2
+                )
+                return None
+        return pa.table(arrays)
+
+    def bulk_insert_into_table(
+        self, table_name: str, data: Any, column_list: List[str] = None
+    ) -> None:
+        """
+        Insert all the rows of a columnar relation with one INSERT ... SELECT.
+
+        The data is scanned by DuckDB directly without binding the values one
+        parameter at a time, so large batches such as embeddings are inserted
+        without creating a Python object per value.
+
+        Args:
+        - table_name: The table name.
+        - data: A pyarrow Table or any other relation DuckDB can register, such
+            as a pandas DataFrame, whose column names match the table columns.
+        - column_list: The columns to insert, default to all columns of the data.
+
+        Returns:
+        - None
+        """
+        if column_list is None:
+            if isinstance(data, pa.Table):
+                column_list = data.column_names
+            else:
+                column_list = list(data.columns)
+        if not column_list:
+            raise exceptions.UnexpectedCaseException(
+                "column_list cannot be empty when inserting values"
+            )
+        if len(data) == 0:
+            return
+
+        columns_str = ",".join(column_list)
+        insert_sql = f"""
+            INSERT INTO {table_name} ({columns_str})
+            SELECT {columns_str} FROM {BULK_INSERT_SOURCE}
+        """
+        logger().noop(f"SQL Statement bulk_insert_into_table: {insert_sql}", noop_lvl=2)
+        self._execute_write(insert_sql, source=data)
+
+    def get_stats(self) -> Dict[str, LockWaitStats]:
+        """
+        Get the wait time statistics of the client.
+
+        Returns:
+        - A dictionary with a copy of the stats for the write queue and the
+            table locks.
+        """
+        with self._stats_lock:
+            return {
+                name: stats.model_copy() for name, stats in self._wait_stats.items()
+            }
+
     def batch_insert_into_table(
         self, table_name: str, column_list: List[str], values: List[List[Any]]
     ) -> None:
         """
         Insert multiple rows into a table.
 
+        The rows are converted to an Arrow table based on the column types of the
+        table and inserted by bulk_insert_into_table. If some value can't be
+        converted, the rows are inserted with a VALUES statement instead.
+
         Args:
         - table_name: The table name.
         - column_list: The list of column names.
@@ -89,25 +355,125 @@ class DuckDBClient(metaclass=SingletonMetaDuckDB):
             raise exceptions.UnexpectedCaseException(
                 "column_list cannot be empty when inserting values"
             )
-        with self.conn.cursor() as cursor:
-            # Create a string of placeholders for each row
-            placeholders = ",".join(
-                ["(" + ",".join(["?"] * len(column_list)) + ")"] * len(values)
+        column_list = list(column_list)
+        arrow_table = self._rows_to_arrow(table_name, column_list, values)
+        if arrow_table is not None:
+            self.bulk_insert_into_table(table_name, arrow_table, column_list)
+            return
+        self._batch_insert_values(table_name, column_list, values)
+
+    def _batch_insert_values(
+        self, table_name: str, column_list: List[str], values: List[List[Any]]
+    ) -> None:
+        """Insert multiple rows with one VALUES statement."""
+        # Create a string of placeholders for each row
+        placeholders = ",".join(
+            ["(" + ",".join(["?"] * len(column_list)) + ")"] * len(values)
+        )
+        # Flatten the list of values for the executemany function
+        flattened_values: List[Any] = []
+        for sublist in values:
+            for item in sublist:
+                flattened_values.append(item)
+        insert_sql = f"""
+            INSERT INTO {table_name} ({",".join(column_list)})
+            VALUES {placeholders}
+        """
+        logger().noop(
+            f"SQL Statement batch_insert_into_table: {insert_sql}", noop_lvl=2
+        )
+        self._execute_write(insert_sql, flattened_values)
+
+    def batch_upsert_into_table(
+        self,
+        table_name: str,
+        column_list: List[str],
+        values: List[List[Any]],
+        update_column_list: Optional[List[str]] = None,
+    ) -> None:
+        """
+        Insert multiple rows into a table with a primary key, the rows with the
+        same key as an existing row replace it.
+
+        Args:
+        - table_name: The table name.
+        - column_list: The list of column names.
+        - values: The list of rows to insert, at most one row per key.
+        - update_column_list: The columns to update in the existing rows, all the
+            columns if None. DuckDB can't update the list columns, so leave them out
+            if they don't change for the same key.
+
+        Returns:
+        - None
+        """
+        if not values:
+            return
+        placeholders = ",".join(
+            ["(" + ",".join(["?"] * len(column_list)) + ")"] * len(values)
+        )
+        flattened_values = [item for row in values for item in row]
+        if update_column_list is None:
+            upsert_sql = f"""
+                INSERT OR REPLACE INTO {table_name} ({",".join(column_list)})
+                VALUES {placeholders}
+            """
+        else:
+            update_clause = ", ".join(
+                [f"{column} = excluded.{column}" for column in update_column_list]
             )
-            # Flatten the list of values for the executemany function
-            flattened_values: List[Any] = []
-            for sublist in values:
-                for item in sublist:
-                    flattened_values.append(item)
-            insert_sql = f"""
+            upsert_sql = f"""
                 INSERT INTO {table_name} ({",".join(column_list)})
                 VALUES {placeholders}
+                ON CONFLICT DO UPDATE SET {update_clause}
             """
-            logger().noop(
-                f"SQL Statement batch_insert_into_table: {insert_sql}", noop_lvl=2
+        logger().noop(
+            f"SQL Statement batch_upsert_into_table: {upsert_sql}", noop_lvl=2
+        )
+        self._execute_write(upsert_sql, flattened_values)
+
+    def batch_insert_into_table_returning(
+        self,
+        table_name: str,
+        column_list: List[str],
+        values: List[List[Any]],
+        returning_columns: List[str],
+    ) -> List[Dict[str, Any]]:
+        """
+        Insert multiple rows with one VALUES statement and return the inserted rows.
+
+        Used to get the values generated by the table for the new rows, such as
+        the ids from a sequence, without querying the table again.
+
+        Args:
+        - table_name: The table name.
+        - column_list: The list of column names.
+        - values: The list of rows to insert.
+        - returning_columns: The columns of the inserted rows to return.
+
+        Returns:
+        - The inserted rows as column-value dictionaries, in the order of values.
+        """
+        if not values:
+            return []
+
+        if not column_list:
+            raise exceptions.UnexpectedCaseException(
+                "column_list cannot be empty when inserting values"
             )
-            with self._get_table_lock(table_name):
-                cursor.execute(insert_sql, flattened_values)
+        placeholders = ",".join(
+            ["(" + ",".join(["?"] * len(column_list)) + ")"] * len(values)
+        )
+        flattened_values = [item for row in values for item in row]
+        insert_sql = (
+            f"INSERT INTO {table_name} ({','.join(column_list)}) "
+            f"VALUES {placeholders} "
+            f"RETURNING {','.join(returning_columns)}"
+        )
+        logger().noop(
+            f"SQL Statement batch_insert_into_table_returning: {insert_sql}",
+            noop_lvl=2,
+        )
+        return self._execute_write(insert_sql, flattened_values, fetch=True)
 
     def get_table_from_cache(
         self,
@@ -115,11 +481,8 @@ class DuckDBClient(metaclass=SingletonMetaDuckDB):
         table_name: str,
     ) -> str:
         table_key = f"{schema_name}.{table_name}"
-        with self._get_table_lock(table_name):
-            table_name_in_db = self.created_tables.get(table_key)
-            if table_name_in_db is not None:
-                return table_name_in_db
-            return None
+        with self._lock:
+            return self.created_tables.get(table_key)
 
     def create_table_if_not_exists(
         self,
@@ -152,7 +515,13 @@ class DuckDBClient(metaclass=SingletonMetaDuckDB):
 
         # Since multiple threads will be creating tables at the same time,
         # we need to gurantee that only one thread will be creating the table.
-        with self._get_table_lock(table_name):
+        with self._lock:
+            table_name_in_db = self.created_tables.get(table_key)
+        if table_name_in_db is not None:
+            return table_name_in_db
+
+        table_lock = self._acquire_table_lock(table_name)
+        try:
             table_name_in_db = self.created_tables.get(table_key)
             if table_name_in_db is not None:
                 return table_name_in_db
@@ -238,23 +607,27 @@ class DuckDBClient(metaclass=SingletonMetaDuckDB):
                             """
                             logger().info(f"Adding new column: {alter_sql}")
                             cursor.execute(alter_sql)
+                    with self._lock:
+                        self._column_types.pop(
+                            f"{new_schema_name}.{new_table_name}", None
+                        )
 
-                self.created_tables[table_key] = f"{new_schema_name}.{new_table_name}"
+                with self._lock:
+                    self.created_tables[table_key] = (
+                        f"{new_schema_name}.{new_table_name}"
+                    )
                 return self.created_tables[table_key]
+        finally:
+            table_lock.release()
 
     def delete_from_table(
         self, table_name: str, where_clause: str = None, value_list: List[Any] = None
     ) -> None:
-        with self.conn.cursor() as cursor:
-            delete_sql = f"DELETE FROM {table_name}"
-            if where_clause is not None:
-                delete_sql += f" {where_clause}"
-            logger().noop(f"SQL Statement delete_sql: {delete_sql}", noop_lvl=2)
-            with self._get_table_lock(table_name):
-                if value_list is not None:
-                    cursor.execute(delete_sql, value_list)
-                else:
-                    cursor.execute(delete_sql)
+        delete_sql = f"DELETE FROM {table_name}"
+        if where_clause is not None:
+            delete_sql += f" {where_clause}"
+        logger().noop(f"SQL Statement delete_sql: {delete_sql}", noop_lvl=2)
+        self._execute_write(delete_sql, value_list)
 
     def _get_create_table_sql(
         self, schema_name: str, table_name: str, columns: Dict[str, str]
@@ -267,23 +640,57 @@ class DuckDBClient(metaclass=SingletonMetaDuckDB):
         """
 
     def execute_sql(self, sql: str, value_list: List[Any] = None) -> None:
-        with self.conn.cursor() as cursor:
-            if value_list is not None:
-                cursor.execute(sql, value_list)
-            else:
-                cursor.execute(sql)
+        """
+        Execute a DDL or maintenance statement, such as creating an index.
+
+        These statements run on the cursor of the calling thread instead of the
+        writer, so a long index rebuild does not block other mutations.
+        """
+        cursor = self._get_cursor()
+        if value_list is not None:
+            cursor.execute(sql, value_list)
+        else:
+            cursor.execute(sql)
 
     def execute_and_fetch_all(
-        self, sql: str, value_list: List[Any] = None
+        self,
+        sql: str,
+        value_list: List[Any] = None,
+        session_settings: Dict[str, Any] = None,
     ) -> List[Dict[str, Any]]:
+        """
+        Execute a query and fetch all the results as dictionaries.
+
+        Args:
+        - sql: The SQL statement to execute.
+        - value_list: The values for the placeholders in the SQL statement.
+        - session_settings: Settings applied with SET on the cursor before the
+            query, e.g. {"hnsw_ef_search": 64}. They only affect this query.
+
+        Returns:
+        - The list of rows as column-value dictionaries.
+        """
+        if session_settings is None:
+            return self._fetch_all(self._get_cursor(), sql, value_list)
+
+        # use a new cursor so that the settings do not leak to other queries
         with self.conn.cursor() as cursor:
-            if value_list is not None:
-                results = cursor.execute(sql, value_list).fetchall()
-            else:
-                results = cursor.execute(sql).fetchall()
-            column_names = [desc[0] for desc in cursor.description]
-            value = [dict(zip(column_names, row)) for row in results]
-            return value
+            for name, value in session_settings.items():
+                cursor.execute(f"SET {name} = {value}")
+            return self._fetch_all(cursor, sql, value_list)
+
+    def _fetch_all(
+        self,
+        cursor: duckdb.DuckDBPyConnection,
+        sql: str,
+        value_list: List[Any] = None,
+    ) -> List[Dict[str, Any]]:
+        if value_list is not None:
+            results = cursor.execute(sql, value_list).fetchall()
+        else:
+            results = cursor.execute(sql).fetchall()
+        column_names = [desc[0] for desc in cursor.description]
+        return [dict(zip(column_names, row)) for row in results]
 
     def fetch_all_from_table(
         self,
@@ -300,27 +707,16 @@ class DuckDBClient(metaclass=SingletonMetaDuckDB):
         if where_clause is None:
             where_clause = ""
 
-        with self.conn.cursor() as cursor:
-            select_sql = f"""
-                SELECT {column_str} FROM {table_name} 
-                {where_clause}
-                """
-            logger().noop(
-                f"SQL Statement fetch_all_from_table: {select_sql}", noop_lvl=3
-            )
-            logger().noop(
-                f"SQL Statement fetch_all_from_table value_list: {value_list}",
-                noop_lvl=3,
-            )
-            with self._get_table_lock(table_name):
-                if value_list is not None:
-                    results = cursor.execute(select_sql, value_list).fetchall()
-                else:
-                    results = cursor.execute(select_sql).fetchall()
-
-            column_names = [desc[0] for desc in cursor.description]
-            value = [dict(zip(column_names, row)) for row in results]
-            return value
+        select_sql = f"""
+            SELECT {column_str} FROM {table_name} 
+            {where_clause}
+            """
+        logger().noop(f"SQL Statement fetch_all_from_table: {select_sql}", noop_lvl=3)
+        logger().noop(
+            f"SQL Statement fetch_all_from_table value_list: {value_list}",
+            noop_lvl=3,
+        )
+        return self._fetch_all(self._get_cursor(), select_sql, value_list)
 
     def fetch_one_from_table(
         self,
@@ -338,39 +734,34 @@ class DuckDBClient(metaclass=SingletonMetaDuckDB):
         if where_clause is None:
             where_clause = ""
 
-        with self.conn.cursor() as cursor:
-            select_sql = f"""
-                SELECT {column_str} FROM {table_name} 
-                {where_clause}
-                """
-            with self._get_table_lock(table_name):
-                if value_list is not None:
-                    result = cursor.execute(select_sql, value_list).fetchone()
-                else:
-                    result = cursor.execute(select_sql).fetchone()
+        select_sql = f"""
+            SELECT {column_str} FROM {table_name} 
+            {where_clause}
+            """
+        cursor = self._get_cursor()
+        if value_list is not None:
+            result = cursor.execute(select_sql, value_list).fetchone()
+        else:
+            result = cursor.execute(select_sql).fetchone()
 
-            column_names = [desc[0] for desc in cursor.description]
-            value = dict(zip(column_names, result)) if result else None
-            return value
+        column_names = [desc[0] for desc in cursor.description]
+        value = dict(zip(column_names, result)) if result else None
+        return value
 
     def fetch_sequence_current_value(self, sequence_name: str) -> int:
-        with self.conn.cursor() as cursor:
-            return cursor.execute(
-                f"SELECT currval('{sequence_name}') as currval"
-            ).fetchone()[0]
+        cursor = self._get_cursor()
+        return cursor.execute(
+            f"SELECT currval('{sequence_name}') as currval"
+        ).fetchone()[0]
 
     def insert_into_table(
         self, table_name: str, column_list: List[str], value_list: List[Any]
     ) -> None:
-        with self.conn.cursor() as cursor:
-            with self._get_table_lock(table_name):
-                cursor.execute(
-                    f"""
-                INSERT INTO {table_name} ({",".join(column_list)})
-                VALUES ({",".join(["?"] * len(column_list))})
-                """,
-                    value_list,
-                )
+        insert_sql = f"""
+            INSERT INTO {table_name} ({",".join(column_list)})
+            VALUES ({",".join(["?"] * len(column_list))})
+            """
+        self._execute_write(insert_sql, value_list)
 
     def update_table(
         self,
@@ -379,12 +770,44 @@ class DuckDBClient(metaclass=SingletonMetaDuckDB):
         value_list: List[Any],
         where_clause: str = None,
     ) -> None:
-        with self.conn.cursor() as cursor:
-            set_clause = ",".join([f"{k} = ?" for k in column_list])
-            update_sql = f"UPDATE {table_name} SET {set_clause} "
-            if where_clause is not None:
-                update_sql += f"{where_clause}"
-            logger().noop(f"SQL Statement update_sql: {update_sql}", noop_lvl=2)
-            logger().noop(f"SQL Statement value_list: {value_list}", noop_lvl=2)
-            with self._get_table_lock(table_name):
-                cursor.execute(update_sql, value_list)
+        set_clause = ",".join([f"{k} = ?" for k in column_list])
+        update_sql = f"UPDATE {table_name} SET {set_clause} "
+        if where_clause is not None:
+            update_sql += f"{where_clause}"
+        logger().noop(f"SQL Statement update_sql: {update_sql}", noop_lvl=2)
+        logger().noop(f"SQL Statement value_list: {value_list}", noop_lvl=2)
+        self._execute_write(update_sql, value_list)
+
+    def update_table_returning(
+        self,
+        table_name: str,
+        column_list: List[str],
+        value_list: List[Any],
+        where_clause: str,
+        returning_columns: List[str],
+    ) -> List[Dict[str, Any]]:
+        """
+        Update the rows matching the where clause and return the updated rows.
+
+        The writer runs the mutations one at a time, so the condition in the where
+        clause is checked and the rows are updated atomically, which can be used
+        to claim a row.
+
+        Args:
+        - table_name: The table name.
+        - column_list: The columns to update.
+        - value_list: The values of the columns followed by the values of the
+            placeholders in the where clause.
+        - where_clause: The where clause, starting with WHERE.
+        - returning_columns: The columns of the updated rows to return.
+
+        Returns:
+        - The updated rows as column-value dictionaries.
+        """
+        set_clause = ",".join([f"{k} = ?" for k in column_list])
+        update_sql = (
+            f"UPDATE {table_name} SET {set_clause} {where_clause} "
+            f"RETURNING {','.join(returning_columns)}"
+        )
+        logger().noop(f"SQL Statement update_sql: {update_sql}", noop_lvl=2)
+        return self._execute_write(update_sql, value_list, fetch=True)
@@ -1,4 +1,5 @@
-import inspect
+import os
+import sys
 import traceback
 from typing import List, Optional
 
@@ -34,17 +35,14 @@ class EdsExceptionBase(Exception):
         """
         Retrieves information about where the exception was raised.
         """
-        stack = inspect.stack()
-
-        # stack[1] gives previous function ('info' in our case)
-        # stack[2] gives before previous function and so on
-
-        fn = stack[3][1]
-        fn = fn.split("/")[-1]
-        ln = stack[3][2]
-        func = stack[3][3]
-
-        return fn, ln, func
+        # frame 1 is the __init__ of the base class, frame 2 is the __init__ of
+        # the exception class, and frame 3 is where the exception was raised
+        try:
+            frame = sys._getframe(3)
+        except ValueError:
+            return "", 0, ""
+        code = frame.f_code
+        return os.path.basename(code.co_filename), frame.f_lineno, code.co_name
 
 
 class InsufficientBalanceException(EdsExceptionBase):
@@ -1,13 +1,18 @@
-import inspect
 import logging
 import os
+import queue
 import sys
 import threading
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-from typing import Dict, Optional, Union
+from typing import Any, Dict, Optional, Union
 
 thread_local = threading.local()
 
+# the frames between the caller and __get_call_info:
+# __get_call_info <- _get_full_massage <- _log_message <- info/debug/... <- caller
+_CALLER_STACK_LEVEL = 4
+
 
 class EventLogger:
     """
@@ -19,6 +24,10 @@ class EventLogger:
 
     global_default_level: str = os.environ.get("EDS_LOG_LEVEL", "INFO")
     default_encoding: str = os.environ.get("EDS_LOG_ENCODING", "utf-8")
+    # write the per-query log files in a background thread
+    query_log_async_write: bool = (
+        os.environ.get("EDS_LOG_QUERY_ASYNC_WRITE", "false").lower() == "true"
+    )
 
     @staticmethod
     def set_global_default_level(level: str) -> None:
@@ -154,22 +163,21 @@ class EventLogger:
             self._default_handler = handler
             self._logger.propagate = False
             self._file_handler = None
+            self._queue_handler: Optional[QueueHandler] = None
+            self._queue_listener: Optional[QueueListener] = None
 
             EventLogger.__instances[name] = self
 
     @staticmethod
     def __get_call_info():
-        stack = inspect.stack()
-
-        # stack[1] gives previous function ('info' in our case)
-        # stack[2] gives before previous function and so on
-
-        fn = stack[3][1]
-        fn = fn.split("/")[-1]
-        ln = stack[3][2]
-        func = stack[3][3]
-
-        return fn, ln, func
+        # only the frame of the caller is needed, inspect.stack() would read the
+        # source lines of the whole stack
+        try:
+            frame = sys._getframe(_CALLER_STACK_LEVEL)
+        except ValueError:
+            return "", 0, ""
+        code = frame.f_code
+        return os.path.basename(code.co_filename), frame.f_lineno, code.co_name
 
     @staticmethod
     def _check_valid_logging_level(level: str):
@@ -196,6 +204,15 @@ class EventLogger:
         """Get the logging level"""
         return self.level
 
+    def is_enabled_for(self, level: str) -> bool:
+        """Check if the messages of the level will be logged, so that the callers
+        can skip building expensive messages.
+
+        Args:
+            level (str): Can only be INFO, DEBUG, WARNING and ERROR.
+        """
+        return self._logger.isEnabledFor(getattr(logging, level.upper()))
+
     def set_log_detail(
         self,
         thread: Optional[bool] = True,
@@ -205,7 +222,11 @@ class EventLogger:
         self._detail_code_loc = code_loc
 
     def log_to_file(
-        self, file: Union[str, Path], level: Optional[str] = None, mode: str = "a"
+        self,
+        file: Union[str, Path],
+        level: Optional[str] = None,
+        mode: str = "a",
+        async_write: bool = False,
     ) -> logging.FileHandler:
         """Save the logs to a file
 
@@ -213,13 +234,14 @@ class EventLogger:
             file (A string or pathlib.Path object): The file to save the log.
             level (str): Can only be INFO, DEBUG, WARNING and ERROR. If None, use current logger level.
             mode (str): The mode to write log into the file.
+            async_write (bool): Write the file in a background thread.
         """
         assert isinstance(
             file, (str, Path)
         ), f"expected argument path to be type str or Path, but got {type(file)}"
         if isinstance(file, str):
             file = Path(file)
-        return self.log_to_dir(file.parent, level, mode, file.name)
+        return self.log_to_dir(file.parent, level, mode, file.name, async_write)
 
     def log_to_dir(
         self,
@@ -227,6 +249,7 @@ class EventLogger:
         level: Optional[str] = None,
         mode: str = "a",
         filename: str = "events.log",
+        async_write: bool = False,
     ) -> logging.FileHandler:
         """Save the logs to a dir
 
@@ -235,6 +258,9 @@ class EventLogger:
         - mode (str): The mode to write log into the file.
         - level (str): Can only be INFO, DEBUG, WARNING and ERROR. If None, use current logger level.
         - filename (str): a log filename, default is 'events.log'.
+        - async_write (bool): If True, the records are put in a queue and written
+            to the file by a listener thread, so the callers do not wait for the
+            disk. The formatter of the returned file handler is still used.
         """
         assert isinstance(
             dir, (str, Path)
@@ -259,7 +285,17 @@ class EventLogger:
         )
         file_handler.setLevel(log_level)
         file_handler.setFormatter(self.get_default_formatter())
-        self._logger.addHandler(file_handler)
+        if async_write:
+            queue_handler = QueueHandler(queue.SimpleQueue())
+            queue_handler.setLevel(log_level)
+            self._queue_listener = QueueListener(
+                queue_handler.queue, file_handler, respect_handler_level=True
+            )
+            self._queue_listener.start()
+            self._queue_handler = queue_handler
+            self._logger.addHandler(queue_handler)
+        else:
+            self._logger.addHandler(file_handler)
         self._file_handler = file_handler
         return file_handler
 
@@ -290,8 +326,15 @@ class EventLogger:
 
     def remove_file_handler(self) -> None:
         try:
+            if self._queue_handler is not None:
+                self._logger.removeHandler(self._queue_handler)
+                self._queue_handler = None
+                # writes the records left in the queue before returning
+                self._queue_listener.stop()
+                self._queue_listener = None
             if self._file_handler is not None:
                 self._logger.removeHandler(self._file_handler)
+                self._file_handler.close()
                 self._file_handler = None
             else:
                 self._logger.warning(
@@ -303,6 +346,17 @@ class EventLogger:
     def _log(self, level, message: str) -> None:
         getattr(self._logger, level)(message)
 
+    def _log_message(self, level: int, message: str, args: tuple) -> None:
+        # check the level first so that nothing is formatted for skipped messages
+        if not self._logger.isEnabledFor(level):
+            return
+        if args:
+            try:
+                message = message % args
+            except (TypeError, ValueError):
+                message = f"{message} {args}"
+        self._logger.log(level, self._get_full_massage(message))
+
     def _get_full_massage(self, message: str) -> str:
         code_location = ""
         if self._detail_code_loc:
@@ -312,37 +366,41 @@ class EventLogger:
             thread_info = f"[{self._pid}-{self._tid}] "
         return f"{thread_info}{message}{code_location}"
 
-    def info(self, message: str) -> None:
+    def info(self, message: str, *args: Any) -> None:
         """Log an info message.
 
         Args:
-            message (str): The message to be logged.
+            message (str): The message to be logged, formatted with args in the
+                %-style only if the message is logged.
         """
-        self._log("info", self._get_full_massage(message))
+        self._log_message(logging.INFO, message, args)
 
-    def warning(self, message: str) -> None:
+    def warning(self, message: str, *args: Any) -> None:
         """Log a warning message.
 
         Args:
-            message (str): The message to be logged.
+            message (str): The message to be logged, formatted with args in the
+                %-style only if the message is logged.
         """
-        self._log("warning", self._get_full_massage(message))
+        self._log_message(logging.WARNING, message, args)
 
-    def debug(self, message: str) -> None:
+    def debug(self, message: str, *args: Any) -> None:
         """Log a debug message.
 
         Args:
-            message (str): The message to be logged.
+            message (str): The message to be logged, formatted with args in the
+                %-style only if the message is logged.
         """
-        self._log("debug", self._get_full_massage(message))
+        self._log_message(logging.DEBUG, message, args)
 
-    def error(self, message: str) -> None:
+    def error(self, message: str, *args: Any) -> None:
         """Log an error message.
 
         Args:
-            message (str): The message to be logged.
+            message (str): The message to be logged, formatted with args in the
+                %-style only if the message is logged.
         """
-        self._log("error", self._get_full_massage(message))
+        self._log_message(logging.ERROR, message, args)
 
     def noop(self, message: str, noop_lvl: Optional[int] = 1) -> None:
         """No-op, for place holders and temporary logging.
@@ -355,7 +413,7 @@ class EventLogger:
         """
 
         if noop_lvl <= self.log_noop_level:
-            self._log("debug", self._get_full_massage(message))
+            self._log_message(logging.DEBUG, message, ())
         return
 
 
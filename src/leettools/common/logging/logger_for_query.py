@@ -30,6 +30,8 @@ def get_logger_for_chat(chat_id: str, query_id: str) -> Tuple[str, EventLogger]:
             return logger_name, display_logger
         # else: this case should not happen, but we will create a new file handler
 
-    handler = display_logger.log_to_file(log_location + "/query.log")
+    handler = display_logger.log_to_file(
+        log_location + "/query.log", async_write=EventLogger.query_log_async_write
+    )
     handler.setFormatter(EventLogger.get_simple_formatter())
     return logger_name, display_logger
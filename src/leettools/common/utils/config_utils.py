@@ -83,6 +83,42 @@ def get_int_option_value(
     return value
 
 
+def get_float_option_value(
+    options: Dict[str, Any],
+    option_name: str,
+    default_value: Optional[float] = None,
+    display_logger: Optional[EventLogger] = None,
+) -> Optional[float]:
+    """
+    Get the float value of the option from the options.
+
+    Args:
+    -   options: The options.
+    -   option_name: The name of the option.
+    -   default_value: The default value of the option.
+    -   display_logger: The logger to display the warning message.
+
+    Returns:
+    -   The float value of the option.
+    """
+    if display_logger is None:
+        display_logger = logger()
+
+    value_obj = options.get(option_name, None)
+    if value_obj is None:
+        value = default_value
+    else:
+        try:
+            value = float(value_obj)
+        except ValueError:
+            display_logger.warning(
+                f"Failed to convert the value of the option to float {option_name}: [{value_obj}]. "
+                f"Using the default value {default_value}."
+            )
+            value = default_value
+    return value
+
+
 def get_bool_option_value(
     options: Dict[str, Any],
     option_name: str,
@@ -229,6 +229,19 @@ def filename_timestamp_to_datetime(timestamp: str) -> datetime:
     return datetime.strptime(timestamp, "%Y-%m-%d-%H-%M-%S-%f")
 
 
+def remove_filename_timestamp(filename: str) -> str:
+    """
+    Remove the timestamp added by filename_timestamp from a filename.
+
+    Args:
+    - filename (str): The filename, such as "prefix.2024-01-02-03-04-05-123456.html".
+
+    Returns:
+    - str: The filename without the timestamp, such as "prefix.html".
+    """
+    return re.sub(r"\.\d{4}-\d{2}-\d{2}-\d{2}-\d{2}-\d{2}-\d{6}(?=\.|$)", "", filename)
+
+
 def get_files_with_timestamp(
     directory: str, prefix: str, suffix: str
 ) -> List[Tuple[str, datetime]]:
@@ -0,0 +1,78 @@
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket to limit the rate of the calls to a resource.
+
+    The bucket holds up to capacity tokens and is refilled at rate_per_second
+    tokens per second. A rate of 0 or less means no limit.
+
+    A call larger than the capacity waits for a full bucket and then takes all of
+    its tokens, leaving the bucket in debt, so the next calls wait until the
+    extra tokens are refilled and the rate holds for calls of any size.
+    """
+
+    def __init__(self, rate_per_second: float, capacity: float) -> None:
+        self._condition = threading.Condition()
+        self.rate_per_second = rate_per_second
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity,
+            self._tokens + (now - self._last_refill) * self.rate_per_second,
+        )
+        self._last_refill = now
+
+    def set_rate(self, rate_per_second: float) -> None:
+        """
+        Change the refill rate, the tokens already in the bucket are kept.
+
+        Args:
+        - rate_per_second: The new number of tokens added per second.
+        """
+        with self._condition:
+            if self.rate_per_second > 0:
+                self._refill()
+            else:
+                self._last_refill = time.monotonic()
+            self.rate_per_second = rate_per_second
+            self._condition.notify_all()
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """
+        Take tokens from the bucket, blocking until they are available.
+
+        Args:
+        - tokens: The number of tokens to take, all of them are charged even if
+            more than the capacity.
+        - timeout: The max seconds to wait, wait forever if None.
+
+        Returns:
+        - True if the tokens are taken, False if the timeout is reached.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                if self.rate_per_second <= 0:
+                    return True
+                self._refill()
+                # a full bucket is enough for a call larger than the capacity
+                required = min(tokens, self.capacity)
+                if self._tokens >= required:
+                    self._tokens -= tokens
+                    return True
+                wait = (required - self._tokens) / self.rate_per_second
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    wait = min(wait, remaining)
+                # set_rate wakes up the waiters to use the new rate
+                self._condition.wait(wait)
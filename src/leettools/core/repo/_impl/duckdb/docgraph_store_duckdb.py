@@ -1,10 +1,13 @@
 import uuid
+from typing import Any, List, Tuple
 
 from leettools.common.duckdb.duckdb_client import DuckDBClient
 from leettools.core.repo._impl.duckdb.docgraph_store_duckdb_schema import (
     CHILD_NODE_ID_ATTR,
     GRAPH_DB_NAME,
+    GRAPH_NODE_ID_ATTR,
     PARENT_NODE_ID_ATTR,
+    RELATIONSHIP_ID_ATTR,
     DocGraphNodeDuckDBSchema,
     DocGraphRelationshipDuckDBSchema,
 )
@@ -43,6 +46,16 @@ class GraphStoreDuckDB(AbstractDocGraphStore):
             DocGraphRelationshipDuckDBSchema.get_create_sequence_sql(),
         )
 
+    def _get_node_value_list(self, segment_in_db: SegmentInDB) -> List[Any]:
+        segment_uuid = segment_in_db.segment_uuid
+        doc_id = segment_in_db.document_uuid
+        heading = segment_in_db.heading
+        start = segment_in_db.start_offset
+        offset = segment_in_db.end_offset
+        if heading == "Root":
+            segment_uuid = str(uuid.uuid4())
+        return [segment_uuid, doc_id, heading, start, offset]
+
     def create_segment_node(self, segment_in_db: SegmentInDB) -> int:
         """
         Create a segment in the graph database.
@@ -53,14 +66,19 @@ class GraphStoreDuckDB(AbstractDocGraphStore):
         Returns:
         The id of the node.
         """
-        segment_uuid = segment_in_db.segment_uuid
-        doc_id = segment_in_db.document_uuid
-        heading = segment_in_db.heading
-        start = segment_in_db.start_offset
-        offset = segment_in_db.end_offset
-        if heading == "Root":
-            segment_uuid = str(uuid.uuid4())
+        return self.create_segment_nodes([segment_in_db])[0]
+
+    def create_segment_nodes(self, segments_in_db: List[SegmentInDB]) -> List[int]:
+        """
+        Create the nodes for a list of segments with one insert, the ids are
+        returned by the insert instead of reading the sequence afterwards.
+
+        Args:
+        segments_in_db: The segments to be created.
 
+        Returns:
+        The ids of the nodes in the same order as the segments.
+        """
         column_list = [
             Segment.FIELD_SEGMENT_UUID,
             Segment.FIELD_DOCUMENT_UUID,
@@ -68,13 +86,13 @@ class GraphStoreDuckDB(AbstractDocGraphStore):
             Segment.FIELD_START_OFFSET,
             Segment.FIELD_END_OFFSET,
         ]
-        value_list = [segment_uuid, doc_id, heading, start, offset]
-        self.duckdb_client.insert_into_table(
+        rows = self.duckdb_client.batch_insert_into_table_returning(
             table_name=self.node_table_name,
             column_list=column_list,
-            value_list=value_list,
+            values=[self._get_node_value_list(s) for s in segments_in_db],
+            returning_columns=[GRAPH_NODE_ID_ATTR],
         )
-        return self.duckdb_client.fetch_sequence_current_value("graph_node_id_seq")
+        return [row[GRAPH_NODE_ID_ATTR] for row in rows]
 
     def create_segments_relationship(self, parent_id: int, child_id: int) -> int:
         """
@@ -87,14 +105,28 @@ class GraphStoreDuckDB(AbstractDocGraphStore):
         Returns:
         The id of the created relationship.
         """
-        column_list = [PARENT_NODE_ID_ATTR, CHILD_NODE_ID_ATTR]
-        value_list = [parent_id, child_id]
-        self.duckdb_client.insert_into_table(
+        return self.create_segments_relationships([(parent_id, child_id)])[0]
+
+    def create_segments_relationships(
+        self, parent_child_pairs: List[Tuple[int, int]]
+    ) -> List[int]:
+        """
+        Create the BELONGS_TO relationships for a list of node pairs with one
+        insert.
+
+        Args:
+        parent_child_pairs: The (parent_id, child_id) pairs.
+
+        Returns:
+        The ids of the created relationships in the same order as the pairs.
+        """
+        rows = self.duckdb_client.batch_insert_into_table_returning(
             table_name=self.relationship_table_name,
-            column_list=column_list,
-            value_list=value_list,
+            column_list=[PARENT_NODE_ID_ATTR, CHILD_NODE_ID_ATTR],
+            values=[list(pair) for pair in parent_child_pairs],
+            returning_columns=[RELATIONSHIP_ID_ATTR],
         )
-        return self.duckdb_client.fetch_sequence_current_value("relationship_id_seq")
+        return [row[RELATIONSHIP_ID_ATTR] for row in rows]
 
     def delete_segment_node(self, segment_in_db: SegmentInDB) -> bool:
         """
@@ -10,6 +10,7 @@ from leettools.core.consts.docsink_status import DocSinkStatus
 from leettools.core.repo._impl.duckdb.docsink_store_duckdb_schema import (
     DocsinkDuckDBSchema,
 )
+from leettools.core.repo.change_feed import ChangeFeed
 from leettools.core.repo.docsink_store import AbstractDocsinkStore
 from leettools.core.schemas.docsink import (
     DocSink,
@@ -32,6 +33,7 @@ class DocsinkStoreDuckDB(AbstractDocsinkStore):
         """Initialize DuckDB connection."""
         self.settings = settings
         self.duckdb_client = DuckDBClient(settings)
+        self.change_feed = ChangeFeed()
 
     def _clean_up_related_data(self, org: Org, kb: KnowledgeBase, docsink: DocSink):
         """Clean up related data for a docsink."""
@@ -151,6 +153,9 @@ class DocsinkStoreDuckDB(AbstractDocsinkStore):
                 value_list=value_list,
             )
             result = self.get_docsink_by_id(org, kb, docsink_uuid)
+            self.change_feed.mark_dirty(
+                org.org_id, kb.kb_id, docsink_in_db.docsource_uuids
+            )
 
             if result is not None:
                 logger().debug(f"Successfllly created a new DocSink: {docsink_uuid}.")
@@ -322,4 +327,7 @@ class DocsinkStoreDuckDB(AbstractDocsinkStore):
             value_list=value_list,
             where_clause=where_clause,
         )
+        self.change_feed.mark_dirty(
+            org.org_id, kb.kb_id, docsink_update.docsource_uuids
+        )
         return self.get_docsink_by_id(org, kb, data[DocSink.FIELD_DOCSINK_UUID])
@@ -1,6 +1,7 @@
 import json
 import time
 import uuid
+from datetime import datetime
 from typing import List, Optional
 
 from leettools.common import exceptions
@@ -11,6 +12,7 @@ from leettools.core.consts.docsource_status import DocSourceStatus
 from leettools.core.repo._impl.duckdb.docsource_store_duckdb_schema import (
     DocSourceDuckDBSchema,
 )
+from leettools.core.repo.change_feed import ChangeFeed
 from leettools.core.repo.docsource_store import AbstractDocsourceStore
 from leettools.core.schemas.docsource import (
     DocSource,
@@ -32,6 +34,7 @@ class DocsourceStoreDuckDB(AbstractDocsourceStore):
         """Initialize DuckDB connection."""
         self.settings = settings
         self.duckdb_client = DuckDBClient(self.settings)
+        self.change_feed = ChangeFeed()
 
     def _clean_up_related_data(self, org: Org, kb: KnowledgeBase, docsource: DocSource):
         """Clean up related data for a docsource."""
@@ -125,6 +128,9 @@ class DocsourceStoreDuckDB(AbstractDocsourceStore):
             column_list=column_list,
             value_list=value_list,
         )
+        self.change_feed.mark_dirty(
+            org.org_id, kb.kb_id, [data[DocSource.FIELD_DOCSOURCE_UUID]]
+        )
 
         return self.get_docsource(org, kb, data[DocSource.FIELD_DOCSOURCE_UUID])
 
@@ -177,6 +183,21 @@ class DocsourceStoreDuckDB(AbstractDocsourceStore):
         )
         return [self._dict_to_docsource(row) for row in results]
 
+    def get_docsources_updated_since(
+        self, org: Org, kb: KnowledgeBase, updated_since: datetime
+    ) -> List[DocSource]:
+        table_name = self._get_table_name(org, kb)
+        where_clause = (
+            f"WHERE {DocSource.FIELD_KB_ID} = ? AND {DocSource.FIELD_UPDATED_AT} > ?"
+        )
+        value_list = [kb.kb_id, updated_since]
+        results = self.duckdb_client.fetch_all_from_table(
+            table_name=table_name,
+            where_clause=where_clause,
+            value_list=value_list,
+        )
+        return [self._dict_to_docsource(row) for row in results]
+
     def update_docsource(
         self, org: Org, kb: KnowledgeBase, docsource_update: DocSourceUpdate
     ) -> Optional[DocSource]:
@@ -200,6 +221,9 @@ class DocsourceStoreDuckDB(AbstractDocsourceStore):
             value_list=value_list,
             where_clause=where_clause,
         )
+        self.change_feed.mark_dirty(
+            org.org_id, kb.kb_id, [data[DocSource.FIELD_DOCSOURCE_UUID]]
+        )
 
         return self.get_docsource(org, kb, data[DocSource.FIELD_DOCSOURCE_UUID])
 
@@ -10,6 +10,7 @@ from leettools.core.consts.segment_embedder_type import SegmentEmbedderType
 from leettools.core.repo._impl.duckdb.document_store_duckdb_schema import (
     DocumentDuckDBSchema,
 )
+from leettools.core.repo.change_feed import ChangeFeed
 from leettools.core.repo.document_store import AbstractDocumentStore
 from leettools.core.repo.vector_store import (
     create_vector_store_dense,
@@ -37,6 +38,7 @@ class DocumentStoreDuckDB(AbstractDocumentStore):
         """Initialize DuckDB connection."""
         self.settings = settings
         self.duckdb_client = DuckDBClient(self.settings)
+        self.change_feed = ChangeFeed()
 
     def _clean_up_related_data(self, org: Org, kb: KnowledgeBase, document: Document):
         """
@@ -252,6 +254,9 @@ class DocumentStoreDuckDB(AbstractDocumentStore):
             column_list=column_list,
             value_list=value_list,
         )
+        self.change_feed.mark_dirty(
+            org.org_id, kb.kb_id, document_in_store.docsource_uuids
+        )
 
         return self.get_document_by_id(org, kb, document_in_store.document_uuid)
 
@@ -466,4 +471,7 @@ class DocumentStoreDuckDB(AbstractDocumentStore):
             value_list=value_list,
             where_clause=where_clause,
         )
+        self.change_feed.mark_dirty(
+            org.org_id, kb.kb_id, document_update.docsource_uuids
+        )
         return self.get_document_by_id(org, kb, document_uuid)
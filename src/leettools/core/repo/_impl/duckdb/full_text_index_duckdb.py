@@ -0,0 +1,381 @@
+import re
+import threading
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import pyarrow as pa
+from nltk.stem import PorterStemmer
+
+from leettools.common.duckdb.duckdb_client import DuckDBClient
+from leettools.common.logging import logger
+from leettools.core.repo._impl.duckdb.vector_store_duckdb_schema import (
+    FullTextDocsDuckDBSchema,
+    FullTextPostingsDuckDBSchema,
+)
+from leettools.core.schemas.segment import Segment
+
+FULL_TEXT_DOCS_SUFFIX = "_fts_docs"
+FULL_TEXT_POSTINGS_SUFFIX = "_fts_postings"
+
+# the same parameters as the match_bm25 function of the DuckDB fts extension
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+BACKFILL_BATCH_SIZE = 1000
+
+# the index state is shared by all the instances in the process, keyed by the full
+# name of the vector table, so that two instances never index the same rows twice
+_index_tables: Dict[str, Tuple[str, str]] = {}
+_table_locks: Dict[str, threading.RLock] = {}
+_backfilling_tables: Set[str] = set()
+_registry_lock = threading.Lock()
+
+# the english stopwords from NLTK, so that no corpus download is needed
+_ENGLISH_STOPWORDS_TEXT = """
+    i me my myself we our ours ourselves you you're you've you'll you'd your yours
+    yourself yourselves he him his himself she she's her hers herself it it's its
+    itself they them their theirs themselves what which who whom this that that'll
+    these those am is are was were be been being have has had having do does did
+    doing a an the and but if or because as until while of at by for with about
+    against between into through during before after above below to from up down
+    in out on off over under again further then once here there when where why how
+    all any both each few more most other some such no nor not only own same so
+    than too very s t can will just don don't should should've now d ll m o re ve y
+    ain aren aren't couldn couldn't didn didn't doesn doesn't hadn hadn't hasn
+    hasn't haven haven't isn isn't ma mightn mightn't mustn mustn't needn needn't
+    shan shan't shouldn shouldn't wasn wasn't weren weren't won won't wouldn
+    wouldn't
+"""
+ENGLISH_STOPWORDS = frozenset(_ENGLISH_STOPWORDS_TEXT.split())
+
+_stemmer = PorterStemmer()
+
+
+@lru_cache(maxsize=100000)
+def _stem(word: str) -> str:
+    return _stemmer.stem(word)
+
+
+def tokenize_for_full_text(text: str) -> List[str]:
+    """
+    Split the text into index terms: lower case, strip accents, ignore everything
+    but a-z, remove the NLTK english stopwords, and use the NLTK porter stemmer.
+
+    The fts extension uses a longer stopword list and the snowball porter stemmer,
+    so the BM25 scores differ from the ones of the fts index.
+
+    Args:
+    - text: The text to tokenize.
+
+    Returns:
+    - The list of terms, with duplicates.
+    """
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [
+        _stem(word)
+        for word in re.split(r"[^a-z]+", text)
+        if word and word not in ENGLISH_STOPWORDS
+    ]
+
+
+class FullTextIndexDuckDB:
+    """
+    An incremental BM25 full text index for a dense vector table.
+
+    The postings and the document lengths are kept in two tables next to the
+    vector table and are updated in the same batches as the vectors, so the index
+    is always current and no query needs to wait for the index to be rebuilt.
+
+    A segment is indexed once its row is in the docs table. The rows of the
+    vector table without one, e.g. from a KB created before the incremental
+    index was used or left by a crash, are indexed when the index is prepared.
+    """
+
+    def __init__(self, duckdb_client: DuckDBClient) -> None:
+        self.duckdb_client = duckdb_client
+        # vector table name -> (docs table name, postings table name)
+        self.index_tables: Dict[str, Tuple[str, str]] = _index_tables
+
+    def get_table_lock(self, table_name: str) -> threading.RLock:
+        """
+        Get the lock of the index of the vector table, shared by all the instances.
+
+        The callers that insert or delete the rows of the vector table should hold
+        it together with the index update, so the backfill never sees a row whose
+        index update is still in flight.
+        """
+        with _registry_lock:
+            if table_name not in _table_locks:
+                _table_locks[table_name] = threading.RLock()
+            return _table_locks[table_name]
+
+    def prepare_index(self, table_name: str) -> None:
+        """
+        Create the index tables for the vector table if needed, and index the rows
+        of the vector table that are not indexed yet.
+
+        A small backfill runs before returning. A larger one runs in a background
+        thread, and the keyword search misses the rows not indexed yet until it is
+        done. If the process exits first, the next process resumes it.
+
+        Args:
+        - table_name: The full name of the vector table, schema.table.
+        """
+        if table_name in self.index_tables:
+            return
+
+        with self.get_table_lock(table_name):
+            if table_name in self.index_tables:
+                return
+            schema_name, base_name = table_name.split(".", 1)
+            docs_table = self.duckdb_client.create_table_if_not_exists(
+                schema_name=schema_name,
+                table_name=f"{base_name}{FULL_TEXT_DOCS_SUFFIX}",
+                columns=FullTextDocsDuckDBSchema.get_schema(),
+            )
+            postings_table = self.duckdb_client.create_table_if_not_exists(
+                schema_name=schema_name,
+                table_name=f"{base_name}{FULL_TEXT_POSTINGS_SUFFIX}",
+                columns=FullTextPostingsDuckDBSchema.get_schema(),
+            )
+            self.index_tables[table_name] = (docs_table, postings_table)
+
+        missing_count = self._count_missing_segments(table_name)
+        if missing_count == 0:
+            return
+        if missing_count <= BACKFILL_BATCH_SIZE:
+            self._backfill(table_name)
+            return
+        logger().info(
+            f"Indexing {missing_count} existing segments in {table_name} in the "
+            "background, the keyword search misses them until it is done."
+        )
+        threading.Thread(
+            target=self._backfill,
+            args=(table_name,),
+            name="fts-backfill",
+            daemon=True,
+        ).start()
+
+    def _count_missing_segments(self, table_name: str) -> int:
+        docs_table, _ = self.index_tables[table_name]
+        rows = self.duckdb_client.execute_and_fetch_all(
+            f"SELECT COUNT(*) AS count FROM {table_name} "
+            f"ANTI JOIN {docs_table} USING ({Segment.FIELD_SEGMENT_UUID})"
+        )
+        return rows[0]["count"]
+
+    def _backfill(self, table_name: str) -> None:
+        with _registry_lock:
+            if table_name in _backfilling_tables:
+                return
+            _backfilling_tables.add(table_name)
+
+        docs_table, postings_table = self.index_tables[table_name]
+        segment_uuid = Segment.FIELD_SEGMENT_UUID
+        # page by the segment uuid, OFFSET rescans the skipped rows for every batch
+        query_statement = f"""
+            SELECT v.{segment_uuid}, v.{Segment.FIELD_CONTENT}
+            FROM {table_name} v ANTI JOIN {docs_table} USING ({segment_uuid})
+            WHERE v.{segment_uuid} > ?
+            ORDER BY v.{segment_uuid} LIMIT ?
+        """
+        last_uuid = ""
+        indexed_count = 0
+        try:
+            while True:
+                with self.get_table_lock(table_name):
+                    rows = self.duckdb_client.execute_and_fetch_all(
+                        query_statement, [last_uuid, BACKFILL_BATCH_SIZE]
+                    )
+                    if not rows:
+                        break
+                    segment_uuids = [row[segment_uuid] for row in rows]
+                    # the postings may be saved without the docs row if the
+                    # process exited in the middle of index_segments
+                    self.duckdb_client.delete_from_table(
+                        table_name=postings_table,
+                        where_clause=(
+                            f"WHERE {segment_uuid} IN "
+                            f"({','.join(['?'] * len(segment_uuids))})"
+                        ),
+                        value_list=segment_uuids,
+                    )
+                    self.index_segments(
+                        table_name,
+                        segment_uuids,
+                        [row[Segment.FIELD_CONTENT] for row in rows],
+                    )
+                last_uuid = segment_uuids[-1]
+                indexed_count += len(rows)
+            logger().info(f"Indexed {indexed_count} existing segments in {table_name}.")
+        except Exception as e:
+            logger().warning(
+                f"Failed to index the existing segments in {table_name} after "
+                f"{indexed_count} segments: {e}"
+            )
+        finally:
+            with _registry_lock:
+                _backfilling_tables.discard(table_name)
+
+    def index_segments(
+        self, table_name: str, segment_uuids: List[str], contents: List[str]
+    ) -> None:
+        """
+        Add the segments to the index with one bulk insert per index table. The
+        old postings of the segments should have been deleted by delete_segments.
+
+        Args:
+        - table_name: The full name of the vector table.
+        - segment_uuids: The uuids of the segments.
+        - contents: The contents of the segments.
+        """
+        docs_table, postings_table = self.index_tables[table_name]
+        doc_lengths: List[int] = []
+        terms: List[str] = []
+        posting_uuids: List[str] = []
+        term_frequencies: List[int] = []
+        for segment_uuid, content in zip(segment_uuids, contents):
+            tokens = tokenize_for_full_text(content)
+            doc_lengths.append(len(tokens))
+            for term, frequency in Counter(tokens).items():
+                terms.append(term)
+                posting_uuids.append(segment_uuid)
+                term_frequencies.append(frequency)
+
+        with self.get_table_lock(table_name):
+            # the docs row marks the segment as indexed, so it is saved last
+            self.duckdb_client.bulk_insert_into_table(
+                table_name=postings_table,
+                data=pa.table(
+                    {
+                        FullTextPostingsDuckDBSchema.FIELD_TERM: pa.array(
+                            terms, pa.string()
+                        ),
+                        Segment.FIELD_SEGMENT_UUID: pa.array(
+                            posting_uuids, pa.string()
+                        ),
+                        FullTextPostingsDuckDBSchema.FIELD_TERM_FREQUENCY: pa.array(
+                            term_frequencies, pa.int32()
+                        ),
+                    }
+                ),
+            )
+            self.duckdb_client.bulk_insert_into_table(
+                table_name=docs_table,
+                data=pa.table(
+                    {
+                        Segment.FIELD_SEGMENT_UUID: pa.array(
+                            segment_uuids, pa.string()
+                        ),
+                        FullTextDocsDuckDBSchema.FIELD_DOC_LENGTH: pa.array(
+                            doc_lengths, pa.int32()
+                        ),
+                    }
+                ),
+            )
+
+    def delete_segments(
+        self, table_name: str, where_clause: str, value_list: List[Any]
+    ) -> None:
+        """
+        Remove the segments selected by the where clause on the vector table from
+        the index. Should be called before the rows are deleted from the vector table.
+
+        Args:
+        - table_name: The full name of the vector table.
+        - where_clause: The where clause used to delete the rows of the vector table.
+        - value_list: The values of the where clause.
+        """
+        with self.get_table_lock(table_name):
+            for index_table in self.index_tables[table_name]:
+                self.duckdb_client.delete_from_table(
+                    table_name=index_table,
+                    where_clause=(
+                        f"WHERE {Segment.FIELD_SEGMENT_UUID} IN "
+                        f"(SELECT {Segment.FIELD_SEGMENT_UUID} FROM {table_name} "
+                        f"{where_clause})"
+                    ),
+                    value_list=value_list,
+                )
+
+    def search(
+        self,
+        table_name: str,
+        query: str,
+        top_k: int,
+        filter_expr: Optional[str] = None,
+        filter_values: Optional[List[Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Search the index with BM25 scoring.
+
+        Args:
+        - table_name: The full name of the vector table.
+        - query: The query, tokenized the same way as the contents.
+        - top_k: The number of results to return.
+        - filter_expr: The filter expression on the columns of the vector table.
+        - filter_values: The values of the filter expression.
+
+        Returns:
+        - The segment uuids and the scores of the segments that match the query,
+            ordered by the score.
+        """
+        terms = list(dict.fromkeys(tokenize_for_full_text(query)))
+        if not terms:
+            return []
+
+        docs_table, postings_table = self.index_tables[table_name]
+        term = FullTextPostingsDuckDBSchema.FIELD_TERM
+        tf = FullTextPostingsDuckDBSchema.FIELD_TERM_FREQUENCY
+        doc_length = FullTextDocsDuckDBSchema.FIELD_DOC_LENGTH
+        segment_uuid = Segment.FIELD_SEGMENT_UUID
+
+        where_clause = f"WHERE {filter_expr}" if filter_expr else ""
+        query_statement = f"""
+            WITH query_terms AS (
+                SELECT unnest(?::VARCHAR[]) AS {term}
+            ),
+            matches AS (
+                SELECT p.{term}, p.{segment_uuid}, p.{tf}
+                FROM {postings_table} p JOIN query_terms USING ({term})
+            ),
+            term_stats AS (
+                SELECT {term}, COUNT(*) AS df FROM matches GROUP BY {term}
+            ),
+            corpus_stats AS (
+                SELECT COUNT(*) AS num_docs, AVG({doc_length}) AS avg_doc_length
+                FROM {docs_table}
+            ),
+            scores AS (
+                SELECT m.{segment_uuid}, SUM(
+                    ln(1 + (c.num_docs - t.df + 0.5) / (t.df + 0.5))
+                    * m.{tf} * ({BM25_K1} + 1)
+                    / (m.{tf} + {BM25_K1} * (
+                        1 - {BM25_B} + {BM25_B} * d.{doc_length} / c.avg_doc_length
+                    ))
+                ) AS score
+                FROM matches m
+                JOIN term_stats t USING ({term})
+                JOIN {docs_table} d USING ({segment_uuid})
+                CROSS JOIN corpus_stats c
+                GROUP BY m.{segment_uuid}
+            )
+            SELECT {segment_uuid}, score
+            FROM scores JOIN {table_name} USING ({segment_uuid})
+            {where_clause}
+            ORDER BY score DESC LIMIT ?
+        """
+        value_list: List[Any] = [terms]
+        if filter_values:
+            value_list.extend(filter_values)
+        value_list.append(top_k)
+        logger().noop(
+            f"Full text search query_statement: {query_statement}", noop_lvl=2
+        )
+        return self.duckdb_client.execute_and_fetch_all(query_statement, value_list)
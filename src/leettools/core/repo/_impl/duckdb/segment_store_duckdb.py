@@ -1,6 +1,6 @@
 import json
 import uuid
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from leettools.common.duckdb.duckdb_client import DuckDBClient
 from leettools.common.exceptions import EntityExistsException
@@ -102,6 +102,70 @@ class SegmentStoreDuckDB(AbstractSegmentStore):
 
         return self._dict_to_segment(data)
 
+    def create_segments(
+        self, org: Org, kb: KnowledgeBase, segment_creates: List[SegmentCreate]
+    ) -> List[Segment]:
+        """Create a list of new segments with one bulk insert."""
+        if not segment_creates:
+            return []
+
+        table_name = self._get_table_name(org, kb)
+
+        # check the existing segments for all the documents in one query
+        document_uuids = list({sc.document_uuid for sc in segment_creates})
+        where_clause = (
+            f"WHERE {Segment.FIELD_DOCUMENT_UUID} IN "
+            f"({','.join(['?'] * len(document_uuids))})"
+        )
+        existing_rows = self.duckdb_client.fetch_all_from_table(
+            table_name=table_name,
+            where_clause=where_clause,
+            value_list=document_uuids,
+        )
+        existing_segments: Dict[Tuple[str, str], Segment] = {}
+        for row in existing_rows:
+            segment = self._dict_to_segment(row)
+            existing_segments[(segment.document_uuid, segment.position_in_doc)] = (
+                segment
+            )
+
+        rtn_list: List[Segment] = []
+        new_data_list: List[dict] = []
+        for segment_create in segment_creates:
+            key = (segment_create.document_uuid, segment_create.position_in_doc)
+            existing_segment = existing_segments.get(key)
+            if existing_segment is not None:
+                if existing_segment.content != segment_create.content:
+                    raise EntityExistsException(
+                        entity_name=f"{key[0]} at {key[1]}",
+                        entity_type="Segment",
+                    )
+                logger().debug(
+                    f"Segment {key[0]} at {key[1]} already exists in the collection."
+                )
+                rtn_list.append(existing_segment)
+                continue
+
+            segment_in_db = SegmentInDB.from_segment_create(segment_create)
+            data = self._segment_to_dict(segment_in_db)
+            data[Segment.FIELD_SEGMENT_UUID] = str(uuid.uuid4())
+            new_data_list.append(data)
+            segment = self._dict_to_segment(dict(data))
+            # later duplicates in the same batch return the first one
+            existing_segments[key] = segment
+            rtn_list.append(segment)
+
+        if new_data_list:
+            column_list = list(new_data_list[0].keys())
+            self.duckdb_client.batch_insert_into_table(
+                table_name=table_name,
+                column_list=column_list,
+                values=[
+                    [data[column] for column in column_list] for data in new_data_list
+                ],
+            )
+        return rtn_list
+
     def delete_segment(self, org: Org, kb: KnowledgeBase, segment: Segment) -> bool:
         """Delete a segment by UUID."""
         table_name = self._get_table_name(org, kb)
@@ -217,6 +281,29 @@ class SegmentStoreDuckDB(AbstractSegmentStore):
         )
         return self._dict_to_segment(result) if result else None
 
+    def get_segments_by_uuids(
+        self, org: Org, kb: KnowledgeBase, segment_uuids: List[str]
+    ) -> List[Optional[Segment]]:
+        """Get a list of segments by UUIDs with one query, in the given order."""
+        if not segment_uuids:
+            return []
+        table_name = self._get_table_name(org, kb)
+        unique_uuids = list(dict.fromkeys(segment_uuids))
+        where_clause = (
+            f"WHERE {Segment.FIELD_SEGMENT_UUID} IN "
+            f"({','.join(['?'] * len(unique_uuids))})"
+        )
+        results = self.duckdb_client.fetch_all_from_table(
+            table_name=table_name,
+            where_clause=where_clause,
+            value_list=unique_uuids,
+        )
+        segments: Dict[str, Segment] = {}
+        for row in results:
+            segment = self._dict_to_segment(row)
+            segments[segment.segment_uuid] = segment
+        return [segments.get(segment_uuid) for segment_uuid in segment_uuids]
+
     def get_segments_for_document(
         self, org: Org, kb: KnowledgeBase, document_uuid: str
     ) -> List[Segment]:
@@ -2,14 +2,18 @@ import threading
 import time
 from concurrent.futures import ThreadPoolExecutor
 from functools import partial
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
+import pyarrow as pa
 
 from leettools.common import exceptions
 from leettools.common.duckdb.duckdb_client import DuckDBClient
 from leettools.common.logging import logger
 from leettools.context_manager import Context
+from leettools.core.repo._impl.duckdb.full_text_index_duckdb import (
+    FullTextIndexDuckDB,
+)
 from leettools.core.repo._impl.duckdb.vector_store_duckdb_schema import (
     VectorDuckDBSchema,
 )
@@ -32,9 +36,19 @@ from leettools.eds.str_embedder.schemas.schema_dense_embedder import (
     DenseEmbeddingRequest,
     DenseEmbeddings,
 )
+from leettools.eds.str_embedder.segment_embedding_cache import (
+    SegmentEmbeddingCacheStats,
+    get_segment_embedding_cache,
+)
 
 DENSE_VECTOR_COLLECTION_SUFFIX = "_dense_vectors"
 SIMILARITY_METRIC_ATTR = "similarity_metric"
+DISTANCE_METRIC_ATTR = "distance_metric"
+
+VECTOR_INDEX_TYPE_HNSW = "hnsw"
+HNSW_INDEX_SUFFIX = "_hnsw"
+
+FULL_TEXT_INDEX_TYPE_INCREMENTAL = "incremental"
 
 
 class VectorStoreDuckDBDense(AbstractVectorStore):
@@ -49,30 +63,66 @@ class VectorStoreDuckDBDense(AbstractVectorStore):
         # a table name to lock
         # need to get the lock before updating the content of the store
         self.index_lock: Dict[str, threading.RLock] = {}
+        # a table name to the name of its ANN index, None if the index can't be
+        # created and we fall back to the exact scan
+        self.vector_index_type = self.settings.DUCKDB_VECTOR_INDEX_TYPE.lower()
+        self.ann_indexes: Dict[str, Optional[str]] = {}
+        # the incremental full text index is updated together with the vectors,
+        # None if the fts extension index is rebuilt before the search instead
+        self.full_text_index: Optional[FullTextIndexDuckDB] = None
+        if (
+            self.settings.DUCKDB_FULL_TEXT_INDEX_TYPE.lower()
+            == FULL_TEXT_INDEX_TYPE_INCREMENTAL
+        ):
+            self.full_text_index = FullTextIndexDuckDB(self.duckdb_client)
 
     def support_full_text_search(self) -> bool:
         return True
 
     def _batch_get_embedding(
         self, dense_embedder: AbstractDenseEmbedder, segment_batch: List[Segment]
-    ) -> List[Segment]:
+    ) -> Tuple[List[Segment], SegmentEmbeddingCacheStats]:
         """
         Return the chunk_batch as well as the embeddings for each chunk so that
         we can aggregate them and save them to the database together.
 
+        The segment embedding cache is checked first, so only the contents that
+        have not been embedded by the same embedder are sent to the embedder.
+
         Args:
         - dense_embedder: Dense embedder to use
         - segment_batch: List of segments to get embeddings for
 
         Returns:
         - List of segments with embeddings
+        - The stats of the embedding cache for the batch
         """
         texts = [segment.content for segment in segment_batch]
-        embeddings = self._get_embedding(dense_embedder, texts)
+        cache = get_segment_embedding_cache(self.settings)
+        if cache is None:
+            embeddings = self._get_embedding(dense_embedder, texts)
+            stats = SegmentEmbeddingCacheStats(embedded_segment_count=len(texts))
+        else:
+            embeddings = cache.get_embeddings(dense_embedder, texts)
+            # the same content may appear more than once in the batch
+            missed_texts = list(
+                dict.fromkeys(t for t, e in zip(texts, embeddings) if e is None)
+            )
+            missed_embeddings = self._get_embedding(dense_embedder, missed_texts)
+            cache.save_embeddings(dense_embedder, missed_texts, missed_embeddings)
+            new_embeddings = dict(zip(missed_texts, missed_embeddings))
+            cached_texts = [t for t, e in zip(texts, embeddings) if e is not None]
+            embeddings = [
+                e if e is not None else new_embeddings[t]
+                for t, e in zip(texts, embeddings)
+            ]
+            stats = cache.record(
+                cached_texts=cached_texts, embedded_count=len(missed_texts)
+            )
         for i in range(len(segment_batch)):
             normalized_vector = self._normalize_vector(embeddings[i])
             segment_batch[i].embeddings = normalized_vector
-        return segment_batch
+        return segment_batch, stats
 
     def _batch_upsert_embeddings(
         self, table_name: str, segments: List[Segment]
@@ -84,46 +134,55 @@ class VectorStoreDuckDBDense(AbstractVectorStore):
         # delete the existing embeddings for the segment_uuids
         where_clause = f"WHERE {Segment.FIELD_SEGMENT_UUID} IN ({','.join(['?'] * len(segment_uuids))})"
         value_list = segment_uuids
-        self.duckdb_client.delete_from_table(
-            table_name=table_name,
-            where_clause=where_clause,
-            value_list=value_list,
-        )
-
-        # insert the new embeddings for the segment_uuids
-        column_list = [
-            Segment.FIELD_EMBEDDINGS,
-            Segment.FIELD_CONTENT,
-            Segment.FIELD_CREATED_TIMESTAMP_IN_MS,
-            Segment.FIELD_LABEL_TAG,
-            Segment.FIELD_DOCUMENT_UUID,
-            Segment.FIELD_DOCSINK_UUID,
-            Segment.FIELD_SEGMENT_UUID,
-        ]
-
-        # the value list should be a list of tuples, like (), ()
-        value_list = []
-        for segment in segments:
-            if segment.created_timestamp_in_ms is None:
-                segment.created_timestamp_in_ms = 0
-            if segment.label_tag is None:
-                segment.label_tag = ""
-            item_list = [
-                segment.embeddings,
-                segment.content,
-                segment.created_timestamp_in_ms,
-                segment.label_tag,
-                segment.document_uuid,
-                segment.docsink_uuid,
-                segment.segment_uuid,
-            ]
-            value_list.append(item_list)
+        self._delete_rows(table_name, where_clause, value_list)
 
-        self.duckdb_client.batch_insert_into_table(
-            table_name=table_name,
-            column_list=column_list,
-            values=value_list,
+        # insert the new embeddings for the segment_uuids with one bulk insert,
+        # the embeddings are passed as one float32 buffer instead of a Python
+        # float object per value
+        embeddings = np.asarray(
+            [segment.embeddings for segment in segments], dtype=np.float32
+        )
+        dimension = embeddings.shape[1]
+        arrow_table = pa.table(
+            {
+                Segment.FIELD_EMBEDDINGS: pa.FixedSizeListArray.from_arrays(
+                    pa.array(embeddings.reshape(-1)), dimension
+                ),
+                Segment.FIELD_CONTENT: pa.array(
+                    [segment.content for segment in segments], pa.string()
+                ),
+                Segment.FIELD_CREATED_TIMESTAMP_IN_MS: pa.array(
+                    [segment.created_timestamp_in_ms or 0 for segment in segments],
+                    pa.int64(),
+                ),
+                Segment.FIELD_LABEL_TAG: pa.array(
+                    [segment.label_tag or "" for segment in segments], pa.string()
+                ),
+                Segment.FIELD_DOCUMENT_UUID: pa.array(
+                    [segment.document_uuid for segment in segments], pa.string()
+                ),
+                Segment.FIELD_DOCSINK_UUID: pa.array(
+                    [segment.docsink_uuid for segment in segments], pa.string()
+                ),
+                Segment.FIELD_SEGMENT_UUID: pa.array(segment_uuids, pa.string()),
+            }
         )
+        if self.full_text_index is None:
+            self.duckdb_client.bulk_insert_into_table(
+                table_name=table_name, data=arrow_table
+            )
+        else:
+            # the rows and their postings are saved together, so that the
+            # backfill of the full text index does not index the rows twice
+            with self.full_text_index.get_table_lock(table_name):
+                self.duckdb_client.bulk_insert_into_table(
+                    table_name=table_name, data=arrow_table
+                )
+                self.full_text_index.index_segments(
+                    table_name,
+                    segment_uuids,
+                    [segment.content for segment in segments],
+                )
         self.display_logger.debug(
             f"Upserted {len(segments)} embeddings into {table_name}"
         )
@@ -138,6 +197,29 @@ class VectorStoreDuckDBDense(AbstractVectorStore):
         embed_result: DenseEmbeddings = dense_embedder.embed(embed_request)
         return embed_result.dense_embeddings
 
+    def _delete_rows(
+        self, table_name: str, where_clause: str, value_list: List[Any]
+    ) -> None:
+        """
+        Delete the rows from the table and from the full text index.
+
+        The caller should hold the index lock of the table.
+        """
+        if self.full_text_index is None:
+            self.duckdb_client.delete_from_table(
+                table_name=table_name,
+                where_clause=where_clause,
+                value_list=value_list,
+            )
+            return
+        with self.full_text_index.get_table_lock(table_name):
+            self.full_text_index.delete_segments(table_name, where_clause, value_list)
+            self.duckdb_client.delete_from_table(
+                table_name=table_name,
+                where_clause=where_clause,
+                value_list=value_list,
+            )
+
     def _get_table_name(
         self, org: Org, kb: KnowledgeBase, dense_embedder_dimension: int = None
     ) -> Optional[str]:
@@ -146,7 +228,10 @@ class VectorStoreDuckDBDense(AbstractVectorStore):
         collection_name = f"kb_{kb.kb_id}{DENSE_VECTOR_COLLECTION_SUFFIX}"
 
         if dense_embedder_dimension is not None and dense_embedder_dimension > 0:
-            install_fts_sql = "INSTALL fts; LOAD fts;"
+            # the fts extension is only needed if its index is used
+            install_fts_sql = None
+            if self.full_text_index is None:
+                install_fts_sql = "INSTALL fts; LOAD fts;"
             table_name = self.duckdb_client.create_table_if_not_exists(
                 schema_name=org_db_name,
                 table_name=collection_name,
@@ -164,8 +249,108 @@ class VectorStoreDuckDBDense(AbstractVectorStore):
         if self.index_lock.get(table_name) is None:
             self.index_lock[table_name] = threading.RLock()
 
+        if (
+            self.full_text_index is not None
+            and table_name not in self.full_text_index.index_tables
+        ):
+            self.full_text_index.prepare_index(table_name)
+
+        if (
+            self.vector_index_type == VECTOR_INDEX_TYPE_HNSW
+            and table_name not in self.ann_indexes
+        ):
+            self._create_ann_index(table_name)
+
         return table_name
 
+    def _load_vss_extension(self) -> bool:
+        """
+        Load the vss extension, installing it first if it is not installed yet.
+
+        INSTALL downloads the extension, so it fails without network access unless
+        the extension has been installed before.
+
+        Returns:
+        - True if the extension is loaded, False otherwise.
+        """
+        try:
+            self.duckdb_client.execute_sql("LOAD vss;")
+            return True
+        except Exception as e:
+            logger().debug(f"The vss extension is not installed yet: {e}")
+        try:
+            self.duckdb_client.execute_sql("INSTALL vss; LOAD vss;")
+            return True
+        except Exception as e:
+            logger().warning(
+                "Failed to install the vss extension for the HNSW index, the "
+                f"install needs network access: {e}"
+            )
+            return False
+
+    def _create_ann_index(self, table_name: str) -> None:
+        """
+        Create the HNSW index on the embeddings column if it does not exist.
+
+        The index is maintained by DuckDB, so the inserts in _batch_upsert_embeddings
+        and the deletes by segment/document/docsink/docsource are applied to it in
+        the same statements that change the table. If the vss extension can't be
+        loaded or the index can't be created, the search uses the exact scan.
+        """
+        index_name = f"{table_name.replace('.', '_')}{HNSW_INDEX_SUFFIX}"
+        # the HNSW index can only be created in a persistent database with the
+        # experimental persistence flag on
+        create_index_sql = f"""
+        SET hnsw_enable_experimental_persistence = true;
+        CREATE INDEX IF NOT EXISTS {index_name} ON {table_name}
+            USING HNSW ({Segment.FIELD_EMBEDDINGS})
+            WITH (
+                metric = 'cosine',
+                M = {self.settings.DUCKDB_HNSW_M},
+                ef_construction = {self.settings.DUCKDB_HNSW_EF_CONSTRUCTION}
+            )
+        """
+        start_time = time.perf_counter()
+        with self.index_lock[table_name]:
+            if table_name in self.ann_indexes:
+                return
+            if not self._load_vss_extension():
+                logger().warning(
+                    f"Using the exact scan for the search in table {table_name}."
+                )
+                self.ann_indexes[table_name] = None
+                return
+            try:
+                self.duckdb_client.execute_sql(create_index_sql)
+                # the index is created in the same schema as the table
+                schema_name = table_name.split(".")[0]
+                self.ann_indexes[table_name] = f"{schema_name}.{index_name}"
+                logger().info(
+                    f"HNSW index {index_name} is ready for table {table_name}, "
+                    f"costs {time.perf_counter() - start_time:.3f} seconds."
+                )
+            except Exception as e:
+                logger().warning(
+                    f"Failed to create the HNSW index for table {table_name}, "
+                    f"using the exact scan for the search: {e}"
+                )
+                self.ann_indexes[table_name] = None
+
+    def _compact_ann_index(self, table_name: str) -> None:
+        """
+        Remove the deleted rows from the ANN index after a bulk delete.
+
+        Deleted rows are only marked in the HNSW index, compacting it keeps the
+        search quality and the memory usage in check.
+        """
+        index_name = self.ann_indexes.get(table_name)
+        if index_name is None:
+            return
+        try:
+            self.duckdb_client.execute_sql(f"PRAGMA hnsw_compact_index('{index_name}')")
+        except Exception as e:
+            logger().warning(f"Failed to compact the HNSW index {index_name}: {e}")
+
     def _normalize_vector(self, vector: List[float]) -> List[float]:
         """
         Normalize a vector.
@@ -203,10 +388,15 @@ class VectorStoreDuckDBDense(AbstractVectorStore):
 
         # get the embeddings for the segments
         partial_get_embedding = partial(self._batch_get_embedding, dense_embedder)
-        with ThreadPoolExecutor(max_workers=10) as executor:
+        with ThreadPoolExecutor(
+            max_workers=max(1, self.settings.embed_max_concurrency)
+        ) as executor:
             rtn_list = list(executor.map(partial_get_embedding, embed_batches))
 
-        segments_with_embeddings = [item for sublist in rtn_list for item in sublist]
+        segments_with_embeddings = [item for sublist, _ in rtn_list for item in sublist]
+        cache_stats = SegmentEmbeddingCacheStats()
+        for _, batch_stats in rtn_list:
+            cache_stats.add(batch_stats)
 
         # divide the segments into batches based on the query_batch_size
         insert_batches = []
@@ -229,6 +419,15 @@ class VectorStoreDuckDBDense(AbstractVectorStore):
             f"Batch upserted {len(segments_with_embeddings)} segments into KB {kb.name}. "
             f"{KnowledgeBase.FIELD_DATA_UPDATED_AT} field updated."
         )
+        if cache_stats.cached_segment_count > 0:
+            self.display_logger.info(
+                f"Reused cached embeddings for {cache_stats.cached_segment_count} of "
+                f"{len(segments_with_embeddings)} segments in KB {kb.name}, saved "
+                f"about {cache_stats.saved_token_count} embedding tokens."
+            )
+        cache = get_segment_embedding_cache(self.settings)
+        if cache is not None and cache_stats.embedded_segment_count > 0:
+            cache.maybe_evict()
         return True
 
     def save_segments(
@@ -252,11 +451,27 @@ class VectorStoreDuckDBDense(AbstractVectorStore):
         where_clause = f"WHERE {Segment.FIELD_SEGMENT_UUID} = ?"
         value_list = [segment_uuid]
         with self.index_lock[table_name]:
-            self.duckdb_client.delete_from_table(
-                table_name=table_name,
-                where_clause=where_clause,
-                value_list=value_list,
-            )
+            self._delete_rows(table_name, where_clause, value_list)
+        kb = self.kb_manager.update_kb_timestamp(
+            org, kb, KnowledgeBase.FIELD_DATA_UPDATED_AT
+        )
+        return True
+
+    def delete_segment_vectors(
+        self, org: Org, kb: KnowledgeBase, segment_uuids: List[str]
+    ) -> bool:
+        """Delete a list of segment vectors from the store with one statement."""
+        if not segment_uuids:
+            return True
+        table_name = self._get_table_name(org, kb)
+        if table_name is None:
+            return False
+        where_clause = (
+            f"WHERE {Segment.FIELD_SEGMENT_UUID} IN "
+            f"({','.join(['?'] * len(segment_uuids))})"
+        )
+        with self.index_lock[table_name]:
+            self._delete_rows(table_name, where_clause, list(segment_uuids))
         kb = self.kb_manager.update_kb_timestamp(
             org, kb, KnowledgeBase.FIELD_DATA_UPDATED_AT
         )
@@ -273,11 +488,8 @@ class VectorStoreDuckDBDense(AbstractVectorStore):
         where_clause = f"WHERE {Segment.FIELD_DOCSINK_UUID} = ?"
         value_list = [docsink_uuid]
         with self.index_lock[table_name]:
-            self.duckdb_client.delete_from_table(
-                table_name=table_name,
-                where_clause=where_clause,
-                value_list=value_list,
-            )
+            self._delete_rows(table_name, where_clause, value_list)
+            self._compact_ann_index(table_name)
         kb = self.kb_manager.update_kb_timestamp(
             org, kb, KnowledgeBase.FIELD_DATA_UPDATED_AT
         )
@@ -305,6 +517,7 @@ class VectorStoreDuckDBDense(AbstractVectorStore):
                     org, kb, document.document_uuid
                 ):
                     deleted = True
+            self._compact_ann_index(table_name)
         kb = self.kb_manager.update_kb_timestamp(
             org, kb, KnowledgeBase.FIELD_DATA_UPDATED_AT
         )
@@ -320,11 +533,7 @@ class VectorStoreDuckDBDense(AbstractVectorStore):
         where_clause = f"WHERE {Segment.FIELD_DOCUMENT_UUID} = ?"
         value_list = [document_uuid]
         with self.index_lock[table_name]:
-            self.duckdb_client.delete_from_table(
-                table_name=table_name,
-                where_clause=where_clause,
-                value_list=value_list,
-            )
+            self._delete_rows(table_name, where_clause, value_list)
         kb = self.kb_manager.update_kb_timestamp(
             org, kb, KnowledgeBase.FIELD_DATA_UPDATED_AT
         )
@@ -387,11 +596,18 @@ class VectorStoreDuckDBDense(AbstractVectorStore):
         dense_embedder = create_dense_embedder_for_kb(org, kb, user, self.context)
         embedding_dimension = dense_embedder.get_dimension()
         table_name = self._get_table_name(org, kb, embedding_dimension)
-        embed_request = DenseEmbeddingRequest(sentences=[query])
-        embed_result: DenseEmbeddings = dense_embedder.embed(embed_request)
-        query_vector: List[float] = embed_result.dense_embeddings[0]
+        query_vector: List[float] = dense_embedder.embed_query(query)
         query_vector: List[float] = self._normalize_vector(query_vector)
 
+        if filter is None and self.ann_indexes.get(table_name) is not None:
+            return self._ann_search_in_kb(
+                table_name=table_name,
+                query_vector=query_vector,
+                embedding_dimension=embedding_dimension,
+                top_k=top_k,
+                search_params=search_params,
+            )
+
         column_list = [
             Segment.FIELD_SEGMENT_UUID,
             f"array_cosine_similarity({Segment.FIELD_EMBEDDINGS}, "
@@ -430,6 +646,56 @@ class VectorStoreDuckDBDense(AbstractVectorStore):
             for result in results
         ]
 
+    def _ann_search_in_kb(
+        self,
+        table_name: str,
+        query_vector: List[float],
+        embedding_dimension: int,
+        top_k: int,
+        search_params: Dict[str, Any] = None,
+    ) -> List[VectorSearchResult]:
+        """
+        Search the segments using the HNSW index of the table.
+
+        The size of the candidate list can be set per query by the "ef" value in
+        search_params["params"], and it is never smaller than top_k. The "nprobe"
+        value used by the IVF indexes is ignored.
+
+        Filtered queries do not go through this path since the HNSW index can't
+        be used together with a WHERE clause.
+        """
+        ef_search = self.settings.DUCKDB_HNSW_EF_SEARCH
+        if search_params is not None:
+            params = search_params.get("params", None) or {}
+            ef_search = int(params.get("ef", ef_search))
+        ef_search = max(ef_search, top_k)
+
+        # the index is only used if the query vector is a constant, so we can't
+        # use a parameter placeholder for it
+        vector_literal = ",".join(str(float(x)) for x in query_vector)
+        query_statement = f"""
+            SELECT {Segment.FIELD_SEGMENT_UUID},
+                array_cosine_distance(
+                    {Segment.FIELD_EMBEDDINGS},
+                    CAST([{vector_literal}] AS FLOAT[{embedding_dimension}])
+                ) AS {DISTANCE_METRIC_ATTR}
+            FROM {table_name}
+            ORDER BY {DISTANCE_METRIC_ATTR} LIMIT ?
+        """
+        results = self.duckdb_client.execute_and_fetch_all(
+            query_statement,
+            [top_k],
+            session_settings={"hnsw_ef_search": ef_search},
+        )
+        return [
+            VectorSearchResult(
+                segment_uuid=result[Segment.FIELD_SEGMENT_UUID],
+                search_score=1.0 - result[DISTANCE_METRIC_ATTR],
+                vector_type=VectorType.DENSE,
+            )
+            for result in results
+        ]
+
     def update_segment_vector(
         self, org: Org, kb: KnowledgeBase, user: User, segment: Segment
     ) -> bool:
@@ -449,6 +715,11 @@ class VectorStoreDuckDBDense(AbstractVectorStore):
         rebuild_full_text_index: bool = False,
     ) -> List[VectorSearchResult]:
         """Search for segments in the store."""
+        if self.full_text_index is not None:
+            return self._incremental_full_text_search_in_kb(
+                org, kb, user, query, top_k, filter
+            )
+
         if rebuild_full_text_index:
             # refresh the timestamps
             kb = self.kb_manager.get_kb_by_id(org, kb.kb_id)
@@ -516,7 +787,46 @@ class VectorStoreDuckDBDense(AbstractVectorStore):
             for result in results
         ]
 
+    def _incremental_full_text_search_in_kb(
+        self,
+        org: Org,
+        kb: KnowledgeBase,
+        user: User,
+        query: str,
+        top_k: int,
+        filter: Filter = None,
+    ) -> List[VectorSearchResult]:
+        """
+        Search the incremental full text index, which is always up to date with
+        the vectors, so no index rebuild is needed before the search.
+        """
+        dense_embedder = create_dense_embedder_for_kb(org, kb, user, self.context)
+        table_name = self._get_table_name(org, kb, dense_embedder.get_dimension())
+
+        filter_expr = None
+        values = None
+        if filter is not None:
+            filter_expr, _, values = to_duckdb_filter(filter)
+        results = self.full_text_index.search(
+            table_name=table_name,
+            query=query,
+            top_k=top_k,
+            filter_expr=filter_expr,
+            filter_values=values,
+        )
+        return [
+            VectorSearchResult(
+                segment_uuid=result[Segment.FIELD_SEGMENT_UUID],
+                search_score=result["score"],
+                vector_type=VectorType.SPARSE,
+            )
+            for result in results
+        ]
+
     def _rebuild_full_text_index(self, org: Org, kb: KnowledgeBase, user: User) -> None:
+        if self.full_text_index is not None:
+            # the incremental index is updated with the vectors
+            return
         dense_embedder = create_dense_embedder_for_kb(org, kb, user, self.context)
         embedding_dimension = dense_embedder.get_dimension()
         table_name = self._get_table_name(org, kb, embedding_dimension)
@@ -16,3 +16,63 @@ class VectorDuckDBSchema:
             Segment.FIELD_CONTENT: "VARCHAR",
             Segment.FIELD_EMBEDDINGS: f"FLOAT[{dense_embedder_dimension}]",
         }
+
+
+class FullTextDocsDuckDBSchema:
+    """The length of each indexed segment in the incremental full text index."""
+
+    FIELD_DOC_LENGTH = "doc_length"
+
+    @classmethod
+    def get_schema(cls) -> Dict[str, str]:
+        return {
+            Segment.FIELD_SEGMENT_UUID: "VARCHAR",
+            cls.FIELD_DOC_LENGTH: "INTEGER",
+        }
+
+
+class FullTextPostingsDuckDBSchema:
+    """The postings of the incremental full text index, one row per term per segment."""
+
+    FIELD_TERM = "term"
+    FIELD_TERM_FREQUENCY = "term_frequency"
+
+    @classmethod
+    def get_schema(cls) -> Dict[str, str]:
+        return {
+            cls.FIELD_TERM: "VARCHAR",
+            Segment.FIELD_SEGMENT_UUID: "VARCHAR",
+            cls.FIELD_TERM_FREQUENCY: "INTEGER",
+        }
+
+
+class SparseVectorDuckDBSchema:
+    """The postings of the sparse vectors, one row per non-zero term per segment."""
+
+    FIELD_TERM_ID = "term_id"
+    FIELD_WEIGHT = "weight"
+
+    @classmethod
+    def get_schema(cls) -> Dict[str, str]:
+        return {
+            Segment.FIELD_DOCUMENT_UUID: "VARCHAR",
+            Segment.FIELD_DOCSINK_UUID: "VARCHAR",
+            Segment.FIELD_SEGMENT_UUID: "VARCHAR",
+            Segment.FIELD_CREATED_TIMESTAMP_IN_MS: "BIGINT",
+            Segment.FIELD_LABEL_TAG: "VARCHAR",
+            cls.FIELD_TERM_ID: "INTEGER",
+            cls.FIELD_WEIGHT: "FLOAT",
+        }
+
+
+class SparseTermBoundsDuckDBSchema:
+    """The max weight of each term in the sparse postings, used to prune the search."""
+
+    FIELD_MAX_WEIGHT = "max_weight"
+
+    @classmethod
+    def get_schema(cls) -> Dict[str, str]:
+        return {
+            SparseVectorDuckDBSchema.FIELD_TERM_ID: "INTEGER",
+            cls.FIELD_MAX_WEIGHT: "FLOAT",
+        }
@@ -0,0 +1,526 @@
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+from scipy.sparse import csr_array
+
+from leettools.common.duckdb.duckdb_client import DuckDBClient
+from leettools.common.logging import logger
+from leettools.context_manager import Context
+from leettools.core.repo._impl.duckdb.vector_store_duckdb_schema import (
+    SparseTermBoundsDuckDBSchema,
+    SparseVectorDuckDBSchema,
+)
+from leettools.core.repo.vector_store import (
+    AbstractVectorStore,
+    VectorSearchResult,
+    VectorType,
+)
+from leettools.core.schemas.knowledgebase import KnowledgeBase
+from leettools.core.schemas.organization import Org
+from leettools.core.schemas.segment import Segment
+from leettools.core.schemas.user import User
+from leettools.eds.rag.search.filter import Filter
+from leettools.eds.rag.search.filter_duckdb import to_duckdb_filter
+from leettools.eds.str_embedder.schemas.schema_sparse_embedder import (
+    SparseEmbeddingRequest,
+)
+from leettools.eds.str_embedder.sparse_embedder import (
+    AbstractSparseEmbedder,
+    create_sparse_embber_for_kb,
+)
+
+SPARSE_VECTOR_COLLECTION_SUFFIX = "_sparse_vectors"
+SPARSE_TERM_BOUNDS_SUFFIX = "_sparse_term_bounds"
+SCORE_ATTR = "score"
+
+
+class VectorStoreDuckDBSparse(AbstractVectorStore):
+    """
+    Store the sparse vectors, such as the SPLADE embeddings, as an inverted index.
+
+    Each KB has a postings table with one (term_id, weight) row for every non-zero
+    term of a segment, and a table with the max weight of each term. The search
+    scores the segments by the inner product with the query vector and uses the
+    term bounds to skip the segments that can't make it into the top k (MaxScore).
+    """
+
+    def __init__(self, context: Context) -> None:
+        self.context = context
+        self.settings = context.settings
+        self.duckdb_client = DuckDBClient(self.settings)
+        self.kb_manager = context.get_kb_manager()
+        # a table name to lock
+        # need to get the lock before updating the content of the store
+        self.index_lock: Dict[str, threading.RLock] = {}
+
+    def support_full_text_search(self) -> bool:
+        return False
+
+    def _get_table_names(
+        self, org: Org, kb: KnowledgeBase, create: bool = False
+    ) -> Optional[Tuple[str, str]]:
+        """
+        Get the postings table and the term bounds table for the org and kb.
+
+        Returns None if the tables are not created yet and create is False.
+        """
+        org_db_name = Org.get_org_db_name(org.org_id)
+        postings_name = f"kb_{kb.kb_id}{SPARSE_VECTOR_COLLECTION_SUFFIX}"
+        bounds_name = f"kb_{kb.kb_id}{SPARSE_TERM_BOUNDS_SUFFIX}"
+        if create:
+            postings_table = self.duckdb_client.create_table_if_not_exists(
+                schema_name=org_db_name,
+                table_name=postings_name,
+                columns=SparseVectorDuckDBSchema.get_schema(),
+            )
+            bounds_table = self.duckdb_client.create_table_if_not_exists(
+                schema_name=org_db_name,
+                table_name=bounds_name,
+                columns=SparseTermBoundsDuckDBSchema.get_schema(),
+            )
+        else:
+            postings_table = self.duckdb_client.get_table_from_cache(
+                org_db_name, postings_name
+            )
+            bounds_table = self.duckdb_client.get_table_from_cache(
+                org_db_name, bounds_name
+            )
+            if postings_table is None or bounds_table is None:
+                return None
+
+        if self.index_lock.get(postings_table) is None:
+            self.index_lock[postings_table] = threading.RLock()
+        return postings_table, bounds_table
+
+    def _get_embeddings(
+        self, sparse_embedder: AbstractSparseEmbedder, texts: List[str]
+    ) -> csr_array:
+        embed_request = SparseEmbeddingRequest(sentences=texts)
+        return csr_array(sparse_embedder.embed(embed_request).sparse_embeddings)
+
+    def _batch_upsert_embeddings(
+        self,
+        postings_table: str,
+        bounds_table: str,
+        segments: List[Segment],
+        embeddings: csr_array,
+    ) -> None:
+        # the lock is already acquired in the caller
+        segment_uuids = [segment.segment_uuid for segment in segments]
+        self.duckdb_client.delete_from_table(
+            table_name=postings_table,
+            where_clause=(
+                f"WHERE {Segment.FIELD_SEGMENT_UUID} IN "
+                f"({','.join(['?'] * len(segment_uuids))})"
+            ),
+            value_list=segment_uuids,
+        )
+
+        embeddings.sum_duplicates()
+        row_ids = np.repeat(np.arange(len(segments)), np.diff(embeddings.indptr))
+        term_ids = embeddings.indices.astype(np.int32)
+        weights = embeddings.data.astype(np.float32)
+        non_zero = weights > 0
+        row_ids = row_ids[non_zero]
+        term_ids = term_ids[non_zero]
+        weights = weights[non_zero]
+        if len(term_ids) == 0:
+            return
+
+        def _column(values: List[Any], arrow_type: pa.DataType) -> pa.Array:
+            return pa.array(values, arrow_type).take(pa.array(row_ids))
+
+        arrow_table = pa.table(
+            {
+                Segment.FIELD_DOCUMENT_UUID: _column(
+                    [segment.document_uuid for segment in segments], pa.string()
+                ),
+                Segment.FIELD_DOCSINK_UUID: _column(
+                    [segment.docsink_uuid for segment in segments], pa.string()
+                ),
+                Segment.FIELD_SEGMENT_UUID: _column(segment_uuids, pa.string()),
+                Segment.FIELD_CREATED_TIMESTAMP_IN_MS: _column(
+                    [segment.created_timestamp_in_ms or 0 for segment in segments],
+                    pa.int64(),
+                ),
+                Segment.FIELD_LABEL_TAG: _column(
+                    [segment.label_tag or "" for segment in segments], pa.string()
+                ),
+                SparseVectorDuckDBSchema.FIELD_TERM_ID: pa.array(term_ids),
+                SparseVectorDuckDBSchema.FIELD_WEIGHT: pa.array(weights),
+            }
+        )
+        self.duckdb_client.bulk_insert_into_table(
+            table_name=postings_table, data=arrow_table
+        )
+        self._update_term_bounds(bounds_table, term_ids, weights)
+        logger().debug(
+            f"Upserted {len(term_ids)} postings of {len(segments)} segments "
+            f"into {postings_table}"
+        )
+
+    def _update_term_bounds(
+        self, bounds_table: str, term_ids: np.ndarray, weights: np.ndarray
+    ) -> None:
+        """
+        Raise the max weights of the terms to cover the new postings.
+
+        The bounds are not lowered when postings are deleted, they stay valid
+        upper bounds and only make the pruning a bit less effective.
+        """
+        unique_terms, inverse = np.unique(term_ids, return_inverse=True)
+        max_weights = np.zeros(len(unique_terms), dtype=np.float32)
+        np.maximum.at(max_weights, inverse, weights)
+
+        term_id_field = SparseVectorDuckDBSchema.FIELD_TERM_ID
+        max_weight_field = SparseTermBoundsDuckDBSchema.FIELD_MAX_WEIGHT
+        terms_expr = "unnest(?::INTEGER[])"
+        existing = self.duckdb_client.fetch_all_from_table(
+            table_name=bounds_table,
+            column_list=[term_id_field, max_weight_field],
+            where_clause=f"WHERE {term_id_field} IN (SELECT {terms_expr})",
+            value_list=[unique_terms.tolist()],
+        )
+        if existing:
+            positions = np.searchsorted(
+                unique_terms, [row[term_id_field] for row in existing]
+            )
+            np.maximum.at(
+                max_weights, positions, [row[max_weight_field] for row in existing]
+            )
+            self.duckdb_client.delete_from_table(
+                table_name=bounds_table,
+                where_clause=f"WHERE {term_id_field} IN (SELECT {terms_expr})",
+                value_list=[[row[term_id_field] for row in existing]],
+            )
+        self.duckdb_client.bulk_insert_into_table(
+            table_name=bounds_table,
+            data=pa.table(
+                {
+                    term_id_field: pa.array(unique_terms.astype(np.int32)),
+                    max_weight_field: pa.array(max_weights),
+                }
+            ),
+        )
+
+    def _upsert_embeddings_into_duckdb(
+        self,
+        org: Org,
+        kb: KnowledgeBase,
+        segments: List[Segment],
+        sparse_embedder: AbstractSparseEmbedder,
+    ) -> bool:
+        postings_table, bounds_table = self._get_table_names(org, kb, create=True)
+        embed_batch_size = self.settings.embed_batch_size
+        with self.index_lock[postings_table]:
+            for i in range(0, len(segments), embed_batch_size):
+                batch = segments[i : i + embed_batch_size]
+                embeddings = self._get_embeddings(
+                    sparse_embedder, [segment.content for segment in batch]
+                )
+                self._batch_upsert_embeddings(
+                    postings_table, bounds_table, batch, embeddings
+                )
+
+        kb = self.kb_manager.update_kb_timestamp(
+            org, kb, KnowledgeBase.FIELD_DATA_UPDATED_AT
+        )
+        logger().debug(
+            f"Batch upserted {len(segments)} sparse vectors into KB {kb.name}."
+        )
+        return True
+
+    def save_segments(
+        self,
+        org: Org,
+        kb: KnowledgeBase,
+        user: User,
+        segments: List[Segment],
+    ) -> bool:
+        """Save a list of segments into the store."""
+        if len(segments) == 0:
+            return True
+        sparse_embedder = create_sparse_embber_for_kb(org, kb, user, self.context)
+        return self._upsert_embeddings_into_duckdb(org, kb, segments, sparse_embedder)
+
+    def update_segment_vector(
+        self, org: Org, kb: KnowledgeBase, user: User, segment: Segment
+    ) -> bool:
+        """Update a segment vector in the store."""
+        return self.save_segments(org, kb, user, [segment])
+
+    def get_segment_vector(
+        self, org: Org, kb: KnowledgeBase, segment_uuid: str
+    ) -> List[float]:
+        """
+        Get a segment vector from the store, as a dense list with the dimension of
+        the sparse embedder of the KB.
+        """
+        table_names = self._get_table_names(org, kb)
+        if table_names is None:
+            return []
+        results = self.duckdb_client.fetch_all_from_table(
+            table_name=table_names[0],
+            column_list=[
+                SparseVectorDuckDBSchema.FIELD_TERM_ID,
+                SparseVectorDuckDBSchema.FIELD_WEIGHT,
+            ],
+            where_clause=f"WHERE {Segment.FIELD_SEGMENT_UUID} = ?",
+            value_list=[segment_uuid],
+        )
+        if len(results) == 0:
+            return []
+        sparse_embedder = create_sparse_embber_for_kb(org, kb, None, self.context)
+        vector = [0.0] * sparse_embedder.get_dimension()
+        for result in results:
+            vector[result[SparseVectorDuckDBSchema.FIELD_TERM_ID]] = result[
+                SparseVectorDuckDBSchema.FIELD_WEIGHT
+            ]
+        return vector
+
+    def _delete_postings(
+        self, org: Org, kb: KnowledgeBase, where_clause: str, value_list: List[Any]
+    ) -> bool:
+        table_names = self._get_table_names(org, kb)
+        if table_names is None:
+            return False
+        postings_table = table_names[0]
+        with self.index_lock[postings_table]:
+            self.duckdb_client.delete_from_table(
+                table_name=postings_table,
+                where_clause=where_clause,
+                value_list=value_list,
+            )
+        kb = self.kb_manager.update_kb_timestamp(
+            org, kb, KnowledgeBase.FIELD_DATA_UPDATED_AT
+        )
+        return True
+
+    def delete_segment_vector(
+        self, org: Org, kb: KnowledgeBase, segment_uuid: str
+    ) -> bool:
+        """Delete a segment vector from the store."""
+        return self._delete_postings(
+            org, kb, f"WHERE {Segment.FIELD_SEGMENT_UUID} = ?", [segment_uuid]
+        )
+
+    def delete_segment_vectors(
+        self, org: Org, kb: KnowledgeBase, segment_uuids: List[str]
+    ) -> bool:
+        """Delete a list of segment vectors from the store with one statement."""
+        if not segment_uuids:
+            return True
+        where_clause = (
+            f"WHERE {Segment.FIELD_SEGMENT_UUID} IN "
+            f"({','.join(['?'] * len(segment_uuids))})"
+        )
+        return self._delete_postings(org, kb, where_clause, list(segment_uuids))
+
+    def delete_segment_vectors_by_docsink_uuid(
+        self, org: Org, kb: KnowledgeBase, docsink_uuid: str
+    ) -> bool:
+        """Delete a list of segment vectors from the store by docsink uuid."""
+        return self._delete_postings(
+            org, kb, f"WHERE {Segment.FIELD_DOCSINK_UUID} = ?", [docsink_uuid]
+        )
+
+    def delete_segment_vectors_by_document_id(
+        self, org: Org, kb: KnowledgeBase, document_uuid: str
+    ) -> bool:
+        """Delete a list of segment vectors from the store by document id."""
+        return self._delete_postings(
+            org, kb, f"WHERE {Segment.FIELD_DOCUMENT_UUID} = ?", [document_uuid]
+        )
+
+    def delete_segment_vectors_by_docsource_uuid(
+        self, org: Org, kb: KnowledgeBase, docsource_uuid: str
+    ) -> bool:
+        """Delete a list of segment vectors from the store by docsource uuid."""
+        repo_manger = self.context.get_repo_manager()
+        docsource = repo_manger.get_docsource_store().get_docsource(
+            org, kb, docsource_uuid
+        )
+        documents = repo_manger.get_document_store().get_documents_for_docsource(
+            org, kb, docsource
+        )
+        if len(documents) == 0:
+            return False
+        where_clause = (
+            f"WHERE {Segment.FIELD_DOCUMENT_UUID} IN "
+            f"({','.join(['?'] * len(documents))})"
+        )
+        return self._delete_postings(
+            org, kb, where_clause, [document.document_uuid for document in documents]
+        )
+
+    def search_in_kb(
+        self,
+        org: Org,
+        kb: KnowledgeBase,
+        user: User,
+        query: str,
+        top_k: int,
+        search_params: Dict[str, Any] = None,
+        filter: Filter = None,
+        full_text_search: bool = False,
+        rebuild_full_text_index: bool = False,
+    ) -> List[VectorSearchResult]:
+        """Search for segments in the store."""
+        if full_text_search:
+            logger().warning(
+                "The sparse vector store does not support full text search, "
+                "using the sparse vector search instead."
+            )
+        sparse_embedder = create_sparse_embber_for_kb(org, kb, user, self.context)
+        return self._search_with_embedder(
+            org, kb, query, top_k, sparse_embedder, filter
+        )
+
+    def _search_with_embedder(
+        self,
+        org: Org,
+        kb: KnowledgeBase,
+        query: str,
+        top_k: int,
+        sparse_embedder: AbstractSparseEmbedder,
+        filter: Filter = None,
+    ) -> List[VectorSearchResult]:
+        table_names = self._get_table_names(org, kb, create=True)
+        postings_table, bounds_table = table_names
+
+        query_vector = self._get_embeddings(sparse_embedder, [query])
+        query_vector.sum_duplicates()
+        query_terms = query_vector.indices.astype(np.int32)
+        query_weights = query_vector.data.astype(np.float32)
+        positive = query_weights > 0
+        query_terms, query_weights = query_terms[positive], query_weights[positive]
+        if len(query_terms) == 0 or top_k <= 0:
+            return []
+
+        filter_expr = None
+        filter_values: List[Any] = []
+        if filter is not None:
+            filter_expr, _, filter_values = to_duckdb_filter(filter)
+
+        essential_terms = self._get_essential_terms(
+            postings_table,
+            bounds_table,
+            query_terms,
+            query_weights,
+            top_k,
+            # the threshold of the unfiltered postings is not valid with a filter
+            use_threshold=filter is None,
+        )
+        if len(essential_terms) == 0:
+            return []
+
+        term_id = SparseVectorDuckDBSchema.FIELD_TERM_ID
+        weight = SparseVectorDuckDBSchema.FIELD_WEIGHT
+        segment_uuid = Segment.FIELD_SEGMENT_UUID
+
+        conditions: List[str] = []
+        value_list: List[Any] = [query_terms.tolist(), query_weights.tolist()]
+        if len(essential_terms) < len(query_terms):
+            # a segment without any essential term can't make it into the top k
+            conditions.append(
+                f"p.{segment_uuid} IN (SELECT {segment_uuid} FROM {postings_table} "
+                f"WHERE {term_id} IN (SELECT unnest(?::INTEGER[])))"
+            )
+            value_list.append(essential_terms)
+        if filter_expr is not None:
+            conditions.append(f"({filter_expr})")
+            value_list.extend(filter_values)
+        value_list.append(top_k)
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        query_statement = f"""
+            WITH query_terms AS (
+                SELECT unnest(?::INTEGER[]) AS {term_id},
+                    unnest(?::FLOAT[]) AS query_weight
+            )
+            SELECT p.{segment_uuid}, SUM(p.{weight} * q.query_weight) AS {SCORE_ATTR}
+            FROM {postings_table} p JOIN query_terms q USING ({term_id})
+            {where_clause}
+            GROUP BY p.{segment_uuid}
+            ORDER BY {SCORE_ATTR} DESC LIMIT ?
+        """
+        results = self.duckdb_client.execute_and_fetch_all(query_statement, value_list)
+        return [
+            VectorSearchResult(
+                segment_uuid=result[segment_uuid],
+                search_score=result[SCORE_ATTR],
+                vector_type=VectorType.SPARSE,
+            )
+            for result in results
+        ]
+
+    def _get_essential_terms(
+        self,
+        postings_table: str,
+        bounds_table: str,
+        query_terms: np.ndarray,
+        query_weights: np.ndarray,
+        top_k: int,
+        use_threshold: bool,
+    ) -> List[int]:
+        """
+        Split the query terms into the essential and non-essential terms (MaxScore).
+
+        The k-th highest weight in the postings of the term with the highest upper
+        bound gives a lower bound of the k-th best score. The terms with the lowest
+        upper bounds whose sum is still below that score are non-essential: a
+        segment that only has these terms can't be in the top k, so only the
+        segments with an essential term need to be scored.
+
+        Returns:
+        - The essential terms, an empty list if no query term is in the postings.
+        """
+        term_id = SparseVectorDuckDBSchema.FIELD_TERM_ID
+        max_weight = SparseTermBoundsDuckDBSchema.FIELD_MAX_WEIGHT
+        rows = self.duckdb_client.fetch_all_from_table(
+            table_name=bounds_table,
+            column_list=[term_id, max_weight],
+            where_clause=f"WHERE {term_id} IN (SELECT unnest(?::INTEGER[]))",
+            value_list=[query_terms.tolist()],
+        )
+        max_weights = {row[term_id]: row[max_weight] for row in rows}
+        upper_bounds = sorted(
+            (
+                (float(w) * max_weights[int(t)], int(t), float(w))
+                for t, w in zip(query_terms, query_weights)
+                if int(t) in max_weights
+            ),
+        )
+        if not use_threshold or len(upper_bounds) < 2:
+            return [t for _, t, _ in upper_bounds]
+
+        _, top_term, top_query_weight = upper_bounds[-1]
+        row = self.duckdb_client.fetch_one_from_table(
+            table_name=postings_table,
+            column_list=[SparseVectorDuckDBSchema.FIELD_WEIGHT],
+            where_clause=(
+                f"WHERE {term_id} = ? "
+                f"ORDER BY {SparseVectorDuckDBSchema.FIELD_WEIGHT} DESC "
+                f"LIMIT 1 OFFSET ?"
+            ),
+            value_list=[top_term, top_k - 1],
+        )
+        if row is None:
+            return [t for _, t, _ in upper_bounds]
+        threshold = top_query_weight * row[SparseVectorDuckDBSchema.FIELD_WEIGHT]
+
+        bound_sum = 0.0
+        essential_start = 0
+        for i, (upper_bound, _, _) in enumerate(upper_bounds):
+            bound_sum += upper_bound
+            if bound_sum >= threshold:
+                essential_start = i
+                break
+        logger().noop(
+            f"Sparse search threshold {threshold}, skipped {essential_start} of "
+            f"{len(upper_bounds)} query terms.",
+            noop_lvl=2,
+        )
+        return [t for _, t, _ in upper_bounds[essential_start:]]
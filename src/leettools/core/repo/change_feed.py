@@ -0,0 +1,64 @@
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Set, Tuple
+
+from leettools.common.singleton_meta import SingletonMeta
+
+
+class ChangeFeed(metaclass=SingletonMeta):
+    """
+    The dirty markers published by the docsource, docsink, and document stores,
+    so that the task scanner only revisits the docsources changed since its last
+    scan instead of listing all the orgs, KBs, and docsources every time.
+
+    The markers are kept in memory per process. The task scanner finds the
+    changes made by other processes by the updated_at time of the docsources.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # the key is (org_id, kb_id), the value is the set of docsource uuids
+        self._dirty: Dict[Tuple[str, str], Set[str]] = {}
+        self._local = threading.local()
+
+    def mark_dirty(
+        self, org_id: str, kb_id: str, docsource_uuids: Iterable[str]
+    ) -> None:
+        """
+        Mark the docsources as changed.
+
+        Args:
+        - org_id: The id of the organization.
+        - kb_id: The id of the knowledge base.
+        - docsource_uuids: The uuids of the changed docsources.
+        """
+        if getattr(self._local, "muted", False):
+            return
+        with self._lock:
+            self._dirty.setdefault((org_id, kb_id), set()).update(docsource_uuids)
+
+    def drain(self) -> Dict[Tuple[str, str], Set[str]]:
+        """
+        Get and clear the docsources marked as changed.
+
+        Returns:
+        - The uuids of the changed docsources keyed by (org_id, kb_id).
+        """
+        with self._lock:
+            dirty = self._dirty
+            self._dirty = {}
+        return dirty
+
+    @contextmanager
+    def muted(self) -> Iterator[None]:
+        """
+        Ignore the changes made by the current thread in the context, used by the
+        task scanner so that its own status updates do not mark the docsources
+        it has just visited as changed.
+        """
+        previous = getattr(self._local, "muted", False)
+        self._local.muted = True
+        try:
+            yield
+        finally:
+            self._local.muted = previous
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import List, Tuple
 
 from leettools.core.schemas.segment import SegmentInDB
 from leettools.settings import SystemSettings
@@ -18,6 +19,19 @@ class AbstractDocGraphStore(ABC):
         """
         pass
 
+    @abstractmethod
+    def create_segment_nodes(self, segments_in_store: List[SegmentInDB]) -> List[int]:
+        """
+        Create the nodes for a list of segments with one bulk write.
+
+        Args:
+        segments_in_store: The segments to be created.
+
+        Returns:
+        The ids of the created nodes in the same order as the segments.
+        """
+        pass
+
     @abstractmethod
     def create_segments_relationship(
         self, parent_node_id: int, child_node_id: int
@@ -34,6 +48,22 @@ class AbstractDocGraphStore(ABC):
         """
         pass
 
+    @abstractmethod
+    def create_segments_relationships(
+        self, parent_child_pairs: List[Tuple[int, int]]
+    ) -> List[int]:
+        """
+        Create the BELONGS_TO relationships for a list of node pairs with one bulk
+        write.
+
+        Args:
+        parent_child_pairs: The (parent node id, child node id) pairs.
+
+        Returns:
+        The ids of the created relationships in the same order as the pairs.
+        """
+        pass
+
     @abstractmethod
     def delete_segment_node(self, segment_in_store: SegmentInDB) -> bool:
         """
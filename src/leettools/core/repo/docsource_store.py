@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from datetime import datetime
 from typing import List, Optional
 
 from leettools.core.consts.docsource_status import DocSourceStatus
@@ -81,6 +82,24 @@ class AbstractDocsourceStore(ABC):
         """
         pass
 
+    @abstractmethod
+    def get_docsources_updated_since(
+        self, org: Org, kb: KnowledgeBase, updated_since: datetime
+    ) -> List[DocSource]:
+        """
+        Get the docsources for a knowledgebase created or updated after a time,
+        including the deleted ones.
+
+        Args:
+        org: the organization.
+        kb: The knowledgebase.
+        updated_since: Only the docsources updated after this time are returned.
+
+        Returns:
+        A list of docsources.
+        """
+        pass
+
     @abstractmethod
     def update_docsource(
         self, org: Org, kb: KnowledgeBase, docsource_update: DocSourceUpdate
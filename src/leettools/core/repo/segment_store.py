@@ -32,6 +32,26 @@ class AbstractSegmentStore(ABC):
         """
         pass
 
+    @abstractmethod
+    def create_segments(
+        self, org: Org, kb: KnowledgeBase, segment_creates: List[SegmentCreate]
+    ) -> List[Segment]:
+        """
+        Create a list of new segments in the store with one bulk write.
+
+        Same as create_segment, an existing segment at the same position with the
+        same content is returned as is.
+
+        Args:
+        - org: The organization to create the segments in.
+        - kb: The knowledge base to create the segments in.
+        - segment_creates: The segments to be created.
+
+        Returns:
+        - The created segments in the same order as segment_creates.
+        """
+        pass
+
     @abstractmethod
     def delete_segment(self, org: Org, kb: KnowledgeBase, segment: Segment) -> bool:
         """
@@ -82,6 +102,23 @@ class AbstractSegmentStore(ABC):
         """
         pass
 
+    @abstractmethod
+    def get_segments_by_uuids(
+        self, org: Org, kb: KnowledgeBase, segment_uuids: List[str]
+    ) -> List[Optional[Segment]]:
+        """
+        Get a list of segments from the store by their uuids in one query.
+
+        Args:
+        - org: The organization to get the segments from.
+        - kb: The knowledge base to get the segments from.
+        - segment_uuids: The uuids to search for.
+
+        Returns:
+        - The segments in the same order as the uuids, None if a uuid is not found.
+        """
+        pass
+
     @abstractmethod
     def get_all_segments_for_document(
         self, org: Org, kb: KnowledgeBase, doc_id: str
@@ -143,6 +143,23 @@ class AbstractVectorStore(ABC):
         """
         pass
 
+    @abstractmethod
+    def delete_segment_vectors(
+        self, org: Org, kb: KnowledgeBase, segment_uuids: List[str]
+    ) -> bool:
+        """
+        Delete a list of segment vectors from the store in one operation.
+
+        Args:
+        - org: The organization to delete the segments from.
+        - kb: The knowledge base to delete the segments from.
+        - segment_uuids: The segment_uuids to delete.
+
+        Returns:
+        - True if the segments were deleted, False otherwise.
+        """
+        pass
+
     @abstractmethod
     def delete_segment_vectors_by_document_id(
         self, org: Org, kb: KnowledgeBase, document_uuid: str
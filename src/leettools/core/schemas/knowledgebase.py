@@ -44,6 +44,13 @@ class KBPerfConfig(PerfBaseModel):
         False,
         description="Whether to enable contextual retrieval for the KB",
     )
+    parser: Optional[str] = Field(
+        None,
+        description=(
+            "The parser to convert the PDF, DOCX, PPTX, and XLSX files of the KB, "
+            "the DEFAULT_PARSER setting is used if None"
+        ),
+    )
 
 
 class KBBase(BaseModel):
@@ -261,6 +268,7 @@ class BaseKBSchema(ABC):
             KnowledgeBase.FIELD_SHARE_TO_PUBLIC: "BOOLEAN",
             KnowledgeBase.FIELD_PROMOTION_METADATA: "VARCHAR",
             KnowledgeBase.FIELD_ENABLE_CONTEXTUAL_RETRIEVAL: "BOOLEAN",
+            KnowledgeBase.FIELD_PARSER: "VARCHAR",
             KnowledgeBase.FIELD_AUTO_SCHEDULE: "BOOLEAN",
             KnowledgeBase.FIELD_CREATED_AT: "TIMESTAMP",
             KnowledgeBase.FIELD_UPDATED_AT: "TIMESTAMP",
@@ -7,6 +7,11 @@ from leettools.core.strategy.schemas.strategy_status import StrategyStatus
 
 SEARCH_OPTION_TOP_K = "top_k_for_search"
 SEARCH_OPTION_METRIC = "dense_search_metric"
+SEARCH_OPTION_FUSION_METHOD = "fusion_method"
+SEARCH_OPTION_DENSE_WEIGHT = "dense_weight"
+SEARCH_OPTION_SPARSE_WEIGHT = "sparse_weight"
+SEARCH_OPTION_RRF_K = "rrf_k"
+SEARCH_OPTION_OVERFETCH_FACTOR = "fusion_overfetch_factor"
 
 """
 This class is the original raw conf format for users to specify the strategy in a single
@@ -3,7 +3,12 @@ from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 
 from leettools.core.strategy.schemas.strategy_conf import (
+    SEARCH_OPTION_DENSE_WEIGHT,
+    SEARCH_OPTION_FUSION_METHOD,
     SEARCH_OPTION_METRIC,
+    SEARCH_OPTION_OVERFETCH_FACTOR,
+    SEARCH_OPTION_RRF_K,
+    SEARCH_OPTION_SPARSE_WEIGHT,
     SEARCH_OPTION_TOP_K,
 )
 from leettools.core.strategy.schemas.strategy_section_name import StrategySectionName
@@ -112,13 +117,64 @@ dense_search_option_item_display = StrategyOptionItemDisplay(
     default_value="COSINE",
 )
 
+fusion_method_option_item_display = StrategyOptionItemDisplay(
+    name=SEARCH_OPTION_FUSION_METHOD,
+    display_name="Fusion Method",
+    description=(
+        "How to fuse the dense and sparse results: min_max, z_score, or rrf "
+        "(reciprocal rank fusion)"
+    ),
+    value_type="str",
+    default_value="min_max",
+)
+
+dense_weight_option_item_display = StrategyOptionItemDisplay(
+    name=SEARCH_OPTION_DENSE_WEIGHT,
+    display_name="Dense Weight",
+    description="The weight of the dense search results in the fusion",
+    value_type="float",
+    default_value="0.6",
+)
+
+sparse_weight_option_item_display = StrategyOptionItemDisplay(
+    name=SEARCH_OPTION_SPARSE_WEIGHT,
+    display_name="Sparse Weight",
+    description="The weight of the sparse search results in the fusion",
+    value_type="float",
+    default_value="0.4",
+)
+
+rrf_k_option_item_display = StrategyOptionItemDisplay(
+    name=SEARCH_OPTION_RRF_K,
+    display_name="RRF K",
+    description="The rank offset used by the reciprocal rank fusion",
+    value_type="int",
+    default_value="60",
+)
+
+overfetch_factor_option_item_display = StrategyOptionItemDisplay(
+    name=SEARCH_OPTION_OVERFETCH_FACTOR,
+    display_name="Fusion Over-fetch Factor",
+    description="Each search fetches Top K times this factor results for the fusion",
+    value_type="float",
+    default_value="1.0",
+)
+
 search_section_display = StrategySectionDisplay(
     section_name=StrategySectionName.SEARCH,
     section_display_name="Search",
     section_description="The options for search. ",
     default_strategy_name="hybrid",
     strategy_name_choices={
-        "hybrid": [top_k_option_item_display, dense_search_option_item_display],
+        "hybrid": [
+            top_k_option_item_display,
+            dense_search_option_item_display,
+            fusion_method_option_item_display,
+            dense_weight_option_item_display,
+            sparse_weight_option_item_display,
+            rrf_k_option_item_display,
+            overfetch_factor_option_item_display,
+        ],
         "simple": [top_k_option_item_display, dense_search_option_item_display],
     },
     use_api=False,
@@ -10,8 +10,8 @@ from leettools.core.schemas.document import DocumentCreate
 from leettools.core.schemas.knowledgebase import KnowledgeBase
 from leettools.core.schemas.organization import Org
 from leettools.eds.pipeline.convert._impl.parser_html import ParserHTML
+from leettools.eds.pipeline.convert.conversion_service import get_conversion_service
 from leettools.eds.pipeline.convert.converter import AbstractConverter
-from leettools.eds.pipeline.convert.parser import create_parser
 from leettools.settings import (
     DOCX_EXT,
     HTML_EXT,
@@ -150,10 +150,12 @@ class ConverterLocal(AbstractConverter):
             or file_path.suffix == XLSX_EXT
             or file_path.suffix == XLS_EXT
         ):
-            parser_module = self.settings.DEFAULT_PARSER
+            parser_module = self.kb.parser or self.settings.DEFAULT_PARSER
             logger().debug(f"Using parser: {parser_module}")
-            parser = create_parser(self.settings, parser_module)
-            md_content = parser.file2md(str(file_path), output_file_path)
+            conversion_service = get_conversion_service(self.settings)
+            md_content = conversion_service.file2md(
+                parser_module, str(file_path), output_file_path
+            )
             output_file_created = True
         elif file_path.suffix == MD_EXT:
             with open(file_path, "r", encoding="utf-8") as md_file:
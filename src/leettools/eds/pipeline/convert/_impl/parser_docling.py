@@ -1,8 +1,10 @@
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 
+import pypdfium2
 from docling.backend.pypdfium2_backend import PyPdfiumDocumentBackend
 from docling.datamodel.base_models import InputFormat
+from docling.datamodel.document import ConversionResult
 from docling.datamodel.pipeline_options import PdfPipelineOptions
 from docling.document_converter import (
     DocumentConverter,
@@ -15,15 +17,23 @@ from docling_core.types.doc import PictureItem, TableItem
 
 from leettools.common.logging import logger
 from leettools.eds.pipeline.convert.parser import AbstractParser
-from leettools.settings import SystemSettings
+from leettools.settings import PDF_EXT, SystemSettings
 
 
 class ParserDocling(AbstractParser):
     """Parse file content and convert it to Markdown using Docling parser."""
 
+    # the document converter keeps the state of the models between the pages
+    thread_safe = False
+
+    # whether to render the pages, tables, and pictures and save them as PNG
+    # files next to the markdown file
+    generate_images = True
+
     def __init__(self, settings: SystemSettings):
         super().__init__()
         self.settings = settings
+        self.page_batch_size = settings.docling_page_batch_size
 
         # Move initialization to constructor
         # TODO: make these parameters configurable
@@ -31,9 +41,9 @@ class ParserDocling(AbstractParser):
         pipeline_options = PdfPipelineOptions()
         pipeline_options.do_ocr = False
         pipeline_options.images_scale = IMAGE_RESOLUTION_SCALE
-        pipeline_options.generate_page_images = True
-        pipeline_options.generate_table_images = True
-        pipeline_options.generate_picture_images = True
+        pipeline_options.generate_page_images = self.generate_images
+        pipeline_options.generate_table_images = self.generate_images
+        pipeline_options.generate_picture_images = self.generate_images
 
         # Initialize converter for this instance
         self.doc_converter = DocumentConverter(
@@ -52,10 +62,35 @@ class ParserDocling(AbstractParser):
             },
         )
 
+    def _convert_in_batches(self, filepath: str) -> Iterator[ConversionResult]:
+        """
+        Convert the file, a PDF with more pages than the page batch size is
+        converted one page range at a time, so only the pages of one batch are
+        kept in memory.
+        """
+        if self.page_batch_size <= 0 or Path(filepath).suffix != PDF_EXT:
+            yield self.doc_converter.convert(filepath)
+            return
+
+        pdf = pypdfium2.PdfDocument(filepath)
+        try:
+            page_count = len(pdf)
+        finally:
+            pdf.close()
+
+        # the page range of docling starts from 1 and includes the end page
+        for start_page in range(1, page_count + 1, self.page_batch_size):
+            end_page = min(start_page + self.page_batch_size - 1, page_count)
+            logger().debug(
+                f"Converting pages {start_page}-{end_page} of {page_count}: "
+                f"{filepath}"
+            )
+            yield self.doc_converter.convert(
+                filepath, page_range=(start_page, end_page)
+            )
+
     def _convert(self, filepath: str, target_path: Optional[Path] = None) -> str:
         try:
-            # Use instance converter instead of module-level one
-            result = self.doc_converter.convert(filepath)
             if target_path:
                 output_dir = Path(target_path).parent
             else:
@@ -63,34 +98,40 @@ class ParserDocling(AbstractParser):
             doc_filename = Path(filepath).stem
             doc_filename = doc_filename.split(".")[0]
 
-            # Save page images
-            for page_no, page in result.document.pages.items():
-                page_no = page.page_no
-                page_image_filename = output_dir / f"{doc_filename}-{page_no}.png"
-                with page_image_filename.open("wb") as fp:
-                    page.image.pil_image.save(fp, format="PNG")
-
-            # Save images of figures and tables
             table_counter = 0
             picture_counter = 0
-            for element, _level in result.document.iterate_items():
-                if isinstance(element, TableItem):
-                    table_counter += 1
-                    element_image_filename = (
-                        output_dir / f"{doc_filename}-table-{table_counter}.png"
-                    )
-                    with element_image_filename.open("wb") as fp:
-                        element.image.pil_image.save(fp, "PNG")
-
-                if isinstance(element, PictureItem):
-                    picture_counter += 1
-                    element_image_filename = (
-                        output_dir / f"{doc_filename}-picture-{picture_counter}.png"
-                    )
-                    with element_image_filename.open("wb") as fp:
-                        element.image.pil_image.save(fp, "PNG")
-
-            content = result.document.export_to_markdown()
+            md_parts = []
+            for result in self._convert_in_batches(filepath):
+                md_parts.append(result.document.export_to_markdown())
+                if not self.generate_images:
+                    continue
+
+                # Save page images
+                for page_no, page in result.document.pages.items():
+                    page_no = page.page_no
+                    page_image_filename = output_dir / f"{doc_filename}-{page_no}.png"
+                    with page_image_filename.open("wb") as fp:
+                        page.image.pil_image.save(fp, format="PNG")
+
+                # Save images of figures and tables
+                for element, _level in result.document.iterate_items():
+                    if isinstance(element, TableItem):
+                        table_counter += 1
+                        element_image_filename = (
+                            output_dir / f"{doc_filename}-table-{table_counter}.png"
+                        )
+                        with element_image_filename.open("wb") as fp:
+                            element.image.pil_image.save(fp, "PNG")
+
+                    if isinstance(element, PictureItem):
+                        picture_counter += 1
+                        element_image_filename = (
+                            output_dir / f"{doc_filename}-picture-{picture_counter}.png"
+                        )
+                        with element_image_filename.open("wb") as fp:
+                            element.image.pil_image.save(fp, "PNG")
+
+            content = "\n\n".join(md_parts)
             if target_path:
                 with open(target_path, "w", encoding="utf-8") as f:
                     f.write(content)
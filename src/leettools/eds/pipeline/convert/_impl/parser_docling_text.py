@@ -0,0 +1,13 @@
+# import the module instead of the class, the parser factory expects only one
+# parser class in the module
+from leettools.eds.pipeline.convert._impl import parser_docling
+
+
+class ParserDoclingText(parser_docling.ParserDocling):
+    """
+    Parse file content and convert it to Markdown using Docling parser, without
+    rendering the page, table, and picture images, which takes most of the time
+    and memory of the conversion when only the text is used.
+    """
+
+    generate_images = False
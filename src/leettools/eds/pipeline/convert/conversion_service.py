@@ -0,0 +1,123 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from leettools.common.logging import logger
+from leettools.eds.pipeline.convert.parser import parse_file
+from leettools.settings import SystemSettings
+
+# the settings of a worker process, set by the pool initializer
+_worker_settings: Optional[SystemSettings] = None
+
+
+def _init_worker(settings: SystemSettings) -> None:
+    global _worker_settings
+    _worker_settings = settings
+
+
+def _parse_file_in_worker(
+    parser_module: str, file_path: str, target_path: Optional[str]
+) -> str:
+    # the parsers are kept warm in the worker process between the files
+    return parse_file(_worker_settings, parser_module, file_path, target_path)
+
+
+class ConversionService:
+    """
+    Parse the PDF, DOCX, PPTX, and XLSX files with the warm parsers.
+
+    If convert_process_pool_size is larger than 0, the files are parsed in a pool
+    of worker processes, so that the CPU-heavy parsing of different files runs on
+    different cores without holding the GIL of the calling process. Each worker
+    keeps its own parser instances, so the models are loaded once per worker.
+    Otherwise the files are parsed in the calling thread.
+    """
+
+    def __init__(self, settings: SystemSettings) -> None:
+        self.settings = settings
+        self.pool_size = settings.convert_process_pool_size
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn the workers instead of forking the process with the
+                # threads and the database connections of the caller
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.pool_size,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.settings,),
+                )
+                logger().info(
+                    f"Started {self.pool_size} processes for document conversion."
+                )
+            return self._pool
+
+    def _reset_pool(self, pool: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def file2md(
+        self, parser_module: str, file_path: str, target_path: Optional[str] = None
+    ) -> str:
+        """
+        Parse a file and return the text.
+
+        Args:
+        - parser_module: module name of parser to use.
+        - file_path: Path to the file.
+        - target_path: File path to save the parsed text. If None, the text is not saved.
+
+        Returns:
+        - The parsed text.
+        """
+        if self.pool_size <= 0:
+            return parse_file(self.settings, parser_module, file_path, target_path)
+
+        pool = self._get_pool()
+        try:
+            future = pool.submit(
+                _parse_file_in_worker, parser_module, file_path, target_path
+            )
+            return future.result()
+        except BrokenProcessPool as e:
+            # a worker died, e.g. killed for the memory, start new workers next time
+            logger().error(f"Conversion process pool is broken parsing {file_path}.")
+            self._reset_pool(pool)
+            raise e
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        with self._lock:
+            pool = self._pool
+            self._pool = None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+
+_conversion_service: Optional[ConversionService] = None
+_conversion_service_lock = threading.Lock()
+
+
+def get_conversion_service(settings: SystemSettings) -> ConversionService:
+    """
+    Get the conversion service shared by the process.
+
+    Args:
+    - settings: The system settings.
+
+    Returns:
+    - The conversion service.
+    """
+    global _conversion_service
+    if _conversion_service is None:
+        with _conversion_service_lock:
+            if _conversion_service is None:
+                _conversion_service = ConversionService(settings)
+    return _conversion_service
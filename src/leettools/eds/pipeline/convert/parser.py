@@ -1,7 +1,9 @@
 import os
+import threading
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterator, List, Optional
 
 from leettools.common.exceptions import UnexpectedCaseException
 from leettools.settings import (
@@ -15,6 +17,11 @@ from leettools.settings import (
 
 
 class AbstractParser(ABC):
+
+    # whether one instance can parse files in multiple threads at the same time,
+    # otherwise the instances are checked out of a bounded pool one thread at a time
+    thread_safe: bool = True
+
     @abstractmethod
     def pdf2md(self, pdf_path: str, target_path: Optional[Path] = None) -> str:
         """
@@ -121,3 +128,116 @@ def create_parser(settings: SystemSettings, parser_module: str) -> AbstractParse
         AbstractParser,
         settings=settings,
     )
+
+
+class _ParserPool:
+    """
+    The instances of a parser that is not thread safe, shared by the threads of
+    the process. At most max_size instances are created, and a thread waits for
+    an idle instance when all of them are checked out.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max(1, max_size)
+        self.created = 0
+        self._idle: List[AbstractParser] = []
+        self._condition = threading.Condition()
+
+    def checkout(self, settings: SystemSettings, parser_module: str) -> AbstractParser:
+        with self._condition:
+            while len(self._idle) == 0 and self.created >= self.max_size:
+                self._condition.wait()
+            if len(self._idle) > 0:
+                return self._idle.pop()
+            self.created += 1
+        try:
+            return create_parser(settings, parser_module)
+        except Exception as e:
+            with self._condition:
+                self.created -= 1
+                self._condition.notify()
+            raise e
+
+    def checkin(self, parser: AbstractParser) -> None:
+        with self._condition:
+            self._idle.append(parser)
+            self._condition.notify()
+
+
+# the parsers that are thread safe, shared by all the threads
+_parsers: Dict[str, AbstractParser] = {}
+# the pools of the parsers that are not thread safe
+_parser_pools: Dict[str, _ParserPool] = {}
+_parsers_lock = threading.Lock()
+
+
+@contextmanager
+def checkout_parser(
+    settings: SystemSettings, parser_module: str
+) -> Iterator[AbstractParser]:
+    """
+    Check out the parser instance kept warm by the process, created on the first
+    use, so that the models of the parser are only loaded once.
+
+    A thread safe parser is shared by all the threads. A parser that is not thread
+    safe is used by one thread at a time, at most convert_parser_pool_size
+    instances are created and returned to the pool after use.
+
+    Args:
+    - settings: System settings for configuration
+    - parser_module: module name of parser to check out
+
+    Yields:
+    - The parser instance, only used by the calling thread until returned
+    """
+    parser = _parsers.get(parser_module)
+    if parser is not None:
+        yield parser
+        return
+
+    pool = _parser_pools.get(parser_module)
+    if pool is None:
+        # the first instance tells if the parser is thread safe
+        with _parsers_lock:
+            parser = _parsers.get(parser_module)
+            pool = _parser_pools.get(parser_module)
+            if parser is None and pool is None:
+                parser = create_parser(settings, parser_module)
+                if parser.thread_safe:
+                    _parsers[parser_module] = parser
+                else:
+                    pool = _ParserPool(settings.convert_parser_pool_size)
+                    pool.created = 1
+                    _parser_pools[parser_module] = pool
+        if pool is None:
+            yield parser
+            return
+
+    if parser is None:
+        parser = pool.checkout(settings, parser_module)
+    try:
+        yield parser
+    finally:
+        pool.checkin(parser)
+
+
+def parse_file(
+    settings: SystemSettings,
+    parser_module: str,
+    file_path: str,
+    target_path: Optional[str] = None,
+) -> str:
+    """
+    Parse a file with a warm parser instance checked out of the process.
+
+    Args:
+    - settings: System settings for configuration
+    - parser_module: module name of parser to use
+    - file_path: Path to the file.
+    - target_path: File path to save the parsed text. If None, the text is not saved.
+
+    Returns:
+    - The parsed text.
+    """
+    with checkout_parser(settings, parser_module) as parser:
+        return parser.file2md(file_path, target_path)
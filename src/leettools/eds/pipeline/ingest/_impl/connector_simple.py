@@ -1,20 +1,14 @@
 import os
 import traceback
 from pathlib import Path
-from typing import Dict, List, Optional
-from urllib.parse import urljoin
+from typing import List, Optional
 
-import requests
-from bs4 import BeautifulSoup
-
-import leettools.common.utils.url_utils
 from leettools.common import exceptions
 from leettools.common.logging import logger
 from leettools.common.logging.event_logger import EventLogger
 from leettools.common.logging.logger_for_query import get_logger_for_chat
 from leettools.common.utils import file_utils, time_utils
 from leettools.common.utils.file_utils import file_hash_and_size, uri_to_path
-from leettools.common.utils.url_utils import normalize_url
 from leettools.context_manager import Context
 from leettools.core.consts import flow_option
 from leettools.core.consts.docsource_type import DocSourceType
@@ -35,6 +29,7 @@ from leettools.settings import (
     supported_file_extensions,
 )
 from leettools.web.schemas.scrape_result import ScrapeResult
+from leettools.web.web_crawler import WebCrawler
 from leettools.web.web_scraper import WebScraper
 from leettools.web.web_searcher import WebSearcher
 
@@ -77,7 +72,6 @@ class ConnectorSimple(AbstractConnector):
         self.docsource_uri = docsource.uri
 
         self.docsource_type = docsource.source_type
-        self.visited: set = set()
         self.docsink_create_list: Optional[List[DocSinkCreate]] = []
         self.docsinkstore = docsinkstore
         self.local_folder = os.path.join(
@@ -144,46 +138,6 @@ class ConnectorSimple(AbstractConnector):
                 d.write(f.read())
         return True
 
-    def _is_internal_url(self, url: str) -> bool:
-        """
-        Checks if the URL is in the same TLD as the docsource URI.
-
-        Args:
-            url: The URL to be checked.
-
-        Returns:
-            True if the URL is internal, False otherwise.
-        """
-        tld = leettools.common.utils.url_utils.get_first_level_domain_from_url(url)
-        base_tld = leettools.common.utils.url_utils.get_first_level_domain_from_url(
-            self.docsource_uri
-        )
-
-        if tld == base_tld:
-            return True
-        return False
-
-    def _is_hyperlink_file(self, url: str) -> bool:
-        """
-        Checks if the URL is a hyperlink file.
-
-        Args:
-            url: The URL to be checked.
-
-        Returns:
-            True if the URL is a hyperlink file, False otherwise.
-        """
-        url_str = str(url).lower()
-        if (
-            url_str.endswith(".html")
-            or url_str.endswith(".htm")
-            or url_str.endswith(".php")
-            or url_str.endswith(".asp")
-        ):
-            return True
-        else:
-            return False
-
     def _is_supported_file(self, url: str) -> bool:
         """
         Checks if the URL is a supported file.
@@ -392,6 +346,10 @@ class ConnectorSimple(AbstractConnector):
             )
             return scrape_result
 
+        self._add_docsink_create(url, scrape_result)
+        return scrape_result
+
+    def _add_docsink_create(self, url: str, scrape_result: ScrapeResult) -> None:
         file_path = scrape_result.file_path
 
         doc_hash, doc_size = file_hash_and_size(Path(file_path))
@@ -405,24 +363,14 @@ class ConnectorSimple(AbstractConnector):
         )
         self.docsink_create_list.append(docsink_create)
         self.display_logger.info(f"Saved {url} to {file_path}")
-        return scrape_result
 
-    def _ingest_website(
-        self,
-        url: str,
-        crawled_urls: Dict[str, bool],
-        depth: int,
-        ingest_config: IngestConfig,
-    ) -> None:
+    def _ingest_website(self, url: str, ingest_config: IngestConfig) -> None:
         """
         Crawls the website and saves the content to a local folder.
 
         Args:
         - url: The URL of the website to be crawled.
-        - crawled_urls: A dictionary of crawled URLs.
-        - depth: The depth of the crawl.
         - ingest_config: The ingestion configuration.
-
         """
         if ingest_config.extra_parameters is None:
             extra_parameters = {}
@@ -433,95 +381,25 @@ class ConnectorSimple(AbstractConnector):
         max_url = int(extra_parameters.get("max_urls", 20))
 
         self.display_logger.info(
-            f"Processing website: {url}, current depth: {depth}, "
-            f"max_depth: {max_depth}, max_url: {max_url} "
-            f"current crawled_urls: {len(crawled_urls)}"
+            f"Processing website: {url}, max_depth: {max_depth}, max_url: {max_url}"
         )
 
-        normalized_url = normalize_url(url)
-
-        if not self._is_internal_url(normalized_url):
-            self.display_logger.info(f"Skipping outside URL: {normalized_url}")
-            return
-
-        if normalized_url in self.visited:
-            self.display_logger.info(f"URL already visited: {normalized_url}")
-            return
-
-        scrape_result = self._ingest_url(normalized_url)
-        if scrape_result is None:
-            self.display_logger.error(f"Failed to crawl url: {normalized_url}")
-            return
-        crawled_urls[normalized_url] = True
-
-        if not scrape_result.content:
-            self.display_logger.info(f"No content retrieved for url: {normalized_url}")
-            return
-
-        if not self._is_hyperlink_file(scrape_result.file_path):
-            self.display_logger.info(
-                f"Skipping link checking for file: {scrape_result.file_path}"
-            )
-            return
-
-        if depth >= max_depth:
-            self.display_logger.info(f"Skipping link checking at max depth: {depth}")
-            return
-
-        if len(crawled_urls) >= max_url:
-            self.display_logger.info(
-                f"Skipping link checking at max url: {len(crawled_urls)}"
-            )
-            return
-
-        # TODO: we are basically doing a depth-first search here
-        # Maybe we should use breadth-first search by default
-        # https://github.com/LinkTime-Corp/leettools/issues/1035
-        try:
-            top_tld = leettools.common.utils.url_utils.get_first_level_domain_from_url(
-                normalized_url
-            )
-
-            self.display_logger.info(f"Finding links in {normalized_url}")
-
-            # response = requests.get(normalized_url, timeout=100)
-            # response.raise_for_status()
-            # soup = BeautifulSoup(response.text, "html.parser")
-
-            soup = BeautifulSoup(scrape_result.content, "html.parser")
-
-            for link in soup.find_all("a", href=True):
-                href = link.get("href")
-                joined_url = urljoin(normalized_url, href)
+        web_crawler = WebCrawler(
+            context=self.context,
+            user_agent=self.user_agent,
+            display_logger=self.display_logger,
+        )
+        scrape_results = web_crawler.crawl(
+            start_url=url, max_depth=max_depth, max_urls=max_url
+        )
+        for scrape_result in scrape_results:
+            if scrape_result.rtn_code != ReturnCode.SUCCESS:
                 self.display_logger.debug(
-                    f"Joined URL: {joined_url} from base: {normalized_url} and relatvie: {href}"
+                    f"Skipping {scrape_result.url} failed to scrape: "
+                    f"{scrape_result.rtn_code}"
                 )
-                full_url = normalize_url(joined_url)
-
-                # if the new url is in the same domain and not visited
-                tld = leettools.common.utils.url_utils.get_first_level_domain_from_url(
-                    full_url
-                )
-                if tld == top_tld:
-                    if full_url not in crawled_urls:
-                        self.display_logger.info(
-                            f"Found new link in same tld: {full_url}"
-                        )
-                    else:
-                        self.display_logger.debug(f"Skipping visited link: {full_url}")
-                        continue
-                else:
-                    self.display_logger.debug(f"Skipping different tld: {full_url}")
-                    continue
-
-                self._ingest_website(
-                    url=full_url,
-                    crawled_urls=crawled_urls,
-                    depth=depth + 1,
-                    ingest_config=ingest_config,
-                )
-        except requests.RequestException as e:
-            self.display_logger.error(f"Failed to crawl {url}: {str(e)}")
+                continue
+            self._add_docsink_create(scrape_result.url, scrape_result)
 
     def _run_search(self) -> None:
         web_searcher = WebSearcher(context=self.context)
@@ -627,13 +505,7 @@ class ConnectorSimple(AbstractConnector):
             else:
                 ingest_config = self.docsource.ingest_config
 
-            crawled_urls: Dict[str, bool] = {}
-            self._ingest_website(
-                url=self.docsource_uri,
-                crawled_urls=crawled_urls,
-                depth=1,
-                ingest_config=ingest_config,
-            )
+            self._ingest_website(url=self.docsource_uri, ingest_config=ingest_config)
             self.display_logger.info(f"Finished crawling web site {self.docsource_uri}")
 
         elif (
@@ -0,0 +1,102 @@
+from typing import Dict, List
+
+from leettools.common.duckdb.duckdb_client import DuckDBClient
+from leettools.common.utils import time_utils
+from leettools.eds.pipeline.split._impl.duckdb.context_summary_cache_store_duckdb_schema import (
+    CONTEXT_SUMMARY_CACHE_TABLE_NAME,
+    ContextSummaryCacheDuckDBSchema,
+)
+from leettools.eds.pipeline.split.context_summary_cache_store import (
+    AbstractContextSummaryCacheStore,
+)
+from leettools.settings import SystemSettings
+
+
+class ContextSummaryCacheStoreDuckDB(AbstractContextSummaryCacheStore):
+
+    def __init__(self, settings: SystemSettings) -> None:
+        self.settings = settings
+        self.duckdb_client = DuckDBClient(self.settings)
+
+    def _get_table_name(self) -> str:
+        return self.duckdb_client.create_table_if_not_exists(
+            self.settings.DB_COMMOM,
+            CONTEXT_SUMMARY_CACHE_TABLE_NAME,
+            ContextSummaryCacheDuckDBSchema.get_schema(),
+        )
+
+    def get_summaries(self, cache_keys: List[str]) -> Dict[str, str]:
+        if not cache_keys:
+            return {}
+        table_name = self._get_table_name()
+        unique_keys = list(dict.fromkeys(cache_keys))
+        rows = self.duckdb_client.fetch_all_from_table(
+            table_name=table_name,
+            column_list=[
+                ContextSummaryCacheDuckDBSchema.FIELD_CACHE_KEY,
+                ContextSummaryCacheDuckDBSchema.FIELD_SUMMARY,
+            ],
+            where_clause=(
+                f"WHERE {ContextSummaryCacheDuckDBSchema.FIELD_CACHE_KEY} IN "
+                f"({','.join(['?'] * len(unique_keys))})"
+            ),
+            value_list=unique_keys,
+        )
+        return {
+            row[ContextSummaryCacheDuckDBSchema.FIELD_CACHE_KEY]: row[
+                ContextSummaryCacheDuckDBSchema.FIELD_SUMMARY
+            ]
+            for row in rows
+        }
+
+    def save_summaries(self, summaries: Dict[str, str]) -> None:
+        if not summaries:
+            return
+        table_name = self._get_table_name()
+        timestamp_in_ms = time_utils.cur_timestamp_in_ms()
+        # another split may have saved the same chunk, replace it
+        self.duckdb_client.batch_upsert_into_table(
+            table_name=table_name,
+            column_list=[
+                ContextSummaryCacheDuckDBSchema.FIELD_CACHE_KEY,
+                ContextSummaryCacheDuckDBSchema.FIELD_SUMMARY,
+                ContextSummaryCacheDuckDBSchema.FIELD_CREATED_TIMESTAMP_IN_MS,
+            ],
+            values=[
+                [cache_key, summary, timestamp_in_ms]
+                for cache_key, summary in summaries.items()
+            ],
+        )
+
+    def _count(self, table_name: str) -> int:
+        row = self.duckdb_client.fetch_one_from_table(
+            table_name=table_name, column_list=["COUNT(*) AS count"]
+        )
+        return row["count"] if row else 0
+
+    def evict_summaries(self, max_entries: int, min_timestamp_in_ms: int) -> int:
+        table_name = self._get_table_name()
+        timestamp_field = ContextSummaryCacheDuckDBSchema.FIELD_CREATED_TIMESTAMP_IN_MS
+        count_before = self._count(table_name)
+        self.duckdb_client.delete_from_table(
+            table_name=table_name,
+            where_clause=f"WHERE {timestamp_field} < ?",
+            value_list=[min_timestamp_in_ms],
+        )
+        count = self._count(table_name)
+        if count > max_entries:
+            # the created timestamp of the newest entry to evict
+            row = self.duckdb_client.fetch_one_from_table(
+                table_name=table_name,
+                column_list=[timestamp_field],
+                where_clause=f"ORDER BY {timestamp_field} DESC LIMIT 1 OFFSET ?",
+                value_list=[max_entries],
+            )
+            if row is not None:
+                self.duckdb_client.delete_from_table(
+                    table_name=table_name,
+                    where_clause=f"WHERE {timestamp_field} <= ?",
+                    value_list=[row[timestamp_field]],
+                )
+            count = self._count(table_name)
+        return count_before - count
@@ -0,0 +1,21 @@
+from dataclasses import dataclass
+from typing import Any, Dict
+
+CONTEXT_SUMMARY_CACHE_TABLE_NAME = "context_summary_cache"
+
+
+@dataclass
+class ContextSummaryCacheDuckDBSchema:
+    """DuckDB-specific schema for the context summary cache table."""
+
+    FIELD_CACHE_KEY = "cache_key"
+    FIELD_SUMMARY = "summary"
+    FIELD_CREATED_TIMESTAMP_IN_MS = "created_timestamp_in_ms"
+
+    @classmethod
+    def get_schema(cls) -> Dict[str, Any]:
+        return {
+            cls.FIELD_CACHE_KEY: "VARCHAR PRIMARY KEY",
+            cls.FIELD_SUMMARY: "VARCHAR",
+            cls.FIELD_CREATED_TIMESTAMP_IN_MS: "BIGINT",
+        }
@@ -0,0 +1,173 @@
+import hashlib
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+from leettools.common.logging import logger
+from leettools.common.utils import time_utils
+from leettools.settings import SystemSettings
+
+
+def get_context_summary_cache_key(
+    model_name: str, system_prompt: str, user_prompt: str
+) -> str:
+    """
+    Get the cache key of a context summary. The prompts contain the document and
+    the chunk, so the key changes with the document, the chunk, the model, and
+    the prompt templates.
+
+    Args:
+    - model_name: The model used to generate the summary.
+    - system_prompt: The system prompt with the document content.
+    - user_prompt: The user prompt with the chunk content.
+
+    Returns:
+    - The sha256 hex digest of the key fields.
+    """
+    document_hash = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+    chunk_hash = hashlib.sha256(user_prompt.encode("utf-8")).hexdigest()
+    key = f"{model_name}\x00{document_hash}\x00{chunk_hash}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class AbstractContextSummaryCacheStore(ABC):
+    """
+    A persistent store of the context summaries generated for the chunks when
+    contextual retrieval is enabled, so that re-splitting a document does not call
+    the LLM again for the same chunks.
+    """
+
+    @abstractmethod
+    def __init__(self, settings: SystemSettings):
+        """
+        Initialize the context summary cache store.
+
+        Args:
+        -   settings: The system settings.
+        """
+        pass
+
+    @abstractmethod
+    def get_summaries(self, cache_keys: List[str]) -> Dict[str, str]:
+        """
+        Get the cached summaries for a list of keys with one query.
+
+        Args:
+        -   cache_keys: The keys to look up.
+
+        Returns:
+        -   The summaries found, keyed by the cache key.
+        """
+        pass
+
+    @abstractmethod
+    def save_summaries(self, summaries: Dict[str, str]) -> None:
+        """
+        Save a batch of summaries into the cache.
+
+        Args:
+        -   summaries: The summaries to save, keyed by the cache key.
+        """
+        pass
+
+    @abstractmethod
+    def evict_summaries(self, max_entries: int, min_timestamp_in_ms: int) -> int:
+        """
+        Evict the summaries created before the timestamp, then the oldest ones
+        until there are at most max_entries summaries left.
+
+        Args:
+        -   max_entries: The max number of summaries to keep.
+        -   min_timestamp_in_ms: The summaries created before it are evicted.
+
+        Returns:
+        -   The number of summaries evicted.
+        """
+        pass
+
+
+def create_context_summary_cache_store(
+    settings: SystemSettings,
+) -> AbstractContextSummaryCacheStore:
+    """
+    Get the context summary cache store.
+
+    Returns:
+    The context summary cache store.
+    """
+
+    from leettools.common.utils import factory_util
+
+    return factory_util.create_manager_with_repo_type(
+        manager_name="context_summary_cache_store",
+        repo_type=settings.DOC_STORE_TYPE,
+        base_class=AbstractContextSummaryCacheStore,
+        settings=settings,
+    )
+
+
+_context_summary_cache_store: Optional[AbstractContextSummaryCacheStore] = None
+_context_summary_cache_store_lock = threading.Lock()
+
+
+def get_context_summary_cache_store(
+    settings: SystemSettings,
+) -> Optional[AbstractContextSummaryCacheStore]:
+    """
+    Get the context summary cache store shared by the process.
+
+    Args:
+    - settings: The system settings.
+
+    Returns:
+    - The cache store, or None if CONTEXTUAL_RETRIEVAL_CACHE_ENABLED is False.
+    """
+    global _context_summary_cache_store
+    if not settings.CONTEXTUAL_RETRIEVAL_CACHE_ENABLED:
+        return None
+    if _context_summary_cache_store is None:
+        with _context_summary_cache_store_lock:
+            if _context_summary_cache_store is None:
+                _context_summary_cache_store = create_context_summary_cache_store(
+                    settings
+                )
+    return _context_summary_cache_store
+
+
+# the monotonic time of the last eviction in the process, None if not evicted yet
+_last_evict_time: Optional[float] = None
+
+
+def maybe_evict_context_summaries(settings: SystemSettings) -> int:
+    """
+    Evict the context summaries older than CONTEXTUAL_RETRIEVAL_CACHE_MAX_AGE_IN_DAYS
+    and the oldest ones over CONTEXTUAL_RETRIEVAL_CACHE_MAX_ENTRIES. The eviction
+    scans the whole cache table, so it runs at most once every
+    CONTEXTUAL_RETRIEVAL_CACHE_EVICT_INTERVAL_IN_SECONDS in the process.
+
+    Args:
+    - settings: The system settings.
+
+    Returns:
+    - The number of summaries evicted, 0 if the eviction is skipped.
+    """
+    global _last_evict_time
+    cache_store = get_context_summary_cache_store(settings)
+    if cache_store is None:
+        return 0
+    interval = settings.CONTEXTUAL_RETRIEVAL_CACHE_EVICT_INTERVAL_IN_SECONDS
+    with _context_summary_cache_store_lock:
+        now = time.monotonic()
+        if _last_evict_time is not None and now - _last_evict_time < interval:
+            return 0
+        _last_evict_time = now
+    max_age_in_ms = settings.CONTEXTUAL_RETRIEVAL_CACHE_MAX_AGE_IN_DAYS * 86400 * 1000
+    try:
+        return cache_store.evict_summaries(
+            max_entries=settings.CONTEXTUAL_RETRIEVAL_CACHE_MAX_ENTRIES,
+            min_timestamp_in_ms=time_utils.cur_timestamp_in_ms() - max_age_in_ms,
+        )
+    except Exception as e:
+        logger().warning(f"Failed to evict the context summary cache: {e}")
+        return 0
@@ -1,6 +1,7 @@
 import os
 import re
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
@@ -8,17 +9,22 @@ from urllib.parse import unquote
 
 from leettools.common.logging import logger
 from leettools.common.logging.event_logger import EventLogger
-from leettools.common.utils import time_utils
+from leettools.common.utils import file_utils, time_utils
 from leettools.common.utils.tokenizer import Tokenizer
 from leettools.context_manager import Context
 from leettools.core.consts.return_code import ReturnCode
 from leettools.core.schemas.document import Document
 from leettools.core.schemas.knowledgebase import KnowledgeBase
 from leettools.core.schemas.organization import Org
-from leettools.core.schemas.segment import SegmentCreate, SegmentInDB
+from leettools.core.schemas.segment import Segment, SegmentCreate, SegmentInDB
 from leettools.core.schemas.user import User
 from leettools.eds.api_caller import api_utils
 from leettools.eds.pipeline.chunk.chunker import create_chunker
+from leettools.eds.pipeline.split.context_summary_cache_store import (
+    get_context_summary_cache_key,
+    get_context_summary_cache_store,
+    maybe_evict_context_summaries,
+)
 from leettools.settings import is_media_file, supported_file_extensions
 
 SEGMENTS = "segments"
@@ -59,21 +65,17 @@ def separate_heading_from_content(content: str) -> Tuple[str, str]:
         return "", content  # Return the original text if "@@" is not found
 
 
+# the document is in the system prompt and the chunk is at the end, so the calls
+# for the chunks of a document share the same prefix for the prompt caching of
+# the API provider
 CONTEXTUAL_RETRIEVAL_SYSTEM_PROMPT = """
 You are a helpful assistant that can help to add the context to the chunk content.
-"""
-
-CONTEXTUAL_RETRIEVAL_USER_PROMPT = """
 <document> 
 {document_content} 
 </document> 
-Here is the chunk we want to situate within the whole document 
-<chunk> 
-{chunk_content} 
-</chunk> 
-Please give a short succinct context to situate this chunk within the overall document 
-for the purposes of improving search retrieval of the chunk. Answer only with the 
-succinct context and nothing else. 
+For each chunk given by the user, please give a short succinct context to situate 
+the chunk within the overall document above for the purposes of improving search 
+retrieval of the chunk. Answer only with the succinct context and nothing else. 
 The response should be in the following json format (Make sure the "document", "paragraph_id", "summary" 
 and "other_info" are in the same language as the chunk itself):
 {{
@@ -84,6 +86,13 @@ and "other_info" are in the same language as the chunk itself):
 }}
 """
 
+CONTEXTUAL_RETRIEVAL_USER_PROMPT = """
+Here is the chunk we want to situate within the whole document 
+<chunk> 
+{chunk_content} 
+</chunk> 
+"""
+
 # we can put the above prompts into a text file and load them in a strategy section
 _script_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -127,55 +136,124 @@ class Splitter:
         self.settings = context.settings
         self.tokenizer = Tokenizer(self.settings)
 
-    def _add_context_summary_to_chunk(
+    def _add_context_summary_to_chunks(
         self,
-        chunk_content: str,
+        chunk_contents: List[str],
         document_for_contextual_retrieval: str,
-    ) -> str:
+    ) -> List[str]:
         """
-        Add the context summary to the chunk content when contextual retrieval is enabled.
+        Add the context summaries to the chunk contents when contextual retrieval is
+        enabled. The summaries are read from the cache if possible, the others are
+        generated with concurrent LLM calls and saved to the cache.
 
         Args:
-        - chunk_content: the content of the chunk
+        - chunk_contents: the contents of the chunks
         - document_for_contextual_retrieval: the document content for contextual retrieval
+
+        Returns:
+        - The chunk contents with the context summaries, in the same order.
         """
-        user_prompt = CONTEXTUAL_RETRIEVAL_USER_PROMPT.format(
-            document_content=document_for_contextual_retrieval,
-            chunk_content=chunk_content,
-        )
+        if not chunk_contents:
+            return []
 
-        api_provider_config = api_utils.get_default_inference_api_provider_config(
+        model_name = api_utils.get_default_inference_model_for_user(
             context=self.context, user=self.user
         )
-        api_client = api_utils.get_openai_client_for_user(
-            context=self.context,
-            user=self.user,
-            api_provider_config=api_provider_config,
-            display_logger=self.display_logger,
+        system_prompt = CONTEXTUAL_RETRIEVAL_SYSTEM_PROMPT.format(
+            document_content=document_for_contextual_retrieval,
         )
-        model_options = {}
-        model_name = api_utils.get_default_inference_model_for_user(
-            context=self.context, user=self.user
+        user_prompts = [
+            CONTEXTUAL_RETRIEVAL_USER_PROMPT.format(chunk_content=chunk_content)
+            for chunk_content in chunk_contents
+        ]
+        cache_keys = [
+            get_context_summary_cache_key(model_name, system_prompt, user_prompt)
+            for user_prompt in user_prompts
+        ]
+
+        cache_store = get_context_summary_cache_store(self.settings)
+        summaries: Dict[str, str] = {}
+        if cache_store is not None:
+            try:
+                summaries = cache_store.get_summaries(cache_keys)
+            except Exception as e:
+                self.display_logger.warning(
+                    f"Failed to read the context summary cache: {e}"
+                )
+
+        # keyed by the cache key since the same chunk may appear more than once
+        missing: Dict[str, str] = {}
+        for cache_key, user_prompt in zip(cache_keys, user_prompts):
+            if cache_key not in summaries:
+                missing[cache_key] = user_prompt
+        self.display_logger.debug(
+            f"Context summaries: {len(chunk_contents) - len(missing)} cached, "
+            f"{len(missing)} to generate."
         )
-        try:
-            (context_summary, _) = api_utils.run_inference_call_direct(
+
+        if missing:
+            api_provider_config = api_utils.get_default_inference_api_provider_config(
+                context=self.context, user=self.user
+            )
+            api_client = api_utils.get_openai_client_for_user(
                 context=self.context,
                 user=self.user,
-                api_client=api_client,
-                api_provider_name=api_provider_config.api_provider,
-                model_name=model_name,
-                model_options=model_options,
-                system_prompt=CONTEXTUAL_RETRIEVAL_SYSTEM_PROMPT,
-                user_prompt=user_prompt,
-                need_json=True,
-                call_target="CONTEXTUAL RETRIEVAL",
-                response_pydantic_model=None,
+                api_provider_config=api_provider_config,
                 display_logger=self.display_logger,
             )
-        except Exception as e:
-            self.display_logger.error(f"Error adding context to chunk: {e}")
-            return chunk_content
-        return f"\n<context>\n{context_summary}\n</context>\n{chunk_content}"
+
+            def _generate_summary(user_prompt: str) -> Optional[str]:
+                try:
+                    (context_summary, _) = api_utils.run_inference_call_direct(
+                        context=self.context,
+                        user=self.user,
+                        api_client=api_client,
+                        api_provider_name=api_provider_config.api_provider,
+                        model_name=model_name,
+                        model_options={},
+                        system_prompt=system_prompt,
+                        user_prompt=user_prompt,
+                        need_json=True,
+                        call_target="CONTEXTUAL RETRIEVAL",
+                        response_pydantic_model=None,
+                        display_logger=self.display_logger,
+                    )
+                    return context_summary
+                except Exception as e:
+                    self.display_logger.error(f"Error adding context to chunk: {e}")
+                    return None
+
+            max_workers = max(
+                1, min(len(missing), self.settings.contextual_retrieval_max_workers)
+            )
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                new_summaries = list(executor.map(_generate_summary, missing.values()))
+            # the failed chunks are not cached so that they are retried next time
+            generated = {
+                cache_key: summary
+                for cache_key, summary in zip(missing.keys(), new_summaries)
+                if summary is not None
+            }
+            summaries.update(generated)
+            if cache_store is not None:
+                try:
+                    cache_store.save_summaries(generated)
+                    maybe_evict_context_summaries(self.settings)
+                except Exception as e:
+                    self.display_logger.warning(
+                        f"Failed to save the context summary cache: {e}"
+                    )
+
+        rtn_list: List[str] = []
+        for cache_key, chunk_content in zip(cache_keys, chunk_contents):
+            context_summary = summaries.get(cache_key)
+            if context_summary is None:
+                rtn_list.append(chunk_content)
+            else:
+                rtn_list.append(
+                    f"\n<context>\n{context_summary}\n</context>\n{chunk_content}"
+                )
+        return rtn_list
 
     def _find_parent_child_pairs(
         self, pos_map: Dict[str, int]
@@ -198,18 +276,19 @@ class Splitter:
 
     def _save2segmentstore(
         self,
-        segment_create: SegmentCreate,
-    ) -> SegmentInDB:
-        return self.segstore.create_segment(self.org, self.kb, segment_create)
+        segment_creates: List[SegmentCreate],
+    ) -> List[Segment]:
+        return self.segstore.create_segments(self.org, self.kb, segment_creates)
 
-    def _save2graphdb(self, segment_in_db: SegmentInDB) -> None:
-        graph_node_id = self.graphstore.create_segment_node(segment_in_db)
-        segment_in_db.graph_node_id = graph_node_id
+    def _save2graphdb(self, segments_in_db: List[SegmentInDB]) -> None:
+        graph_node_ids = self.graphstore.create_segment_nodes(segments_in_db)
+        for segment_in_db, graph_node_id in zip(segments_in_db, graph_node_ids):
+            segment_in_db.graph_node_id = graph_node_id
 
     def _update_doc_graph(self, doc_postion_map: Dict[str, int]) -> None:
         parent_child_pairs = self._find_parent_child_pairs(doc_postion_map)
-        for parent_id, child_id in parent_child_pairs:
-            self.graphstore.create_segments_relationship(parent_id, child_id)
+        if parent_child_pairs:
+            self.graphstore.create_segments_relationships(parent_child_pairs)
 
     def _split(self, doc: Document) -> ReturnCode:
         rtn_code = ReturnCode.SUCCESS
@@ -221,7 +300,9 @@ class Splitter:
 
         # since doc_uri may contain some useful information,
         # we need to add doc_uri at the beginning of the content
-        base_name = doc_uri.split("/")[-1]
+        # the timestamp of a scraped file changes on every scrape, remove it so that
+        # the same content gets the same segments and cached embeddings
+        base_name = file_utils.remove_filename_timestamp(doc_uri.split("/")[-1])
         base_name = ".".join(base_name.split(".")[:-1])
         doc_uri_unqoted = unquote(base_name).replace("_", " ").replace("-", " ")
         for ext in supported_file_extensions():
@@ -268,14 +349,14 @@ class Splitter:
                 )
         # end of getting the document content for contextual retrieval
 
-        for chunk in chunks:
-            if self.kb.enable_contextual_retrieval:
-                chunk_content = self._add_context_summary_to_chunk(
-                    chunk.content, document_for_contextual_retrieval
-                )
-            else:
-                chunk_content = chunk.content
+        chunk_contents = [chunk.content for chunk in chunks]
+        if self.kb.enable_contextual_retrieval:
+            chunk_contents = self._add_context_summary_to_chunks(
+                chunk_contents, document_for_contextual_retrieval
+            )
 
+        segment_creates: List[SegmentCreate] = []
+        for chunk, chunk_content in zip(chunks, chunk_contents):
             segmeng_create = SegmentCreate(
                 content=add_heading_to_content(
                     heading=f"{doc_uri_unqoted}@@{chunk.heading}", content=chunk_content
@@ -292,9 +373,7 @@ class Splitter:
                 created_timestamp_in_ms=epoch_time_ms,
                 label_tag=str(epoch_time_ms),
             )
-            segment_in_db = self._save2segmentstore(segmeng_create)
-            self._save2graphdb(segment_in_db)
-            doc_postion_map[chunk.position_in_doc] = segment_in_db.graph_node_id
+            segment_creates.append(segmeng_create)
 
         root_segment = SegmentCreate(
             content="The root segment",
@@ -311,7 +390,12 @@ class Splitter:
             label_tag=str(epoch_time_ms),
         )
         root_segment_in_db = SegmentInDB.from_segment_create(root_segment)
-        self._save2graphdb(root_segment_in_db)
+
+        # save the segments and their graph nodes with one write each
+        segments_in_db = self._save2segmentstore(segment_creates)
+        self._save2graphdb(segments_in_db + [root_segment_in_db])
+        for segment_in_db in segments_in_db:
+            doc_postion_map[segment_in_db.position_in_doc] = segment_in_db.graph_node_id
         doc_postion_map[ROOT_POSITION] = root_segment_in_db.graph_node_id
 
         self._update_doc_graph(doc_postion_map)
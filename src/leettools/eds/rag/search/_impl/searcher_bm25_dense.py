@@ -1,4 +1,5 @@
-from typing import Any, ClassVar, Dict, List
+import time
+from typing import Any, ClassVar, Dict, List, Optional
 
 import nltk
 from nltk import pos_tag
@@ -8,6 +9,7 @@ from nltk.tokenize import word_tokenize
 
 from leettools.common import exceptions
 from leettools.common.logging import logger
+from leettools.common.logging.event_logger import EventLogger
 from leettools.context_manager import Context
 from leettools.core.repo.vector_store import (
     VectorSearchResult,
@@ -21,6 +23,15 @@ from leettools.core.schemas.organization import Org
 from leettools.core.schemas.segment import SearchResultSegment
 from leettools.core.schemas.user import User
 from leettools.eds.rag.search.filter import Filter
+from leettools.eds.rag.search.fusion import FusionOptions, fuse_search_results
+from leettools.eds.rag.search.search_leg import (
+    LEG_DENSE,
+    LEG_KEYWORDS,
+    LEG_SPARSE,
+    SearchLeg,
+    get_search_executor,
+    report_search_legs,
+)
 from leettools.eds.rag.search.searcher import AbstractSearcher
 
 
@@ -75,6 +86,7 @@ class SearcherBM25Dense(AbstractSearcher):
         return "|".join(keywords)
 
     def __init__(self, context: Context) -> None:
+        self.settings = context.settings
         repo_manager = context.get_repo_manager()
         self.segmentstore = repo_manager.get_segment_store()
         self.dense_vectorstore = create_vector_store_dense(context)
@@ -113,104 +125,6 @@ class SearcherBM25Dense(AbstractSearcher):
         }
         return common_results
 
-    def _normalize_scores(
-        self, search_scores_dict: Dict[str, float], reverse=False
-    ) -> Dict[str, float]:
-        if search_scores_dict == {} or len(search_scores_dict) == 0:
-            return search_scores_dict
-
-        """Normalize dictionary scores to the range 0 to 1."""
-        search_scores = list(search_scores_dict.values())
-        min_score = min(search_scores)
-        max_score = max(search_scores)
-        range_score = max_score - min_score
-        if range_score == 0.0:
-            return {segment_uuid: 0.0 for segment_uuid in search_scores_dict.keys()}
-        if reverse:
-            return {
-                segment_uuid: (max_score - search_score) / range_score
-                for segment_uuid, search_score in search_scores_dict.items()
-            }
-        else:
-            return {
-                segment_uuid: (search_score - min_score) / range_score
-                for segment_uuid, search_score in search_scores_dict.items()
-            }
-
-    def _relative_score_fusion(
-        self,
-        dense_list: List[VectorSearchResult],
-        sparse_list: List[VectorSearchResult],
-        dense_weight=0.6,
-        sparse_weight=0.4,
-        default_score=0.0,
-    ) -> List[VectorSearchResult]:
-        """
-        Fuse two lists of VectorSearchResult using normalized weighted sum.
-
-        Args:
-        - search_result_list1 (list of VectorSearchResult): First list of search results.
-        - search_result_list2 (list of VectorSearchResult): Second list of search results.
-        - weight1 (float): Weight for the first list.
-        - weight2 (float): Weight for the second list.
-        - default_score (float): Default score to use if one segment is only in on of lists.
-
-        Returns:
-        - list of tuples: Fused list of VectorSearchResult.
-        """
-        # Create dictionaries from the lists
-        dense_dict = {result.segment_uuid: result.search_score for result in dense_list}
-        sparse_dict = {
-            result.segment_uuid: result.search_score for result in sparse_list
-        }
-
-        # Normalize scores for COSINE similarity
-        normalized_dict_dense = self._normalize_scores(dense_dict)
-        logger().debug("Normalized scores for dense vector")
-        for key, value in normalized_dict_dense.items():
-            logger().debug(f"{key}: {value}")
-
-        # Normalize scores for IP similarity
-        normalized_dict_sparse = self._normalize_scores(sparse_dict)
-        logger().debug("Normalized scores for sparse vector")
-        for key, value in normalized_dict_sparse.items():
-            logger().debug(f"{key}: {value}")
-
-        common_uuids = set(dense_dict.keys()) & set(sparse_dict.keys())
-        all_list = dense_list + sparse_list
-        fused_results: Dict[str, VectorSearchResult] = {}
-        for result in all_list:
-            if result.segment_uuid in fused_results.keys():
-                continue
-
-            if result.segment_uuid in common_uuids:
-                fused_results[result.segment_uuid] = VectorSearchResult(
-                    segment_uuid=result.segment_uuid,
-                    vector_type=VectorType.COMMON,
-                    search_score=(
-                        dense_weight
-                        * normalized_dict_dense.get(result.segment_uuid, default_score)
-                        + sparse_weight
-                        * normalized_dict_sparse.get(result.segment_uuid, default_score)
-                    ),
-                )
-            else:
-                fused_results[result.segment_uuid] = VectorSearchResult(
-                    segment_uuid=result.segment_uuid,
-                    vector_type=result.vector_type,
-                    search_score=(
-                        dense_weight
-                        * normalized_dict_dense.get(result.segment_uuid, default_score)
-                        + sparse_weight
-                        * normalized_dict_sparse.get(result.segment_uuid, default_score)
-                    ),
-                )
-
-        rtn_results: List[VectorSearchResult] = []
-        for result in fused_results.values():
-            rtn_results.append(result)
-        return rtn_results
-
     def execute_kb_search(
         self,
         org: Org,
@@ -222,32 +136,41 @@ class SearcherBM25Dense(AbstractSearcher):
         search_params: Dict[str, Any],
         query_meta: ChatQueryMetadata,
         filter: Filter = None,
+        display_logger: Optional[EventLogger] = None,
     ) -> List[SearchResultSegment]:
         logger().info(f"The filter is: {filter} for query {query}")
 
-        try:
-            results_from_dense_vector: List[VectorSearchResult] = (
-                self.dense_vectorstore.search_in_kb(
-                    org=org,
-                    kb=kb,
-                    user=user,
-                    query=rewritten_query,  # use rewritten query for dense search
-                    top_k=top_k,
-                    search_params=search_params,
-                    filter=filter,
-                )
+        # each leg may fetch more than top_k results for the fusion
+        fusion_options = FusionOptions.from_search_params(search_params)
+        fetch_k = fusion_options.get_fetch_k(top_k)
+
+        start_time = time.perf_counter()
+        executor = get_search_executor(self.settings)
+
+        def _dense_search() -> List[VectorSearchResult]:
+            return self.dense_vectorstore.search_in_kb(
+                org=org,
+                kb=kb,
+                user=user,
+                query=rewritten_query,  # use rewritten query for dense search
+                top_k=fetch_k,
+                search_params=search_params,
+                filter=filter,
             )
-            for result in results_from_dense_vector:
-                logger().debug(f"{result.segment_uuid}: {result.search_score}")
-        except Exception as e:
-            logger().error(f"Error in dense vector search: {e}")
-            results_from_dense_vector = []
 
-        logger().info(
-            f"Found {len(results_from_dense_vector)} from dense vector search."
+        # the dense leg includes the remote embedding call, so start it first and
+        # run the keyword extraction and the sparse leg while it is in flight
+        dense_leg = SearchLeg(
+            executor=executor,
+            name=LEG_DENSE,
+            func=_dense_search,
+            timeout=self.settings.SEARCH_DENSE_TIMEOUT_IN_SECONDS,
         )
+        legs = [dense_leg]
 
         logger().info(f"Extracting keywords from query...")
+        keyword_query = query
+        keyword_leg: Optional[SearchLeg] = None
         if (
             query_meta is not None
             and query_meta.keywords is not None
@@ -257,67 +180,100 @@ class SearcherBM25Dense(AbstractSearcher):
             logger().info(f"keyword_query from metadata: {keyword_query}")
         else:
             # we use original query instead of the rewritten query for keywords
-            keyword_query = self.extract_keywords(query)
-            logger().info(f"keyword_query from original query: {keyword_query}")
+            keyword_leg = SearchLeg(
+                executor=executor,
+                name=LEG_KEYWORDS,
+                func=lambda: self.extract_keywords(query),
+                timeout=self.settings.SEARCH_KEYWORD_TIMEOUT_IN_SECONDS,
+            )
+            legs.append(keyword_leg)
+
+        def _sparse_search() -> List[VectorSearchResult]:
+            # the sparse leg waits for the keywords on the search executor, so
+            # that all the legs are submitted before the caller waits for any
+            sparse_query = keyword_query
+            if keyword_leg is not None:
+                sparse_query = keyword_leg.result(default=query)
+                logger().info(f"keyword_query from original query: {sparse_query}")
+            return self.dense_vectorstore.search_in_kb(
+                org=org,
+                kb=kb,
+                user=user,
+                query=sparse_query,
+                top_k=fetch_k,
+                filter=filter,
+                full_text_search=True,
+                rebuild_full_text_index=True,
+            )
 
         logger().info(f"Performing BM25 search ...")
-        try:
-            results_from_sparse_vector: List[VectorSearchResult] = (
-                self.dense_vectorstore.search_in_kb(
-                    org=org,
-                    kb=kb,
-                    user=user,
-                    query=keyword_query,
-                    top_k=top_k,
-                    filter=filter,
-                    full_text_search=True,
-                    rebuild_full_text_index=True,
-                )
-            )
-            for result in results_from_sparse_vector:
-                logger().debug(f"{result.segment_uuid}: {result.search_score}")
-        except Exception as e:
-            logger().error(f"Error in sparse vector search: {e}")
-            results_from_sparse_vector = []
+        sparse_leg = SearchLeg(
+            executor=executor,
+            name=LEG_SPARSE,
+            func=_sparse_search,
+            timeout=self.settings.SEARCH_SPARSE_TIMEOUT_IN_SECONDS,
+        )
+        legs.append(sparse_leg)
+
+        results_from_dense_vector: List[VectorSearchResult] = dense_leg.result(
+            default=[]
+        )
+        for result in results_from_dense_vector:
+            logger().debug(f"{result.segment_uuid}: {result.search_score}")
+        logger().info(
+            f"Found {len(results_from_dense_vector)} from dense vector search."
+        )
+
+        results_from_sparse_vector: List[VectorSearchResult] = sparse_leg.result(
+            default=[]
+        )
+        for result in results_from_sparse_vector:
+            logger().debug(f"{result.segment_uuid}: {result.search_score}")
         logger().info(
             f"Found {len(results_from_sparse_vector)} from sparse vector search."
         )
 
-        results = self._relative_score_fusion(
+        report_search_legs(
+            legs=legs,
+            total_ms=(time.perf_counter() - start_time) * 1000,
+            display_logger=display_logger,
+        )
+
+        # sorted by the fused score, the higher the better, only fetch_k results
+        # are kept so that there is room for the stale results below
+        results = fuse_search_results(
             results_from_dense_vector,
             results_from_sparse_vector,
+            options=fusion_options,
+            limit=fetch_k,
         )
 
-        # the high score, the better the result
-        results.sort(key=lambda x: x.search_score, reverse=True)
-
         logger().debug(f"Fused search results for query: {query}")
         for result in results:
             logger().debug(result)
 
-        # return the top k results
+        # return the top k results, hydrated with one query to the segment store
+        segments = self.segmentstore.get_segments_by_uuids(
+            org, kb, [result.segment_uuid for result in results]
+        )
         rtn_list = []
-        for result in results:
-            segment = self.segmentstore.get_segment_by_uuid(
-                org, kb, result.segment_uuid
-            )
+        stale_uuids = []
+        for result, segment in zip(results, segments):
             if segment is None:
                 logger().warning(
                     f"Hybrid search returned segment {result.segment_uuid} not found in "
                     "segment store, maybe from a deleted document."
                 )
-                self.sparse_vectorstore.delete_segment_vector(
-                    org, kb, result.segment_uuid
-                )
-                self.dense_vectorstore.delete_segment_vector(
-                    org, kb, result.segment_uuid
-                )
+                stale_uuids.append(result.segment_uuid)
+                continue
+            if len(rtn_list) >= top_k:
                 continue
             rtn_list.append(
                 SearchResultSegment.from_segment(
                     segment, result.search_score, result.vector_type
                 )
             )
-            if len(rtn_list) >= top_k:
-                break
+        if stale_uuids:
+            # the BM25 index is built on the dense vector table
+            self.dense_vectorstore.delete_segment_vectors(org, kb, stale_uuids)
         return rtn_list
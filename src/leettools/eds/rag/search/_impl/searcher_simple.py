@@ -1,6 +1,7 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from leettools.common.logging import logger
+from leettools.common.logging.event_logger import EventLogger
 from leettools.context_manager import Context
 from leettools.core.repo.vector_store import (
     VectorSearchResult,
@@ -32,6 +33,7 @@ class SearcherSimple(AbstractSearcher):
         search_params: Dict[str, Any],
         query_meta: ChatQueryMetadata,
         filter: Filter = None,
+        display_logger: Optional[EventLogger] = None,
     ) -> List[SearchResultSegment]:
         """
         Using vector search to get related segments in the vector DB.
@@ -46,6 +48,7 @@ class SearcherSimple(AbstractSearcher):
         - search_params: Additional search parameters.
         - query_meta: The query metadata.
         - filter: The filter for the query Defaults to None.
+        - display_logger: The logger for the query, not used by this searcher.
 
         Returns:
         - List[SearchResultSegment]: The list of search result segments.
@@ -63,21 +66,22 @@ class SearcherSimple(AbstractSearcher):
         logger().debug(
             f"Found segments through dense vector search in KB: {len(results)}"
         )
+        segments = self.segmentstore.get_segments_by_uuids(
+            org, kb, [result.segment_uuid for result in results]
+        )
         rtn_list = []
-        for result in results:
-            segment = self.segmentstore.get_segment_by_uuid(
-                org, kb, result.segment_uuid
-            )
+        stale_uuids = []
+        for result, segment in zip(results, segments):
             if segment is None:
                 logger().warning(
                     f"Simple search returned segment {result.segment_uuid} not found in "
                     "segment store, maybe from a deleted document."
                 )
-                self.dense_vectorstore.delete_segment_vector(
-                    org, kb, result.segment_uuid
-                )
+                stale_uuids.append(result.segment_uuid)
                 continue
             rtn_list.append(
                 SearchResultSegment.from_segment(segment, result.search_score)
             )
+        if stale_uuids:
+            self.dense_vectorstore.delete_segment_vectors(org, kb, stale_uuids)
         return rtn_list
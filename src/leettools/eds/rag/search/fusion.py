@@ -0,0 +1,236 @@
+import math
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from leettools.common.logging import logger
+from leettools.common.logging.event_logger import EventLogger
+from leettools.common.utils import config_utils
+from leettools.core.repo.vector_store import VectorSearchResult, VectorType
+from leettools.core.strategy.schemas.strategy_conf import (
+    SEARCH_OPTION_DENSE_WEIGHT,
+    SEARCH_OPTION_FUSION_METHOD,
+    SEARCH_OPTION_OVERFETCH_FACTOR,
+    SEARCH_OPTION_RRF_K,
+    SEARCH_OPTION_SPARSE_WEIGHT,
+)
+
+FUSION_MIN_MAX = "min_max"
+FUSION_Z_SCORE = "z_score"
+FUSION_RRF = "rrf"
+
+# the key in the search_params passed to the searchers for the fusion options
+SEARCH_PARAM_FUSION_OPTIONS = "fusion_options"
+
+
+class FusionOptions(BaseModel):
+    """How to fuse the results of the dense and the sparse search legs."""
+
+    method: str = Field(
+        FUSION_MIN_MAX,
+        description=(
+            "The fusion method: min_max or z_score for the weighted sum of the "
+            "normalized scores, rrf for the reciprocal rank fusion."
+        ),
+    )
+    dense_weight: float = Field(0.6, description="The weight of the dense leg.")
+    sparse_weight: float = Field(0.4, description="The weight of the sparse leg.")
+    rrf_k: int = Field(60, description="The rank offset of the reciprocal rank fusion.")
+    overfetch_factor: float = Field(
+        1.0,
+        description=(
+            "Each leg returns top_k * overfetch_factor results, so that results "
+            "ranked low by one leg can still be lifted by the other."
+        ),
+    )
+
+    @classmethod
+    def from_strategy_options(
+        cls,
+        options: Optional[Dict[str, Any]],
+        display_logger: Optional[EventLogger] = None,
+    ) -> "FusionOptions":
+        """
+        Read the fusion options from the options of the strategy search section.
+
+        Args:
+        - options: The strategy options of the search section, may be None.
+        - display_logger: The logger to display the warning messages.
+
+        Returns:
+        - The fusion options, with the default values for the missing options.
+        """
+        default = cls()
+        if options is None:
+            return default
+        method = config_utils.get_str_option_value(
+            options=options,
+            option_name=SEARCH_OPTION_FUSION_METHOD,
+            default_value=default.method,
+            display_logger=display_logger,
+        ).lower()
+        if method not in (FUSION_MIN_MAX, FUSION_Z_SCORE, FUSION_RRF):
+            if display_logger is None:
+                display_logger = logger()
+            display_logger.warning(
+                f"Unknown fusion method {method}, using {default.method}."
+            )
+            method = default.method
+        return cls(
+            method=method,
+            dense_weight=config_utils.get_float_option_value(
+                options=options,
+                option_name=SEARCH_OPTION_DENSE_WEIGHT,
+                default_value=default.dense_weight,
+                display_logger=display_logger,
+            ),
+            sparse_weight=config_utils.get_float_option_value(
+                options=options,
+                option_name=SEARCH_OPTION_SPARSE_WEIGHT,
+                default_value=default.sparse_weight,
+                display_logger=display_logger,
+            ),
+            rrf_k=config_utils.get_int_option_value(
+                options=options,
+                option_name=SEARCH_OPTION_RRF_K,
+                default_value=default.rrf_k,
+                display_logger=display_logger,
+            ),
+            overfetch_factor=config_utils.get_float_option_value(
+                options=options,
+                option_name=SEARCH_OPTION_OVERFETCH_FACTOR,
+                default_value=default.overfetch_factor,
+                display_logger=display_logger,
+            ),
+        )
+
+    @classmethod
+    def from_search_params(
+        cls, search_params: Optional[Dict[str, Any]]
+    ) -> "FusionOptions":
+        """Get the fusion options passed to the searcher in the search_params."""
+        if search_params is None:
+            return cls()
+        options = search_params.get(SEARCH_PARAM_FUSION_OPTIONS, None)
+        if options is None:
+            return cls()
+        if isinstance(options, FusionOptions):
+            return options
+        return cls.model_validate(options)
+
+    def get_fetch_k(self, top_k: int) -> int:
+        """The number of results to fetch from each leg for the top_k results."""
+        return max(top_k, int(math.ceil(top_k * self.overfetch_factor)))
+
+
+def _normalize(scores: np.ndarray, method: str) -> np.ndarray:
+    if len(scores) == 0:
+        return scores
+    if method == FUSION_Z_SCORE:
+        std = scores.std()
+        if std == 0.0:
+            return np.zeros_like(scores)
+        return (scores - scores.mean()) / std
+    min_score = scores.min()
+    range_score = scores.max() - min_score
+    if range_score == 0.0:
+        return np.zeros_like(scores)
+    return (scores - min_score) / range_score
+
+
+def _reciprocal_ranks(scores: np.ndarray, rrf_k: int) -> np.ndarray:
+    # rank 1 for the highest score, the ties keep the order of the leg
+    order = np.argsort(-scores, kind="stable")
+    ranks = np.empty(len(scores), dtype=np.float64)
+    ranks[order] = np.arange(1, len(scores) + 1)
+    return 1.0 / (rrf_k + ranks)
+
+
+def fuse_search_results(
+    dense_list: List[VectorSearchResult],
+    sparse_list: List[VectorSearchResult],
+    options: Optional[FusionOptions] = None,
+    limit: Optional[int] = None,
+) -> List[VectorSearchResult]:
+    """
+    Fuse the results of the dense and the sparse search legs.
+
+    The scores of each leg are normalized as arrays (min-max or z-score) and
+    summed with the leg weights, or the reciprocal ranks are summed for RRF. A
+    result only found by one leg gets the lowest normalized score of the other
+    leg, or nothing from it for RRF. The results found by both legs have the
+    COMMON vector type.
+
+    Args:
+    - dense_list: The results of the dense leg.
+    - sparse_list: The results of the sparse leg.
+    - options: The fusion options, the default options if None.
+    - limit: The max number of results to return, all results if None.
+
+    Returns:
+    - The fused results, sorted by the fused score in descending order.
+    """
+    if options is None:
+        options = FusionOptions()
+
+    positions: Dict[str, int] = {}
+    uuids: List[str] = []
+    vector_types: List[VectorType] = []
+    for result in dense_list + sparse_list:
+        if result.segment_uuid not in positions:
+            positions[result.segment_uuid] = len(uuids)
+            uuids.append(result.segment_uuid)
+            vector_types.append(result.vector_type)
+    total = len(uuids)
+    if total == 0:
+        return []
+
+    def _leg_arrays(results: List[VectorSearchResult]):
+        index = np.fromiter(
+            (positions[r.segment_uuid] for r in results),
+            dtype=np.int64,
+            count=len(results),
+        )
+        scores = np.fromiter(
+            (r.search_score for r in results), dtype=np.float64, count=len(results)
+        )
+        # keep the first score of a segment listed twice in the same leg
+        index, first = np.unique(index, return_index=True)
+        return index, scores[first]
+
+    dense_index, dense_scores = _leg_arrays(dense_list)
+    sparse_index, sparse_scores = _leg_arrays(sparse_list)
+
+    fused = np.zeros(total, dtype=np.float64)
+    for index, scores, weight in (
+        (dense_index, dense_scores, options.dense_weight),
+        (sparse_index, sparse_scores, options.sparse_weight),
+    ):
+        if len(index) == 0:
+            continue
+        if options.method == FUSION_RRF:
+            fused[index] += weight * _reciprocal_ranks(scores, options.rrf_k)
+        else:
+            normalized = _normalize(scores, options.method)
+            leg_scores = np.full(total, normalized.min(), dtype=np.float64)
+            leg_scores[index] = normalized
+            fused += weight * leg_scores
+
+    in_both = np.zeros(total, dtype=bool)
+    in_both[np.intersect1d(dense_index, sparse_index, assume_unique=True)] = True
+
+    if limit is not None and limit < total:
+        top = np.argpartition(-fused, limit - 1)[:limit]
+        top = top[np.argsort(-fused[top], kind="stable")]
+    else:
+        top = np.argsort(-fused, kind="stable")
+
+    return [
+        VectorSearchResult(
+            segment_uuid=uuids[i],
+            search_score=float(fused[i]),
+            vector_type=VectorType.COMMON if in_both[i] else vector_types[i],
+        )
+        for i in top.tolist()
+    ]
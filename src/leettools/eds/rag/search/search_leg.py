@@ -0,0 +1,119 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, List, Optional
+
+from leettools.common.logging import logger
+from leettools.common.logging.event_logger import EventLogger
+from leettools.settings import SystemSettings
+
+LEG_DENSE = "dense"
+LEG_SPARSE = "sparse"
+LEG_KEYWORDS = "keywords"
+
+_search_executor: Optional[ThreadPoolExecutor] = None
+_search_executor_lock = threading.Lock()
+
+
+def get_search_executor(settings: SystemSettings) -> ThreadPoolExecutor:
+    """
+    Get the executor shared by all searchers to run the search legs.
+
+    The executor is created on first use with SEARCH_EXECUTOR_MAX_WORKERS threads.
+    """
+    global _search_executor
+    if _search_executor is None:
+        with _search_executor_lock:
+            if _search_executor is None:
+                _search_executor = ThreadPoolExecutor(
+                    max_workers=settings.SEARCH_EXECUTOR_MAX_WORKERS,
+                    thread_name_prefix="search-leg",
+                )
+    return _search_executor
+
+
+class SearchLeg:
+    """
+    One independent part of a search, such as the dense vector search or the
+    keyword extraction, running on the shared search executor.
+
+    The timeout is counted from the submission of the leg. A leg that times out or
+    fails returns the default value so that the search can continue with the results
+    from the other legs. A timed-out leg keeps running in the background and its
+    result is discarded.
+    """
+
+    def __init__(
+        self,
+        executor: ThreadPoolExecutor,
+        name: str,
+        func: Callable[[], Any],
+        timeout: float,
+    ) -> None:
+        self.name = name
+        self.timeout = timeout
+        self.latency_ms: Optional[float] = None
+        self.status = "running"
+        self._submitted_at = time.perf_counter()
+        self._future: Future = executor.submit(self._run, func)
+
+    def _run(self, func: Callable[[], Any]) -> Any:
+        start = time.perf_counter()
+        try:
+            return func()
+        finally:
+            self.latency_ms = (time.perf_counter() - start) * 1000
+
+    def result(self, default: Any) -> Any:
+        """
+        Wait for the result of the leg.
+
+        Args:
+        - default: The value to return if the leg times out or fails.
+
+        Returns:
+        - The result of the leg, or the default value.
+        """
+        remaining = self.timeout - (time.perf_counter() - self._submitted_at)
+        try:
+            rtn = self._future.result(timeout=max(remaining, 0.0))
+            self.status = "ok"
+            return rtn
+        except FutureTimeoutError:
+            self.status = "timeout"
+            logger().warning(
+                f"Search leg {self.name} timed out after {self.timeout} seconds."
+            )
+        except Exception as e:
+            self.status = "failed"
+            logger().error(f"Error in search leg {self.name}: {e}")
+        return default
+
+    def report(self) -> str:
+        if self.status == "timeout":
+            return f"{self.name}=timeout({self.timeout * 1000:.0f}ms)"
+        latency = f"{self.latency_ms:.0f}ms" if self.latency_ms is not None else "n/a"
+        if self.status == "failed":
+            return f"{self.name}=failed({latency})"
+        return f"{self.name}={latency}"
+
+
+def report_search_legs(
+    legs: List[SearchLeg],
+    total_ms: float,
+    display_logger: Optional[EventLogger] = None,
+) -> None:
+    """
+    Report the latency of each search leg and the total search time, to the query
+    log if a display logger is provided.
+
+    Args:
+    - legs: The search legs that have been waited for.
+    - total_ms: The wall time of the search in milliseconds.
+    - display_logger: The logger for the query.
+    """
+    if display_logger is None:
+        display_logger = logger()
+    leg_reports = " ".join(leg.report() for leg in legs)
+    display_logger.info(f"[Search] Latency: {leg_reports} total={total_ms:.0f}ms")
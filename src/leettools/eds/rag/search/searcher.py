@@ -35,9 +35,13 @@ class AbstractSearcher(ABC):
         search_params: Dict[str, Any],
         query_meta: ChatQueryMetadata,
         filter: Filter = None,
+        display_logger: Optional[EventLogger] = None,
     ) -> List[SearchResultSegment]:
         """
         Search for segments in the knowledge base.
+
+        The display_logger is the logger for the query, used to report the progress
+        and the latency of the search.
         """
         pass
 
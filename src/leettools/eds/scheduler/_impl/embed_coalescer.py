@@ -0,0 +1,208 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from leettools.common.logging import logger
+from leettools.common.logging.event_logger import EventLogger
+from leettools.core.consts.return_code import ReturnCode
+from leettools.core.schemas.segment import Segment
+from leettools.eds.pipeline.embed.segment_embedder import AbstractSegmentEmbedder
+
+_BatchKey = Tuple[str, str]
+
+
+class _PendingBatch:
+    def __init__(self, embedder: AbstractSegmentEmbedder) -> None:
+        self.embedder = embedder
+        # the segment lists of all the submissions, in the order they are added
+        self.parts: List[List[Segment]] = []
+        self.segment_count = 0
+        self.submission_count = 0
+        self.results: List[ReturnCode] = []
+        self.closed = False
+        self.done = threading.Event()
+
+
+class EmbedJob:
+    """
+    An embed job registered with the coalescer, see EmbedCoalescer.job.
+    """
+
+    def __init__(self, coalescer: "EmbedCoalescer", key: _BatchKey) -> None:
+        self.coalescer = coalescer
+        self.key = key
+        self.submitted = False
+
+    def embed_segment_lists(
+        self,
+        embedder: AbstractSegmentEmbedder,
+        segment_lists: List[List[Segment]],
+        display_logger: Optional[EventLogger] = None,
+    ) -> List[ReturnCode]:
+        """
+        Embed the segment lists together with the segments of the other embed
+        jobs of the same knowledge base.
+
+        Args:
+        - embedder: The embedder for the knowledge base, used if this submission
+            starts a new batch.
+        - segment_lists: The segment lists to embed, e.g. one per document. The
+            caller should keep their total under the batch size.
+        - display_logger: The logger of the job.
+
+        Returns:
+        - The return code of each segment list.
+        """
+        return self.coalescer._submit(self, embedder, segment_lists, display_logger)
+
+
+class EmbedCoalescer:
+    """
+    Combine the segments submitted by the embed jobs of the same KB into one call
+    to the embedder, so that many small documents are embedded and saved in one
+    batch instead of one API call and one insert per document.
+
+    An embed job registers with job() before it reads its segments. The first
+    submission of a batch waits while other registered jobs of the same KB have
+    not submitted their segments yet, until the batch has batch_size segments or
+    max_wait_in_seconds passed, then embeds the batch in its thread. A job that
+    runs alone in its KB does not wait. The other submissions wait for the result
+    of the batch.
+    """
+
+    def __init__(self, batch_size: int, max_wait_in_seconds: float) -> None:
+        self.batch_size = max(1, batch_size)
+        self.max_wait_in_seconds = max_wait_in_seconds
+        self._condition = threading.Condition()
+        self._open_batches: Dict[_BatchKey, _PendingBatch] = {}
+        # the number of registered jobs per KB that have not submitted yet
+        self._preparing: Dict[_BatchKey, int] = {}
+
+    @contextmanager
+    def job(self, org_id: str, kb_id: str) -> Iterator[EmbedJob]:
+        """
+        Register an embed job of the knowledge base for the duration of the
+        context, so that the open batch of the KB waits for its segments.
+
+        Args:
+        - org_id: The id of the organization.
+        - kb_id: The id of the knowledge base.
+
+        Returns:
+        - The job to submit the segments with.
+        """
+        key = (org_id, kb_id)
+        with self._condition:
+            self._preparing[key] = self._preparing.get(key, 0) + 1
+        embed_job = EmbedJob(self, key)
+        try:
+            yield embed_job
+        finally:
+            if not embed_job.submitted:
+                with self._condition:
+                    self._finish_preparing(key)
+
+    def _finish_preparing(self, key: _BatchKey) -> None:
+        # must be called with the lock held
+        self._preparing[key] -= 1
+        if self._preparing[key] == 0:
+            del self._preparing[key]
+        self._condition.notify_all()
+
+    def _close(self, key: _BatchKey, batch: _PendingBatch) -> None:
+        # must be called with the lock held
+        if self._open_batches.get(key) is batch:
+            del self._open_batches[key]
+        batch.closed = True
+        self._condition.notify_all()
+
+    def _submit(
+        self,
+        embed_job: EmbedJob,
+        embedder: AbstractSegmentEmbedder,
+        segment_lists: List[List[Segment]],
+        display_logger: Optional[EventLogger],
+    ) -> List[ReturnCode]:
+        if display_logger is None:
+            display_logger = logger()
+        key = embed_job.key
+        segment_count = sum(len(segments) for segments in segment_lists)
+        with self._condition:
+            if not embed_job.submitted:
+                embed_job.submitted = True
+                self._finish_preparing(key)
+            if segment_count == 0:
+                return [ReturnCode.SUCCESS] * len(segment_lists)
+
+            batch = self._open_batches.get(key)
+            if (
+                batch is not None
+                and batch.segment_count + segment_count > self.batch_size
+            ):
+                self._close(key, batch)
+                batch = None
+            is_leader = batch is None
+            if is_leader:
+                batch = _PendingBatch(embedder)
+                self._open_batches[key] = batch
+            start = len(batch.parts)
+            batch.parts.extend(segment_lists)
+            batch.segment_count += segment_count
+            batch.submission_count += 1
+            if batch.segment_count >= self.batch_size:
+                self._close(key, batch)
+        end = start + len(segment_lists)
+
+        if not is_leader:
+            batch.done.wait()
+            display_logger.info(
+                f"Embedded {segment_count} segments in a batch of "
+                f"{batch.segment_count} segments from {batch.submission_count} "
+                "submissions."
+            )
+            return batch.results[start:end]
+
+        try:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: batch.closed or self._preparing.get(key, 0) == 0,
+                    timeout=self.max_wait_in_seconds,
+                )
+                self._close(key, batch)
+            self._run_batch(batch, display_logger)
+        finally:
+            if len(batch.results) != len(batch.parts):
+                batch.results = [ReturnCode.FAILURE] * len(batch.parts)
+            batch.done.set()
+        return batch.results[start:end]
+
+    def _run_batch(self, batch: _PendingBatch, display_logger: EventLogger) -> None:
+        start = time.perf_counter()
+        all_segments = [segment for part in batch.parts for segment in part]
+        rtn_code = batch.embedder.embed_segment_list(
+            segments=all_segments, display_logger=display_logger
+        )
+        if rtn_code == ReturnCode.SUCCESS or len(batch.parts) == 1:
+            batch.results = [rtn_code] * len(batch.parts)
+        else:
+            # embed the parts one by one so that a bad segment only fails its part
+            display_logger.warning(
+                f"Failed to embed a batch of {len(batch.parts)} segment lists: "
+                f"{rtn_code}. Retrying the segment lists separately."
+            )
+            batch.results = [
+                (
+                    batch.embedder.embed_segment_list(
+                        segments=part, display_logger=display_logger
+                    )
+                    if part
+                    else ReturnCode.SUCCESS
+                )
+                for part in batch.parts
+            ]
+        display_logger.debug(
+            f"Embedded a batch of {batch.segment_count} segments from "
+            f"{batch.submission_count} submissions in "
+            f"{(time.perf_counter() - start) * 1000:.0f}ms."
+        )
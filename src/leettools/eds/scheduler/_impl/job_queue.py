@@ -0,0 +1,263 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from leettools.eds.scheduler.schemas.job import Job
+from leettools.eds.scheduler.schemas.program import ProgramType
+from leettools.eds.scheduler.schemas.queue_stats import JobClassStats, JobQueueStats
+
+# Jobs of the later stages run first in a KB, so that the docsources already
+# being processed finish before new ones are started.
+JOB_PRIORITY: Dict[ProgramType, int] = {
+    ProgramType.EMBED: 0,
+    ProgramType.SPLIT: 1,
+    ProgramType.CONVERT: 2,
+    ProgramType.CONNECTOR: 3,
+}
+
+# The share of a KB used by a job, the heavy conversion jobs count more.
+JOB_COST: Dict[ProgramType, float] = {
+    ProgramType.EMBED: 1.0,
+    ProgramType.SPLIT: 1.0,
+    ProgramType.CONVERT: 4.0,
+    ProgramType.CONNECTOR: 2.0,
+}
+
+# The share given to an org in each round, divided among its KBs with jobs.
+DEFAULT_ORG_QUANTUM = 4.0
+
+_FlowKey = Tuple[str, str]
+
+
+class _Flow:
+    def __init__(self) -> None:
+        # the items are (priority, sequence, enqueued_at, job)
+        self.heap: List[Tuple[int, int, float, Job]] = []
+        self.deficit = 0.0
+
+
+def _get_flow_key(job: Job) -> _FlowKey:
+    spec = job.program_spec.real_program_spec
+    return (spec.org_id, spec.kb_id)
+
+
+def _get_program_type(job: Job) -> ProgramType:
+    return job.program_spec.program_type
+
+
+class JobQueue:
+    """
+    The job queue of the scheduler, shared fairly between the KBs.
+
+    The jobs are grouped into one flow per KB and the flows are served with
+    deficit round robin: in each round an org gets DEFAULT_ORG_QUANTUM divided
+    among its KBs with waiting jobs, and a KB can run a job when its accumulated
+    share covers the JOB_COST of the job. In a KB, the jobs are ordered by
+    JOB_PRIORITY and then by their arrival.
+
+    A None put in the queue is returned before the jobs, it is used to stop the
+    workers.
+    """
+
+    def __init__(self, org_quantum: float = DEFAULT_ORG_QUANTUM) -> None:
+        self.org_quantum = org_quantum
+        self._condition = threading.Condition()
+        self._flows: Dict[_FlowKey, _Flow] = {}
+        self._active: Deque[_FlowKey] = deque()
+        self._active_per_org: Dict[str, int] = {}
+        self._turn_started = False
+        self._sequence = itertools.count()
+        self._stop_signals = 0
+        self._size = 0
+
+        self._depth: Dict[ProgramType, int] = {}
+        self._dequeued: Dict[ProgramType, int] = {}
+        self._total_wait: Dict[ProgramType, float] = {}
+        self._max_wait: Dict[ProgramType, float] = {}
+
+    def put(self, job: Optional[Job]) -> None:
+        with self._condition:
+            if job is None:
+                self._stop_signals += 1
+                self._condition.notify()
+                return
+            key = _get_flow_key(job)
+            flow = self._flows.get(key)
+            if flow is None:
+                flow = _Flow()
+                self._flows[key] = flow
+            if len(flow.heap) == 0:
+                self._active.append(key)
+                self._active_per_org[key[0]] = self._active_per_org.get(key[0], 0) + 1
+            program_type = _get_program_type(job)
+            heapq.heappush(
+                flow.heap,
+                (
+                    JOB_PRIORITY.get(program_type, len(JOB_PRIORITY)),
+                    next(self._sequence),
+                    time.monotonic(),
+                    job,
+                ),
+            )
+            self._size += 1
+            self._depth[program_type] = self._depth.get(program_type, 0) + 1
+            self._condition.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Job]:
+        """
+        Get the next job, blocking until one is available.
+
+        Args:
+        - timeout: The max seconds to wait, wait forever if None.
+
+        Returns:
+        - The next job, or None if a None was put in the queue.
+
+        Raises:
+        - TimeoutError: If no job is available before the timeout.
+        """
+        with self._condition:
+            if not self._condition.wait_for(
+                lambda: self._stop_signals > 0 or self._size > 0, timeout=timeout
+            ):
+                raise TimeoutError("No job in the queue.")
+            if self._stop_signals > 0:
+                self._stop_signals -= 1
+                return None
+            return self._next_job()
+
+    def _deactivate(self, key: _FlowKey) -> None:
+        self._active.popleft()
+        self._active_per_org[key[0]] -= 1
+        if self._active_per_org[key[0]] == 0:
+            del self._active_per_org[key[0]]
+        del self._flows[key]
+        self._turn_started = False
+
+    def _remove_flow(self, key: _FlowKey) -> None:
+        # the flow may not be the one whose turn it is
+        if self._active[0] == key:
+            self._deactivate(key)
+            return
+        self._active.remove(key)
+        self._active_per_org[key[0]] -= 1
+        if self._active_per_org[key[0]] == 0:
+            del self._active_per_org[key[0]]
+        del self._flows[key]
+
+    def _next_job(self) -> Job:
+        while True:
+            key = self._active[0]
+            flow = self._flows[key]
+            if not self._turn_started:
+                flow.deficit += self.org_quantum / self._active_per_org[key[0]]
+                self._turn_started = True
+            _, _, enqueued_at, job = flow.heap[0]
+            program_type = _get_program_type(job)
+            cost = JOB_COST.get(program_type, 1.0)
+            if flow.deficit < cost:
+                # the KB has used its share in this round
+                self._active.rotate(-1)
+                self._turn_started = False
+                continue
+
+            heapq.heappop(flow.heap)
+            flow.deficit -= cost
+            if len(flow.heap) == 0:
+                self._deactivate(key)
+            self._record_dequeue(program_type, enqueued_at)
+            return job
+
+    def _record_dequeue(self, program_type: ProgramType, enqueued_at: float) -> None:
+        wait = time.monotonic() - enqueued_at
+        self._size -= 1
+        self._depth[program_type] -= 1
+        self._dequeued[program_type] = self._dequeued.get(program_type, 0) + 1
+        self._total_wait[program_type] = self._total_wait.get(program_type, 0.0) + wait
+        self._max_wait[program_type] = max(self._max_wait.get(program_type, 0.0), wait)
+
+    def get_more_like(self, job: Job, max_count: int) -> List[Job]:
+        """
+        Take the waiting jobs of the same KB and the same program type as the job
+        without blocking, so that they can run together with it, e.g. to embed the
+        segments of several small documents in one batch.
+
+        The jobs taken are charged to the share of the KB, so the KB waits longer
+        for its next turn and the other KBs are not starved.
+
+        Args:
+        - job: The job just returned by get.
+        - max_count: The max number of jobs to take.
+
+        Returns:
+        - The jobs taken in their order in the queue, may be empty.
+        """
+        key = _get_flow_key(job)
+        program_type = _get_program_type(job)
+        jobs: List[Job] = []
+        with self._condition:
+            flow = self._flows.get(key)
+            while flow is not None and len(jobs) < max_count and len(flow.heap) > 0:
+                _, _, enqueued_at, next_job = flow.heap[0]
+                if _get_program_type(next_job) != program_type:
+                    break
+                heapq.heappop(flow.heap)
+                flow.deficit -= JOB_COST.get(program_type, 1.0)
+                self._record_dequeue(program_type, enqueued_at)
+                jobs.append(next_job)
+            if flow is not None and len(flow.heap) == 0:
+                self._remove_flow(key)
+        return jobs
+
+    def clear(self) -> List[Job]:
+        """Remove all the jobs and the stop signals, return the removed jobs."""
+        with self._condition:
+            jobs = [item[3] for flow in self._flows.values() for item in flow.heap]
+            self._flows = {}
+            self._active = deque()
+            self._active_per_org = {}
+            self._turn_started = False
+            self._stop_signals = 0
+            self._size = 0
+            self._depth = {}
+            return jobs
+
+    def qsize(self) -> int:
+        with self._condition:
+            return self._size
+
+    def get_stats(self) -> JobQueueStats:
+        with self._condition:
+            now = time.monotonic()
+            oldest: Dict[ProgramType, float] = {}
+            for flow in self._flows.values():
+                for _, _, enqueued_at, job in flow.heap:
+                    program_type = _get_program_type(job)
+                    oldest[program_type] = max(
+                        oldest.get(program_type, 0.0), now - enqueued_at
+                    )
+            job_classes: Dict[str, JobClassStats] = {}
+            for program_type in ProgramType:
+                dequeued = self._dequeued.get(program_type, 0)
+                depth = self._depth.get(program_type, 0)
+                if dequeued == 0 and depth == 0:
+                    continue
+                job_classes[program_type.value] = JobClassStats(
+                    depth=depth,
+                    oldest_wait_in_seconds=oldest.get(program_type, 0.0),
+                    dequeued_count=dequeued,
+                    avg_wait_in_seconds=(
+                        self._total_wait.get(program_type, 0.0) / dequeued
+                        if dequeued > 0
+                        else 0.0
+                    ),
+                    max_wait_in_seconds=self._max_wait.get(program_type, 0.0),
+                )
+            return JobQueueStats(
+                depth=self._size,
+                active_flow_count=len(self._active),
+                job_classes=job_classes,
+            )
@@ -1,6 +1,9 @@
+import os
+import socket
 import threading
 import time
 import traceback
+import uuid
 from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import timedelta
 from queue import Queue
@@ -9,25 +12,42 @@ from typing import Dict, List, Optional, Union
 import leettools.common.exceptions as exceptions
 from leettools.common.logging import get_logger
 from leettools.common.utils import time_utils
+from leettools.common.utils.rate_limiter import TokenBucket
 from leettools.context_manager import Context
+from leettools.core.repo.change_feed import ChangeFeed
 from leettools.core.schemas.docsource import DocSource
 from leettools.core.schemas.knowledgebase import KnowledgeBase
 from leettools.core.schemas.organization import Org
+from leettools.eds.scheduler._impl.job_queue import JobQueue
 from leettools.eds.scheduler._impl.task_runner_eds import TaskRunnerEDS
 from leettools.eds.scheduler._impl.task_scanner_kb import TaskScannerKB
 from leettools.eds.scheduler.scheduler import AbstractScheduler
 from leettools.eds.scheduler.schemas.job import Job, JobCreate
 from leettools.eds.scheduler.schemas.job_status import JobStatus
+from leettools.eds.scheduler.schemas.program import ProgramType
+from leettools.eds.scheduler.schemas.queue_stats import JobQueueStats
 from leettools.eds.scheduler.schemas.scheduler_status import SchedulerStatus
 from leettools.eds.scheduler.schemas.task import Task, TaskStatus
 
+# the jobs of the program types without their own pool run in this pool
+_DEFAULT_POOL = ProgramType.SPLIT
+
 
 class SchedulerSimple(AbstractScheduler):
     def __init__(
         self,
         context: Context,
-        num_of_workers: int = 4,
+        pool_sizes: Optional[Dict[ProgramType, int]] = None,
     ):
+        """
+        The jobs of each program type run in their own worker pool, so that a burst
+        of slow jobs of one type does not hold up the jobs of the other types.
+
+        Args:
+        - context: The context object.
+        - pool_sizes: The number of workers per program type, read from the
+            settings if not specified.
+        """
         self.logger = get_logger(name="scheduler")
         self.logger.info("Initializing the simple scheduler.")
 
@@ -38,6 +58,7 @@ class SchedulerSimple(AbstractScheduler):
         self.jobstore = self.task_manager.get_jobstore()
 
         self.task_scanner = TaskScannerKB(context)
+        self.change_feed = ChangeFeed()
         self.target_org = None
         self.target_kb = None
         self.target_docsources = None
@@ -46,8 +67,41 @@ class SchedulerSimple(AbstractScheduler):
 
         self.lock = threading.Lock()
 
+        settings = context.settings
+        # the jobs are claimed with leases so that a job is run by one scheduler at a
+        # time, and the job of a crashed scheduler is run again once its lease expires
+        self.lease_owner = (
+            f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        )
+        self.lease_in_seconds = settings.scheduler_lease_in_seconds
+        self.last_heartbeat_time: float = 0.0
+        if pool_sizes is None:
+            pool_sizes = {
+                ProgramType.CONNECTOR: settings.scheduler_connector_worker_count,
+                ProgramType.CONVERT: settings.scheduler_convert_worker_count,
+                ProgramType.SPLIT: settings.scheduler_split_worker_count,
+                ProgramType.EMBED: settings.scheduler_embed_worker_count,
+            }
+        if _DEFAULT_POOL not in pool_sizes:
+            pool_sizes = {**pool_sizes, _DEFAULT_POOL: 1}
+        self.pool_sizes: Dict[ProgramType, int] = pool_sizes
+
         # todo: the operations of all these lists are connected, should be atomic
-        self.task_queue: Queue[Union[Job, None]] = Queue()
+        # the jobs to run for each pool, shared fairly between the KBs
+        self.job_queues: Dict[ProgramType, JobQueue] = {
+            program_type: JobQueue() for program_type in pool_sizes
+        }
+        # the embed jobs can be started at most at the configured rate, no limit
+        # by default since the embedders limit the API requests and tokens
+        self.rate_limiters: Dict[ProgramType, TokenBucket] = {}
+        if (
+            ProgramType.EMBED in pool_sizes
+            and settings.scheduler_embed_jobs_per_second > 0
+        ):
+            self.rate_limiters[ProgramType.EMBED] = TokenBucket(
+                rate_per_second=settings.scheduler_embed_jobs_per_second,
+                capacity=pool_sizes[ProgramType.EMBED],
+            )
         self.cooldown_queue: Queue[Union[Job, None]] = Queue()
 
         # the key is the task_uuid, the value is the job
@@ -57,15 +111,29 @@ class SchedulerSimple(AbstractScheduler):
         self.tasks_in_queue: Dict[str, Job] = {}
         self.tasks_todo: Dict[str, JobStatus] = {}
 
-        self.workers: Dict[int, Future] = {}
+        # the key is the worker id, such as "embed-0"
+        self.workers: Dict[str, Future] = {}
         self.task_loader: Union[Future, None] = None
-        self.num_of_workers: int = num_of_workers
-        self.threadpool: ThreadPoolExecutor = ThreadPoolExecutor(
-            max_workers=num_of_workers + 1
-        )
+        self.threadpool: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1)
+        self.worker_pools: Dict[ProgramType, ThreadPoolExecutor] = {
+            program_type: ThreadPoolExecutor(
+                max_workers=num_of_workers,
+                thread_name_prefix=f"scheduler-{program_type.value}",
+            )
+            for program_type, num_of_workers in pool_sizes.items()
+        }
         self.status: SchedulerStatus = SchedulerStatus.PAUSED
         self.logger.info("Finished initializing the simple scheduler.")
 
+    def _get_pool_type(self, job: Job) -> ProgramType:
+        program_type = job.program_spec.program_type
+        if program_type in self.job_queues:
+            return program_type
+        return _DEFAULT_POOL
+
+    def _queue_job(self, job: Job) -> None:
+        self.job_queues[self._get_pool_type(job)].put(job)
+
     def _current_task_info(self) -> str:
         return f"running/cd/queue/todo: {len(self.tasks_running)}/{len(self.tasks_in_cooldown_queue)}/{len(self.tasks_in_queue)}/{len(self.tasks_todo)}"
 
@@ -76,11 +144,9 @@ class SchedulerSimple(AbstractScheduler):
         ), f"Scheduler status is {self.status} while trying to clear tasks."
         with self.lock:
             self.logger.noop("Inside the lock ...", noop_lvl=3)
-            if self.task_queue.qsize() > 0:
-                while self.task_queue.qsize() > 0:
-                    item = self.task_queue.get()
+            for job_queue in self.job_queues.values():
+                for item in job_queue.clear():
                     self.logger.info(f"Task queue has {item}, removing it.")
-                    self.task_queue.task_done()
 
             if self.cooldown_queue.qsize() > 0:
                 while self.cooldown_queue.qsize() > 0:
@@ -122,6 +188,12 @@ class SchedulerSimple(AbstractScheduler):
             job_create = JobCreate(task_uuid=task_uuid, program_spec=task.program_spec)
             job = self.jobstore.create_job(job_create)
         else:
+            if self._is_leased_by_others(existing_job):
+                self.logger.debug(
+                    f"Job {existing_job.job_uuid} for task {task_uuid} is running in "
+                    f"scheduler {existing_job.lease_owner}. Skip it for now."
+                )
+                return None
             if existing_job.job_status == JobStatus.COMPLETED:
                 self.logger.info(
                     f"Found complete job {existing_job.job_uuid} for task {task_uuid}."
@@ -144,6 +216,42 @@ class SchedulerSimple(AbstractScheduler):
                 job = self.jobstore.create_job(job_create)
         return job
 
+    def _is_leased_by_others(self, job: Job) -> bool:
+        if job.lease_owner is None or job.lease_owner == self.lease_owner:
+            return False
+        if job.lease_expires_at is None:
+            return False
+        return job.lease_expires_at > time_utils.current_datetime()
+
+    def _renew_leases(self) -> None:
+        """
+        The heartbeat of the running jobs, renew their leases a few times in each
+        lease period so that other schedulers do not take them over.
+        """
+        if time.monotonic() - self.last_heartbeat_time < self.lease_in_seconds / 3:
+            return
+        self.last_heartbeat_time = time.monotonic()
+        with self.lock:
+            running_jobs = list(self.tasks_running.values())
+        for job in running_jobs:
+            if not self.jobstore.renew_lease(
+                job.job_uuid, self.lease_owner, self.lease_in_seconds
+            ):
+                self.logger.error(
+                    f"Lost the lease of the running job {job.job_uuid} "
+                    f"for task {job.task_uuid}."
+                )
+
+    def _mark_task_changed(self, task_uuid: str) -> None:
+        """
+        Mark the docsource of the task as changed after its status changed, so that
+        the task scanner updates the docsource and adds the next tasks for it.
+        """
+        task = self.taskstore.get_task_by_uuid(task_uuid)
+        if task is None:
+            return
+        self.change_feed.mark_dirty(task.org_id, task.kb_id, [task.docsource_uuid])
+
     def _init_load_tasks(self) -> None:
         """
         This function is called when the scheduler is started or resumed.
@@ -184,7 +292,7 @@ class SchedulerSimple(AbstractScheduler):
             )
             for job in self.tasks_in_queue.values():
                 self.logger.info(f"Adding job {job.job_uuid} to the queue.")
-                self.task_queue.put(job)
+                self._queue_job(job)
         self.logger.noop("Outside the lock ...", noop_lvl=3)
 
     def _update_tasks(self) -> None:
@@ -198,8 +306,10 @@ class SchedulerSimple(AbstractScheduler):
 
         with self.lock:
             self.logger.noop("Inside the lock ...", noop_lvl=3)
-            self.logger.noop("Scan the KB for new tasks ...", noop_lvl=2)
-            todo_tasks = self.task_scanner.scan_kb_for_tasks(
+            self.logger.noop(
+                "Scan the changed docsources for new tasks ...", noop_lvl=2
+            )
+            todo_tasks = self.task_scanner.scan_changes_for_tasks(
                 target_org=self.target_org,
                 target_kb=self.target_kb,
                 target_docsources=self.target_docsources,
@@ -225,7 +335,7 @@ class SchedulerSimple(AbstractScheduler):
 
                 self.tasks_in_queue[task.task_uuid] = job
                 self.tasks_todo[task.task_uuid] = job.job_status
-                self.task_queue.put(job)
+                self._queue_job(job)
 
         self.logger.noop("Outside the lock ...", noop_lvl=3)
         self._check_cooldown_queue()
@@ -245,8 +355,11 @@ class SchedulerSimple(AbstractScheduler):
         while self.status == SchedulerStatus.RUNNING:
             try:
                 if logging_count == int(60 / interval):
+                    scan_stats = self.task_scanner.get_total_scan_stats()
                     self.logger.info(
-                        f"Scanning data storage for new tasks. [{self._current_task_info()}]"
+                        f"Scanning data storage for new tasks. [{self._current_task_info()}] "
+                        f"[scans/full scans/ms: {scan_stats.scan_count}/"
+                        f"{scan_stats.full_scan_count}/{scan_stats.duration_in_ms:.0f}]"
                     )
                     logging_count = logging_count - 1
                 elif logging_count == 0:
@@ -255,6 +368,7 @@ class SchedulerSimple(AbstractScheduler):
                     logging_count = logging_count - 1
 
                 self._update_tasks()
+                self._renew_leases()
                 time.sleep(interval)
             except Exception as e:
                 tb_str = traceback.format_exc()
@@ -299,45 +413,49 @@ class SchedulerSimple(AbstractScheduler):
                     self.logger.noop("Inside the lock ...", noop_lvl=3)
                     self.tasks_in_queue[job.task_uuid] = job
                     self.tasks_todo[job.task_uuid] = job.job_status
-                    self.task_queue.put(job)
+                    self._queue_job(job)
                     self.tasks_in_cooldown_queue.pop(job.task_uuid)
                 self.logger.noop("Outside the lock ...", noop_lvl=3)
         self.taskstore.update_task_status(job.task_uuid, job.job_status)
+        if job.job_status == JobStatus.ABORTED:
+            self._mark_task_changed(job.task_uuid)
         self.cooldown_queue.task_done()
 
-    def _worker_executes_job(self, id: int, job: Job) -> None:
+    def _worker_executes_jobs(self, id: str, jobs: List[Job]) -> None:
+        task_uuids = [job.task_uuid for job in jobs]
         try:
-            updated_job = self.task_runner.run_job(job)
-            if updated_job is not None:
-                self.logger.info(
-                    f"[{id}]Finished exeuting task {job.task_uuid} in the worker."
-                    f"The job status is {updated_job.job_status}. "
-                    f"(job_uuid {job.job_uuid})"
-                )
-                job.job_status = updated_job.job_status
-            else:
-                self.logger.error(
-                    f"[{id}]The executor returns a null object for {job.task_uuid}."
-                    f"(job_uuid {job.job_uuid})"
-                )
-                job.job_status = JobStatus.FAILED
+            updated_jobs = self.task_runner.run_jobs(jobs)
+            for job, updated_job in zip(jobs, updated_jobs):
+                if updated_job is not None:
+                    self.logger.info(
+                        f"[{id}]Finished exeuting task {job.task_uuid} in the worker."
+                        f"The job status is {updated_job.job_status}. "
+                        f"(job_uuid {job.job_uuid})"
+                    )
+                    job.job_status = updated_job.job_status
+                else:
+                    self.logger.error(
+                        f"[{id}]The executor returns a null object for {job.task_uuid}."
+                        f"(job_uuid {job.job_uuid})"
+                    )
+                    job.job_status = JobStatus.FAILED
         except Exception as e:
             trace = traceback.format_exc()
             self.logger.error(
-                f"[{id}]Executing job failed with exception {job.task_uuid}: {trace} "
-                f"(job_uuid {job.job_uuid})"
+                f"[{id}]Executing jobs failed with exception {task_uuids}: {trace}"
             )
-            self.logger.error(f"[{id}]Error in executing task {job.task_uuid}: {e} ")
-            job.job_status = JobStatus.FAILED
+            self.logger.error(f"[{id}]Error in executing tasks {task_uuids}: {e} ")
+            for job in jobs:
+                job.job_status = JobStatus.FAILED
         except:
             trace = traceback.format_exc()
             self.logger.error(
-                f"[{id}]Executing job failed with unknown error {job.task_uuid}: {trace} "
-                f"(job_uuid {job.job_uuid})"
+                f"[{id}]Executing jobs failed with unknown error {task_uuids}: {trace}"
             )
-            job.job_status = JobStatus.FAILED
+            for job in jobs:
+                job.job_status = JobStatus.FAILED
 
-    def _worker_initializes_job(self, id: int, job: Job) -> bool:
+    def _worker_initializes_job(self, id: str, job: Job) -> bool:
         task_uuid = job.task_uuid
         task_in_db = self.taskstore.get_task_by_uuid(task_uuid)
         if task_in_db is None:
@@ -383,6 +501,19 @@ class SchedulerSimple(AbstractScheduler):
             or job.job_status == JobStatus.PENDING
             or job.job_status == JobStatus.FAILED
         ):
+            claimed_job = self.jobstore.claim_job(
+                job.job_uuid, self.lease_owner, self.lease_in_seconds
+            )
+            if claimed_job is None:
+                self.logger.info(
+                    f"[{id}]Job {job.job_uuid} for task {task_uuid} has been claimed "
+                    "by another scheduler."
+                )
+                # the task is picked up by a later scan, and run again if the lease
+                # expires before its job is finished
+                with self.lock:
+                    self.tasks_todo.pop(task_uuid, None)
+                return False
             self.taskstore.update_task_status(task_uuid, TaskStatus.RUNNING)
             job.job_status = JobStatus.RUNNING
         else:
@@ -395,7 +526,7 @@ class SchedulerSimple(AbstractScheduler):
         self.logger.noop("Outside the lock ...", noop_lvl=3)
         return True
 
-    def _worker_finalizes_job(self, id: int, job: Job) -> None:
+    def _worker_finalizes_job(self, id: str, job: Job) -> None:
         self.logger.info(
             f"Finalizing the job_uuid {job.job_uuid}, status {job.job_status}."
         )
@@ -436,6 +567,8 @@ class SchedulerSimple(AbstractScheduler):
             self.logger.noop("Outside the lock ...", noop_lvl=3)
 
         self.taskstore.update_task_status(job.task_uuid, job.job_status)
+        self.jobstore.release_lease(job.job_uuid, self.lease_owner)
+        self._mark_task_changed(job.task_uuid)
         if job.job_status == JobStatus.COMPLETED:
             self.logger.debug(
                 f"[{id}]Removing task {job.task_uuid} from tasks_all list."
@@ -446,12 +579,15 @@ class SchedulerSimple(AbstractScheduler):
         )
 
     # Worker function
-    def _worker(self, id: int):
+    def _worker(self, id: str, program_type: ProgramType):
         self.logger.debug(f"[{id}] starting the worker thread.")
+        job_queue = self.job_queues[program_type]
+        rate_limiter = self.rate_limiters.get(program_type)
         should_run = True
         while should_run:
-            job = self.task_queue.get()
-            job_is_executable = False
+            job = job_queue.get()
+            jobs: List[Job] = []
+            executable_jobs: List[Job] = []
             try:
                 if job is None:
                     self.logger.info(
@@ -460,9 +596,21 @@ class SchedulerSimple(AbstractScheduler):
                     should_run = False
                     continue
 
+                jobs = [job]
+                if job.program_spec.program_type == ProgramType.EMBED:
+                    # the waiting embed jobs of the KB are embedded in one batch
+                    jobs += job_queue.get_more_like(
+                        job, self.context.settings.scheduler_embed_batch_size - 1
+                    )
+
+                # the jobs are still counted as queued while waiting for the limit
+                if rate_limiter is not None:
+                    rate_limiter.acquire(len(jobs))
+
                 with self.lock:
                     self.logger.noop("Inside the lock ...", noop_lvl=3)
-                    self.tasks_in_queue.pop(job.task_uuid)
+                    for queued_job in jobs:
+                        self.tasks_in_queue.pop(queued_job.task_uuid)
                 self.logger.noop("Outside the lock ...", noop_lvl=3)
 
                 if self.status != SchedulerStatus.RUNNING:
@@ -472,23 +620,38 @@ class SchedulerSimple(AbstractScheduler):
                     should_run = False
                     continue
 
-                job_is_executable = self._worker_initializes_job(id, job)
+                for queued_job in jobs:
+                    try:
+                        if self._worker_initializes_job(id, queued_job):
+                            executable_jobs.append(queued_job)
+                    except Exception as e:
+                        tb_str = traceback.format_exc()
+                        self.logger.error(
+                            f"[{id}]Failed to initialize job_uuid "
+                            f"{queued_job.job_uuid}: {tb_str}"
+                        )
 
                 # TODO: executor to support pause / abort operations
-                self.logger.debug(f"Executing job_uuid {job.job_uuid} ...")
-                if job_is_executable:
-                    self._worker_executes_job(id, job)
+                self.logger.debug(
+                    "Executing job_uuids "
+                    f"{[queued_job.job_uuid for queued_job in executable_jobs]} ..."
+                )
+                if len(executable_jobs) > 0:
+                    self._worker_executes_jobs(id, executable_jobs)
             except Exception as e:
                 tb_str = traceback.format_exc()
                 self.logger.error(f"[{id}]Critical error in the worker: {tb_str}")
             finally:
-                self.logger.info(
-                    f"[{id}]In the finally block job_uuid {job.job_uuid}, "
-                    f"job_is_executable {job_is_executable}"
-                )
-                if job_is_executable:
-                    self._worker_finalizes_job(id, job)
-                self.task_queue.task_done()
+                for queued_job in jobs:
+                    job_is_executable = any(
+                        queued_job is executable for executable in executable_jobs
+                    )
+                    self.logger.info(
+                        f"[{id}]In the finally block job_uuid {queued_job.job_uuid}, "
+                        f"job_is_executable {job_is_executable}"
+                    )
+                    if job_is_executable:
+                        self._worker_finalizes_job(id, queued_job)
         self.logger.info(f"[{id}]Finished the worker.")
 
     def _start_workers(self) -> None:
@@ -501,8 +664,12 @@ class SchedulerSimple(AbstractScheduler):
             self.task_loader == None
         ), f"The task loader is not None while trying to start workers."
         self.task_loader = self.threadpool.submit(self._task_loader, interval=3)
-        for id in range(self.num_of_workers):
-            self.workers[id] = self.threadpool.submit(self._worker, id)
+        for program_type, num_of_workers in self.pool_sizes.items():
+            for i in range(num_of_workers):
+                id = f"{program_type.value}-{i}"
+                self.workers[id] = self.worker_pools[program_type].submit(
+                    self._worker, id, program_type
+                )
         self.logger.info(
             "The task loader and workers in the scheduler have been started."
         )
@@ -518,11 +685,11 @@ class SchedulerSimple(AbstractScheduler):
                 self.task_loader.result()
             self.task_loader = None
 
-        running_tasks = []
-        for id in range(self.num_of_workers):
-            if self.workers[id].running():
+        running_tasks: List[str] = []
+        for id, worker in self.workers.items():
+            if worker.running():
                 self.logger.info(
-                    f"[{id}] woker: {self.workers[id]}. Running : {self.workers[id].running()}"
+                    f"[{id}] woker: {worker}. Running : {worker.running()}"
                 )
                 running_tasks.append(id)
         for id in running_tasks:
@@ -533,7 +700,8 @@ class SchedulerSimple(AbstractScheduler):
             else:
                 # the order the workers receiving the None signal is not guaranteed
                 # so we can't do check and finish it one loop
-                self.task_queue.put(None)
+                program_type = ProgramType(id.rsplit("-", 1)[0])
+                self.job_queues[program_type].put(None)
 
     def _check_workers_done(self) -> bool:
         assert (
@@ -544,8 +712,8 @@ class SchedulerSimple(AbstractScheduler):
             self.logger.info(f"Task loader is running.")
             done = False
 
-        for id in range(self.num_of_workers):
-            if self.workers[id].running():
+        for id, worker in self.workers.items():
+            if worker.running():
                 self.logger.info(f"Worker {id} is running.")
                 done = False
             else:
@@ -601,6 +769,15 @@ class SchedulerSimple(AbstractScheduler):
     def get_status(self) -> SchedulerStatus:
         return self.status
 
+    def get_queue_stats(self) -> JobQueueStats:
+        queue_stats = JobQueueStats()
+        for job_queue in self.job_queues.values():
+            pool_stats = job_queue.get_stats()
+            queue_stats.depth += pool_stats.depth
+            queue_stats.active_flow_count += pool_stats.active_flow_count
+            queue_stats.job_classes.update(pool_stats.job_classes)
+        return queue_stats
+
     def cooldown_tasks(self) -> Dict[str, Job]:
         return self.tasks_in_cooldown_queue
 
@@ -619,7 +796,8 @@ class SchedulerSimple(AbstractScheduler):
 
     def shutdown(self, force: bool = False):
         self.logger.info(
-            f"Shutting down the simple scheduler, queue size: {self.task_queue.qsize()}"
+            "Shutting down the simple scheduler, queue size: "
+            f"{sum(job_queue.qsize() for job_queue in self.job_queues.values())}"
         )
         self.status = SchedulerStatus.STOPPED
 
@@ -627,6 +805,8 @@ class SchedulerSimple(AbstractScheduler):
         self._stop_workers(force)
 
         self.threadpool.shutdown(wait=False)
+        for worker_pool in self.worker_pools.values():
+            worker_pool.shutdown(wait=False)
         self.context.scheduler_is_running = False
         self.logger.info("Finished simple scheduler shutdown.")
 
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Iterator, List, Optional
 
 from leettools.common import exceptions
 from leettools.common.logging import logger
@@ -6,11 +6,15 @@ from leettools.common.logging.event_logger import EventLogger
 from leettools.context_manager import Context
 from leettools.core.consts.docsource_type import DocSourceType
 from leettools.core.consts.return_code import ReturnCode
+from leettools.core.schemas.knowledgebase import KnowledgeBase
+from leettools.core.schemas.organization import Org
+from leettools.core.schemas.segment import Segment
 from leettools.core.schemas.user import User
 from leettools.eds.pipeline.convert.converter import create_converter
 from leettools.eds.pipeline.embed.segment_embedder import create_segment_embedder_for_kb
 from leettools.eds.pipeline.ingest.connector import create_connector
 from leettools.eds.pipeline.split.splitter import Splitter
+from leettools.eds.scheduler._impl.embed_coalescer import EmbedCoalescer
 from leettools.eds.scheduler.schemas.job import Job
 from leettools.eds.scheduler.schemas.job_status import JobStatus
 from leettools.eds.scheduler.schemas.program import (
@@ -42,6 +46,11 @@ class TaskRunnerEDS(AbstractTaskRunner):
 
         self.jobstore = context.get_task_manager().get_jobstore()
         self.settings = context.settings
+        # shared by the embed jobs running in the different workers
+        self.embed_coalescer = EmbedCoalescer(
+            batch_size=self.settings.scheduler_embed_batch_size,
+            max_wait_in_seconds=self.settings.scheduler_embed_max_wait_in_ms / 1000,
+        )
 
         if display_logger is None:
             self.display_logger = logger()
@@ -119,14 +128,56 @@ class TaskRunnerEDS(AbstractTaskRunner):
             )
         return rnt_code
 
-    def _run_embedder(self, embed_program: EmbedProgramSpec, job: Job) -> ReturnCode:
+    def _read_segments_in_batches(
+        self, org: Org, kb: KnowledgeBase, embed_program: EmbedProgramSpec
+    ) -> Iterator[List[Segment]]:
         """
-        Run the file convert program.
+        Read the segments referenced by the embed program from the segment store.
+
+        Args:
+        - org: The organization of the segments.
+        - kb: The knowledge base of the segments.
+        - embed_program: The embed program with the segment references.
+
+        Returns:
+        - The segments in batches of at most scheduler_embed_batch_size, the
+            segments no longer in the store are skipped.
+        """
+        batch_size = max(1, self.settings.scheduler_embed_batch_size)
+        if embed_program.segment_uuids is None:
+            segments = self.segstore.get_all_segments_for_document(
+                org, kb, embed_program.document_uuid
+            )
+            for i in range(0, len(segments), batch_size):
+                yield segments[i : i + batch_size]
+            return
+
+        segment_uuids = embed_program.segment_uuids
+        for i in range(0, len(segment_uuids), batch_size):
+            batch_uuids = segment_uuids[i : i + batch_size]
+            segments = self.segstore.get_segments_by_uuids(org, kb, batch_uuids)
+            found = [segment for segment in segments if segment is not None]
+            if len(found) < len(batch_uuids):
+                self.display_logger.warning(
+                    f"Executor: {len(batch_uuids) - len(found)} segments of document "
+                    f"{embed_program.document_uuid} not found, skipped."
+                )
+            if len(found) > 0:
+                yield found
+
+    def _run_embedders(
+        self, embed_programs: List[EmbedProgramSpec], jobs: List[Job]
+    ) -> List[ReturnCode]:
         """
-        self.display_logger.debug("Executor: embed segments to vectorstore")
+        Run the embed programs of the same KB, the segments of all the programs
+        are embedded together in batches of up to scheduler_embed_batch_size.
+        """
+        self.display_logger.debug(
+            f"Executor: embed segments of {len(jobs)} jobs to vectorstore"
+        )
 
-        org = self.org_manager.get_org_by_id(embed_program.org_id)
-        kb = self.kb_manager.get_kb_by_id(org, embed_program.kb_id)
+        org = self.org_manager.get_org_by_id(embed_programs[0].org_id)
+        kb = self.kb_manager.get_kb_by_id(org, embed_programs[0].kb_id)
 
         user_uuid = kb.user_uuid
         if user_uuid is None:
@@ -142,22 +193,59 @@ class TaskRunnerEDS(AbstractTaskRunner):
 
         job_logger = logger()
         log_handler = None
-        if job.log_location:
-            log_handler = job_logger.log_to_file(job.log_location)
+        # the log of a batch of jobs can't be split into the job log files
+        if len(jobs) == 1 and jobs[0].log_location:
+            log_handler = job_logger.log_to_file(jobs[0].log_location)
 
+        batch_size = max(1, self.settings.scheduler_embed_batch_size)
+        rtn_codes = [ReturnCode.SUCCESS] * len(jobs)
         try:
-            rtn_code = embedder.embed_segment_list(
-                segments=embed_program.source, display_logger=job_logger
-            )
-            if rtn_code == ReturnCode.SUCCESS:
-                self.display_logger.info(
-                    "Executor: embed segments to vectorstore successfully"
-                )
-            else:
-                self.display_logger.error(
-                    f"Executor: failed to embed segments to vectorstore. {rtn_code}"
-                )
-            return rtn_code
+            with self.embed_coalescer.job(org.org_id, kb.kb_id) as embed_job:
+                # the segment lists to embed next and the index of their job
+                parts: List[List[Segment]] = []
+                part_jobs: List[int] = []
+                part_size = 0
+
+                def _flush() -> None:
+                    nonlocal part_size
+                    if len(parts) == 0:
+                        return
+                    part_codes = embed_job.embed_segment_lists(
+                        embedder=embedder,
+                        segment_lists=parts,
+                        display_logger=job_logger,
+                    )
+                    for i, rtn_code in zip(part_jobs, part_codes):
+                        if rtn_codes[i] == ReturnCode.SUCCESS:
+                            rtn_codes[i] = rtn_code
+                    parts.clear()
+                    part_jobs.clear()
+                    part_size = 0
+
+                for i, embed_program in enumerate(embed_programs):
+                    for segments in self._read_segments_in_batches(
+                        org, kb, embed_program
+                    ):
+                        if rtn_codes[i] != ReturnCode.SUCCESS:
+                            break
+                        if part_size + len(segments) > batch_size:
+                            _flush()
+                        parts.append(segments)
+                        part_jobs.append(i)
+                        part_size += len(segments)
+                _flush()
+
+            for job, rtn_code in zip(jobs, rtn_codes):
+                if rtn_code == ReturnCode.SUCCESS:
+                    self.display_logger.info(
+                        "Executor: embed segments to vectorstore successfully"
+                    )
+                else:
+                    self.display_logger.error(
+                        "Executor: failed to embed segments to vectorstore for job "
+                        f"{job.job_uuid}. {rtn_code}"
+                    )
+            return rtn_codes
         finally:
             if log_handler:
                 job_logger.remove_file_handler()
@@ -171,7 +259,15 @@ class TaskRunnerEDS(AbstractTaskRunner):
         org = self.org_manager.get_org_by_id(split_program.org_id)
         kb = self.kb_manager.get_kb_by_id(org, split_program.kb_id)
 
-        document = split_program.source
+        document = self.docstore.get_document_by_id(
+            org, kb, split_program.document_uuid
+        )
+        if document is None:
+            self.display_logger.error(
+                f"Executor: document {split_program.document_uuid} not found, "
+                "aborting the split job."
+            )
+            return ReturnCode.FAILURE_ABORT
         splitter = Splitter(context=self.context, org=org, kb=kb)
         rnt_code = splitter.split(doc=document, log_file_location=job.log_location)
         if rnt_code == ReturnCode.SUCCESS:
@@ -184,10 +280,29 @@ class TaskRunnerEDS(AbstractTaskRunner):
             )
         return rnt_code
 
+    def _start_job(self, job: Job) -> Job:
+        job.job_status = JobStatus.RUNNING
+        return self.jobstore.update_job_status(job.job_uuid, job.job_status)
+
+    def _finish_job(self, job: Job, rnt_code: ReturnCode) -> Job:
+        if rnt_code == ReturnCode.SUCCESS:
+            job.job_status = JobStatus.COMPLETED
+        elif rnt_code == ReturnCode.FAILURE:
+            job.job_status = JobStatus.FAILED
+        elif rnt_code == ReturnCode.FAILURE_RETRY:
+            job.job_status = JobStatus.FAILED
+        elif rnt_code == ReturnCode.FAILURE_ABORT:
+            job.job_status = JobStatus.ABORTED
+        else:
+            raise exceptions.UnexpectedCaseException(
+                f"Executor: unknown return code: {rnt_code}"
+            )
+
+        return self.jobstore.update_job_status(job.job_uuid, job.job_status)
+
     def run_job(self, job: Job) -> Job:
 
-        job.job_status = JobStatus.RUNNING
-        job = self.jobstore.update_job_status(job.job_uuid, job.job_status)
+        job = self._start_job(job)
 
         program_spec = job.program_spec
         if program_spec.program_type == ProgramType.CONVERT:
@@ -204,7 +319,7 @@ class TaskRunnerEDS(AbstractTaskRunner):
             embedder_program = EmbedProgramSpec.model_validate(
                 program_spec.real_program_spec
             )
-            rnt_code = self._run_embedder(embedder_program, job)
+            rnt_code = self._run_embedders([embedder_program], [job])[0]
         elif program_spec.program_type == ProgramType.SPLIT:
             split_program = SplitProgramSpec.model_validate(
                 program_spec.real_program_spec
@@ -215,17 +330,24 @@ class TaskRunnerEDS(AbstractTaskRunner):
                 f"Executor: unknown program type: {program_spec.program_type}"
             )
 
-        if rnt_code == ReturnCode.SUCCESS:
-            job.job_status = JobStatus.COMPLETED
-        elif rnt_code == ReturnCode.FAILURE:
-            job.job_status = JobStatus.FAILED
-        elif rnt_code == ReturnCode.FAILURE_RETRY:
-            job.job_status = JobStatus.FAILED
-        elif rnt_code == ReturnCode.FAILURE_ABORT:
-            job.job_status = JobStatus.ABORTED
-        else:
-            raise exceptions.UnexpectedCaseException(
-                f"Executor: unknown return code: {rnt_code}"
-            )
+        return self._finish_job(job, rnt_code)
 
-        return self.jobstore.update_job_status(job.job_uuid, job.job_status)
+    def run_jobs(self, jobs: List[Job]) -> List[Job]:
+        if len(jobs) <= 1 or any(
+            job.program_spec.program_type != ProgramType.EMBED for job in jobs
+        ):
+            return super().run_jobs(jobs)
+
+        embed_programs = [
+            EmbedProgramSpec.model_validate(job.program_spec.real_program_spec)
+            for job in jobs
+        ]
+        if len({(p.org_id, p.kb_id) for p in embed_programs}) > 1:
+            return super().run_jobs(jobs)
+
+        # the embed jobs of the same KB are embedded in shared batches
+        jobs = [self._start_job(job) for job in jobs]
+        rtn_codes = self._run_embedders(embed_programs, jobs)
+        return [
+            self._finish_job(job, rtn_code) for job, rtn_code in zip(jobs, rtn_codes)
+        ]
@@ -1,6 +1,7 @@
+import threading
 import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Set
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
 from leettools.common import exceptions
 from leettools.common.logging import get_logger
@@ -10,6 +11,7 @@ from leettools.core.consts.docsink_status import DocSinkStatus
 from leettools.core.consts.docsource_status import DocSourceStatus
 from leettools.core.consts.document_status import DocumentStatus
 from leettools.core.consts.schedule_type import ScheduleType
+from leettools.core.repo.change_feed import ChangeFeed
 from leettools.core.schemas.docsink import DocSink
 from leettools.core.schemas.docsource import DocSource
 from leettools.core.schemas.document import Document
@@ -24,6 +26,7 @@ from leettools.eds.scheduler.schemas.program import (
     ProgramType,
     SplitProgramSpec,
 )
+from leettools.eds.scheduler.schemas.scan_stats import TaskScanStats
 from leettools.eds.scheduler.schemas.task import Task, TaskCreate, TaskStatus
 from leettools.eds.scheduler.task_scanner import AbstractTaskScanner
 
@@ -64,6 +67,24 @@ class TaskScannerKB(AbstractTaskScanner):
         ):
             self.docsource_retry_range_in_hours = 24
 
+        # only the docsources marked as changed by the stores are scanned, except
+        # for the full scan once every reconcile interval
+        self.change_feed = ChangeFeed()
+        self.reconcile_interval_in_seconds = (
+            context.settings.scheduler_reconcile_interval_in_seconds
+        )
+        self.last_full_scan_time: Optional[float] = None
+        # the changes made by other processes are not in the change feed, so the
+        # docsources updated since the end of the last scan are also scanned
+        self.last_scan_end_time: Optional[datetime] = None
+        # the recurring docsources are scanned every time, keyed by (org_id, kb_id)
+        self.recurring_docsources: Dict[Tuple[str, str], Set[str]] = {}
+
+        self._stats_lock = threading.Lock()
+        self._scan_stats = TaskScanStats()
+        self._last_scan_stats = TaskScanStats()
+        self._total_scan_stats = TaskScanStats()
+
     def _update_docsource_status(
         self, org: Org, kb: KnowledgeBase, docsource: DocSource
     ) -> DocSourceStatus:
@@ -161,6 +182,7 @@ class TaskScannerKB(AbstractTaskScanner):
 
         new_docsink_tasks = []
         docsinks = self.docsink_store.get_docsinks_for_docsource(org, kb, docsource)
+        self._scan_stats.docsinks_visited += len(docsinks)
         for docsink in docsinks:
             new_tasks = self._add_tasks_for_docsink(org, kb, docsource, docsink)
             if new_tasks:
@@ -180,6 +202,7 @@ class TaskScannerKB(AbstractTaskScanner):
 
         new_split_tasks = []
         documents = self.document_store.get_documents_for_docsource(org, kb, docsource)
+        self._scan_stats.documents_visited += len(documents)
         for doc in documents:
             new_tasks = self._add_tasks_for_document(
                 org, kb, docsource, doc, ProgramType.SPLIT
@@ -354,7 +377,7 @@ class TaskScannerKB(AbstractTaskScanner):
             program_dict[ProgramType.SPLIT] = ProgramSpec(
                 program_type=ProgramType.SPLIT,
                 real_program_spec=SplitProgramSpec(
-                    org_id=org.org_id, kb_id=kb.kb_id, source=doc
+                    org_id=org.org_id, kb_id=kb.kb_id, document_uuid=doc.document_uuid
                 ),
             )
 
@@ -363,14 +386,13 @@ class TaskScannerKB(AbstractTaskScanner):
         # Ideally we should use a set of API-providers
         # in the orgnization object for the task specified for that org. Right
         # now we just use the system-default API-provider settings for the task.
+        # The segments are read from the segment store when the task runs, so
+        # the spec only keeps the document id.
         if task_type == ProgramType.EMBED:
-            segments = self.segment_store.get_all_segments_for_document(
-                org, kb, doc.document_uuid
-            )
             program_dict[ProgramType.EMBED] = ProgramSpec(
                 program_type=ProgramType.EMBED,
                 real_program_spec=EmbedProgramSpec(
-                    org_id=org.org_id, kb_id=kb.kb_id, source=segments
+                    org_id=org.org_id, kb_id=kb.kb_id, document_uuid=doc.document_uuid
                 ),
             )
 
@@ -414,6 +436,149 @@ class TaskScannerKB(AbstractTaskScanner):
                     )
         return new_tasks
 
+    def _has_unfinished_tasks(self, docsource: DocSource) -> bool:
+        for task in self.taskstore.get_tasks_for_docsource(docsource.docsource_uuid):
+            if task.task_status != TaskStatus.COMPLETED:
+                return True
+        return False
+
+    def _scan_docsource(
+        self,
+        org: Org,
+        kb: KnowledgeBase,
+        docsource: DocSource,
+        has_unfinished_tasks: Callable[[], bool],
+    ) -> List[Task]:
+        """
+        Check if the docsource needs to be processed and add the tasks for it.
+
+        Args:
+        - org: The organization of the docsource.
+        - kb: The knowledge base of the docsource.
+        - docsource: The docsource to check.
+        - has_unfinished_tasks: Returns True if the docsource has tasks that are not
+            completed, only called for the finished docsources.
+
+        Returns:
+        - The tasks that need to run for the docsource.
+        """
+        current_time = time_utils.current_datetime()
+        docsource_retry_range = timedelta(hours=self.docsource_retry_range_in_hours)
+
+        schedule_config = docsource.schedule_config
+        dssig = _get_docsource_log_sig(docsource)
+
+        if schedule_config is None:
+            schedule_config = ScheduleConfig(
+                scheduler_type=ScheduleType.ONCE,
+            )
+            # if no schedule config, we only scan the docsource if it is not
+            # older than the retry range
+            if current_time - docsource.updated_at > docsource_retry_range:
+                self.logger.noop(
+                    f"Docsource is older than "
+                    f"{self.docsource_retry_range_in_hours} hours: {dssig}",
+                    noop_lvl=1,
+                )
+                return []
+        else:
+            if schedule_config.schedule_type == ScheduleType.MANUAL:
+                self.logger.noop(f"Docsource is set to manual run: {dssig}", noop_lvl=3)
+                return []
+
+        recurring_uuids = self.recurring_docsources.setdefault(
+            (org.org_id, kb.kb_id), set()
+        )
+        if schedule_config.schedule_type == ScheduleType.RECURRING:
+            recurring_uuids.add(docsource.docsource_uuid)
+        else:
+            recurring_uuids.discard(docsource.docsource_uuid)
+
+        def _need_to_check_docsource() -> bool:
+
+            if schedule_config.schedule_type == ScheduleType.RECURRING:
+                self.logger.debug(f"Found recurring docsource to be scanned: {dssig}")
+                return True
+            elif schedule_config.schedule_type == ScheduleType.MANUAL:
+                self.logger.debug(f"Found manual docsource to be ignored: {dssig}")
+                return False
+
+            # now we deal with run-to-finish docsources
+            if not docsource.is_finished():
+                self.logger.debug(
+                    f"Docsource is not finished [{docsource.docsource_status}]: {dssig}"
+                )
+                return True
+
+            # now the docsource is finished
+            if has_unfinished_tasks():
+                self.logger.noop(
+                    f"Found finished docsource with unfinished tasks: {dssig}",
+                    noop_lvl=1,
+                )
+                return True
+            else:
+                self.logger.noop(
+                    f"Ignore finished docsource with no unfinished tasks: {dssig}",
+                    noop_lvl=3,
+                )
+            return False
+
+        if _need_to_check_docsource() == False:
+            self.logger.noop(f"No need to check the docsource: {dssig}", noop_lvl=3)
+            return []
+
+        self._scan_stats.docsources_visited += 1
+        new_tasks = []
+        try:
+            all_new_tasks = self._process_docsource(org, kb, docsource)
+            self.logger.noop(
+                f"{len(all_new_tasks)} new tasks for docsource: {dssig}",
+                noop_lvl=2,
+            )
+            if len(all_new_tasks) > 0:
+                new_tasks += all_new_tasks
+                docsource.docsource_status = DocSourceStatus.PROCESSING
+                self.docsource_store.update_docsource(org, kb, docsource)
+            else:
+                if not docsource.is_finished():
+                    self._update_docsource_status(org, kb, docsource)
+                else:
+                    self.logger.noop(
+                        f"DocSource is already marked as {docsource.docsource_status}: {dssig}",
+                        noop_lvl=2,
+                    )
+            # last_scan_time is intended to compare the updated_at time of the docsource
+            # but right now the updated_at time is not updated when the status is changed
+            # so last_scan_time is not used currently.
+            self.last_scan_time.setdefault(org.org_id, {}).setdefault(kb.kb_id, {})[
+                docsource.docsource_uuid
+            ] = time_utils.current_datetime()
+        except Exception as e:
+            self.logger.error(
+                f"Error processing docsource for tasks {docsource.uri}: {e}"
+            )
+        return new_tasks
+
+    def _finish_scan(self, start_time: float, new_tasks: List[Task]) -> None:
+        stats = self._scan_stats
+        stats.duration_in_ms = (time.perf_counter() - start_time) * 1000
+        stats.new_task_count = len(new_tasks)
+        # the updates by the scanner itself are before the end of the scan
+        self.last_scan_end_time = time_utils.current_datetime()
+        with self._stats_lock:
+            self._last_scan_stats = stats
+            self._total_scan_stats.add(stats)
+        self.logger.noop(
+            f"Task scanning took {stats.duration_in_ms:.3f} ms: "
+            f"full scan {stats.full_scan_count > 0}, "
+            f"dirty docsources {stats.dirty_docsource_count}, "
+            f"visited docsources/docsinks/documents {stats.docsources_visited}/"
+            f"{stats.docsinks_visited}/{stats.documents_visited}, "
+            f"tasks {stats.new_task_count}.",
+            noop_lvl=1,
+        )
+
     def scan_kb_for_tasks(
         self,
         target_org: Optional[Org] = None,
@@ -421,6 +586,141 @@ class TaskScannerKB(AbstractTaskScanner):
         target_docsources: Optional[List[DocSource]] = None,
     ) -> List[Task]:
         start_time = time.perf_counter()
+        self.last_full_scan_time = time.monotonic()
+        self._scan_stats = TaskScanStats(scan_count=1, full_scan_count=1)
+        # the full scan covers all the changes published before it starts
+        self.change_feed.drain()
+        with self.change_feed.muted():
+            new_tasks = self._scan_all_docsources(
+                target_org, target_kb, target_docsources
+            )
+        self._finish_scan(start_time, new_tasks)
+        return new_tasks
+
+    def scan_changes_for_tasks(
+        self,
+        target_org: Optional[Org] = None,
+        target_kb: Optional[KnowledgeBase] = None,
+        target_docsources: Optional[List[DocSource]] = None,
+    ) -> List[Task]:
+        if (
+            self.last_full_scan_time is None
+            or time.monotonic() - self.last_full_scan_time
+            >= self.reconcile_interval_in_seconds
+        ):
+            return self.scan_kb_for_tasks(target_org, target_kb, target_docsources)
+
+        start_time = time.perf_counter()
+        dirty = self.change_feed.drain()
+        self._add_updated_docsources(dirty, target_org, target_kb)
+        for key, docsource_uuids in self.recurring_docsources.items():
+            dirty.setdefault(key, set()).update(docsource_uuids)
+        self._scan_stats = TaskScanStats(
+            scan_count=1,
+            dirty_docsource_count=sum(len(uuids) for uuids in dirty.values()),
+        )
+        with self.change_feed.muted():
+            new_tasks = self._scan_dirty_docsources(
+                dirty, target_org, target_kb, target_docsources
+            )
+        self._finish_scan(start_time, new_tasks)
+        return new_tasks
+
+    def _add_updated_docsources(
+        self,
+        dirty: Dict[Tuple[str, str], Set[str]],
+        target_org: Optional[Org],
+        target_kb: Optional[KnowledgeBase],
+    ) -> None:
+        """
+        Add the docsources created or updated since the end of the last scan to
+        the dirty markers, so that the docsources changed by another process, e.g.
+        the CLI while the service is running, are scanned without waiting for the
+        reconciliation scan. A change made by another process during a scan is
+        left to the reconciliation scan.
+        """
+        if self.last_scan_end_time is None:
+            return
+        for org in self.org_manager.list_orgs():
+            if target_org is not None and org.org_id != target_org.org_id:
+                continue
+            kbs = self.kb_manager.get_all_kbs_for_org(org=org, list_adhoc=True)
+            for kb in kbs:
+                if target_kb is not None and kb.kb_id != target_kb.kb_id:
+                    continue
+                if kb.auto_schedule is False:
+                    continue
+                docsources = self.docsource_store.get_docsources_updated_since(
+                    org, kb, self.last_scan_end_time
+                )
+                for docsource in docsources:
+                    dirty.setdefault((org.org_id, kb.kb_id), set()).add(
+                        docsource.docsource_uuid
+                    )
+
+    def get_last_scan_stats(self) -> TaskScanStats:
+        with self._stats_lock:
+            return self._last_scan_stats.model_copy()
+
+    def get_total_scan_stats(self) -> TaskScanStats:
+        with self._stats_lock:
+            return self._total_scan_stats.model_copy()
+
+    def _scan_dirty_docsources(
+        self,
+        dirty: Dict[Tuple[str, str], Set[str]],
+        target_org: Optional[Org],
+        target_kb: Optional[KnowledgeBase],
+        target_docsources: Optional[List[DocSource]],
+    ) -> List[Task]:
+        if target_docsources is not None:
+            target_docsource_uuids = {ds.docsource_uuid for ds in target_docsources}
+        else:
+            target_docsource_uuids = None
+
+        new_tasks = []
+        orgs: Dict[str, Optional[Org]] = {}
+        for (org_id, kb_id), docsource_uuids in dirty.items():
+            if target_org is not None and org_id != target_org.org_id:
+                continue
+            if target_kb is not None and kb_id != target_kb.kb_id:
+                continue
+
+            if org_id not in orgs:
+                orgs[org_id] = self.org_manager.get_org_by_id(org_id)
+            org = orgs[org_id]
+            if org is None:
+                continue
+            kb = self.kb_manager.get_kb_by_id(org, kb_id)
+            if kb is None or kb.auto_schedule is False:
+                continue
+
+            for docsource_uuid in docsource_uuids:
+                if (
+                    target_docsource_uuids is not None
+                    and docsource_uuid not in target_docsource_uuids
+                ):
+                    continue
+                docsource = self.docsource_store.get_docsource(org, kb, docsource_uuid)
+                if docsource is None or docsource.is_deleted:
+                    self.recurring_docsources.get((org_id, kb_id), set()).discard(
+                        docsource_uuid
+                    )
+                    continue
+                new_tasks += self._scan_docsource(
+                    org,
+                    kb,
+                    docsource,
+                    lambda: self._has_unfinished_tasks(docsource),
+                )
+        return new_tasks
+
+    def _scan_all_docsources(
+        self,
+        target_org: Optional[Org],
+        target_kb: Optional[KnowledgeBase],
+        target_docsources: Optional[List[DocSource]],
+    ) -> List[Task]:
         cur_tasks: Dict[str, Dict[str, Dict[str, List[Task]]]] = {}
 
         if target_docsources is not None:
@@ -467,15 +767,11 @@ class TaskScannerKB(AbstractTaskScanner):
 
         new_tasks = []
         orgs = self.org_manager.list_orgs()
-        current_time = time_utils.current_datetime()
-        docsource_retry_range = timedelta(hours=self.docsource_retry_range_in_hours)
 
         for org in orgs:
             if target_org is not None and org.org_id != target_org.org_id:
                 continue
 
-            if self.last_scan_time.get(org.org_id) is None:
-                self.last_scan_time[org.org_id] = {}
             # adhoc KBs will not be in the scheduler since no retry will be performed
             kbs = self.kb_manager.get_all_kbs_for_org(org=org, list_adhoc=True)
             for kb in kbs:
@@ -484,8 +780,6 @@ class TaskScannerKB(AbstractTaskScanner):
 
                 if kb.auto_schedule is False:
                     continue
-                if self.last_scan_time[org.org_id].get(kb.kb_id) is None:
-                    self.last_scan_time[org.org_id][kb.kb_id] = {}
                 docsources = self.docsource_store.get_docsources_for_kb(org, kb)
                 for docsource in docsources:
                     if (
@@ -493,98 +787,10 @@ class TaskScannerKB(AbstractTaskScanner):
                         and docsource.docsource_uuid not in target_docsource_uuids
                     ):
                         continue
-                    schedule_config = docsource.schedule_config
-                    dssig = _get_docsource_log_sig(docsource)
-
-                    if schedule_config is None:
-                        schedule_config = ScheduleConfig(
-                            scheduler_type=ScheduleType.ONCE,
-                        )
-                        # if no schedule config, we only scan the docsource if it is not
-                        # older than the retry range
-                        if current_time - docsource.updated_at > docsource_retry_range:
-                            self.logger.noop(
-                                f"Docsource is older than "
-                                f"{self.docsource_retry_range_in_hours} hours: {dssig}",
-                                noop_lvl=1,
-                            )
-                            continue
-                    else:
-                        if schedule_config.schedule_type == ScheduleType.MANUAL:
-                            self.logger.noop(
-                                f"Docsource is set to manual run: {dssig}", noop_lvl=3
-                            )
-                            continue
-
-                    def _need_to_check_docsource() -> bool:
-
-                        if schedule_config.schedule_type == ScheduleType.RECURRING:
-                            self.logger.debug(
-                                f"Found recurring docsource to be scanned: {dssig}"
-                            )
-                            return True
-                        elif schedule_config.schedule_type == ScheduleType.MANUAL:
-                            self.logger.debug(
-                                f"Found manual docsource to be ignored: {dssig}"
-                            )
-                            return False
-
-                        # now we deal with run-to-finish docsources
-                        if not docsource.is_finished():
-                            self.logger.debug(
-                                f"Docsource is not finished [{docsource.docsource_status}]: {dssig}"
-                            )
-                            return True
-
-                        # now the docsource is finished
-                        if _docsource_in_cur_tasks(org, kb, docsource):
-                            self.logger.noop(
-                                f"Found finished docsource with unfinished tasks: {dssig}",
-                                noop_lvl=1,
-                            )
-                            return True
-                        else:
-                            self.logger.noop(
-                                f"Ignore finished docsource with no unfinished tasks: {dssig}",
-                                noop_lvl=3,
-                            )
-                        return False
-
-                    if _need_to_check_docsource() == False:
-                        self.logger.noop(
-                            f"No need to check the docsource: {dssig}", noop_lvl=3
-                        )
-                        continue
-
-                    try:
-                        all_new_tasks = self._process_docsource(org, kb, docsource)
-                        self.logger.noop(
-                            f"{len(all_new_tasks)} new tasks for docsource: {dssig}",
-                            noop_lvl=2,
-                        )
-                        if len(all_new_tasks) > 0:
-                            new_tasks += all_new_tasks
-                            docsource.docsource_status = DocSourceStatus.PROCESSING
-                            self.docsource_store.update_docsource(org, kb, docsource)
-                        else:
-                            if not docsource.is_finished():
-                                self._update_docsource_status(org, kb, docsource)
-                            else:
-                                self.logger.noop(
-                                    f"DocSource is already marked as {docsource.docsource_status}: {dssig}",
-                                    noop_lvl=2,
-                                )
-                        # last_scan_time is intended to compare the updated_at time of the docsource
-                        # but right now the updated_at time is not updated when the status is changed
-                        # so last_scan_time is not used currently.
-                        self.last_scan_time[org.org_id][kb.kb_id][
-                            docsource.docsource_uuid
-                        ] = time_utils.current_datetime()
-                    except Exception as e:
-                        self.logger.error(
-                            f"Error processing docsource for tasks {docsource.uri}: {e}"
-                        )
-        end_time = time.perf_counter()
-        elapsed_time = end_time - start_time
-        self.logger.noop(f"Task scanning took {elapsed_time:.6f} seconds.", noop_lvl=1)
+                    new_tasks += self._scan_docsource(
+                        org,
+                        kb,
+                        docsource,
+                        lambda: _docsource_in_cur_tasks(org, kb, docsource),
+                    )
         return new_tasks
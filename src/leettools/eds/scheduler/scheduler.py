@@ -6,6 +6,7 @@ from leettools.core.schemas.docsource import DocSource
 from leettools.core.schemas.knowledgebase import KnowledgeBase
 from leettools.core.schemas.organization import Org
 from leettools.eds.scheduler.schemas.job import Job
+from leettools.eds.scheduler.schemas.queue_stats import JobQueueStats
 from leettools.eds.scheduler.schemas.scheduler_status import SchedulerStatus
 
 
@@ -38,6 +39,13 @@ class AbstractScheduler(ABC):
     def get_status(self) -> SchedulerStatus:
         pass
 
+    @abstractmethod
+    def get_queue_stats(self) -> JobQueueStats:
+        """
+        Return the depth and the wait time of the job queue per program type.
+        """
+        pass
+
     @abstractmethod
     def pause(self) -> bool:
         """
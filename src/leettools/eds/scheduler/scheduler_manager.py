@@ -14,6 +14,7 @@ from leettools.core.schemas.docsource import DocSource
 from leettools.core.schemas.knowledgebase import KnowledgeBase
 from leettools.core.schemas.organization import Org
 from leettools.eds.scheduler.scheduler import AbstractScheduler
+from leettools.eds.scheduler.schemas.program import ProgramType
 from leettools.settings import SystemSettings
 
 
@@ -137,21 +138,25 @@ class SchedulerManager(metaclass=SingletonMetaSchedule):
                     f"Check {_get_lock_file(settings)} for the PID."
                 )
 
-            num_of_workers = settings.scheduler_default_number_worker
-            if num_of_workers > 32 or num_of_workers < 4:
-                logger().warning(
-                    f"Invalid number of workers {num_of_workers}. Must be between 4 and 32."
-                    "Setting the number of workers to 4."
-                )
-                num_of_workers = 4
-
-            logger().info(f"Creating a new scheduler with {num_of_workers} workers.")
+            pool_sizes = {
+                ProgramType.CONNECTOR: settings.scheduler_connector_worker_count,
+                ProgramType.CONVERT: settings.scheduler_convert_worker_count,
+                ProgramType.SPLIT: settings.scheduler_split_worker_count,
+                ProgramType.EMBED: settings.scheduler_embed_worker_count,
+            }
+            for program_type, num_of_workers in pool_sizes.items():
+                if num_of_workers > 32 or num_of_workers < 1:
+                    logger().warning(
+                        f"Invalid number of {program_type} workers {num_of_workers}. "
+                        "Must be between 1 and 32. Setting the number of workers to 1."
+                    )
+                    pool_sizes[program_type] = 1
+
+            logger().info(f"Creating a new scheduler with workers {pool_sizes}.")
 
             from leettools.eds.scheduler._impl.scheduler_simple import SchedulerSimple
 
-            self._scheduler = SchedulerSimple(
-                context=context, num_of_workers=num_of_workers
-            )
+            self._scheduler = SchedulerSimple(context=context, pool_sizes=pool_sizes)
 
     def get_scheduler(self) -> AbstractScheduler:
         return self._scheduler
@@ -162,6 +167,12 @@ def _print_scheduler_status(scheduler: AbstractScheduler) -> None:
     logger().info(f"Queued tasks: {len(scheduler.queued_tasks())}")
     logger().info(f"Running tasks: {len(scheduler.running_tasks())}")
     logger().info(f"Cooldown tasks: {len(scheduler.cooldown_tasks())}")
+    for job_class, class_stats in scheduler.get_queue_stats().job_classes.items():
+        logger().info(
+            f"Queue {job_class}: depth {class_stats.depth}, "
+            f"oldest wait {class_stats.oldest_wait_in_seconds:.1f}s, "
+            f"avg wait {class_stats.avg_wait_in_seconds:.1f}s"
+        )
 
 
 def run_scheduler(
@@ -50,6 +50,16 @@ class JobInDBBase(JobBase):
     )
     retry_count: Optional[int] = Field(None, description="The retry count.")
     is_deleted: Optional[bool] = Field(False, description="The deletion flag.")
+    lease_owner: Optional[str] = Field(
+        None, description="The id of the scheduler worker running the job."
+    )
+    lease_expires_at: Optional[datetime] = Field(
+        None,
+        description=(
+            "The time the lease of the owner expires if not renewed, after which "
+            "the job can be claimed by another scheduler."
+        ),
+    )
 
 
 class JobUpdate(JobInDBBase):
@@ -156,4 +166,6 @@ class BaseJobSchema(ABC):
             Job.FIELD_LAST_FAILED_AT: "TIMESTAMP",
             Job.FIELD_RETRY_COUNT: "INT",
             Job.FIELD_IS_DELETED: "BOOLEAN",
+            Job.FIELD_LEASE_OWNER: "VARCHAR",
+            Job.FIELD_LEASE_EXPIRES_AT: "TIMESTAMP",
         }
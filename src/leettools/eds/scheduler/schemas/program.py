@@ -1,7 +1,7 @@
 from enum import Enum
-from typing import List, Union
+from typing import Any, List, Optional, Union
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 
 from leettools.core.schemas.docsink import DocSink
 from leettools.core.schemas.docsource import DocSource
@@ -23,6 +23,12 @@ class ProgramTypeDescrtion(BaseModel):
     description: str
 
 
+def _get_field(item: Union[BaseModel, dict], field_name: str) -> Any:
+    if isinstance(item, dict):
+        return item.get(field_name)
+    return getattr(item, field_name)
+
+
 class ConnectorProgramSpec(BaseModel):
     org_id: str
     kb_id: str
@@ -36,15 +42,66 @@ class ConvertProgramSpec(BaseModel):
 
 
 class EmbedProgramSpec(BaseModel):
+    """
+    The segments to embed are referenced by their ids and read from the segment
+    store when the job runs, so that the task and job rows stay small.
+    """
+
     org_id: str
     kb_id: str
-    source: List[Segment]
+    document_uuid: str
+    segment_uuids: Optional[List[str]] = Field(
+        None,
+        description="The segments to embed, all segments of the document if None.",
+    )
+
+    @model_validator(mode="before")
+    @classmethod
+    def _from_legacy_source(cls, data: Any) -> Any:
+        # the specs stored before carry the whole segment list as the source
+        if not isinstance(data, dict) or "source" not in data:
+            return data
+        data = dict(data)
+        segments = data.pop("source") or []
+        segment_uuids = [_get_field(s, Segment.FIELD_SEGMENT_UUID) for s in segments]
+        document_uuid = ""
+        if len(segments) > 0:
+            document_uuid = _get_field(segments[0], Segment.FIELD_DOCUMENT_UUID)
+        data.setdefault("document_uuid", document_uuid)
+        data.setdefault("segment_uuids", segment_uuids)
+        return data
 
 
 class SplitProgramSpec(BaseModel):
+    """
+    The document to split is referenced by its id and read from the document store
+    when the job runs, so that the task and job rows stay small.
+    """
+
     org_id: str
     kb_id: str
-    source: Document
+    document_uuid: str
+
+    @model_validator(mode="before")
+    @classmethod
+    def _from_legacy_source(cls, data: Any) -> Any:
+        # the specs stored before carry the whole document as the source
+        if not isinstance(data, dict) or "source" not in data:
+            return data
+        data = dict(data)
+        document = data.pop("source")
+        data.setdefault(
+            "document_uuid", _get_field(document, Document.FIELD_DOCUMENT_UUID)
+        )
+        return data
+
+
+_SPEC_CLASSES = {
+    ProgramType.CONNECTOR: ConnectorProgramSpec,
+    ProgramType.CONVERT: ConvertProgramSpec,
+    ProgramType.SPLIT: SplitProgramSpec,
+    ProgramType.EMBED: EmbedProgramSpec,
+}
 
 
 class ProgramSpec(BaseModel):
@@ -57,6 +114,21 @@ class ProgramSpec(BaseModel):
         ConnectorProgramSpec, ConvertProgramSpec, SplitProgramSpec, EmbedProgramSpec
     ]
 
+    @model_validator(mode="before")
+    @classmethod
+    def _validate_real_program_spec(cls, data: Any) -> Any:
+        # the split and embed specs have similar fields, so we pick the spec
+        # class by the program type instead of letting the union guess
+        if not isinstance(data, dict):
+            return data
+        spec_class = _SPEC_CLASSES.get(data.get("program_type"))
+        real_program_spec = data.get("real_program_spec")
+        if spec_class is None or not isinstance(real_program_spec, dict):
+            return data
+        data = dict(data)
+        data["real_program_spec"] = spec_class.model_validate(real_program_spec)
+        return data
+
     @classmethod
     def get_program_type_descriptions(cls) -> List[ProgramTypeDescrtion]:
         return [
@@ -0,0 +1,31 @@
+from typing import Dict
+
+from pydantic import BaseModel, Field
+
+
+class JobClassStats(BaseModel):
+    """The queue stats of the jobs of one program type."""
+
+    depth: int = Field(0, description="The number of jobs waiting in the queue.")
+    oldest_wait_in_seconds: float = Field(
+        0.0, description="How long the oldest job in the queue has been waiting."
+    )
+    dequeued_count: int = Field(0, description="The number of jobs dequeued.")
+    avg_wait_in_seconds: float = Field(
+        0.0, description="The average time the dequeued jobs waited in the queue."
+    )
+    max_wait_in_seconds: float = Field(
+        0.0, description="The longest time a dequeued job waited in the queue."
+    )
+
+
+class JobQueueStats(BaseModel):
+    """The stats of the scheduler job queue."""
+
+    depth: int = Field(0, description="The number of jobs waiting in the queue.")
+    active_flow_count: int = Field(
+        0, description="The number of KBs with jobs waiting in the queue."
+    )
+    job_classes: Dict[str, JobClassStats] = Field(
+        {}, description="The stats per program type."
+    )
@@ -0,0 +1,28 @@
+from pydantic import BaseModel, Field
+
+
+class TaskScanStats(BaseModel):
+    """The work done by the task scanner, for one scan or accumulated."""
+
+    scan_count: int = Field(0, description="The number of scans.")
+    full_scan_count: int = Field(
+        0, description="The number of scans that visited all the docsources."
+    )
+    duration_in_ms: float = Field(0.0, description="The time spent scanning.")
+    dirty_docsource_count: int = Field(
+        0, description="The number of docsources marked as changed by the stores."
+    )
+    docsources_visited: int = Field(0, description="The docsources processed.")
+    docsinks_visited: int = Field(0, description="The docsinks processed.")
+    documents_visited: int = Field(0, description="The documents processed.")
+    new_task_count: int = Field(0, description="The tasks found to run.")
+
+    def add(self, other: "TaskScanStats") -> None:
+        self.scan_count += other.scan_count
+        self.full_scan_count += other.full_scan_count
+        self.duration_in_ms += other.duration_in_ms
+        self.dirty_docsource_count += other.dirty_docsource_count
+        self.docsources_visited += other.docsources_visited
+        self.docsinks_visited += other.docsinks_visited
+        self.documents_visited += other.documents_visited
+        self.new_task_count += other.new_task_count
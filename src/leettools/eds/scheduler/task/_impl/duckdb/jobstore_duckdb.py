@@ -1,18 +1,25 @@
+import threading
 import uuid
-from typing import Any, Dict, List, Optional
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Set
 
 from leettools.common.duckdb.duckdb_client import DuckDBClient
 from leettools.common.exceptions import EntityNotFoundException
+from leettools.common.logging import logger
 from leettools.common.utils import time_utils
 from leettools.eds.scheduler.schemas.job import Job, JobCreate, JobInDB, JobUpdate
 from leettools.eds.scheduler.schemas.job_status import JobStatus
-from leettools.eds.scheduler.schemas.program import ProgramSpec
+from leettools.eds.scheduler.schemas.program import ProgramSpec, ProgramType
 from leettools.eds.scheduler.task._impl.duckdb.jobstore_duckdb_schema import (
     JobDuckDBSchema,
 )
 from leettools.eds.scheduler.task.jobstore import AbstractJobStore
 from leettools.settings import SystemSettings
 
+# the tables whose legacy program specs have been migrated in this process
+_migrated_tables: Set[str] = set()
+_migrated_tables_lock = threading.Lock()
+
 
 class JobStoreDuckDB(AbstractJobStore):
     """
@@ -27,6 +34,12 @@ class JobStoreDuckDB(AbstractJobStore):
         self.settings = settings
         self.duckdb_client = DuckDBClient(self.settings)
         self.table_name = self._get_table_name()
+        # the table is scanned for the legacy specs once per process
+        with _migrated_tables_lock:
+            need_migration = self.table_name not in _migrated_tables
+            _migrated_tables.add(self.table_name)
+        if need_migration:
+            self.migrate_program_specs()
 
     def _dict_to_job(self, job_dict: Dict[str, Any]) -> Job:
         job_dict = job_dict.copy()
@@ -209,6 +222,103 @@ class JobStoreDuckDB(AbstractJobStore):
         )
         return self.get_job(job_uuid)
 
+    def claim_job(
+        self, job_uuid: str, lease_owner: str, lease_in_seconds: int
+    ) -> Optional[Job]:
+        now = time_utils.current_datetime()
+        rtn_list = self.duckdb_client.update_table_returning(
+            table_name=self.table_name,
+            column_list=[Job.FIELD_LEASE_OWNER, Job.FIELD_LEASE_EXPIRES_AT],
+            value_list=[
+                lease_owner,
+                now + timedelta(seconds=lease_in_seconds),
+                job_uuid,
+                lease_owner,
+                now,
+            ],
+            where_clause=f"""
+                WHERE {Job.FIELD_JOB_UUID} = ?
+                AND (
+                    {Job.FIELD_LEASE_OWNER} IS NULL
+                    OR {Job.FIELD_LEASE_OWNER} = ?
+                    OR {Job.FIELD_LEASE_EXPIRES_AT} < ?
+                )
+            """,
+            returning_columns=[Job.FIELD_JOB_UUID],
+        )
+        if len(rtn_list) == 0:
+            return None
+        return self.get_job(job_uuid)
+
+    def renew_lease(
+        self, job_uuid: str, lease_owner: str, lease_in_seconds: int
+    ) -> bool:
+        expires_at = time_utils.current_datetime() + timedelta(seconds=lease_in_seconds)
+        rtn_list = self.duckdb_client.update_table_returning(
+            table_name=self.table_name,
+            column_list=[Job.FIELD_LEASE_EXPIRES_AT],
+            value_list=[expires_at, job_uuid, lease_owner],
+            where_clause=(
+                f"WHERE {Job.FIELD_JOB_UUID} = ? AND {Job.FIELD_LEASE_OWNER} = ?"
+            ),
+            returning_columns=[Job.FIELD_JOB_UUID],
+        )
+        return len(rtn_list) > 0
+
+    def release_lease(self, job_uuid: str, lease_owner: str) -> None:
+        self.duckdb_client.update_table(
+            table_name=self.table_name,
+            column_list=[Job.FIELD_LEASE_OWNER, Job.FIELD_LEASE_EXPIRES_AT],
+            value_list=[None, None, job_uuid, lease_owner],
+            where_clause=(
+                f"WHERE {Job.FIELD_JOB_UUID} = ? AND {Job.FIELD_LEASE_OWNER} = ?"
+            ),
+        )
+
+    def migrate_program_specs(self) -> int:
+        where_clause = f"""
+            WHERE json_valid({Job.FIELD_PROGRAM_SPEC})
+            AND json_extract_string({Job.FIELD_PROGRAM_SPEC}, '$.program_type')
+                IN (?, ?)
+            AND json_exists({Job.FIELD_PROGRAM_SPEC}, '$.real_program_spec.source')
+        """
+        value_list = [ProgramType.SPLIT.value, ProgramType.EMBED.value]
+        rtn_list = self.duckdb_client.fetch_all_from_table(
+            table_name=self.table_name,
+            column_list=[Job.FIELD_JOB_UUID, Job.FIELD_PROGRAM_SPEC],
+            value_list=value_list,
+            where_clause=where_clause,
+        )
+        migrated_count = 0
+        for rtn_dict in rtn_list:
+            # the program spec validators convert the legacy source to the ids
+            try:
+                program_spec = ProgramSpec.model_validate_json(
+                    rtn_dict[Job.FIELD_PROGRAM_SPEC]
+                )
+            except Exception as e:
+                logger().warning(
+                    "Skip migrating the invalid program spec of job "
+                    f"{rtn_dict[Job.FIELD_JOB_UUID]}: {e}"
+                )
+                continue
+            self.duckdb_client.update_table(
+                table_name=self.table_name,
+                column_list=[Job.FIELD_PROGRAM_SPEC],
+                value_list=[
+                    program_spec.model_dump_json(),
+                    rtn_dict[Job.FIELD_JOB_UUID],
+                ],
+                where_clause=f"WHERE {Job.FIELD_JOB_UUID} = ?",
+            )
+            migrated_count += 1
+        if migrated_count > 0:
+            logger().info(
+                f"Migrated the program specs of {migrated_count} jobs "
+                "to the id-only specs."
+            )
+        return migrated_count
+
     def _reset_for_test(self) -> None:
         assert self.settings.DUCKDB_FILE == "duckdb_test.db"
         self.duckdb_client.delete_from_table(table_name=self.table_name)
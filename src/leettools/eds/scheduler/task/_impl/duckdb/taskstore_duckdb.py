@@ -1,5 +1,6 @@
+import threading
 import uuid
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set
 
 from leettools.common.duckdb.duckdb_client import DuckDBClient
 from leettools.common.exceptions import EntityNotFoundException, UnexpectedCaseException
@@ -10,7 +11,7 @@ from leettools.core.schemas.docsource import DocSource
 from leettools.core.schemas.document import Document
 from leettools.core.schemas.knowledgebase import KnowledgeBase
 from leettools.core.schemas.organization import Org
-from leettools.eds.scheduler.schemas.program import ProgramSpec
+from leettools.eds.scheduler.schemas.program import ProgramSpec, ProgramType
 from leettools.eds.scheduler.schemas.task import (
     Task,
     TaskCreate,
@@ -24,6 +25,10 @@ from leettools.eds.scheduler.task._impl.duckdb.taskstore_duckdb_schema import (
 from leettools.eds.scheduler.task.taskstore import AbstractTaskStore
 from leettools.settings import SystemSettings
 
+# the tables whose legacy program specs have been migrated in this process
+_migrated_tables: Set[str] = set()
+_migrated_tables_lock = threading.Lock()
+
 
 class TaskStoreDuckDB(AbstractTaskStore):
     """
@@ -39,6 +44,12 @@ class TaskStoreDuckDB(AbstractTaskStore):
         self.settings = settings
         self.duckdb_client = DuckDBClient(self.settings)
         self.table_name = self._get_table_name()
+        # the table is scanned for the legacy specs once per process
+        with _migrated_tables_lock:
+            need_migration = self.table_name not in _migrated_tables
+            _migrated_tables.add(self.table_name)
+        if need_migration:
+            self.migrate_program_specs()
 
     def _dict_to_task(self, task_dict: Dict[str, Any]) -> Task:
         task_dict = task_dict.copy()
@@ -266,6 +277,50 @@ class TaskStoreDuckDB(AbstractTaskStore):
         )
         return self.get_task_by_uuid(task_uuid)
 
+    def migrate_program_specs(self) -> int:
+        where_clause = f"""
+            WHERE json_valid({Task.FIELD_PROGRAM_SPEC})
+            AND json_extract_string({Task.FIELD_PROGRAM_SPEC}, '$.program_type')
+                IN (?, ?)
+            AND json_exists({Task.FIELD_PROGRAM_SPEC}, '$.real_program_spec.source')
+        """
+        value_list = [ProgramType.SPLIT.value, ProgramType.EMBED.value]
+        rtn_list = self.duckdb_client.fetch_all_from_table(
+            table_name=self.table_name,
+            column_list=[Task.FIELD_TASK_UUID, Task.FIELD_PROGRAM_SPEC],
+            value_list=value_list,
+            where_clause=where_clause,
+        )
+        migrated_count = 0
+        for rtn_dict in rtn_list:
+            # the program spec validators convert the legacy source to the ids
+            try:
+                program_spec = ProgramSpec.model_validate_json(
+                    rtn_dict[Task.FIELD_PROGRAM_SPEC]
+                )
+            except Exception as e:
+                logger().warning(
+                    "Skip migrating the invalid program spec of task "
+                    f"{rtn_dict[Task.FIELD_TASK_UUID]}: {e}"
+                )
+                continue
+            self.duckdb_client.update_table(
+                table_name=self.table_name,
+                column_list=[Task.FIELD_PROGRAM_SPEC],
+                value_list=[
+                    program_spec.model_dump_json(),
+                    rtn_dict[Task.FIELD_TASK_UUID],
+                ],
+                where_clause=f"WHERE {Task.FIELD_TASK_UUID} = ?",
+            )
+            migrated_count += 1
+        if migrated_count > 0:
+            logger().info(
+                f"Migrated the program specs of {migrated_count} tasks "
+                "to the id-only specs."
+            )
+        return migrated_count
+
     def _reset_for_test(self) -> None:
         assert self.settings.DUCKDB_FILE == "duckdb_test.db"
         self.duckdb_client.delete_from_table(table_name=self.table_name)
@@ -37,6 +37,66 @@ class AbstractJobStore(ABC):
     def update_job_status(self, job_uuid: str, job_status: JobStatus) -> Job:
         pass
 
+    @abstractmethod
+    def claim_job(
+        self, job_uuid: str, lease_owner: str, lease_in_seconds: int
+    ) -> Optional[Job]:
+        """
+        Take the lease of a job atomically so that only one scheduler runs it.
+
+        The lease can be taken if the job has no lease, the lease has expired, or
+        the lease is already held by the same owner.
+
+        Args:
+        - job_uuid: The job UUID.
+        - lease_owner: The id of the scheduler worker claiming the job.
+        - lease_in_seconds: How long the lease lasts if not renewed.
+
+        Returns:
+        - The claimed job, or None if the job is leased by another owner.
+        """
+        pass
+
+    @abstractmethod
+    def renew_lease(
+        self, job_uuid: str, lease_owner: str, lease_in_seconds: int
+    ) -> bool:
+        """
+        Extend the lease of a job held by the owner, called as the heartbeat of
+        the running job.
+
+        Args:
+        - job_uuid: The job UUID.
+        - lease_owner: The id of the scheduler worker holding the lease.
+        - lease_in_seconds: How long the lease lasts from now if not renewed.
+
+        Returns:
+        - True if the lease is renewed, False if the owner no longer holds it.
+        """
+        pass
+
+    @abstractmethod
+    def release_lease(self, job_uuid: str, lease_owner: str) -> None:
+        """
+        Release the lease of a job held by the owner.
+
+        Args:
+        - job_uuid: The job UUID.
+        - lease_owner: The id of the scheduler worker holding the lease.
+        """
+        pass
+
+    @abstractmethod
+    def migrate_program_specs(self) -> int:
+        """
+        Rewrite the split and embed program specs stored with the whole document
+        or segment list as their source to the specs with only the ids.
+
+        Returns:
+        - The number of jobs rewritten.
+        """
+        pass
+
     @abstractmethod
     def _reset_for_test(self) -> None:
         """
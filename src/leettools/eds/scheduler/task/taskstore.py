@@ -162,6 +162,17 @@ class AbstractTaskStore(ABC):
         """
         pass
 
+    @abstractmethod
+    def migrate_program_specs(self) -> int:
+        """
+        Rewrite the split and embed program specs stored with the whole document
+        or segment list as their source to the specs with only the ids.
+
+        Returns:
+        - The number of tasks rewritten.
+        """
+        pass
+
     @abstractmethod
     def _reset_for_test(self) -> None:
         """
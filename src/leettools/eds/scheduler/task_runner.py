@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import List
 
 from leettools.eds.scheduler.schemas.job import Job
 
@@ -21,3 +22,18 @@ class AbstractTaskRunner(ABC):
         - The job after running.
         """
         pass
+
+    def run_jobs(self, jobs: List[Job]) -> List[Job]:
+        """
+        Run the jobs taken together by a worker and update them.
+
+        The default runs the jobs one by one, a runner can override it to run
+        similar jobs together, e.g. to embed their segments in one batch.
+
+        Args:
+        - jobs: The jobs to run.
+
+        Returns:
+        - The jobs after running, in the same order.
+        """
+        return [self.run_job(job) for job in jobs]
@@ -4,6 +4,7 @@ from typing import List, Optional
 from leettools.core.schemas.docsource import DocSource
 from leettools.core.schemas.knowledgebase import KnowledgeBase
 from leettools.core.schemas.organization import Org
+from leettools.eds.scheduler.schemas.scan_stats import TaskScanStats
 from leettools.eds.scheduler.schemas.task import Task
 
 
@@ -28,3 +29,39 @@ class AbstractTaskScanner(ABC):
         - The tasks that need to run.
         """
         pass
+
+    @abstractmethod
+    def scan_changes_for_tasks(
+        self,
+        target_org: Optional[Org] = None,
+        target_kb: Optional[KnowledgeBase] = None,
+        target_docsources: Optional[List[DocSource]] = None,
+    ) -> List[Task]:
+        """
+        Scan the docsources changed since the last scan for tasks. All docsources
+        are scanned as in scan_kb_for_tasks once every reconciliation interval, to
+        pick up the changes not reported by the stores.
+
+        Args:
+        - target_org: The organization to scan, if None, scan all organizations.
+        - target_kb: The knowledgebase to scan, if None, scan all knowledgebases in the org.
+        - target_docsources: The docsource to scan, if None, scan all docsources in the kb.
+
+        Returns:
+        - The tasks that need to run.
+        """
+        pass
+
+    @abstractmethod
+    def get_last_scan_stats(self) -> TaskScanStats:
+        """
+        Get the stats of the last scan.
+        """
+        pass
+
+    @abstractmethod
+    def get_total_scan_stats(self) -> TaskScanStats:
+        """
+        Get the stats accumulated since the scanner was created.
+        """
+        pass
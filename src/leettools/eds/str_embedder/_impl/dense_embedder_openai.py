@@ -1,4 +1,7 @@
-from typing import Any, Dict, Optional
+import time
+from typing import Any, Dict, List, Optional
+
+import openai
 
 from leettools.common.exceptions import ConfigValueException
 from leettools.common.logging import logger
@@ -17,12 +20,30 @@ from leettools.eds.str_embedder.schemas.schema_dense_embedder import (
     DenseEmbeddingRequest,
     DenseEmbeddings,
 )
+from leettools.eds.str_embedder.utils.embedding_rate_limiter import (
+    est_token_count,
+    get_embedding_rate_limiter,
+    split_by_token_budget,
+)
 from leettools.eds.usage.schemas.usage_api_call import (
     API_CALL_ENDPOINT_EMBED,
     UsageAPICallCreate,
 )
 from leettools.settings import SystemSettings
 
+# the errors worth retrying after a while
+_RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+def _is_token_limit_error(e: openai.BadRequestError) -> bool:
+    message = str(e).lower()
+    return "token" in message and ("maximum" in message or "limit" in message)
+
 
 class DenseEmbedderOpenAI(AbstractDenseEmbedder):
 
@@ -84,15 +105,80 @@ class DenseEmbedderOpenAI(AbstractDenseEmbedder):
         self.api_provider_config, self.openai = get_openai_embedder_client_for_user(
             context=self.context, user=user, api_provider_config=None
         )
+        # the retries are done by _embed_with_retry within the rate limits
+        self.api_client = self.openai.with_options(max_retries=0)
+        self.settings = settings
+        self.rate_limiter = get_embedding_rate_limiter(
+            settings, str(self.api_provider_config.base_url), self.model_name
+        )
 
     def embed(self, embed_requests: DenseEmbeddingRequest) -> DenseEmbeddings:
+        rtn_list: List[List[float]] = []
+        for sentences in split_by_token_budget(
+            embed_requests.sentences,
+            max_tokens=self.settings.embed_max_tokens_per_request,
+            max_inputs=self.settings.embed_max_inputs_per_request,
+        ):
+            rtn_list.extend(self._embed_with_split(sentences))
+        return DenseEmbeddings(dense_embeddings=rtn_list)
 
+    def _embed_with_split(self, sentences: List[str]) -> List[List[float]]:
+        """
+        Embed the sentences, split the batch into halves if the provider rejects
+        it for having too many tokens.
+        """
+        try:
+            return self._embed_with_retry(sentences)
+        except openai.BadRequestError as e:
+            if len(sentences) == 1 or not _is_token_limit_error(e):
+                raise e
+            logger().info(
+                f"Embedding batch of {len(sentences)} texts is too large, splitting it."
+            )
+            middle = len(sentences) // 2
+            first_half = self._embed_with_split(sentences[:middle])
+            return first_half + self._embed_with_split(sentences[middle:])
+
+    def _embed_with_retry(self, sentences: List[str]) -> List[List[float]]:
+        """
+        Embed the sentences within the rate limits, retry the failures caused by
+        the rate limits, timeouts, and server errors with backoff.
+        """
+        token_count = sum(est_token_count(sentence) for sentence in sentences)
+        max_retries = self.settings.embed_max_retries
+        attempt = 0
+        while True:
+            with self.rate_limiter.acquire(token_count):
+                try:
+                    return self._call_embedding_api(sentences)
+                except _RETRYABLE_ERRORS as e:
+                    attempt += 1
+                    headers = None
+                    if isinstance(e, openai.APIStatusError):
+                        headers = e.response.headers
+                    if isinstance(e, openai.RateLimitError):
+                        if e.code == "insufficient_quota":
+                            raise e
+                        self.rate_limiter.on_rate_limited()
+                    if attempt > max_retries:
+                        raise e
+                    delay = self.rate_limiter.get_backoff_in_seconds(attempt, headers)
+                    logger().warning(
+                        f"Embedding request failed: {e}. Retrying in {delay:.1f}s "
+                        f"({attempt}/{max_retries})."
+                    )
+            # wait outside the concurrency slot so that other requests can run
+            time.sleep(delay)
+
+    def _call_embedding_api(self, sentences: List[str]) -> List[List[float]]:
         response = None
         start_timestamp_in_ms = time_utils.cur_timestamp_in_ms()
         try:
-            response = self.openai.embeddings.create(
-                input=embed_requests.sentences, model=self.model_name
+            raw_response = self.api_client.embeddings.with_raw_response.create(
+                input=sentences, model=self.model_name
             )
+            self.rate_limiter.update_from_headers(raw_response.headers)
+            response = raw_response.parse()
             rtn_list = []
             for i in range(len(response.data)):
                 rtn_list.append(response.data[i].embedding)
@@ -123,13 +209,13 @@ class DenseEmbedderOpenAI(AbstractDenseEmbedder):
                 end_timestamp_in_ms=end_timestamp_in_ms,
                 is_batch=False,
                 system_prompt="",
-                user_prompt="\n".join(embed_requests.sentences),
+                user_prompt="\n".join(sentences),
                 call_target="embed",
                 input_token_count=input_token_count,
                 output_token_count=output_token_count,
             )
             self.usage_store.record_api_call(usage_api_call)
-        return DenseEmbeddings(dense_embeddings=rtn_list)
+        return rtn_list
 
     def get_model_name(self) -> str:
         return self.model_name
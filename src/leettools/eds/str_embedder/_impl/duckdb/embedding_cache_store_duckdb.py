@@ -0,0 +1,130 @@
+from typing import Dict, List, Optional
+
+from leettools.common.duckdb.duckdb_client import DuckDBClient
+from leettools.common.utils import time_utils
+from leettools.eds.str_embedder._impl.duckdb.embedding_cache_store_duckdb_schema import (
+    EmbeddingCacheDuckDBSchema,
+)
+from leettools.eds.str_embedder.embedding_cache_store import (
+    AbstractEmbeddingCacheStore,
+)
+from leettools.settings import SystemSettings
+
+
+class EmbeddingCacheStoreDuckDB(AbstractEmbeddingCacheStore):
+
+    def __init__(self, settings: SystemSettings) -> None:
+        self.settings = settings
+        self.duckdb_client = DuckDBClient(self.settings)
+
+    def _get_table_name(self, cache_name: str) -> str:
+        return self.duckdb_client.create_table_if_not_exists(
+            self.settings.DB_COMMOM,
+            cache_name,
+            EmbeddingCacheDuckDBSchema.get_schema(),
+        )
+
+    def get_embeddings(
+        self,
+        cache_name: str,
+        cache_keys: List[str],
+        min_timestamp_in_ms: Optional[int] = None,
+    ) -> Dict[str, List[float]]:
+        if not cache_keys:
+            return {}
+        table_name = self._get_table_name(cache_name)
+        unique_keys = list(dict.fromkeys(cache_keys))
+        where_clause = (
+            f"WHERE {EmbeddingCacheDuckDBSchema.FIELD_CACHE_KEY} IN "
+            f"({','.join(['?'] * len(unique_keys))})"
+        )
+        value_list = unique_keys
+        if min_timestamp_in_ms is not None:
+            where_clause += (
+                f" AND {EmbeddingCacheDuckDBSchema.FIELD_CREATED_TIMESTAMP_IN_MS} >= ?"
+            )
+            value_list = unique_keys + [min_timestamp_in_ms]
+        rows = self.duckdb_client.fetch_all_from_table(
+            table_name=table_name,
+            column_list=[
+                EmbeddingCacheDuckDBSchema.FIELD_CACHE_KEY,
+                EmbeddingCacheDuckDBSchema.FIELD_EMBEDDINGS,
+            ],
+            where_clause=where_clause,
+            value_list=value_list,
+        )
+        return {
+            row[EmbeddingCacheDuckDBSchema.FIELD_CACHE_KEY]: row[
+                EmbeddingCacheDuckDBSchema.FIELD_EMBEDDINGS
+            ]
+            for row in rows
+        }
+
+    def save_embeddings(
+        self, cache_name: str, embeddings: Dict[str, List[float]]
+    ) -> None:
+        if not embeddings:
+            return
+        table_name = self._get_table_name(cache_name)
+        timestamp_in_ms = time_utils.cur_timestamp_in_ms()
+        # an expired entry may still be in the table, refresh its timestamp, the
+        # embedding of a cache key does not change
+        self.duckdb_client.batch_upsert_into_table(
+            table_name=table_name,
+            column_list=[
+                EmbeddingCacheDuckDBSchema.FIELD_CACHE_KEY,
+                EmbeddingCacheDuckDBSchema.FIELD_EMBEDDINGS,
+                EmbeddingCacheDuckDBSchema.FIELD_CREATED_TIMESTAMP_IN_MS,
+            ],
+            values=[
+                [cache_key, embedding, timestamp_in_ms]
+                for cache_key, embedding in embeddings.items()
+            ],
+            update_column_list=[
+                EmbeddingCacheDuckDBSchema.FIELD_CREATED_TIMESTAMP_IN_MS
+            ],
+        )
+
+    def _count(self, table_name: str) -> int:
+        row = self.duckdb_client.fetch_one_from_table(
+            table_name=table_name, column_list=["COUNT(*) AS count"]
+        )
+        return row["count"] if row else 0
+
+    def evict_embeddings(
+        self, cache_name: str, max_entries: int, min_timestamp_in_ms: int
+    ) -> int:
+        table_name = self._get_table_name(cache_name)
+        count_before = self._count(table_name)
+        self.duckdb_client.delete_from_table(
+            table_name=table_name,
+            where_clause=(
+                f"WHERE {EmbeddingCacheDuckDBSchema.FIELD_CREATED_TIMESTAMP_IN_MS} < ?"
+            ),
+            value_list=[min_timestamp_in_ms],
+        )
+        count = self._count(table_name)
+        if count > max_entries:
+            # the created timestamp of the newest entry to evict
+            row = self.duckdb_client.fetch_one_from_table(
+                table_name=table_name,
+                column_list=[EmbeddingCacheDuckDBSchema.FIELD_CREATED_TIMESTAMP_IN_MS],
+                where_clause=(
+                    f"ORDER BY {EmbeddingCacheDuckDBSchema.FIELD_CREATED_TIMESTAMP_IN_MS} "
+                    f"DESC LIMIT 1 OFFSET ?"
+                ),
+                value_list=[max_entries],
+            )
+            if row is not None:
+                self.duckdb_client.delete_from_table(
+                    table_name=table_name,
+                    where_clause=(
+                        f"WHERE {EmbeddingCacheDuckDBSchema.FIELD_CREATED_TIMESTAMP_IN_MS}"
+                        f" <= ?"
+                    ),
+                    value_list=[
+                        row[EmbeddingCacheDuckDBSchema.FIELD_CREATED_TIMESTAMP_IN_MS]
+                    ],
+                )
+            count = self._count(table_name)
+        return count_before - count
@@ -0,0 +1,20 @@
+from dataclasses import dataclass
+from typing import Any, Dict
+
+
+@dataclass
+class EmbeddingCacheDuckDBSchema:
+    """DuckDB-specific schema for the embedding cache tables."""
+
+    FIELD_CACHE_KEY = "cache_key"
+    FIELD_EMBEDDINGS = "embeddings"
+    FIELD_CREATED_TIMESTAMP_IN_MS = "created_timestamp_in_ms"
+
+    @classmethod
+    def get_schema(cls) -> Dict[str, Any]:
+        return {
+            cls.FIELD_CACHE_KEY: "VARCHAR PRIMARY KEY",
+            # the dimension depends on the embedder, so use a variable-size list
+            cls.FIELD_EMBEDDINGS: "FLOAT[]",
+            cls.FIELD_CREATED_TIMESTAMP_IN_MS: "BIGINT",
+        }
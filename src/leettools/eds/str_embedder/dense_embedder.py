@@ -1,9 +1,9 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional, TypeVar
+from typing import Any, Dict, List, Optional, TypeVar
 
 from leettools.common import exceptions
 from leettools.common.logging import logger
-from leettools.context_manager import Context
+from leettools.context_manager import Context, ContextManager
 from leettools.core.schemas.knowledgebase import KnowledgeBase
 from leettools.core.schemas.organization import Org
 from leettools.core.schemas.user import User
@@ -49,6 +49,46 @@ class AbstractDenseEmbedder(ABC):
         """
         pass
 
+    def embed_query(self, query: str) -> List[float]:
+        """
+        Embeds a query string into a vector, using the query embedding cache.
+
+        The cache is shared by all the embedders in the process and keyed by the
+        embedder class, the model name, the dimension, and the query text, so the
+        same query is only sent to the model or service once.
+
+        Args:
+        - query: The query to embed.
+
+        Returns:
+        - The embedding of the query.
+        """
+        from leettools.eds.str_embedder.query_embedding_cache import (
+            get_embedding_cache_key,
+            get_query_embedding_cache,
+        )
+
+        settings = ContextManager().get_context().settings
+        cache = get_query_embedding_cache(settings)
+        if cache is None:
+            embed_request = DenseEmbeddingRequest(sentences=[query])
+            return self.embed(embed_request).dense_embeddings[0]
+
+        cache_key = get_embedding_cache_key(
+            embedder_class=self.__class__.__qualname__,
+            model_name=self.get_model_name(),
+            dimension=self.get_dimension(),
+            text=query,
+        )
+        embedding = cache.get(cache_key)
+        if embedding is not None:
+            return embedding
+
+        embed_request = DenseEmbeddingRequest(sentences=[query])
+        embedding = self.embed(embed_request).dense_embeddings[0]
+        cache.put(cache_key, embedding)
+        return embedding
+
     @abstractmethod
     def get_dimension(self) -> int:
         """
@@ -0,0 +1,93 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+from leettools.settings import SystemSettings
+
+
+class AbstractEmbeddingCacheStore(ABC):
+    """
+    A persistent store of embeddings keyed by a hash of the embedder and the text.
+
+    Each cache, such as the query embedding cache, is kept in its own table.
+    """
+
+    @abstractmethod
+    def __init__(self, settings: SystemSettings):
+        """
+        Initialize the embedding cache store.
+
+        Args:
+        -   settings: The system settings.
+        """
+        pass
+
+    @abstractmethod
+    def get_embeddings(
+        self,
+        cache_name: str,
+        cache_keys: List[str],
+        min_timestamp_in_ms: Optional[int] = None,
+    ) -> Dict[str, List[float]]:
+        """
+        Get the cached embeddings for a list of keys with one query.
+
+        Args:
+        -   cache_name: The name of the cache.
+        -   cache_keys: The keys to look up.
+        -   min_timestamp_in_ms: If set, ignore the entries created before it.
+
+        Returns:
+        -   The embeddings found, keyed by the cache key.
+        """
+        pass
+
+    @abstractmethod
+    def save_embeddings(
+        self, cache_name: str, embeddings: Dict[str, List[float]]
+    ) -> None:
+        """
+        Save a batch of embeddings into the cache.
+
+        Args:
+        -   cache_name: The name of the cache.
+        -   embeddings: The embeddings to save, keyed by the cache key.
+        """
+        pass
+
+    @abstractmethod
+    def evict_embeddings(
+        self, cache_name: str, max_entries: int, min_timestamp_in_ms: int
+    ) -> int:
+        """
+        Evict the entries created before the timestamp, then the oldest entries
+        until there are at most max_entries entries left.
+
+        Args:
+        -   cache_name: The name of the cache.
+        -   max_entries: The max number of entries to keep.
+        -   min_timestamp_in_ms: The entries created before it are evicted.
+
+        Returns:
+        -   The number of entries evicted.
+        """
+        pass
+
+
+def create_embedding_cache_store(
+    settings: SystemSettings,
+) -> AbstractEmbeddingCacheStore:
+    """
+    Get the embedding cache store.
+
+    Returns:
+    The embedding cache store.
+    """
+
+    from leettools.common.utils import factory_util
+
+    return factory_util.create_manager_with_repo_type(
+        manager_name="embedding_cache_store",
+        repo_type=settings.DOC_STORE_TYPE,
+        base_class=AbstractEmbeddingCacheStore,
+        settings=settings,
+    )
@@ -0,0 +1,181 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from leettools.common.logging import logger
+from leettools.common.utils import time_utils
+from leettools.eds.str_embedder.embedding_cache_store import (
+    AbstractEmbeddingCacheStore,
+)
+from leettools.settings import SystemSettings
+
+QUERY_EMBEDDING_CACHE_NAME = "query_embedding_cache"
+
+
+class EmbeddingCacheStats(BaseModel):
+    hits: int = 0
+    persistent_hits: int = 0
+    misses: int = 0
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.persistent_hits + self.misses
+        if total == 0:
+            return 0.0
+        return (self.hits + self.persistent_hits) / total
+
+
+def get_embedding_cache_key(
+    embedder_class: str, model_name: str, dimension: int, text: str
+) -> str:
+    """
+    Get the cache key of an embedding. Whitespace in the text is normalized so
+    that the same text with different spacing shares the same key.
+
+    Args:
+    - embedder_class: The name of the embedder class.
+    - model_name: The model name of the embedder.
+    - dimension: The dimension of the embedding.
+    - text: The text to embed.
+
+    Returns:
+    - The sha256 hex digest of the key fields.
+    """
+    normalized_text = " ".join(text.split())
+    key = f"{embedder_class}\x00{model_name}\x00{dimension}\x00{normalized_text}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class QueryEmbeddingCache:
+    """
+    An in-memory LRU cache with TTL for the query embeddings used in the dense
+    search, with an optional persistent tier in the embedding cache store.
+
+    The same query is often embedded many times, from the rewrites, the retries,
+    and the scheduled flows, and each time is a paid call to the embedding service.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl_in_seconds: int,
+        cache_store: Optional[AbstractEmbeddingCacheStore] = None,
+    ) -> None:
+        self.max_size = max_size
+        self.ttl_in_seconds = ttl_in_seconds
+        self.cache_store = cache_store
+        self._lock = threading.Lock()
+        # key -> (expire time from time.monotonic(), embedding)
+        self._entries: OrderedDict[str, Tuple[float, List[float]]] = OrderedDict()
+        self._stats = EmbeddingCacheStats()
+
+    def get(self, cache_key: str) -> Optional[List[float]]:
+        """
+        Get the embedding for the key, None if not cached or expired.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(cache_key)
+                    self._stats.hits += 1
+                    return entry[1]
+                del self._entries[cache_key]
+
+        if self.cache_store is not None:
+            min_timestamp_in_ms = (
+                time_utils.cur_timestamp_in_ms() - self.ttl_in_seconds * 1000
+            )
+            try:
+                embeddings = self.cache_store.get_embeddings(
+                    cache_name=QUERY_EMBEDDING_CACHE_NAME,
+                    cache_keys=[cache_key],
+                    min_timestamp_in_ms=min_timestamp_in_ms,
+                )
+            except Exception as e:
+                logger().warning(f"Failed to read the query embedding cache: {e}")
+                embeddings = {}
+            embedding = embeddings.get(cache_key)
+            if embedding is not None:
+                self._put_in_memory(cache_key, embedding)
+                with self._lock:
+                    self._stats.persistent_hits += 1
+                return embedding
+
+        with self._lock:
+            self._stats.misses += 1
+        return None
+
+    def put(self, cache_key: str, embedding: List[float]) -> None:
+        """
+        Add the embedding to the cache, evicting the least recently used entry if
+        the cache is full.
+        """
+        self._put_in_memory(cache_key, embedding)
+        if self.cache_store is not None:
+            try:
+                self.cache_store.save_embeddings(
+                    cache_name=QUERY_EMBEDDING_CACHE_NAME,
+                    embeddings={cache_key: embedding},
+                )
+            except Exception as e:
+                logger().warning(f"Failed to save the query embedding cache: {e}")
+
+    def _put_in_memory(self, cache_key: str, embedding: List[float]) -> None:
+        expire_at = time.monotonic() + self.ttl_in_seconds
+        with self._lock:
+            self._entries[cache_key] = (expire_at, embedding)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_stats(self) -> EmbeddingCacheStats:
+        with self._lock:
+            return self._stats.model_copy()
+
+    def clear(self) -> None:
+        """Remove all the in-memory entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._stats = EmbeddingCacheStats()
+
+
+_query_embedding_cache: Optional[QueryEmbeddingCache] = None
+_query_embedding_cache_lock = threading.Lock()
+
+
+def get_query_embedding_cache(
+    settings: SystemSettings,
+) -> Optional[QueryEmbeddingCache]:
+    """
+    Get the query embedding cache shared by all the dense embedders in the process.
+
+    Args:
+    - settings: The system settings.
+
+    Returns:
+    - The cache, or None if QUERY_EMBEDDING_CACHE_SIZE is 0.
+    """
+    global _query_embedding_cache
+    if settings.QUERY_EMBEDDING_CACHE_SIZE <= 0:
+        return None
+    if _query_embedding_cache is None:
+        with _query_embedding_cache_lock:
+            if _query_embedding_cache is None:
+                cache_store = None
+                if settings.QUERY_EMBEDDING_CACHE_PERSISTENT:
+                    from leettools.eds.str_embedder.embedding_cache_store import (
+                        create_embedding_cache_store,
+                    )
+
+                    cache_store = create_embedding_cache_store(settings)
+                _query_embedding_cache = QueryEmbeddingCache(
+                    max_size=settings.QUERY_EMBEDDING_CACHE_SIZE,
+                    ttl_in_seconds=settings.QUERY_EMBEDDING_CACHE_TTL_IN_SECONDS,
+                    cache_store=cache_store,
+                )
+    return _query_embedding_cache
@@ -0,0 +1,222 @@
+import threading
+import time
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+from leettools.common.logging import logger
+from leettools.common.utils import time_utils
+from leettools.common.utils.tokenizer import Tokenizer
+from leettools.eds.str_embedder.dense_embedder import AbstractDenseEmbedder
+from leettools.eds.str_embedder.embedding_cache_store import (
+    AbstractEmbeddingCacheStore,
+)
+from leettools.eds.str_embedder.query_embedding_cache import get_embedding_cache_key
+from leettools.settings import SystemSettings
+
+SEGMENT_EMBEDDING_CACHE_NAME = "segment_embedding_cache"
+
+# token per character for English, used if the tokenizer is not available
+DEFAULT_TOKEN_PER_CHAR_RATIO = 0.30
+
+
+class SegmentEmbeddingCacheStats(BaseModel):
+    cached_segment_count: int = 0
+    embedded_segment_count: int = 0
+    saved_token_count: int = 0
+
+    def add(self, other: "SegmentEmbeddingCacheStats") -> None:
+        self.cached_segment_count += other.cached_segment_count
+        self.embedded_segment_count += other.embedded_segment_count
+        self.saved_token_count += other.saved_token_count
+
+
+class SegmentEmbeddingCache:
+    """
+    A persistent cache from the hash of the embedder and the segment content to the
+    embedding, used at ingestion time so that identical chunks, such as the ones
+    from re-ingested docsources, mirror sites, or re-split documents, are only
+    embedded once.
+
+    The entries older than SEGMENT_EMBEDDING_CACHE_MAX_AGE_IN_DAYS are evicted, and
+    the oldest entries are evicted when the cache has more than
+    SEGMENT_EMBEDDING_CACHE_MAX_ENTRIES entries. The eviction scans the whole
+    cache table, so it runs at most once every
+    SEGMENT_EMBEDDING_CACHE_EVICT_INTERVAL_IN_SECONDS instead of after every upsert.
+    """
+
+    def __init__(
+        self, settings: SystemSettings, cache_store: AbstractEmbeddingCacheStore
+    ) -> None:
+        self.settings = settings
+        self.cache_store = cache_store
+        self.tokenizer = Tokenizer(settings)
+        self._lock = threading.Lock()
+        self._stats = SegmentEmbeddingCacheStats()
+        # the monotonic time of the last eviction, None if not evicted yet
+        self._last_evict_time: Optional[float] = None
+
+    def _get_cache_key(self, dense_embedder: AbstractDenseEmbedder, text: str) -> str:
+        return get_embedding_cache_key(
+            embedder_class=dense_embedder.__class__.__qualname__,
+            model_name=dense_embedder.get_model_name(),
+            dimension=dense_embedder.get_dimension(),
+            text=text,
+        )
+
+    def _est_token_count(self, text: str) -> int:
+        try:
+            return self.tokenizer.est_token_count(text)
+        except Exception as e:
+            logger().noop(f"Failed to count the tokens: {e}", noop_lvl=2)
+            return int(len(text) * DEFAULT_TOKEN_PER_CHAR_RATIO)
+
+    def _min_timestamp_in_ms(self) -> int:
+        max_age_in_ms = self.settings.SEGMENT_EMBEDDING_CACHE_MAX_AGE_IN_DAYS * 86400000
+        return time_utils.cur_timestamp_in_ms() - max_age_in_ms
+
+    def get_embeddings(
+        self, dense_embedder: AbstractDenseEmbedder, texts: List[str]
+    ) -> List[Optional[List[float]]]:
+        """
+        Get the cached embeddings for the texts with one query.
+
+        Args:
+        - dense_embedder: The embedder that will embed the texts not in the cache.
+        - texts: The texts to look up.
+
+        Returns:
+        - The embeddings in the same order as the texts, None if not cached.
+        """
+        cache_keys = [self._get_cache_key(dense_embedder, text) for text in texts]
+        try:
+            embeddings = self.cache_store.get_embeddings(
+                cache_name=SEGMENT_EMBEDDING_CACHE_NAME,
+                cache_keys=cache_keys,
+                min_timestamp_in_ms=self._min_timestamp_in_ms(),
+            )
+        except Exception as e:
+            logger().warning(f"Failed to read the segment embedding cache: {e}")
+            embeddings = {}
+        return [embeddings.get(cache_key) for cache_key in cache_keys]
+
+    def save_embeddings(
+        self,
+        dense_embedder: AbstractDenseEmbedder,
+        texts: List[str],
+        embeddings: List[List[float]],
+    ) -> None:
+        """
+        Save the embeddings of the texts into the cache.
+
+        Args:
+        - dense_embedder: The embedder used to embed the texts.
+        - texts: The texts.
+        - embeddings: The embeddings in the same order as the texts.
+        """
+        entries: Dict[str, List[float]] = {
+            self._get_cache_key(dense_embedder, text): embedding
+            for text, embedding in zip(texts, embeddings)
+        }
+        try:
+            self.cache_store.save_embeddings(
+                cache_name=SEGMENT_EMBEDDING_CACHE_NAME, embeddings=entries
+            )
+        except Exception as e:
+            logger().warning(f"Failed to save the segment embedding cache: {e}")
+
+    def record(
+        self, cached_texts: List[str], embedded_count: int
+    ) -> SegmentEmbeddingCacheStats:
+        """
+        Record the result of one embedding batch.
+
+        Args:
+        - cached_texts: The texts whose embeddings were found in the cache.
+        - embedded_count: The number of texts sent to the embedder.
+
+        Returns:
+        - The stats of the batch.
+        """
+        stats = SegmentEmbeddingCacheStats(
+            cached_segment_count=len(cached_texts),
+            embedded_segment_count=embedded_count,
+            saved_token_count=sum(self._est_token_count(t) for t in cached_texts),
+        )
+        with self._lock:
+            self._stats.add(stats)
+        return stats
+
+    def evict(self) -> int:
+        """
+        Evict the entries by age and by the max number of entries.
+
+        Returns:
+        - The number of entries evicted.
+        """
+        try:
+            return self.cache_store.evict_embeddings(
+                cache_name=SEGMENT_EMBEDDING_CACHE_NAME,
+                max_entries=self.settings.SEGMENT_EMBEDDING_CACHE_MAX_ENTRIES,
+                min_timestamp_in_ms=self._min_timestamp_in_ms(),
+            )
+        except Exception as e:
+            logger().warning(f"Failed to evict the segment embedding cache: {e}")
+            return 0
+
+    def maybe_evict(self) -> int:
+        """
+        Evict the entries if the eviction interval has passed since the last
+        eviction in the process. The first call in the process always evicts.
+
+        Returns:
+        - The number of entries evicted, 0 if the eviction is skipped.
+        """
+        interval = self.settings.SEGMENT_EMBEDDING_CACHE_EVICT_INTERVAL_IN_SECONDS
+        with self._lock:
+            now = time.monotonic()
+            if (
+                self._last_evict_time is not None
+                and now - self._last_evict_time < interval
+            ):
+                return 0
+            self._last_evict_time = now
+        return self.evict()
+
+    def get_stats(self) -> SegmentEmbeddingCacheStats:
+        """Get the stats accumulated since the process started."""
+        with self._lock:
+            return self._stats.model_copy()
+
+
+_segment_embedding_cache: Optional[SegmentEmbeddingCache] = None
+_segment_embedding_cache_lock = threading.Lock()
+
+
+def get_segment_embedding_cache(
+    settings: SystemSettings,
+) -> Optional[SegmentEmbeddingCache]:
+    """
+    Get the segment embedding cache shared by the process.
+
+    Args:
+    - settings: The system settings.
+
+    Returns:
+    - The cache, or None if SEGMENT_EMBEDDING_CACHE_ENABLED is False.
+    """
+    global _segment_embedding_cache
+    if not settings.SEGMENT_EMBEDDING_CACHE_ENABLED:
+        return None
+    if _segment_embedding_cache is None:
+        with _segment_embedding_cache_lock:
+            if _segment_embedding_cache is None:
+                from leettools.eds.str_embedder.embedding_cache_store import (
+                    create_embedding_cache_store,
+                )
+
+                _segment_embedding_cache = SegmentEmbeddingCache(
+                    settings=settings,
+                    cache_store=create_embedding_cache_store(settings),
+                )
+    return _segment_embedding_cache
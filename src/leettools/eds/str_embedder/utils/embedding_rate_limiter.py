@@ -0,0 +1,212 @@
+import random
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+from leettools.common.logging import logger
+from leettools.common.utils.rate_limiter import TokenBucket
+from leettools.settings import SystemSettings
+
+HEADER_LIMIT_REQUESTS = "x-ratelimit-limit-requests"
+HEADER_LIMIT_TOKENS = "x-ratelimit-limit-tokens"
+HEADER_RETRY_AFTER = "retry-after"
+HEADER_RETRY_AFTER_MS = "retry-after-ms"
+
+# use a bit less than the limits reported by the provider to leave room for
+# the other clients using the same API key
+_LIMIT_USAGE_RATIO = 0.9
+_MIN_BACKOFF_IN_SECONDS = 0.5
+_MAX_BACKOFF_IN_SECONDS = 60.0
+
+
+def est_token_count(text: str) -> int:
+    """
+    Estimate the token count of the text for the rate limits without loading a
+    tokenizer, about 4 characters per token for English text.
+    """
+    return len(text) // 4 + 1
+
+
+def split_by_token_budget(
+    sentences: List[str], max_tokens: int, max_inputs: int
+) -> List[List[str]]:
+    """
+    Split the sentences into the batches that fit in one embedding request.
+
+    Args:
+    - sentences: The sentences to embed, the order is kept in the batches.
+    - max_tokens: The max estimated tokens of a batch, a sentence larger than
+        this is put in a batch by itself.
+    - max_inputs: The max number of sentences in a batch.
+
+    Returns:
+    - The batches of the sentences.
+    """
+    batches: List[List[str]] = []
+    batch: List[str] = []
+    batch_tokens = 0
+    for sentence in sentences:
+        tokens = est_token_count(sentence)
+        if len(batch) > 0 and (
+            batch_tokens + tokens > max_tokens or len(batch) >= max_inputs
+        ):
+            batches.append(batch)
+            batch = []
+            batch_tokens = 0
+        batch.append(sentence)
+        batch_tokens += tokens
+    if len(batch) > 0:
+        batches.append(batch)
+    return batches
+
+
+class EmbeddingRateLimiter:
+    """
+    The limits of the embedding requests to one endpoint, shared by all the
+    embedders using it in the process.
+
+    The number of requests in flight is bounded by a semaphore, and the request
+    and token rates are limited by token buckets. The rates start from the
+    settings and are updated from the rate limit headers of the responses. They
+    are halved when the provider rejects a request with a rate limit error.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+    ) -> None:
+        self._semaphore = threading.BoundedSemaphore(max(1, max_concurrency))
+        self.request_bucket = TokenBucket(
+            rate_per_second=requests_per_minute / 60,
+            capacity=requests_per_minute / 60,
+        )
+        self.token_bucket = TokenBucket(
+            rate_per_second=tokens_per_minute / 60,
+            capacity=tokens_per_minute / 60,
+        )
+        self._lock = threading.Lock()
+        self.requests_per_minute_limit: Optional[float] = None
+        self.tokens_per_minute_limit: Optional[float] = None
+
+    @contextmanager
+    def acquire(self, token_count: int) -> Iterator[None]:
+        """
+        Wait for a slot and the rate limits before sending a request.
+
+        Args:
+        - token_count: The estimated token count of the request.
+        """
+        with self._semaphore:
+            self.request_bucket.acquire()
+            self.token_bucket.acquire(token_count)
+            yield
+
+    def _set_rates(self, requests_per_minute: float, tokens_per_minute: float) -> None:
+        for bucket, per_minute in (
+            (self.request_bucket, requests_per_minute),
+            (self.token_bucket, tokens_per_minute),
+        ):
+            if per_minute > 0:
+                bucket.capacity = max(per_minute / 60, 1.0)
+            bucket.set_rate(per_minute / 60)
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        """
+        Learn the rate limits of the provider from the headers of a response.
+
+        Args:
+        - headers: The response headers.
+        """
+        try:
+            requests_limit = float(headers.get(HEADER_LIMIT_REQUESTS, 0) or 0)
+            tokens_limit = float(headers.get(HEADER_LIMIT_TOKENS, 0) or 0)
+        except ValueError:
+            return
+        if requests_limit <= 0 and tokens_limit <= 0:
+            return
+        with self._lock:
+            if (
+                requests_limit == self.requests_per_minute_limit
+                and tokens_limit == self.tokens_per_minute_limit
+                and self.request_bucket.rate_per_second > 0
+            ):
+                return
+            self.requests_per_minute_limit = requests_limit
+            self.tokens_per_minute_limit = tokens_limit
+            self._set_rates(
+                requests_limit * _LIMIT_USAGE_RATIO, tokens_limit * _LIMIT_USAGE_RATIO
+            )
+        logger().debug(
+            f"Embedding rate limits: {requests_limit} requests and "
+            f"{tokens_limit} tokens per minute."
+        )
+
+    def on_rate_limited(self) -> None:
+        """Slow down after the provider rejected a request for the rate limits."""
+        with self._lock:
+            if self.request_bucket.rate_per_second > 0:
+                self._set_rates(
+                    self.request_bucket.rate_per_second * 60 / 2,
+                    self.token_bucket.rate_per_second * 60 / 2,
+                )
+            # the learned limits are applied again on the next successful response
+            self.requests_per_minute_limit = None
+            self.tokens_per_minute_limit = None
+
+    def get_backoff_in_seconds(
+        self, attempt: int, headers: Optional[Mapping[str, str]] = None
+    ) -> float:
+        """
+        The time to wait before retrying a failed request.
+
+        Args:
+        - attempt: The number of the failed attempts so far, starting from 1.
+        - headers: The headers of the failed response if any.
+
+        Returns:
+        - The retry-after time of the provider if specified, otherwise an
+            exponential backoff with full jitter.
+        """
+        if headers is not None:
+            try:
+                if headers.get(HEADER_RETRY_AFTER_MS) is not None:
+                    return float(headers[HEADER_RETRY_AFTER_MS]) / 1000
+                if headers.get(HEADER_RETRY_AFTER) is not None:
+                    return float(headers[HEADER_RETRY_AFTER])
+            except ValueError:
+                pass
+        max_backoff = min(_MAX_BACKOFF_IN_SECONDS, _MIN_BACKOFF_IN_SECONDS * 2**attempt)
+        return random.uniform(_MIN_BACKOFF_IN_SECONDS, max_backoff)
+
+
+_rate_limiters: Dict[Tuple[str, str], EmbeddingRateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_embedding_rate_limiter(
+    settings: SystemSettings, base_url: str, model_name: str
+) -> EmbeddingRateLimiter:
+    """
+    Get the rate limiter shared by the embedders calling the model at base_url.
+
+    Args:
+    - settings: The system settings.
+    - base_url: The base URL of the embedding API.
+    - model_name: The embedding model name.
+
+    Returns:
+    - The rate limiter for the endpoint and model.
+    """
+    key = (base_url, model_name)
+    with _rate_limiters_lock:
+        rate_limiter = _rate_limiters.get(key)
+        if rate_limiter is None:
+            rate_limiter = EmbeddingRateLimiter(
+                max_concurrency=settings.embed_max_concurrency,
+                requests_per_minute=settings.embed_requests_per_minute,
+                tokens_per_minute=settings.embed_tokens_per_minute,
+            )
+            _rate_limiters[key] = rate_limiter
+        return rate_limiter
@@ -187,7 +187,8 @@ def _run_web_search_pipeline(
 
     web_searcher = WebSearcher(context=context)
 
-    docsink_create_list = web_searcher.create_docsinks_by_search_and_scrape(
+    # the pipeline starts on the pages scraped first while the others are scraped
+    docsink_creates = web_searcher.create_docsinks_by_search_and_scrape_iter(
         context=context,
         org=org,
         kb=kb,
@@ -198,18 +199,22 @@ def _run_web_search_pipeline(
         display_logger=display_logger,
     )
 
-    if docsink_create_list is None or len(docsink_create_list) == 0:
-        display_logger.warning(f"No results found for the query {search_keywords}.")
+    def _complete_docsource(all_documents: List[Document]) -> None:
+        # the docsource is completed after the documents processed in the
+        # background when the latency budget is reached
+        if len(all_documents) == 0:
+            display_logger.warning(f"No results found for the query {search_keywords}.")
         docsource.docsource_status = DocSourceStatus.COMPLETED
         docsource_store.update_docsource(org, kb, docsource)
-        return []
 
-    success_documents = pipeline_utils.run_adhoc_pipeline_for_docsinks(
-        exec_info=exec_info, docsink_create_list=docsink_create_list
+    settings = exec_info.settings
+    return pipeline_utils.run_adhoc_pipeline_for_docsinks(
+        exec_info=exec_info,
+        docsink_create_list=docsink_creates,
+        latency_budget_in_seconds=settings.WEB_SEARCH_LATENCY_BUDGET_IN_SECONDS,
+        min_document_count=settings.WEB_SEARCH_MIN_DOCUMENT_COUNT,
+        on_complete=_complete_docsource,
     )
-    docsource.docsource_status = DocSourceStatus.COMPLETED
-    docsource_store.update_docsource(org, kb, docsource)
-    return success_documents
 
 
 def _create_docsrc_for_search(
@@ -13,6 +13,7 @@ from leettools.core.strategy.schemas.strategy_conf import (
 )
 from leettools.core.strategy.schemas.strategy_section_name import StrategySectionName
 from leettools.eds.rag.search.filter import BaseCondition, Filter
+from leettools.eds.rag.search.fusion import SEARCH_PARAM_FUSION_OPTIONS, FusionOptions
 from leettools.eds.rag.search.searcher import create_searcher_for_kb
 from leettools.eds.rag.search.searcher_type import SearcherType
 from leettools.flow import flow_option_items
@@ -114,7 +115,17 @@ class StepVectorSearch(AbstractStep):
             org=org,
             kb=kb,
         )
-        search_params = {"metric_type": metric_type, "params": {"nprobe": top_k}}
+        fusion_options = FusionOptions.from_strategy_options(
+            options=(
+                search_section.strategy_options if search_section is not None else None
+            ),
+            display_logger=display_logger,
+        )
+        search_params = {
+            "metric_type": metric_type,
+            "params": {"nprobe": top_k},
+            SEARCH_PARAM_FUSION_OPTIONS: fusion_options,
+        }
 
         # the actual search is pretty expensive, so we skip it in test mode
         # may need a better way to test the full flow
@@ -228,6 +239,7 @@ class StepVectorSearch(AbstractStep):
             search_params=search_params,
             query_meta=query_metadata,
             filter=filter,
+            display_logger=display_logger,
         )
         display_logger.info(
             f"Found related segments by vectdb_search {len(top_ranked_result_segments)}."
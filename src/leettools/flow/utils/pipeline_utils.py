@@ -1,13 +1,16 @@
-from concurrent.futures import ThreadPoolExecutor
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from datetime import datetime
-from functools import partial
 from pathlib import Path
-from typing import List
+from typing import Callable, Iterable, List, Optional, Set, Tuple
 
 from leettools.common import exceptions
 from leettools.common.logging import logger
 from leettools.common.logging.event_logger import EventLogger
 from leettools.common.logging.log_location import LogLocator
+from leettools.common.logging.logger_for_query import get_logger_for_chat
 from leettools.common.utils import time_utils
 from leettools.context_manager import Context
 from leettools.core.consts.docsink_status import DocSinkStatus
@@ -32,6 +35,30 @@ from leettools.eds.pipeline.split.splitter import Splitter
 from leettools.eds.scheduler.scheduler_manager import run_scheduler
 from leettools.flow.exec_info import ExecInfo
 
+# runs the adhoc pipelines left when the latency budget is reached, its threads
+# are not daemon threads so that the work is finished before the process exits
+_background_executor = ThreadPoolExecutor(
+    max_workers=4, thread_name_prefix="adhoc_pipeline_background"
+)
+_background_futures: Set[Future] = set()
+_background_lock = threading.Lock()
+
+
+def wait_for_background_pipelines(timeout: Optional[float] = None) -> bool:
+    """
+    Wait for the adhoc pipelines still running in the background.
+
+    Args:
+    - timeout: The max seconds to wait, wait forever if None.
+
+    Returns:
+    - True if all the background pipelines have finished.
+    """
+    with _background_lock:
+        futures = set(_background_futures)
+    _, not_done = wait(futures, timeout=timeout)
+    return len(not_done) == 0
+
 
 def process_docsources_auto(
     org: Org,
@@ -131,17 +158,38 @@ def process_docsource_manual(
     return docsource_store.get_docsource(org, kb, docsource.docsource_uuid)
 
 
+def _discard_background_future(future: Future) -> None:
+    with _background_lock:
+        _background_futures.discard(future)
+
+
 def run_adhoc_pipeline_for_docsinks(
     exec_info: ExecInfo,
-    docsink_create_list: List[DocSinkCreate],
+    docsink_create_list: Iterable[DocSinkCreate],
+    latency_budget_in_seconds: float = 0,
+    min_document_count: int = 1,
+    on_complete: Optional[Callable[[List[Document]], None]] = None,
 ) -> List[Document]:
     """
     Given the list of docsink_creates, run the doc pipeline and return the list of
     documents that have been processed successfully.
 
+    Each docsink is converted and split as soon as a worker is available, and the
+    documents are embedded in batches as they finish, so a slow document does not
+    hold back the others. The docsink_creates can be an iterator, e.g. of the web
+    pages being scraped, each one is submitted as soon as it is produced.
+
     Args:
     - exec_info: Execution information
-    - docsink_create_list: The list of docsink_creates to process
+    - docsink_create_list: The list or iterator of docsink_creates to process
+    - latency_budget_in_seconds: If larger than 0, return the documents embedded
+        when the budget is reached and at least min_document_count documents are
+        ready, the remaining documents are processed in the background.
+    - min_document_count: The min number of documents to return before the
+        latency budget applies.
+    - on_complete: Called with all the documents processed successfully when
+        all the docsinks are processed, in the background if the latency budget
+        is reached.
 
     Returns:
     - List[Document]: The list of documents that have been processed successfully
@@ -157,6 +205,8 @@ def run_adhoc_pipeline_for_docsinks(
     docstore = context.get_repo_manager().get_document_store()
     segment_store = context.get_repo_manager().get_segment_store()
 
+    log_location = None
+    job_logger = logger()
     if exec_info.target_chat_query_item is not None:
         query = exec_info.query
         log_dir = LogLocator.get_log_dir_for_query(
@@ -171,10 +221,15 @@ def run_adhoc_pipeline_for_docsinks(
             f.write(
                 f"Job log for web search {query} created at {time_utils.current_datetime()}\n"
             )
+        # the work in the background still logs to the log of the query
+        _, job_logger = get_logger_for_chat(
+            chat_id=exec_info.target_chat_query_item.chat_id,
+            query_id=exec_info.target_chat_query_item.query_id,
+        )
 
-    display_logger.info("Adhoc query: converting documents to markdown ...")
+    display_logger.info("Adhoc query: converting and chunking documents ...")
 
-    def _convert_helper(docsink_create: DocSinkCreate) -> DocSink:
+    def _convert_helper(docsink_create: DocSinkCreate) -> Optional[DocSink]:
         # this function may create a new docsink or return an existing one
         docsink = docsink_store.create_docsink(org, kb, docsink_create)
         if docsink is None:
@@ -210,23 +265,13 @@ def run_adhoc_pipeline_for_docsinks(
         docsink_store.update_docsink(org, kb, docsink)
         return docsink
 
-    docsinks: List[DocSink] = []
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        for docsink in executor.map(_convert_helper, docsink_create_list):
-            if docsink:
-                docsinks.append(docsink)
-
-    display_logger.info("✅ Adhoc query: finished converting documents to markdown.")
-    display_logger.info("Adhoc query: start to chunk documents ...")
-
-    documents: List[Document] = []
-    for docsink in docsinks:
+    def _get_document_helper(docsink: DocSink) -> Optional[Document]:
         doc_for_docsink = docstore.get_documents_for_docsink(org, kb, docsink)
         if not doc_for_docsink:
             display_logger.warning(
                 f"Adhoc query: no documents found for docsink {docsink.docsink_uuid}, which should not happen."
             )
-            continue
+            return None
         if len(doc_for_docsink) > 1:
             display_logger.debug(
                 f"Adhoc query: multiple documents found for docsink {docsink.docsink_uuid}, which should not happen."
@@ -235,17 +280,17 @@ def run_adhoc_pipeline_for_docsinks(
                 display_logger.debug(
                     f"Adhoc query duplicate docs docsink {docsink.docsink_uuid}: document {doc.document_uuid} {doc.original_uri}"
                 )
-        documents.append(doc_for_docsink[0])
+        return doc_for_docsink[0]
 
     splitter = Splitter(context=context, org=org, kb=kb)
 
-    def _split_helper(log_file_location: str, doc: Document) -> Document:
+    def _split_helper(doc: Document) -> Document:
         if doc.split_status == DocumentStatus.COMPLETED:
             display_logger.debug(
                 f"Adhoc query: document {doc.document_uuid} already split."
             )
             return doc
-        rnt_code = splitter.split(doc=doc, log_file_location=log_file_location)
+        rnt_code = splitter.split(doc=doc, log_file_location=log_location)
         if rnt_code == ReturnCode.SUCCESS:
             display_logger.debug(
                 "Adhoc query: split documents to segments successfully"
@@ -259,56 +304,163 @@ def run_adhoc_pipeline_for_docsinks(
         docstore.update_document(org, kb, doc)
         return doc
 
-    partial_splitter = partial(_split_helper, log_location)
-    success_documents: List[Document] = []
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        for doc in executor.map(partial_splitter, documents):
-            if doc.split_status == DocumentStatus.COMPLETED:
-                success_documents.append(doc)
-
-    display_logger.info("✅ Adhoc query: finished chunking documents.")
-    display_logger.info("Adhoc query: start to embed document chunks ...")
+    def _convert_and_split(
+        docsink_create: DocSinkCreate,
+    ) -> Tuple[Optional[DocSink], Optional[Document]]:
+        # each docsink goes through convert and split without waiting for the others
+        docsink = _convert_helper(docsink_create)
+        if docsink is None:
+            return None, None
+        doc = _get_document_helper(docsink)
+        if doc is None:
+            return docsink, None
+        return docsink, _split_helper(doc)
 
     embedder = create_segment_embedder_for_kb(
         org=org, kb=kb, user=user, context=context
     )
 
-    segments: List[Segment] = []
+    success_documents: List[Document] = []
 
-    for doc in success_documents:
-        if doc.embed_status == DocumentStatus.COMPLETED:
-            display_logger.debug(
-                f"Adhoc query: document {doc.document_uuid} already embedded."
+    def _embed_and_complete(
+        results: List[Tuple[Optional[DocSink], Optional[Document]]],
+        job_logger: EventLogger,
+    ) -> None:
+        # embed the documents finished since the last call in one batch
+        segments: List[Segment] = []
+        for _, doc in results:
+            if doc is None or doc.split_status != DocumentStatus.COMPLETED:
+                continue
+            if doc.embed_status == DocumentStatus.COMPLETED:
+                job_logger.debug(
+                    f"Adhoc query: document {doc.document_uuid} already embedded."
+                )
+                continue
+            segments.extend(
+                segment_store.get_all_segments_for_document(org, kb, doc.document_uuid)
             )
-            continue
-        segments_for_doc = segment_store.get_all_segments_for_document(
-            org, kb, doc.document_uuid
-        )
-        segments.extend(segments_for_doc)
-
-    display_logger.info(
-        f"Adhoc query: number of chunks to embed is {len(segments)} ..."
-    )
-    job_logger = logger()
-    log_handler = None
-    if log_location:
-        log_handler = job_logger.log_to_file(log_location)
+        if len(segments) > 0:
+            embedder.embed_segment_list(segments=segments, display_logger=job_logger)
+
+        # for adhoc query, we update status to completed for ALL documents and
+        # docsinks, including the failed ones
+        for docsink, doc in results:
+            if doc is not None:
+                doc.embed_status = DocumentStatus.COMPLETED
+                docstore.update_document(org, kb, doc)
+                if doc.split_status == DocumentStatus.COMPLETED:
+                    success_documents.append(doc)
+            if docsink is not None:
+                docsink.docsink_status = DocSinkStatus.COMPLETED
+                docsink_store.update_docsink(org, kb, docsink)
+
+    # the futures of the docsinks are put in the queue when they are done, and
+    # None is put after the last docsink_create is submitted
+    done_queue: "queue.Queue[Optional[Future]]" = queue.Queue()
+    stop_feeding = threading.Event()
+    feed_errors: List[Exception] = []
+    submitted_count = 0
+    processed_count = 0
+    feeding = True
+
+    def _feed() -> None:
+        # reads the docsink_creates, which may block while the pages are scraped
+        nonlocal submitted_count
+        try:
+            for docsink_create in docsink_create_list:
+                if stop_feeding.is_set():
+                    break
+                future = executor.submit(_convert_and_split, docsink_create)
+                submitted_count += 1
+                future.add_done_callback(done_queue.put)
+        except Exception as e:
+            feed_errors.append(e)
+        finally:
+            executor.shutdown(wait=False)
+            done_queue.put(None)
+
+    def _run_pipeline(deadline: Optional[float] = None) -> bool:
+        # returns False if the deadline is reached before all the docsinks are done
+        nonlocal processed_count, feeding
+        while feeding or processed_count < submitted_count:
+            # before enough documents are embedded, wait past the deadline
+            timeout = None
+            if deadline is not None and len(success_documents) >= min_documents:
+                timeout = max(0.0, deadline - time.perf_counter())
+            items: List[Optional[Future]] = []
+            try:
+                items.append(done_queue.get(timeout=timeout))
+                while True:
+                    items.append(done_queue.get_nowait())
+            except queue.Empty:
+                pass
+            if None in items:
+                feeding = False
+                if len(feed_errors) > 0:
+                    raise feed_errors[0]
+            done = [future for future in items if future is not None]
+            if len(done) > 0:
+                processed_count += len(done)
+                _embed_and_complete([future.result() for future in done], job_logger)
+                job_logger.debug(
+                    f"Adhoc query: embedded {len(done)} documents, "
+                    f"{submitted_count - processed_count} documents in progress."
+                )
+            if (
+                deadline is not None
+                and time.perf_counter() >= deadline
+                and len(success_documents) >= min_documents
+                and (feeding or processed_count < submitted_count)
+            ):
+                return False
+        return True
+
+    def _run_pipeline_in_background() -> None:
+        try:
+            _run_pipeline()
+            job_logger.info(
+                f"Adhoc query: finished processing the docsinks in the background, "
+                f"{len(success_documents)} documents in total."
+            )
+        except Exception as e:
+            stop_feeding.set()
+            job_logger.error(f"Adhoc query: failed to process the docsinks: {e}")
+        finally:
+            if on_complete is not None:
+                on_complete(list(success_documents))
+
+    min_documents = max(1, min_document_count)
+    # the budget includes the time to produce the docsink_creates
+    deadline = None
+    if latency_budget_in_seconds > 0:
+        deadline = time.perf_counter() + latency_budget_in_seconds
+
+    executor = ThreadPoolExecutor(max_workers=10, thread_name_prefix="adhoc_pipeline")
+    # each docsink_create is submitted as soon as it is produced, while the
+    # documents already done are embedded
+    feeder = threading.Thread(target=_feed, name="adhoc_pipeline_feeder")
+    feeder.start()
     try:
-        embedder.embed_segment_list(segments=segments, display_logger=job_logger)
-        display_logger.info("Adhoc query: embedded all the chunks ...")
-    finally:
-        if log_handler:
-            job_logger.remove_file_handler()
-
-    # for adhoc query, we update status to completed for ALL documents and docsinks
-    for doc in documents:
-        doc.embed_status = DocumentStatus.COMPLETED
-        docstore.update_document(org, kb, doc)
-
-    for docsink in docsinks:
-        docsink.docsink_status = DocSinkStatus.COMPLETED
-        docsink_store.update_docsink(org, kb, docsink)
+        finished = _run_pipeline(deadline)
+    except Exception:
+        stop_feeding.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+
+    if not finished:
+        display_logger.info(
+            f"Adhoc query: latency budget {latency_budget_in_seconds}s reached, "
+            f"continue with {len(success_documents)} documents while the other "
+            "documents are processed in the background."
+        )
+        with _background_lock:
+            future = _background_executor.submit(_run_pipeline_in_background)
+            _background_futures.add(future)
+        future.add_done_callback(_discard_background_future)
+    elif on_complete is not None:
+        on_complete(list(success_documents))
 
     display_logger.info("✅ Adhoc query: finished processing docsinks.")
 
-    return success_documents
+    # the list returned is not changed by the background work
+    return list(success_documents)
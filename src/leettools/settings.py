@@ -155,6 +155,13 @@ class SystemSettings(BaseModel):
             "usually a more capable but more expensive scraper",
         ),
     )
+    WEB_SCRAPE_DEADLINE_IN_SECONDS: float = Field(
+        0,
+        description=(
+            "If larger than 0, scraping a batch of URLs returns the pages scraped "
+            "within this time and drops the rest. 0 waits for all the URLs."
+        ),
+    )
     WEB_SITE_CRAWL_DEPTH: int = Field(
         3, description="The default depth of the web site crawl"
     )
@@ -168,6 +175,21 @@ class SystemSettings(BaseModel):
     RELEVANCE_THRESHOLD: int = Field(
         75, description="The relevance threshold for search results to be used."
     )
+    WEB_SEARCH_LATENCY_BUDGET_IN_SECONDS: float = Field(
+        0,
+        description=(
+            "If larger than 0, the web search starts with the documents embedded "
+            "within this time and the rest are processed in the background. "
+            "0 waits for all the search results to be processed."
+        ),
+    )
+    WEB_SEARCH_MIN_DOCUMENT_COUNT: int = Field(
+        3,
+        description=(
+            "The min number of embedded documents the web search waits for when "
+            "the latency budget is reached."
+        ),
+    )
 
     # 2.2.   Document Pipeline
 
@@ -175,7 +197,11 @@ class SystemSettings(BaseModel):
 
     # 2.2.2. Conversion
     DEFAULT_PARSER: str = Field(
-        "parser_docling", description="The default parser to use for conversion"
+        "parser_docling",
+        description=(
+            "The default parser to use for conversion, parser_docling_text skips "
+            "the page, table, and picture images of parser_docling"
+        ),
     )
     CONVERTER_API_URL: str = Field(
         "http://localhost:8001/api/v1/files/convert",
@@ -195,6 +221,27 @@ class SystemSettings(BaseModel):
     ENABLE_CONTEXTUAL_RETRIEVAL: bool = Field(
         False, description="Whether to enable contextual retrieval"
     )
+    CONTEXTUAL_RETRIEVAL_CACHE_ENABLED: bool = Field(
+        True,
+        description=(
+            "Whether to reuse the context summaries generated for the same chunk "
+            "of the same document by the same model when re-splitting documents."
+        ),
+    )
+    CONTEXTUAL_RETRIEVAL_CACHE_MAX_ENTRIES: int = Field(
+        100000,
+        description="The max number of entries kept in the context summary cache.",
+    )
+    CONTEXTUAL_RETRIEVAL_CACHE_MAX_AGE_IN_DAYS: int = Field(
+        90, description="The max age of the entries in the context summary cache."
+    )
+    CONTEXTUAL_RETRIEVAL_CACHE_EVICT_INTERVAL_IN_SECONDS: int = Field(
+        600,
+        description=(
+            "The min interval between two evictions of the context summary cache "
+            "in the same process."
+        ),
+    )
 
     # 2.2.4. Embedding
     DEFAULT_SEGMENT_EMBEDDER_TYPE: str = Field(
@@ -213,6 +260,47 @@ class SystemSettings(BaseModel):
         "naver/splade-cocondenser-selfdistil",
         description="The default splade embedding model",
     )
+    QUERY_EMBEDDING_CACHE_SIZE: int = Field(
+        1024,
+        description=(
+            "The max number of query embeddings kept in memory by the query "
+            "embedding cache, 0 to disable the cache."
+        ),
+    )
+    QUERY_EMBEDDING_CACHE_TTL_IN_SECONDS: int = Field(
+        86400, description="The time to live of the cached query embeddings."
+    )
+    QUERY_EMBEDDING_CACHE_PERSISTENT: bool = Field(
+        False,
+        description=(
+            "Whether to also keep the query embeddings in the embedding cache store "
+            "so that they survive restarts and are shared by processes."
+        ),
+    )
+    SEGMENT_EMBEDDING_CACHE_ENABLED: bool = Field(
+        True,
+        description=(
+            "Whether to reuse the embeddings of identical segment contents embedded "
+            "by the same embedder when ingesting documents."
+        ),
+    )
+    SEGMENT_EMBEDDING_CACHE_MAX_ENTRIES: int = Field(
+        100000,
+        description=(
+            "The max number of entries kept in the segment embedding cache, about "
+            "600MB with 1536-dimension embeddings."
+        ),
+    )
+    SEGMENT_EMBEDDING_CACHE_MAX_AGE_IN_DAYS: int = Field(
+        90, description="The max age of the entries in the segment embedding cache."
+    )
+    SEGMENT_EMBEDDING_CACHE_EVICT_INTERVAL_IN_SECONDS: int = Field(
+        600,
+        description=(
+            "The min interval between two evictions of the segment embedding cache "
+            "in the same process."
+        ),
+    )
 
     # 2.3.   Retrieval
 
@@ -225,6 +313,38 @@ class SystemSettings(BaseModel):
         20, description="The default top k search results to return"
     )
 
+    SEARCH_EXECUTOR_MAX_WORKERS: int = Field(
+        16,
+        description=(
+            "The number of threads shared by all queries to run the dense, sparse, "
+            "and keyword extraction legs of the hybrid search concurrently."
+        ),
+    )
+
+    SEARCH_DENSE_TIMEOUT_IN_SECONDS: float = Field(
+        30.0,
+        description=(
+            "The timeout of the dense leg of the hybrid search, including the query "
+            "embedding call. The search continues with the other leg on timeout."
+        ),
+    )
+
+    SEARCH_SPARSE_TIMEOUT_IN_SECONDS: float = Field(
+        30.0,
+        description=(
+            "The timeout of the sparse or BM25 leg of the hybrid search. The search "
+            "continues with the other leg on timeout."
+        ),
+    )
+
+    SEARCH_KEYWORD_TIMEOUT_IN_SECONDS: float = Field(
+        5.0,
+        description=(
+            "The timeout to extract the keywords for the sparse leg. The query is "
+            "used as is on timeout."
+        ),
+    )
+
     # 2.3.2. Rerank settings
     DEFAULT_RERANK_STRATEGY: str = Field(
         "dummy", description="The default rerank strategy to use"
@@ -376,6 +496,54 @@ class SystemSettings(BaseModel):
         3, description="The default number of retries for the inference"
     )
 
+    convert_process_pool_size: int = Field(
+        0,
+        description=(
+            "The number of worker processes parsing the PDF, DOCX, PPTX, and XLSX "
+            "files in parallel, each loads its own parser models. 0 parses the "
+            "files in the calling process."
+        ),
+    )
+
+    convert_parser_pool_size: int = Field(
+        2,
+        description=(
+            "The max number of instances of a parser that is not thread safe, "
+            "such as docling, in one process. The threads parsing files wait for "
+            "an idle instance, so the models are loaded at most this many times."
+        ),
+    )
+
+    web_scrape_max_concurrency: int = Field(
+        20, description="The max number of URLs scraped at the same time."
+    )
+
+    web_scrape_max_concurrency_per_host: int = Field(
+        4,
+        description="The max number of URLs of the same host scraped at the same time.",
+    )
+
+    web_scrape_timeout_in_seconds: float = Field(
+        10, description="The timeout of each HTTP request of the web scraper."
+    )
+
+    docling_page_batch_size: int = Field(
+        0,
+        description=(
+            "The number of pages the docling parser converts at a time, so that "
+            "the memory used by a large PDF is bounded by the batch. 0 converts "
+            "the whole document at once."
+        ),
+    )
+
+    contextual_retrieval_max_workers: int = Field(
+        8,
+        description=(
+            "The max number of concurrent LLM calls generating the context "
+            "summaries of the chunks of one document."
+        ),
+    )
+
     embed_batch_size: int = Field(
         32, description="The default batch size for embedding operations"
     )
@@ -385,6 +553,46 @@ class SystemSettings(BaseModel):
         description="The default batch size for inserting embeddings into the database",
     )
 
+    embed_max_concurrency: int = Field(
+        10, description="The max number of embedding API requests in flight."
+    )
+
+    embed_requests_per_minute: float = Field(
+        0,
+        description=(
+            "The embedding API requests allowed per minute before the limits are "
+            "learned from the response headers, 0 means no limit."
+        ),
+    )
+
+    embed_tokens_per_minute: float = Field(
+        0,
+        description=(
+            "The embedding API tokens allowed per minute before the limits are "
+            "learned from the response headers, 0 means no limit."
+        ),
+    )
+
+    embed_max_retries: int = Field(
+        5,
+        description=(
+            "The max number of retries of an embedding API request failed for "
+            "rate limits, timeouts, or server errors."
+        ),
+    )
+
+    embed_max_tokens_per_request: int = Field(
+        200000,
+        description=(
+            "The max estimated tokens sent in one embedding API request, the "
+            "larger batches are split."
+        ),
+    )
+
+    embed_max_inputs_per_request: int = Field(
+        2048, description="The max number of texts sent in one embedding request."
+    )
+
     display_log_status_flag: str = Field(
         "status,thinking,update,runtime",
         description="The default log status flag for the system",
@@ -438,8 +646,33 @@ class SystemSettings(BaseModel):
             "The scheduler will ignore data sources older than this range.",
         ),
     )
-    scheduler_default_number_worker: int = Field(
-        8, description="The default number of worker threads for the scheduler"
+    scheduler_connector_worker_count: int = Field(
+        8,
+        description=(
+            "The number of worker threads for the connector jobs in the scheduler, "
+            "which mostly wait on the network."
+        ),
+    )
+    scheduler_convert_worker_count: int = Field(
+        2,
+        description=(
+            "The number of worker threads for the convert jobs in the scheduler, "
+            "which are CPU bound."
+        ),
+    )
+    scheduler_split_worker_count: int = Field(
+        2, description="The number of worker threads for the split jobs."
+    )
+    scheduler_embed_worker_count: int = Field(
+        4, description="The number of worker threads for the embed jobs."
+    )
+    scheduler_embed_jobs_per_second: float = Field(
+        0,
+        description=(
+            "The max number of embed jobs started per second by the scheduler, "
+            "0 means no limit. The rate limits of the embedding API are handled "
+            "by the embedders, which count the requests and the tokens."
+        ),
     )
     scheduler_base_delay_in_seconds: int = Field(
         10,
@@ -458,6 +691,41 @@ class SystemSettings(BaseModel):
     scheduler_max_retries: int = Field(
         3, description="The default max retries for a task in the scheduler."
     )
+    scheduler_lease_in_seconds: int = Field(
+        60,
+        description=(
+            "How long a scheduler holds the lease of a running job without a "
+            "heartbeat. The jobs of a crashed scheduler are run again after their "
+            "leases expire."
+        ),
+    )
+    scheduler_reconcile_interval_in_seconds: int = Field(
+        300,
+        description=(
+            "The interval in seconds of the full scan of all the docsources by the "
+            "scheduler. Between the full scans, only the docsources marked as "
+            "changed by the stores, the docsources updated since the last scan, "
+            "and the recurring docsources are scanned."
+        ),
+    )
+    scheduler_embed_batch_size: int = Field(
+        256,
+        description=(
+            "The max number of segments embedded at a time. An embed worker "
+            "takes up to this many waiting embed jobs of the same KB from the "
+            "queue, and the segments of the embed jobs of the same KB running at "
+            "the same time are combined into batches of up to this size."
+        ),
+    )
+    scheduler_embed_max_wait_in_ms: int = Field(
+        200,
+        description=(
+            "The max time in milliseconds an embed job waits for the other "
+            "running embed jobs of the same KB to fill its batch before embedding "
+            "it. No wait if all the other running embed jobs of the KB have "
+            "submitted their segments."
+        ),
+    )
 
     ## 4.3.  Name of kb and collections
     DEFAULT_ORG_NAME: str = Field(
@@ -543,6 +811,40 @@ class SystemSettings(BaseModel):
     DUCKDB_FILE: str = Field(
         "duckdb.db", description="The default file for the DuckDB database"
     )
+    DUCKDB_VECTOR_INDEX_TYPE: str = Field(
+        "none",
+        description=(
+            "The ANN index type for the DuckDB dense vector store: 'none' for the "
+            "exact full-table scan, 'hnsw' for the HNSW index from the vss extension. "
+            "The 'hnsw' index turns on hnsw_enable_experimental_persistence, which "
+            "may leave a corrupted index after a crash, and the first use runs "
+            "INSTALL vss, which needs network access. If the extension can't be "
+            "loaded, the search falls back to the exact scan."
+        ),
+    )
+    DUCKDB_HNSW_M: int = Field(
+        16, description="The max number of neighbors per node in the HNSW index"
+    )
+    DUCKDB_HNSW_EF_CONSTRUCTION: int = Field(
+        128, description="The candidate list size used when building the HNSW index"
+    )
+    DUCKDB_HNSW_EF_SEARCH: int = Field(
+        64,
+        description=(
+            "The default candidate list size used when searching the HNSW index, "
+            "can be overridden per query by the 'ef' value in search_params."
+        ),
+    )
+    DUCKDB_FULL_TEXT_INDEX_TYPE: str = Field(
+        "fts",
+        description=(
+            "The full text index for the DuckDB dense vector store: 'fts' for the "
+            "index from the fts extension rebuilt before the search, 'incremental' "
+            "for the postings tables updated with every upsert and delete. The "
+            "'incremental' index uses the NLTK stopwords and stemmer, so the keyword "
+            "ranking is not the same as the one of the 'fts' index."
+        ),
+    )
 
     def initialize(
         self, env_file_path: str = _default_env_file, override: bool = False
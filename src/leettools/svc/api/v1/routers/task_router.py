@@ -3,17 +3,10 @@ from typing import List
 from fastapi import Depends, HTTPException
 
 from leettools.common.exceptions import EntityNotFoundException
-from leettools.core.schemas.document import Document
 from leettools.core.schemas.knowledgebase import KnowledgeBase
 from leettools.core.schemas.organization import Org
 from leettools.core.schemas.user import User
-from leettools.eds.scheduler.schemas.program import (
-    EmbedProgramSpec,
-    ProgramSpec,
-    ProgramType,
-    ProgramTypeDescrtion,
-    SplitProgramSpec,
-)
+from leettools.eds.scheduler.schemas.program import ProgramSpec, ProgramTypeDescrtion
 from leettools.eds.scheduler.schemas.task import Task, TaskStatusDescription
 from leettools.svc.api_router_base import APIRouterBase
 
@@ -35,25 +28,6 @@ class TaskRouter(APIRouterBase):
             )
         return kb
 
-    def _remove_content_from_spec(self, task: Task) -> Task:
-        # Remove content from the source of the task to avoid sending it over the wire
-        if task.program_spec.program_type == ProgramType.SPLIT:
-            spec: SplitProgramSpec = task.program_spec.real_program_spec
-            doc: Document = spec.source
-            doc.content = ""
-        elif task.program_spec.program_type == ProgramType.EMBED:
-            spec: EmbedProgramSpec = task.program_spec.real_program_spec
-            # for segment in spec.source:
-            #    segment.content = ""
-            spec.source = []
-        return task
-
-    def _remove_content_from_tasks(self, tasks: List[Task]) -> List[Task]:
-        rtn_tasks = []
-        for task in tasks:
-            rtn_tasks.append(self._remove_content_from_spec(task))
-        return rtn_tasks
-
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         context = self.context
@@ -98,7 +72,7 @@ class TaskRouter(APIRouterBase):
                     detail=f"User {calling_user.username} does not have permission to read org {org_name}",
                 )
             tasks = self.task_store.get_all_tasks_for_org(org)
-            return self._remove_content_from_tasks(tasks)
+            return tasks
 
         @self.get("/list/{org_name}/{kb_name}", response_model=List[Task])
         async def get_tasks_for_kb(
@@ -126,7 +100,7 @@ class TaskRouter(APIRouterBase):
                     detail=f"User {calling_user.username} does not have permission to read kb {kb_name}",
                 )
             tasks = self.task_store.get_all_tasks_for_kb(org, kb)
-            return self._remove_content_from_tasks(tasks)
+            return tasks
 
         @self.get("/docsource/{docsource_uuid}", response_model=List[Task])
         async def get_tasks_for_docsource(
@@ -138,7 +112,7 @@ class TaskRouter(APIRouterBase):
             """
 
             tasks = self.task_store.get_tasks_for_docsource(docsource_uuid)
-            return self._remove_content_from_tasks(tasks)
+            return tasks
 
         @self.get("/docsink/{docsink_uuid}", response_model=List[Task])
         async def get_tasks_for_docsink(
@@ -150,7 +124,7 @@ class TaskRouter(APIRouterBase):
             """
 
             tasks = self.task_store.get_tasks_for_docsink(docsink_uuid)
-            return self._remove_content_from_tasks(tasks)
+            return tasks
 
         @self.get("/document/{doc_uuid}", response_model=List[Task])
         async def get_tasks_for_document(
@@ -162,7 +136,7 @@ class TaskRouter(APIRouterBase):
             """
 
             tasks = self.task_store.get_tasks_for_document(doc_uuid)
-            return self._remove_content_from_tasks(tasks)
+            return tasks
 
         @self.get("/{task_uuid}", response_model=Task)
         async def get_task_by_id(
@@ -155,6 +155,7 @@ class LocalSearch(AbstractRetriever):
             search_params=search_params,
             query_meta=None,
             filter=filter,
+            display_logger=display_logger,
         )
 
         # we need tp combine all results from teh same uri to form a single result
@@ -1,7 +1,9 @@
+import asyncio
 from datetime import timedelta
 from pathlib import Path
 from typing import Optional
 
+import httpx
 import requests
 from bs4 import BeautifulSoup
 
@@ -65,139 +67,168 @@ class BeautifulSoupSimpleScraper(AbstractScraper):
             self.display_logger.error(f"scrape_content_to_str {url}: {e}")
             return ""
 
-    def scrape_to_file(self, url: str, dir: str) -> ScrapeResult:
-        # TODO: use settings to set the default values of the parameters
-        # such as size limit, timeout, etc.
-        file_path = ""
-
-        try:
-            filename_prefix = file_utils.extract_filename_from_uri(url)
-            suffix = file_utils.extract_file_suffix_from_url(url)
-            if suffix != "":
-                existing_scrape_result = check_existing_file(
-                    url=url,
-                    dir=dir,
-                    filename_prefix=filename_prefix,
-                    suffix=suffix,
-                    display_logger=self.display_logger,
-                )
-                if existing_scrape_result is not None:
-                    return existing_scrape_result
-                else:
-                    self.display_logger.debug(
-                        f"No previous result found, need to scrape: {url} "
-                        f"prefix {filename_prefix} suffix {suffix}"
-                    )
-            else:
-                self.display_logger.debug(
-                    f"No suffix found, need to crawl first: {url}."
-                )
-
-            response = self.session.get(url, timeout=10)
-            # check the type of the response
-            content_type = response.headers.get("content-type")
-            if content_type is None:
-                self.display_logger.info(
-                    f"Skipped scraping: {url}: content-type is None"
-                )
-                return ScrapeResult(
-                    url=url,
-                    file_path=None,
-                    content=None,
-                    reused=False,
-                    rtn_code=ReturnCode.FAILURE_ABORT,
-                )
+    def _check_existing_file(self, url: str, dir: str) -> Optional[ScrapeResult]:
+        filename_prefix = file_utils.extract_filename_from_uri(url)
+        suffix = file_utils.extract_file_suffix_from_url(url)
+        if suffix == "":
+            self.display_logger.debug(f"No suffix found, need to crawl first: {url}.")
+            return None
+
+        existing_scrape_result = check_existing_file(
+            url=url,
+            dir=dir,
+            filename_prefix=filename_prefix,
+            suffix=suffix,
+            display_logger=self.display_logger,
+        )
+        if existing_scrape_result is None:
+            self.display_logger.debug(
+                f"No previous result found, need to scrape: {url} "
+                f"prefix {filename_prefix} suffix {suffix}"
+            )
+        return existing_scrape_result
+
+    def _save_response_to_file(
+        self, url: str, dir: str, content_type: Optional[str], content: bytes
+    ) -> ScrapeResult:
+        # check the type of the response
+        if content_type is None:
+            self.display_logger.info(f"Skipped scraping: {url}: content-type is None")
+            return ScrapeResult(
+                url=url,
+                file_path=None,
+                content=None,
+                reused=False,
+                rtn_code=ReturnCode.FAILURE_ABORT,
+            )
 
-            # if it is not an HTML file, save directly to the file
-            if "text/html" not in content_type:
-                content_type = response.headers.get("content-type")
-                content = response.content
-                return save_url_content_to_file(
-                    url=url,
-                    dir=dir,
-                    content_type=content_type,
-                    content=content,
-                    display_logger=self.display_logger,
-                )
+        # if it is not an HTML file, save directly to the file
+        if "text/html" not in content_type:
+            return save_url_content_to_file(
+                url=url,
+                dir=dir,
+                content_type=content_type,
+                content=content,
+                display_logger=self.display_logger,
+            )
 
-            soup = BeautifulSoup(response.content, "lxml", from_encoding="utf-8")
+        soup = BeautifulSoup(content, "lxml", from_encoding="utf-8")
 
-            body_tag = soup.body
-            # Extract the text content from the body
-            if body_tag:
-                body_text = body_tag.get_text()
-                body_text = " ".join(body_text.split()).strip()
-                if not self._is_content_length_ok(body_text):
-                    return ScrapeResult(
-                        url=url,
-                        file_path=None,
-                        content=body_text,
-                        reused=False,
-                        rtn_code=ReturnCode.FAILURE_ABORT,
-                    )
-            else:
-                self.display_logger.info(
-                    "Error scraping: {url}: No body tag found in the HTML document."
-                )
+        body_tag = soup.body
+        # Extract the text content from the body
+        if body_tag:
+            body_text = body_tag.get_text()
+            body_text = " ".join(body_text.split()).strip()
+            if not self._is_content_length_ok(body_text):
                 return ScrapeResult(
                     url=url,
                     file_path=None,
-                    content=None,
+                    content=body_text,
                     reused=False,
                     rtn_code=ReturnCode.FAILURE_ABORT,
                 )
+        else:
+            self.display_logger.info(
+                "Error scraping: {url}: No body tag found in the HTML document."
+            )
+            return ScrapeResult(
+                url=url,
+                file_path=None,
+                content=None,
+                reused=False,
+                rtn_code=ReturnCode.FAILURE_ABORT,
+            )
 
-            for script_or_style in soup(["script"]):
-                script_or_style.extract()
-
-            content = soup.prettify()
+        for script_or_style in soup(["script"]):
+            script_or_style.extract()
 
-            if not self._is_content_length_ok(content):
-                self.display_logger.info(
-                    f"Error scraping: {url}: final content length too short: {content}"
-                )
-                return ScrapeResult(
-                    url=url,
-                    file_path=None,
-                    content=content,
-                    reused=False,
-                    rtn_code=ReturnCode.FAILURE_ABORT,
-                )
+        html_content = soup.prettify()
 
-            suffix = "html"
-            existing_scrape_result = check_existing_file(
+        if not self._is_content_length_ok(html_content):
+            self.display_logger.info(
+                f"Error scraping: {url}: final content length too short: "
+                f"{html_content}"
+            )
+            return ScrapeResult(
                 url=url,
-                dir=dir,
-                filename_prefix=filename_prefix,
-                suffix=suffix,
-                display_logger=self.display_logger,
+                file_path=None,
+                content=html_content,
+                reused=False,
+                rtn_code=ReturnCode.FAILURE_ABORT,
             )
-            if existing_scrape_result is not None:
-                return existing_scrape_result
 
-            timestamp = file_utils.filename_timestamp()
-            file_path = f"{dir}/{filename_prefix}.{timestamp}.{suffix}"
+        filename_prefix = file_utils.extract_filename_from_uri(url)
+        suffix = "html"
+        existing_scrape_result = check_existing_file(
+            url=url,
+            dir=dir,
+            filename_prefix=filename_prefix,
+            suffix=suffix,
+            display_logger=self.display_logger,
+        )
+        if existing_scrape_result is not None:
+            return existing_scrape_result
+
+        timestamp = file_utils.filename_timestamp()
+        file_path = f"{dir}/{filename_prefix}.{timestamp}.{suffix}"
+
+        # if file already exists, print out an warning since this should not happen
+        if Path(file_path).exists():
+            self.display_logger.warning(
+                f"File with the same name and timestamp already exists: {file_path}"
+            )
 
-            # if file already exists, print out an warning since this should not happen
-            if Path(file_path).exists():
-                self.display_logger.warning(
-                    f"File with the same name and timestamp already exists: {file_path}"
-                )
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(html_content)
+        return ScrapeResult(
+            url=url,
+            file_path=file_path,
+            content=html_content,
+            reused=False,
+            rtn_code=ReturnCode.SUCCESS,
+        )
 
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write(content)
+    def scrape_to_file(self, url: str, dir: str) -> ScrapeResult:
+        # TODO: use settings to set the default values of the parameters
+        # such as size limit, timeout, etc.
+        try:
+            existing_scrape_result = self._check_existing_file(url, dir)
+            if existing_scrape_result is not None:
+                return existing_scrape_result
+
+            response = self.session.get(url, timeout=10)
+            return self._save_response_to_file(
+                url, dir, response.headers.get("content-type"), response.content
+            )
+        except Exception as e:
+            self.display_logger.warning(f"Exception scrape_to_file {url}: {e}")
             return ScrapeResult(
                 url=url,
-                file_path=file_path,
-                content=content,
+                file_path=None,
+                content=None,
                 reused=False,
-                rtn_code=ReturnCode.SUCCESS,
+                rtn_code=ReturnCode.FAILURE_ABORT,
             )
 
-        except Exception as e:
-            self.display_logger.warning(
-                f"Exception scrape_to_file {url} {file_path}: {e}"
+    async def scrape_to_file_async(
+        self, url: str, dir: str, client: httpx.AsyncClient
+    ) -> ScrapeResult:
+        try:
+            existing_scrape_result = self._check_existing_file(url, dir)
+            if existing_scrape_result is not None:
+                return existing_scrape_result
+
+            response = await client.get(url)
+            # parsing the page is CPU-bound, keep it off the event loop
+            return await asyncio.to_thread(
+                self._save_response_to_file,
+                url,
+                dir,
+                response.headers.get("content-type"),
+                response.content,
             )
+        except Exception as e:
+            self.display_logger.warning(f"Exception scrape_to_file {url}: {e}")
             return ScrapeResult(
                 url=url,
                 file_path=None,
@@ -1,6 +1,8 @@
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Optional
 
+import httpx
 import requests
 
 from leettools.common.logging.event_logger import EventLogger
@@ -58,6 +60,24 @@ class AbstractScraper(ABC):
         """
         pass
 
+    async def scrape_to_file_async(
+        self, url: str, dir: str, client: httpx.AsyncClient
+    ) -> ScrapeResult:
+        """
+        The async version of `scrape_to_file` used by the WebScraper to scrape many
+        URLs concurrently. Scrapers fetching the page themselves should override it
+        to use the shared `client`, by default `scrape_to_file` runs in a thread.
+
+        Args:
+        - url (str): The URL of the webpage from which the content should be scraped.
+        - dir (str): The dir where the scraped content should be saved.
+        - client (httpx.AsyncClient): The HTTP client shared by the scraping tasks.
+
+        Returns:
+        - the final ScrapeResult with the file path and the content.
+        """
+        return await asyncio.to_thread(self.scrape_to_file, url, dir)
+
     @abstractmethod
     def scraper_type(self) -> str:
         """
@@ -0,0 +1,258 @@
+import time
+from pathlib import Path
+from typing import List, Optional, Set
+from urllib.parse import urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+
+import lxml.html
+import requests
+from lxml import etree
+
+from leettools.common.logging import logger
+from leettools.common.logging.event_logger import EventLogger
+from leettools.common.utils import url_utils
+from leettools.context_manager import Context
+from leettools.web.schemas.scrape_result import ScrapeResult
+from leettools.web.web_scraper import WebScraper
+
+_SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+_HYPERLINK_FILE_EXTS = (".html", ".htm", ".php", ".asp")
+# the max number of sitemaps read from a sitemap index
+_MAX_SITEMAPS = 10
+
+
+def get_crawl_key(url: str) -> str:
+    """
+    Get the key of the URL in the seen set of the crawler, so that the different
+    forms of the same page are only crawled once.
+
+    The query and the fragment are removed as in url_utils.normalize_url, the
+    scheme and the host are lowercased, the default port is removed, and the
+    empty path is the same as "/".
+
+    Args:
+    - url: The URL to get the key for.
+
+    Returns:
+    - The key of the URL.
+    """
+    parsed_url = urlparse(url_utils.normalize_url(url))
+    scheme = parsed_url.scheme.lower()
+    netloc = parsed_url.netloc.lower()
+    if (scheme == "http" and netloc.endswith(":80")) or (
+        scheme == "https" and netloc.endswith(":443")
+    ):
+        netloc = netloc.rsplit(":", 1)[0]
+    path = parsed_url.path or "/"
+    return f"{scheme}://{netloc}{path}"
+
+
+def extract_links(base_url: str, content: str) -> List[str]:
+    """
+    Extract the http and https links of the <a> tags in the HTML content.
+
+    Args:
+    - base_url: The URL of the page, used to resolve the relative links.
+    - content: The HTML content.
+
+    Returns:
+    - The absolute URLs of the links in the order they appear in the page.
+    """
+    try:
+        doc = lxml.html.fromstring(content)
+    except (etree.ParserError, ValueError):
+        return []
+    links = []
+    for href in doc.xpath("//a/@href"):
+        full_url = urljoin(base_url, href.strip())
+        if urlparse(full_url).scheme in ("http", "https"):
+            links.append(full_url)
+    return links
+
+
+class WebCrawler:
+    """
+    Crawl the pages of a web site breadth-first.
+
+    The pages of one depth are scraped concurrently by the WebScraper, and the
+    links of each page are extracted as soon as it is scraped to build the
+    frontier of the next depth. Only the pages in the same first level domain as
+    the start URL are crawled, the robots.txt of the site is respected, and the
+    URLs in the sitemaps of the site under the start URL are crawled with the
+    start URL. The max depth and the max number of URLs apply to the whole crawl.
+    """
+
+    def __init__(
+        self,
+        context: Context,
+        user_agent: str = None,
+        display_logger: Optional[EventLogger] = None,
+    ):
+        self.context = context
+        self.settings = context.settings
+        if user_agent is not None:
+            self.user_agent = user_agent
+        else:
+            self.user_agent = url_utils.DEFAULT_USER_AGENT
+        if display_logger is not None:
+            self.display_logger = display_logger
+        else:
+            self.display_logger = logger()
+
+        self.web_scraper = WebScraper(
+            context=context,
+            user_agent=self.user_agent,
+            display_logger=self.display_logger,
+        )
+        self.robots: Optional[RobotFileParser] = None
+
+    def _get(self, url: str) -> Optional[requests.Response]:
+        try:
+            response = self.web_scraper.session.get(
+                url, timeout=self.settings.web_scrape_timeout_in_seconds
+            )
+        except requests.RequestException as e:
+            self.display_logger.debug(f"Failed to get {url}: {e}")
+            return None
+        if response.status_code != 200:
+            self.display_logger.debug(f"Failed to get {url}: {response.status_code}")
+            return None
+        return response
+
+    def _load_robots(self, start_url: str) -> None:
+        parsed_url = urlparse(start_url)
+        robots_url = f"{parsed_url.scheme}://{parsed_url.netloc}/robots.txt"
+        self.robots = RobotFileParser(robots_url)
+        response = self._get(robots_url)
+        # no robots.txt allows all the URLs
+        self.robots.parse(response.text.splitlines() if response is not None else [])
+
+    def _is_allowed(self, url: str) -> bool:
+        if self.robots is None:
+            return True
+        return self.robots.can_fetch(self.user_agent, url)
+
+    def _get_sitemap_urls(self, start_url: str) -> List[str]:
+        parsed_url = urlparse(start_url)
+        sitemaps = self.robots.site_maps() if self.robots is not None else None
+        if not sitemaps:
+            sitemaps = [f"{parsed_url.scheme}://{parsed_url.netloc}/sitemap.xml"]
+
+        # an lxml parser can't be shared by the threads crawling at the same time
+        parser = etree.XMLParser(resolve_entities=False, no_network=True)
+        urls: List[str] = []
+        read_count = 0
+        while len(sitemaps) > 0 and read_count < _MAX_SITEMAPS:
+            sitemap_url = sitemaps.pop(0)
+            read_count += 1
+            response = self._get(sitemap_url)
+            if response is None:
+                continue
+            try:
+                root = etree.fromstring(response.content, parser=parser)
+            except etree.XMLSyntaxError as e:
+                self.display_logger.debug(f"Invalid sitemap {sitemap_url}: {e}")
+                continue
+            locs = [loc.text.strip() for loc in root.iter(f"{_SITEMAP_NS}loc")]
+            if root.tag == f"{_SITEMAP_NS}sitemapindex":
+                sitemaps.extend(locs)
+            else:
+                urls.extend(locs)
+        self.display_logger.debug(f"Found {len(urls)} URLs in the sitemaps.")
+        return urls
+
+    def _read_links(self, scrape_result: ScrapeResult) -> List[str]:
+        if not scrape_result.file_path.lower().endswith(_HYPERLINK_FILE_EXTS):
+            self.display_logger.info(
+                f"Skipping link checking for file: {scrape_result.file_path}"
+            )
+            return []
+        content = scrape_result.content
+        if not content:
+            # the content is not returned when a saved file is reused
+            content = Path(scrape_result.file_path).read_text(encoding="utf-8")
+        return extract_links(scrape_result.url, content)
+
+    def crawl(
+        self, start_url: str, max_depth: int, max_urls: int
+    ) -> List[ScrapeResult]:
+        """
+        Crawl the web site from the start URL.
+
+        Args:
+        - start_url: The URL to start the crawl.
+        - max_depth: The max depth of the pages to crawl, the start URL is at 1.
+        - max_urls: The max number of URLs to scrape in the crawl.
+
+        Returns:
+        - The successful scrape results of the pages crawled.
+        """
+        if "://" not in start_url:
+            self.display_logger.warning(
+                f"URL {start_url} has no scheme, adding https:// as default."
+            )
+            start_url = f"https://{start_url}"
+        start_url = url_utils.normalize_url(start_url)
+        start_time = time.perf_counter()
+        top_tld = url_utils.get_first_level_domain_from_url(start_url)
+
+        self._load_robots(start_url)
+        seen: Set[str] = set()
+
+        def _add_to_frontier(url: str, frontier: List[str]) -> None:
+            key = get_crawl_key(url)
+            if key in seen:
+                return
+            seen.add(key)
+            if url_utils.get_first_level_domain_from_url(url) != top_tld:
+                self.display_logger.debug(f"Skipping different tld: {url}")
+                return
+            if not self._is_allowed(url):
+                self.display_logger.info(f"Skipping URL disallowed by robots: {url}")
+                return
+            frontier.append(url_utils.normalize_url(url))
+
+        frontier: List[str] = []
+        _add_to_frontier(start_url, frontier)
+        # only the pages of the sitemaps under the start URL are in the crawl
+        url_prefix = start_url.rsplit("/", 1)[0] + "/"
+        for url in self._get_sitemap_urls(start_url):
+            if url.startswith(url_prefix):
+                _add_to_frontier(url, frontier)
+
+        results: List[ScrapeResult] = []
+        scraped_count = 0
+        depth = 1
+        while len(frontier) > 0 and depth <= max_depth and scraped_count < max_urls:
+            urls = frontier[: max_urls - scraped_count]
+            scraped_count += len(urls)
+            self.display_logger.info(
+                f"Crawling {len(urls)} URLs at depth {depth}, "
+                f"{scraped_count} of max {max_urls} URLs."
+            )
+
+            next_frontier: List[str] = []
+            for scrape_result in self.web_scraper.scrape_urls_iter(urls):
+                results.append(scrape_result)
+                if depth >= max_depth or scraped_count >= max_urls:
+                    continue
+                try:
+                    links = self._read_links(scrape_result)
+                except Exception as e:
+                    self.display_logger.warning(
+                        f"Failed to find links in {scrape_result.url}: {e}"
+                    )
+                    continue
+                for link in links:
+                    _add_to_frontier(link, next_frontier)
+
+            frontier = next_frontier
+            depth += 1
+
+        elapsed = time.perf_counter() - start_time
+        self.display_logger.info(
+            f"Crawled {start_url}: {len(results)} pages saved of {scraped_count} "
+            f"URLs in {elapsed:.1f}s, {scraped_count / max(elapsed, 1e-6):.1f} "
+            f"pages/s."
+        )
+        return results
@@ -1,10 +1,16 @@
+import asyncio
+import importlib.util
 import os
+import queue
+import threading
+import time
 import traceback
-from concurrent.futures.thread import ThreadPoolExecutor
-from functools import partial
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import urlparse
 
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
 
 from leettools.common.logging import logger
 from leettools.common.logging.event_logger import EventLogger
@@ -14,6 +20,12 @@ from leettools.core.consts.return_code import ReturnCode
 from leettools.web.schemas.scrape_result import ScrapeResult
 from leettools.web.scrapers.scraper import get_scraper
 
+# HTTP/2 needs the h2 package, which is installed with httpx[http2]
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# marks the end of the results of a batch in the result queue
+_SCRAPE_DONE = object()
+
 
 class WebScraper:
     """
@@ -38,6 +50,10 @@ class WebScraper:
         self.settings = context.settings
 
         self.session = requests.Session()
+        # the scrapers fetching the pages with the session run in threads
+        adapter = HTTPAdapter(pool_maxsize=self.settings.web_scrape_max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
         if user_agent is not None:
             self.user_agent = user_agent
         else:
@@ -55,21 +71,134 @@ class WebScraper:
         else:
             self.display_logger = logger()
 
-    def scrape_urls_to_file(self, urls: List[str]) -> List[ScrapeResult]:
+    def scrape_urls_to_file(
+        self, urls: List[str], deadline_in_seconds: Optional[float] = None
+    ) -> List[ScrapeResult]:
         """
         Scrape the list of URLs and extract the content from them.
 
         Args:
         - urls: A list of strings representing the URLs to extract content from
+        - deadline_in_seconds: If larger than 0, the URLs not scraped within this
+            time are dropped. The WEB_SCRAPE_DEADLINE_IN_SECONDS setting if None.
 
         Returns:
         - A list of ScrapeResult objects
         """
-        partial_extract = partial(self._save_data_from_link)
-        with ThreadPoolExecutor(max_workers=20) as executor:
-            results = executor.map(partial_extract, urls)
-        res = [result for result in results if result.file_path is not None]
-        return res
+        return list(self.scrape_urls_iter(urls, deadline_in_seconds))
+
+    def scrape_urls_iter(
+        self, urls: List[str], deadline_in_seconds: Optional[float] = None
+    ) -> Iterator[ScrapeResult]:
+        """
+        Scrape the URLs concurrently and yield the successful results in the order
+        they finish, so that the caller can process the early finishers while the
+        other URLs are still being scraped.
+
+        The URLs are scraped by the tasks of an event loop in a separate thread,
+        sharing one HTTP client that keeps the connections alive between the
+        requests to the same host. At most web_scrape_max_concurrency URLs are
+        scraped at the same time, and at most web_scrape_max_concurrency_per_host
+        of them from the same host.
+
+        Args:
+        - urls: A list of strings representing the URLs to extract content from
+        - deadline_in_seconds: If larger than 0, the URLs not scraped within this
+            time are dropped. The WEB_SCRAPE_DEADLINE_IN_SECONDS setting if None.
+
+        Returns:
+        - An iterator of the successful ScrapeResult objects
+        """
+        if len(urls) == 0:
+            return
+        if deadline_in_seconds is None:
+            deadline_in_seconds = self.settings.WEB_SCRAPE_DEADLINE_IN_SECONDS
+
+        result_queue: queue.Queue = queue.Queue()
+        thread = threading.Thread(
+            target=self._run_scrape_loop,
+            args=(urls, deadline_in_seconds, result_queue),
+            name="web_scraper",
+            daemon=True,
+        )
+        thread.start()
+        while True:
+            result = result_queue.get()
+            if result is _SCRAPE_DONE:
+                break
+            if result.file_path is not None:
+                yield result
+
+    def _run_scrape_loop(
+        self, urls: List[str], deadline_in_seconds: float, result_queue: queue.Queue
+    ) -> None:
+        try:
+            asyncio.run(self._scrape_urls(urls, deadline_in_seconds, result_queue))
+        except Exception as e:
+            trace = traceback.format_exc()
+            self.display_logger.error(f"Error scraping the URLs: {e}")
+            self.display_logger.debug(f"Detailed error: {trace}")
+        finally:
+            # the consumer stops at the first mark, a second one is ignored
+            result_queue.put(_SCRAPE_DONE)
+
+    async def _scrape_urls(
+        self, urls: List[str], deadline_in_seconds: float, result_queue: queue.Queue
+    ) -> None:
+        settings = self.settings
+        deadline = None
+        if deadline_in_seconds > 0:
+            deadline = time.perf_counter() + deadline_in_seconds
+
+        max_concurrency = max(1, settings.web_scrape_max_concurrency)
+        max_concurrency_per_host = max(1, settings.web_scrape_max_concurrency_per_host)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+        async with httpx.AsyncClient(
+            http2=_HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+            ),
+            timeout=settings.web_scrape_timeout_in_seconds,
+            follow_redirects=True,
+            headers={"User-Agent": self.user_agent},
+        ) as client:
+
+            async def _scrape(url: str) -> ScrapeResult:
+                host = urlparse(url).netloc
+                host_semaphore = host_semaphores.setdefault(
+                    host, asyncio.Semaphore(max_concurrency_per_host)
+                )
+                # wait for the host first to not hold a global slot meanwhile
+                async with host_semaphore:
+                    async with semaphore:
+                        return await self._save_data_from_link(url, client)
+
+            pending = {asyncio.create_task(_scrape(url)) for url in urls}
+            while len(pending) > 0:
+                timeout = None
+                if deadline is not None:
+                    timeout = max(0.0, deadline - time.perf_counter())
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    result_queue.put(task.result())
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+
+            # return to the caller before waiting for the cancelled URLs
+            result_queue.put(_SCRAPE_DONE)
+            if len(pending) > 0:
+                self.display_logger.info(
+                    f"Scraping deadline {deadline_in_seconds}s reached, dropped "
+                    f"{len(pending)} of {len(urls)} URLs not finished."
+                )
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
 
     def scrape_url_to_content(self, url: str) -> Optional[str]:
         """
@@ -104,12 +233,15 @@ class WebScraper:
 
         return target_dir
 
-    def _save_data_from_link(self, url: str) -> ScrapeResult:
+    async def _save_data_from_link(
+        self, url: str, client: httpx.AsyncClient
+    ) -> ScrapeResult:
         """
         Extracts the data from the url.
 
         Args:
         - url (str): The URL of the link to extract data from.
+        - client (httpx.AsyncClient): The HTTP client shared by the scraping tasks.
 
         Returns:
         - the scrape result object
@@ -128,7 +260,7 @@ class WebScraper:
             )
             dir = self._get_dir_for_url(url)
             display_logger.info(f"🔍 Trying to scrape: {url} to dir {dir}")
-            scrape_result = scraper.scrape_to_file(url, dir)
+            scrape_result = await scraper.scrape_to_file_async(url, dir, client)
 
             if scrape_result is None or scrape_result.rtn_code != ReturnCode.SUCCESS:
                 if scrape_result is None:
@@ -149,7 +281,7 @@ class WebScraper:
                         default_type=fallback_scraper,
                         display_logger=display_logger,
                     )
-                    scrape_result = scraper.scrape_to_file(url, dir)
+                    scrape_result = await scraper.scrape_to_file_async(url, dir, client)
                     display_logger.debug(
                         f"Fallback scraper returned null result for: {url} "
                         f"or failed rtn_code: {scrape_result.rtn_code}."
@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Any, ClassVar, Dict, List, Optional, Type
+from typing import Any, ClassVar, Dict, Iterator, List, Optional, Type
 
 from leettools.common.logging import logger
 from leettools.common.logging.event_logger import EventLogger
@@ -129,6 +129,49 @@ local storage.
 
         return new_urls
 
+    def _search_new_urls(
+        self,
+        context: Context,
+        org: Org,
+        kb: KnowledgeBase,
+        user: User,
+        search_keywords: str,
+        flow_options: Optional[Dict[str, Any]],
+        display_logger: EventLogger,
+    ) -> List[str]:
+        if flow_options is None:
+            flow_options = {}
+
+        retrieve_type = config_utils.get_str_option_value(
+            options=flow_options,
+            option_name=flow_option.FLOW_OPTION_RETRIEVER_TYPE,
+            default_value=context.settings.WEB_RETRIEVER,
+            display_logger=display_logger,
+        )
+        retriever = create_retriever(
+            retriever_type=retrieve_type,
+            context=context,
+            org=org,
+            kb=kb,
+            user=user,
+        )
+
+        search_results = retriever.retrieve_search_result(
+            search_keywords=search_keywords,
+            flow_options=flow_options,
+            display_logger=display_logger,
+        )
+
+        if len(search_results) == 0:
+            display_logger.info(
+                f"[Update] No search results found for query {search_keywords}."
+            )
+            return []
+
+        return self._get_new_urls(
+            [search_result.href for search_result in search_results]
+        )
+
     def create_docsinks_by_search_and_scrape(
         self,
         context: Context,
@@ -161,39 +204,18 @@ local storage.
         if display_logger is None:
             display_logger = logger()
 
-        if flow_options is None:
-            flow_options = {}
-
-        retrieve_type = config_utils.get_str_option_value(
-            options=flow_options,
-            option_name=flow_option.FLOW_OPTION_RETRIEVER_TYPE,
-            default_value=context.settings.WEB_RETRIEVER,
-            display_logger=display_logger,
-        )
-        retriever = create_retriever(
-            retriever_type=retrieve_type,
+        new_search_urls = self._search_new_urls(
             context=context,
             org=org,
             kb=kb,
             user=user,
-        )
-
-        search_results = retriever.retrieve_search_result(
             search_keywords=search_keywords,
             flow_options=flow_options,
             display_logger=display_logger,
         )
-
-        if len(search_results) == 0:
-            display_logger.info(
-                f"[Update] No search results found for query {search_keywords}."
-            )
+        if len(new_search_urls) == 0:
             return []
 
-        new_search_urls = self._get_new_urls(
-            [search_result.href for search_result in search_results]
-        )
-
         docsink_create_list = self.scrape_urls_to_docsinks(
             query=search_keywords,
             org=org,
@@ -209,6 +231,56 @@ local storage.
 
         return docsink_create_list
 
+    def create_docsinks_by_search_and_scrape_iter(
+        self,
+        context: Context,
+        org: Org,
+        kb: KnowledgeBase,
+        user: User,
+        search_keywords: str,
+        docsource: DocSource,
+        flow_options: Optional[Dict[str, Any]] = {},
+        display_logger: Optional[EventLogger] = None,
+    ) -> Iterator[DocSinkCreate]:
+        """
+        Same as create_docsinks_by_search_and_scrape, but yield the DocSinkCreate
+        objects as the pages are scraped, so that the caller can start processing
+        the early finishers.
+
+        Args:
+        - context (Context): the Context object.
+        - org (Org): The organization object.
+        - kb (KnowledgeBase): The KnowledgeBase object.
+        - user (User): The user object.
+        - search_keywords (str): The search keywords string.
+        - docsource (DocSource): The document source.
+        - flow_options (Optional[Dict[str, Any]]): The flow options.
+        - display_logger (Optional[EventLogger]): The display logger.
+
+        Returns:
+        - An iterator of DocSinkCreate objects.
+        """
+        if display_logger is None:
+            display_logger = logger()
+
+        new_search_urls = self._search_new_urls(
+            context=context,
+            org=org,
+            kb=kb,
+            user=user,
+            search_keywords=search_keywords,
+            flow_options=flow_options,
+            display_logger=display_logger,
+        )
+        yield from self.scrape_urls_to_docsinks_iter(
+            query=search_keywords,
+            org=org,
+            kb=kb,
+            docsource=docsource,
+            links=new_search_urls,
+            display_logger=display_logger,
+        )
+
     def scrape_urls_to_docsinks(
         self,
         query: str,
@@ -235,18 +307,55 @@ local storage.
         if display_logger is None:
             display_logger = self.display_logger
 
-        scraper = WebScraper(context=self.context, display_logger=display_logger)
-        scrape_results = scraper.scrape_urls_to_file(links)
-
-        display_logger.info(
-            f"[Update] Scraped {len(scrape_results)} results for {query}"
+        docsink_create_list = list(
+            self.scrape_urls_to_docsinks_iter(
+                query=query,
+                org=org,
+                kb=kb,
+                docsource=docsource,
+                links=links,
+                display_logger=display_logger,
+            )
         )
 
-        docsink_create_list = _get_docsink_create_from_saved_files(
-            kb=kb, docsource=docsource, scrape_results=scrape_results
+        display_logger.info(
+            f"[Update] Scraped {len(docsink_create_list)} results for {query}"
         )
         return docsink_create_list
 
+    def scrape_urls_to_docsinks_iter(
+        self,
+        query: str,
+        org: Org,
+        kb: KnowledgeBase,
+        docsource: DocSource,
+        links: List[str],
+        display_logger: Optional[EventLogger] = None,
+    ) -> Iterator[DocSinkCreate]:
+        """
+        Scrape the URLs and yield the documents for an existing docsource in the
+        order the pages are scraped.
+
+        Args:
+        - query (str): The query string.
+        - org (Org): The organization object.
+        - kb (KnowledgeBase): The KnowledgeBase object.
+        - docsource (DocSource): The DocSource object.
+        - links (List[str]): The list of URLs to scrape.
+        - display_logger (Optional[EventLogger]): The display logger.
+
+        Returns:
+        - An iterator of DocSinkCreate objects.
+        """
+        if display_logger is None:
+            display_logger = self.display_logger
+
+        scraper = WebScraper(context=self.context, display_logger=display_logger)
+        for scrape_result in scraper.scrape_urls_iter(links):
+            yield from _get_docsink_create_from_saved_files(
+                kb=kb, docsource=docsource, scrape_results=[scrape_result]
+            )
+
     def simple_search(
         self,
         context: Context,
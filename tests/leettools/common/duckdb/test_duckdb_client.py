@@ -0,0 +1,71 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from leettools.common.duckdb.duckdb_client import (
+    STATS_TABLE_LOCK,
+    STATS_WRITE_QUEUE,
+    DuckDBClient,
+)
+from leettools.common.temp_setup import TempSetup
+
+
+def test_duckdb_client_concurrent_read_write():
+    temp_setup = TempSetup()
+    duckdb_client = DuckDBClient(temp_setup.context.settings)
+
+    table_name = duckdb_client.create_table_if_not_exists(
+        schema_name="test_duckdb_client",
+        table_name=f"t_{uuid.uuid4().hex}",
+        columns={"item_id": "INTEGER", "content": "VARCHAR"},
+    )
+
+    def _insert(i: int) -> None:
+        duckdb_client.insert_into_table(
+            table_name=table_name,
+            column_list=["item_id", "content"],
+            value_list=[i, f"content {i}"],
+        )
+
+    def _read(i: int) -> int:
+        return len(duckdb_client.fetch_all_from_table(table_name=table_name))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(_insert, range(100)))
+        counts = list(executor.map(_read, range(100)))
+
+    assert counts == [100] * 100
+
+    duckdb_client.update_table(
+        table_name=table_name,
+        column_list=["content"],
+        value_list=["updated", 1],
+        where_clause="WHERE item_id = ?",
+    )
+    row = duckdb_client.fetch_one_from_table(
+        table_name=table_name,
+        where_clause="WHERE item_id = ?",
+        value_list=[1],
+    )
+    assert row["content"] == "updated"
+
+    duckdb_client.delete_from_table(
+        table_name=table_name, where_clause="WHERE item_id < ?", value_list=[50]
+    )
+    assert len(duckdb_client.fetch_all_from_table(table_name=table_name)) == 50
+
+    # errors from the writer are raised in the calling thread
+    with pytest.raises(Exception):
+        duckdb_client.insert_into_table(
+            table_name=table_name,
+            column_list=["no_such_column"],
+            value_list=[1],
+        )
+
+    stats = duckdb_client.get_stats()
+    assert stats[STATS_WRITE_QUEUE].count >= 103
+    assert stats[STATS_TABLE_LOCK].count >= 1
+    assert stats[STATS_WRITE_QUEUE].max_wait_ms >= 0.0
+
+    duckdb_client.execute_sql(f"DROP TABLE {table_name}")
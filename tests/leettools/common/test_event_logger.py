@@ -0,0 +1,61 @@
+from pathlib import Path
+
+from leettools.common.logging.event_logger import EventLogger
+
+
+class _CountingStr:
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __str__(self) -> str:
+        self.count += 1
+        return "counted"
+
+
+def test_event_logger_lazy_and_call_site(tmp_path: Path):
+    logger = EventLogger.get_instance("test_event_logger_lazy")
+    logger.set_level("INFO")
+    log_file = tmp_path / "events.log"
+    logger.log_to_file(log_file)
+    try:
+        arg = _CountingStr()
+        logger.debug("skipped %s", arg)
+        assert arg.count == 0
+        assert not logger.is_enabled_for("DEBUG")
+        assert logger.is_enabled_for("info")
+
+        logger.info("logged %s and %d", arg, 3)
+        assert arg.count == 1
+        logger.info("no args with 100%")
+    finally:
+        logger.remove_file_handler()
+        EventLogger.remove_instance("test_event_logger_lazy")
+
+    content = log_file.read_text()
+    assert "skipped" not in content
+    assert "logged counted and 3" in content
+    assert "no args with 100%" in content
+    # the call site is the caller of the logger
+    assert "(test_event_logger.py:" in content
+    assert "test_event_logger_lazy_and_call_site)" in content
+
+
+def test_event_logger_async_file(tmp_path: Path):
+    logger = EventLogger.get_instance("test_event_logger_async")
+    logger.set_level("INFO")
+    logger.set_log_detail(thread=False, code_loc=False)
+    log_file = tmp_path / "query.log"
+    handler = logger.log_to_file(log_file, async_write=True)
+    handler.setFormatter(EventLogger.get_simple_formatter())
+    try:
+        for i in range(100):
+            logger.info("message %d", i)
+    finally:
+        # the queued records are written before the handler is removed
+        logger.remove_file_handler()
+        EventLogger.remove_instance("test_event_logger_async")
+
+    lines = log_file.read_text().splitlines()
+    assert len(lines) == 100
+    assert lines[-1].endswith("INFO message 99")
+    assert logger.get_file_handler() is None
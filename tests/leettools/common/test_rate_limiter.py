@@ -0,0 +1,36 @@
+import time
+
+from leettools.common.utils.rate_limiter import TokenBucket
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate_per_second=20, capacity=2)
+
+    # the burst up to the capacity is not limited
+    assert bucket.acquire()
+    assert bucket.acquire()
+    assert not bucket.acquire(timeout=0.01)
+
+    start = time.monotonic()
+    assert bucket.acquire(timeout=1)
+    assert time.monotonic() - start >= 0.03
+
+    # no limit when the rate is 0
+    bucket.set_rate(0)
+    for _ in range(10):
+        assert bucket.acquire(timeout=0)
+
+
+def test_token_bucket_larger_than_capacity():
+    bucket = TokenBucket(rate_per_second=20, capacity=2)
+
+    # a full bucket is enough for a call larger than the capacity
+    start = time.monotonic()
+    assert bucket.acquire(4, timeout=1)
+    assert time.monotonic() - start < 0.05
+
+    # the full cost is charged, the next call waits for the debt to be refilled
+    assert not bucket.acquire(timeout=0.1)
+    start = time.monotonic()
+    assert bucket.acquire(timeout=1)
+    assert time.monotonic() - start >= 0.03
@@ -59,10 +59,12 @@ def _test_function(context: Context, org: Org, kb: KnowledgeBase, user: User):
             name="test_kb_2",
             description="This is a test KB 2",
             user_uuid=user.user_uuid,
+            parser="parser_docling_text",
         ),
     )
     assert kb_2 is not None
     assert kb_2.name == "test_kb_2"
+    assert kb_2.parser == "parser_docling_text"
 
     kbs = kb_manager.get_all_kbs_for_org(org)
     assert len(kbs) == 3
@@ -72,6 +74,7 @@ def _test_function(context: Context, org: Org, kb: KnowledgeBase, user: User):
     assert kb_2_get.name == kb_2.name
     assert kb_2_get.description == kb_2.description
     assert kb_2_get.kb_id == kb_2.kb_id
+    assert kb_2_get.parser == "parser_docling_text"
 
     update_desc = "Updated description."
     kb_1 = kb_manager.update_kb(org, KBUpdate(name=test_name, description=update_desc))
@@ -0,0 +1,154 @@
+import time
+import uuid
+from typing import Optional
+
+import pytest
+
+from leettools.common.duckdb.duckdb_client import DuckDBClient
+from leettools.common.temp_setup import TempSetup
+from leettools.core.repo._impl.duckdb import full_text_index_duckdb
+from leettools.core.repo._impl.duckdb.full_text_index_duckdb import (
+    FullTextIndexDuckDB,
+    tokenize_for_full_text,
+)
+from leettools.core.repo._impl.duckdb.vector_store_duckdb_schema import (
+    VectorDuckDBSchema,
+)
+from leettools.core.schemas.segment import Segment
+
+
+def test_tokenize_for_full_text():
+    assert tokenize_for_full_text("The Cafés are running!") == ["cafe", "run"]
+    assert tokenize_for_full_text("") == []
+
+
+def _insert_segments(
+    duckdb_client: DuckDBClient,
+    index: Optional[FullTextIndexDuckDB],
+    table_name: str,
+    contents: list,
+    document_uuid: str,
+) -> list:
+    segment_uuids = [str(uuid.uuid4()) for _ in contents]
+    duckdb_client.batch_insert_into_table(
+        table_name=table_name,
+        column_list=[
+            Segment.FIELD_SEGMENT_UUID,
+            Segment.FIELD_DOCUMENT_UUID,
+            Segment.FIELD_CONTENT,
+            Segment.FIELD_EMBEDDINGS,
+        ],
+        values=[
+            [segment_uuid, document_uuid, content, [0.0, 1.0]]
+            for segment_uuid, content in zip(segment_uuids, contents)
+        ],
+    )
+    if index is not None:
+        index.index_segments(table_name, segment_uuids, contents)
+    return segment_uuids
+
+
+def test_full_text_index_duckdb():
+    temp_setup = TempSetup()
+    settings = temp_setup.context.settings
+    duckdb_client = DuckDBClient(settings)
+    table_name = duckdb_client.create_table_if_not_exists(
+        schema_name=settings.DB_COMMOM,
+        table_name=f"test_fts_{uuid.uuid4().hex}",
+        columns=VectorDuckDBSchema.get_schema(2),
+    )
+
+    # the existing rows are indexed when the index is prepared
+    existing_uuids = _insert_segments(
+        duckdb_client, None, table_name, ["ducks are swimming in the pond"], "doc-0"
+    )
+    index = FullTextIndexDuckDB(duckdb_client)
+    index.prepare_index(table_name)
+    results = index.search(table_name, "duck", top_k=5)
+    assert [r[Segment.FIELD_SEGMENT_UUID] for r in results] == existing_uuids
+
+    uuids = _insert_segments(
+        duckdb_client,
+        index,
+        table_name,
+        ["a fox jumps over the dog", "the fox and the fox", "nothing here"],
+        "doc-1",
+    )
+    results = index.search(table_name, "Foxes", top_k=5)
+    assert [r[Segment.FIELD_SEGMENT_UUID] for r in results] == [uuids[1], uuids[0]]
+    assert results[0]["score"] > results[1]["score"] > 0
+    assert index.search(table_name, "the", top_k=5) == []
+
+    results = index.search(
+        table_name,
+        "fox duck",
+        top_k=5,
+        filter_expr=f"{Segment.FIELD_DOCUMENT_UUID} = ?",
+        filter_values=["doc-0"],
+    )
+    assert [r[Segment.FIELD_SEGMENT_UUID] for r in results] == existing_uuids
+
+    where_clause = f"WHERE {Segment.FIELD_SEGMENT_UUID} = ?"
+    index.delete_segments(table_name, where_clause, [uuids[1]])
+    duckdb_client.delete_from_table(
+        table_name=table_name, where_clause=where_clause, value_list=[uuids[1]]
+    )
+    results = index.search(table_name, "fox", top_k=5)
+    assert [r[Segment.FIELD_SEGMENT_UUID] for r in results] == [uuids[0]]
+
+
+def test_full_text_index_duckdb_backfill(monkeypatch: pytest.MonkeyPatch):
+    temp_setup = TempSetup()
+    settings = temp_setup.context.settings
+    duckdb_client = DuckDBClient(settings)
+    table_name = duckdb_client.create_table_if_not_exists(
+        schema_name=settings.DB_COMMOM,
+        table_name=f"test_fts_{uuid.uuid4().hex}",
+        columns=VectorDuckDBSchema.get_schema(2),
+    )
+    contents = [f"the fox number {i}" for i in range(7)]
+    segment_uuids = _insert_segments(duckdb_client, None, table_name, contents, "doc")
+
+    # more rows than one batch, so the backfill runs in the background
+    monkeypatch.setattr(full_text_index_duckdb, "BACKFILL_BATCH_SIZE", 3)
+    index = FullTextIndexDuckDB(duckdb_client)
+    index.prepare_index(table_name)
+    _wait_for_backfill(index, table_name)
+    results = index.search(table_name, "fox", top_k=10)
+    assert sorted(r[Segment.FIELD_SEGMENT_UUID] for r in results) == sorted(
+        segment_uuids
+    )
+    assert set(results[0].keys()) == {Segment.FIELD_SEGMENT_UUID, "score"}
+
+    # another instance shares the index state and does not index the rows again
+    other_index = FullTextIndexDuckDB(duckdb_client)
+    other_index.prepare_index(table_name)
+    assert len(other_index.search(table_name, "fox", top_k=10)) == 7
+
+    # a segment whose docs row is lost, e.g. by a crash in index_segments, is
+    # indexed again with no duplicated postings when the index is prepared
+    docs_table, postings_table = index.index_tables[table_name]
+    duckdb_client.delete_from_table(
+        table_name=docs_table,
+        where_clause=f"WHERE {Segment.FIELD_SEGMENT_UUID} = ?",
+        value_list=[segment_uuids[0]],
+    )
+    full_text_index_duckdb._index_tables.pop(table_name)
+    FullTextIndexDuckDB(duckdb_client).prepare_index(table_name)
+    assert index._count_missing_segments(table_name) == 0
+    rows = duckdb_client.execute_and_fetch_all(
+        f"SELECT COUNT(*) AS count FROM {postings_table} "
+        f"WHERE {Segment.FIELD_SEGMENT_UUID} = ?",
+        [segment_uuids[0]],
+    )
+    assert rows[0]["count"] == len(tokenize_for_full_text(contents[0]))
+
+
+def _wait_for_backfill(index: FullTextIndexDuckDB, table_name: str) -> None:
+    deadline = time.monotonic() + 10
+    while index._count_missing_segments(table_name) > 0:
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    while table_name in full_text_index_duckdb._backfilling_tables:
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
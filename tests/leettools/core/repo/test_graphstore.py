@@ -75,6 +75,33 @@ def _test_function(context: Context, org: Org, kb: KnowledgeBase):
     logger().info(f"Created relationship with id: {relationship_id}")
     assert relationship_id is not None
 
+    # Test create_segment_nodes and create_segments_relationships
+    batch_segments = [
+        SegmentInDB(
+            segment_uuid=f"batch{i}",
+            document_uuid="doc3",
+            doc_uri="uri3",
+            docsink_uuid="docsink1",
+            kb_id=kb_id,
+            content=f"batch content{i}",
+            position_in_doc=f"{i + 1}",
+            heading=f"batch heading{i}",
+            start_offset=0,
+            end_offset=10,
+        )
+        for i in range(3)
+    ]
+    node_ids = graphstore.create_segment_nodes(batch_segments)
+    assert len(node_ids) == 3
+    assert len(set(node_ids)) == 3
+    assert node_ids[0] > node_id2
+    relationship_ids = graphstore.create_segments_relationships(
+        [(node_ids[0], node_ids[1]), (node_ids[0], node_ids[2])]
+    )
+    assert len(relationship_ids) == 2
+    assert relationship_ids[0] > relationship_id
+    assert graphstore.create_segments_relationships([]) == []
+
     # Test update_segment_node
     segment1_in_store.heading = "updated heading1"
     node1_id = graphstore.update_segment_node(segment1_in_store)
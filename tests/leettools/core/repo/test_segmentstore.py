@@ -194,3 +194,40 @@ def _test_function(
     assert older_segment.segment_uuid == segment12.segment_uuid
     younger_segment = segstore.get_younger_sibling_segment(org, kb, segment13)
     assert younger_segment is None
+
+    # Test create_segments
+    segment_creates = [
+        SegmentCreate(
+            document_uuid="doc2",
+            doc_uri=doc_uri,
+            docsink_uuid=docsink_id,
+            kb_id=kb_id,
+            content=f"batch content {i}",
+            position_in_doc=f"1.{i}",
+            start_offset=i * 10,
+            label_tag="batch",
+        )
+        for i in range(5)
+    ]
+    # the first one already exists
+    existing = segstore.create_segment(org, kb, segment_creates[0])
+    batch_segments = segstore.create_segments(org, kb, segment_creates)
+    assert len(batch_segments) == 5
+    assert batch_segments[0].segment_uuid == existing.segment_uuid
+    for i, batch_segment in enumerate(batch_segments):
+        assert batch_segment.position_in_doc == f"1.{i}"
+        stored = segstore.get_segment_by_uuid(org, kb, batch_segment.segment_uuid)
+        assert stored is not None
+        assert stored.content == f"batch content {i}"
+        assert stored.start_offset == i * 10
+        assert stored.label_tag == "batch"
+    assert len(segstore.get_segments_for_document(org, kb, "doc2")) == 5
+
+    # Test get_segments_by_uuids, results follow the order of the uuids
+    uuids = [batch_segment.segment_uuid for batch_segment in batch_segments]
+    uuids = uuids[::-1] + ["non_existent_uuid"]
+    segments = segstore.get_segments_by_uuids(org, kb, uuids)
+    assert len(segments) == 6
+    assert [s.segment_uuid for s in segments[:5]] == uuids[:5]
+    assert segments[5] is None
+    assert segstore.get_segments_by_uuids(org, kb, []) == []
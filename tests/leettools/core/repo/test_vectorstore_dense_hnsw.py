@@ -0,0 +1,115 @@
+import uuid
+
+import duckdb
+import numpy as np
+import pytest
+
+from leettools.common.temp_setup import TempSetup
+from leettools.core.repo._impl.duckdb.vector_store_dense_duckdb import (
+    FULL_TEXT_INDEX_TYPE_INCREMENTAL,
+    VECTOR_INDEX_TYPE_HNSW,
+    VectorStoreDuckDBDense,
+)
+from leettools.core.schemas.segment import Segment
+
+
+def _vss_available() -> bool:
+    try:
+        with duckdb.connect() as conn:
+            conn.execute("LOAD vss;")
+        return True
+    except Exception:
+        return False
+
+
+@pytest.mark.skipif(not _vss_available(), reason="the vss extension is not installed")
+def test_vectorstore_dense_hnsw():
+    temp_setup = TempSetup()
+    context = temp_setup.context
+    org, kb, user = temp_setup.create_tmp_org_kb_user()
+    vector_index_type = context.settings.DUCKDB_VECTOR_INDEX_TYPE
+    context.settings.DUCKDB_VECTOR_INDEX_TYPE = VECTOR_INDEX_TYPE_HNSW
+    try:
+        vector_store = VectorStoreDuckDBDense(context)
+        dimension = 8
+        table_name = vector_store._get_table_name(org, kb, dimension)
+        assert vector_store.ann_indexes[table_name] is not None
+
+        rng = np.random.default_rng(42)
+        segments = []
+        for i in range(50):
+            embeddings = vector_store._normalize_vector(rng.normal(size=dimension))
+            segments.append(
+                Segment(
+                    segment_uuid=str(uuid.uuid4()),
+                    document_uuid=f"doc-{i % 2}",
+                    doc_uri="doc_uri",
+                    docsink_uuid=f"docsink-{i % 2}",
+                    kb_id=kb.kb_id,
+                    content=f"segment {i}",
+                    position_in_doc=f"{i}",
+                    embeddings=embeddings.tolist(),
+                )
+            )
+        with vector_store.index_lock[table_name]:
+            vector_store._batch_upsert_embeddings(table_name, segments)
+
+        def _exact_top_k(query_vector: np.ndarray, top_k: int) -> list:
+            scores = [
+                (float(np.dot(query_vector, segment.embeddings)), segment.segment_uuid)
+                for segment in segments
+            ]
+            return [segment_uuid for _, segment_uuid in sorted(scores)[::-1][:top_k]]
+
+        for _ in range(5):
+            query_vector = vector_store._normalize_vector(rng.normal(size=dimension))
+            results = vector_store._ann_search_in_kb(
+                table_name=table_name,
+                query_vector=query_vector.tolist(),
+                embedding_dimension=dimension,
+                top_k=5,
+                search_params={"params": {"ef": 100}},
+            )
+            # the index covers every row of the small table with this ef
+            assert [r.segment_uuid for r in results] == _exact_top_k(query_vector, 5)
+
+        # the deleted rows are removed from the index by the compaction
+        assert vector_store.delete_segment_vectors_by_docsink_uuid(org, kb, "docsink-0")
+        vector_store.duckdb_client.execute_sql(
+            f"PRAGMA hnsw_compact_index('{vector_store.ann_indexes[table_name]}')"
+        )
+        segments = [s for s in segments if s.docsink_uuid == "docsink-1"]
+        query_vector = vector_store._normalize_vector(rng.normal(size=dimension))
+        results = vector_store._ann_search_in_kb(
+            table_name=table_name,
+            query_vector=query_vector.tolist(),
+            embedding_dimension=dimension,
+            top_k=5,
+        )
+        assert [r.segment_uuid for r in results] == _exact_top_k(query_vector, 5)
+    finally:
+        context.settings.DUCKDB_VECTOR_INDEX_TYPE = vector_index_type
+        temp_setup.clear_tmp_org_kb_user(org, kb, user)
+
+
+def test_vectorstore_dense_hnsw_fallback(monkeypatch: pytest.MonkeyPatch):
+    temp_setup = TempSetup()
+    context = temp_setup.context
+    org, kb, user = temp_setup.create_tmp_org_kb_user()
+    vector_index_type = context.settings.DUCKDB_VECTOR_INDEX_TYPE
+    full_text_index_type = context.settings.DUCKDB_FULL_TEXT_INDEX_TYPE
+    context.settings.DUCKDB_VECTOR_INDEX_TYPE = VECTOR_INDEX_TYPE_HNSW
+    # the incremental full text index does not need to install the fts extension
+    context.settings.DUCKDB_FULL_TEXT_INDEX_TYPE = FULL_TEXT_INDEX_TYPE_INCREMENTAL
+    try:
+        vector_store = VectorStoreDuckDBDense(context)
+        # the exact scan is used if the extension can't be loaded
+        monkeypatch.setattr(vector_store, "_load_vss_extension", lambda: False)
+        table_name = vector_store._get_table_name(org, kb, 8)
+        assert table_name in vector_store.ann_indexes
+        assert vector_store.ann_indexes[table_name] is None
+        vector_store._compact_ann_index(table_name)
+    finally:
+        context.settings.DUCKDB_VECTOR_INDEX_TYPE = vector_index_type
+        context.settings.DUCKDB_FULL_TEXT_INDEX_TYPE = full_text_index_type
+        temp_setup.clear_tmp_org_kb_user(org, kb, user)
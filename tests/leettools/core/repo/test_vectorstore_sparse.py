@@ -0,0 +1,115 @@
+import uuid
+from typing import Any, Dict, List
+
+from scipy.sparse import csr_array
+
+from leettools.common.temp_setup import TempSetup
+from leettools.core.repo._impl.duckdb.vector_store_sparse_duckdb import (
+    VectorStoreDuckDBSparse,
+)
+from leettools.core.schemas.segment import Segment
+from leettools.eds.rag.search.filter import BaseCondition
+from leettools.eds.str_embedder.schemas.schema_sparse_embedder import (
+    SparseEmbeddingRequest,
+    SparseEmbeddings,
+)
+from leettools.eds.str_embedder.sparse_embedder import AbstractSparseEmbedder
+
+_VOCABULARY = ["apple", "banana", "cherry", "date", "elder", "fig", "grape"]
+
+
+class _WordCountEmbedder(AbstractSparseEmbedder):
+    """Embeds a string as the counts of the words in a small vocabulary."""
+
+    def __init__(self, context=None, org=None, kb=None, user=None) -> None:
+        pass
+
+    def embed(self, embed_requests: SparseEmbeddingRequest) -> SparseEmbeddings:
+        rows: List[List[float]] = []
+        for sentence in embed_requests.sentences:
+            row = [0.0] * len(_VOCABULARY)
+            for word in sentence.split():
+                if word in _VOCABULARY:
+                    row[_VOCABULARY.index(word)] += 1.0
+            rows.append(row)
+        return SparseEmbeddings(sparse_embeddings=csr_array(rows))
+
+    def get_dimension(self) -> int:
+        return len(_VOCABULARY)
+
+    @classmethod
+    def get_default_params(cls, context, user) -> Dict[str, Any]:
+        return {}
+
+
+def _segment(kb_id: str, document_uuid: str, content: str) -> Segment:
+    return Segment(
+        segment_uuid=str(uuid.uuid4()),
+        content=content,
+        document_uuid=document_uuid,
+        doc_uri="doc_uri",
+        docsink_uuid=f"docsink-{document_uuid}",
+        kb_id=kb_id,
+        position_in_doc="1",
+    )
+
+
+def test_vectorstore_sparse():
+    temp_setup = TempSetup()
+    context = temp_setup.context
+    org, kb, user = temp_setup.create_tmp_org_kb_user()
+    try:
+        vector_store = VectorStoreDuckDBSparse(context)
+        embedder = _WordCountEmbedder()
+
+        segments = [
+            _segment(kb.kb_id, "doc-1", "apple apple apple banana"),
+            _segment(kb.kb_id, "doc-1", "apple banana banana"),
+            _segment(kb.kb_id, "doc-2", "cherry banana"),
+        ] + [_segment(kb.kb_id, "doc-3", "date elder fig") for _ in range(20)]
+        assert vector_store._upsert_embeddings_into_duckdb(org, kb, segments, embedder)
+
+        results = vector_store._search_with_embedder(
+            org, kb, "apple banana", 2, embedder
+        )
+        assert [r.segment_uuid for r in results] == [
+            segments[0].segment_uuid,
+            segments[1].segment_uuid,
+        ]
+        assert results[0].search_score == 4.0
+        # the pruning must not change the results
+        results = vector_store._search_with_embedder(
+            org, kb, "apple banana fig", 3, embedder
+        )
+        assert [r.search_score for r in results] == [4.0, 3.0, 1.0]
+        # fig can't lift a segment over the best apple weight, so it is skipped
+        results = vector_store._search_with_embedder(org, kb, "apple fig", 1, embedder)
+        assert [r.segment_uuid for r in results] == [segments[0].segment_uuid]
+        assert results[0].search_score == 3.0
+
+        filter = BaseCondition(
+            field=Segment.FIELD_DOCUMENT_UUID, operator="==", value="doc-2"
+        )
+        results = vector_store._search_with_embedder(
+            org, kb, "apple banana", 5, embedder, filter=filter
+        )
+        assert [r.segment_uuid for r in results] == [segments[2].segment_uuid]
+        assert vector_store._search_with_embedder(org, kb, "grape", 5, embedder) == []
+
+        # re-embedding a segment replaces its postings
+        segments[0].content = "cherry"
+        vector_store._upsert_embeddings_into_duckdb(org, kb, segments[:1], embedder)
+        results = vector_store._search_with_embedder(org, kb, "apple", 5, embedder)
+        assert [r.segment_uuid for r in results] == [segments[1].segment_uuid]
+
+        assert vector_store.delete_segment_vector(org, kb, segments[1].segment_uuid)
+        assert vector_store._search_with_embedder(org, kb, "apple", 5, embedder) == []
+        assert vector_store.delete_segment_vectors_by_docsink_uuid(
+            org, kb, "docsink-doc-2"
+        )
+        results = vector_store._search_with_embedder(org, kb, "cherry", 5, embedder)
+        assert [r.segment_uuid for r in results] == [segments[0].segment_uuid]
+        assert vector_store.delete_segment_vectors_by_document_id(org, kb, "doc-3")
+        assert vector_store._search_with_embedder(org, kb, "fig", 5, embedder) == []
+    finally:
+        temp_setup.clear_tmp_org_kb_user(org, kb, user)
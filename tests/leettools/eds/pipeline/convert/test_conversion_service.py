@@ -0,0 +1,136 @@
+import sys
+import threading
+from pathlib import Path
+
+from leettools.context_manager import ContextManager
+from leettools.eds.pipeline.convert.conversion_service import ConversionService
+from leettools.eds.pipeline.convert.parser import checkout_parser, parse_file
+
+# a parser that reports the process and the instance that parsed the file, it is
+# written to a package on sys.path so that the spawned workers can import it
+_PARSER_SOURCE = """
+import os
+from leettools.eds.pipeline.convert.parser import AbstractParser
+
+
+class ParserPid(AbstractParser):
+    created = 0
+
+    def __init__(self, settings):
+        ParserPid.created += 1
+        self.instance_id = ParserPid.created
+
+    def _parse(self, path, target_path=None):
+        return f"{os.getpid()}-{self.instance_id}"
+
+    pdf2md = docx2md = pptx2md = xlsx2md = _parse
+"""
+
+
+# a parser that is not thread safe, reports the instance that parsed the file and
+# fails if the instance is used by two threads at the same time
+_THREAD_PARSER_SOURCE = """
+import itertools
+import time
+from leettools.eds.pipeline.convert.parser import AbstractParser
+
+
+class ParserThread(AbstractParser):
+    thread_safe = False
+    instance_ids = itertools.count()
+
+    def __init__(self, settings):
+        self.instance_id = next(ParserThread.instance_ids)
+        self.in_use = False
+
+    def _parse(self, path, target_path=None):
+        assert not self.in_use
+        self.in_use = True
+        time.sleep(0.05)
+        self.in_use = False
+        return str(self.instance_id)
+
+    pdf2md = docx2md = pptx2md = xlsx2md = _parse
+"""
+
+
+def _create_parser_module(
+    tmp_path: Path,
+    package_name: str = "leet_test_parsers",
+    module_name: str = "parser_pid",
+    source: str = _PARSER_SOURCE,
+) -> str:
+    package_dir = tmp_path / package_name
+    package_dir.mkdir()
+    (package_dir / "__init__.py").write_text("")
+    (package_dir / f"{module_name}.py").write_text(source)
+    sys.path.insert(0, str(tmp_path))
+    return f"{package_name}.{module_name}"
+
+
+def test_conversion_service(tmp_path: Path):
+    settings = ContextManager().get_context().settings.model_copy()
+    parser_module = _create_parser_module(tmp_path)
+    try:
+        # in the calling process, the same parser instance is reused
+        settings.convert_process_pool_size = 0
+        service = ConversionService(settings)
+        result1 = service.file2md(parser_module, "a.pdf")
+        result2 = service.file2md(parser_module, "b.docx")
+        assert result1 == result2
+        with checkout_parser(settings, parser_module) as parser1:
+            with checkout_parser(settings, parser_module) as parser2:
+                assert parser1 is parser2
+
+        # in the worker processes, each worker keeps its own parser instance
+        settings.convert_process_pool_size = 2
+        service = ConversionService(settings)
+        try:
+            results = [service.file2md(parser_module, f"{i}.pdf") for i in range(6)]
+        finally:
+            service.shutdown()
+        pids = {result.split("-")[0] for result in results}
+        assert pids.isdisjoint({result1.split("-")[0]})
+        assert 1 <= len(pids) <= 2
+        assert {result.split("-")[1] for result in results} == {"1"}
+    finally:
+        sys.path.remove(str(tmp_path))
+
+
+def test_parse_file_parser_pool(tmp_path: Path):
+    settings = ContextManager().get_context().settings.model_copy()
+    settings.convert_parser_pool_size = 2
+    parser_module = _create_parser_module(
+        tmp_path,
+        package_name="leet_test_thread_parsers",
+        module_name="parser_thread",
+        source=_THREAD_PARSER_SOURCE,
+    )
+    try:
+        # the parser that is not thread safe is checked out by one thread at a
+        # time, and the threads share at most convert_parser_pool_size instances
+        results = []
+        barrier = threading.Barrier(4)
+
+        def _parse() -> None:
+            barrier.wait()
+            for i in range(3):
+                results.append(parse_file(settings, parser_module, f"{i}.pdf"))
+
+        threads = [threading.Thread(target=_parse) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(results) == 12
+        assert len(set(results)) == 2
+
+        # the instances are kept warm for the later threads
+        thread = threading.Thread(target=_parse)
+        barrier = threading.Barrier(1)
+        thread.start()
+        thread.join()
+        assert len(results) == 15
+        assert len(set(results)) == 2
+    finally:
+        sys.path.remove(str(tmp_path))
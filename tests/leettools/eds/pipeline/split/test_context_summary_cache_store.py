@@ -0,0 +1,95 @@
+import time
+
+from leettools.common.temp_setup import TempSetup
+from leettools.common.utils import time_utils
+from leettools.eds.api_caller import api_utils
+from leettools.eds.pipeline.split.context_summary_cache_store import (
+    create_context_summary_cache_store,
+    get_context_summary_cache_key,
+    get_context_summary_cache_store,
+)
+from leettools.eds.pipeline.split.splitter import (
+    CONTEXTUAL_RETRIEVAL_SYSTEM_PROMPT,
+    CONTEXTUAL_RETRIEVAL_USER_PROMPT,
+    Splitter,
+)
+
+
+def test_context_summary_cache_store():
+    temp_setup = TempSetup()
+    context = temp_setup.context
+
+    cache_store = create_context_summary_cache_store(context.settings)
+    key1 = get_context_summary_cache_key("model1", "document", "chunk1")
+    key2 = get_context_summary_cache_key("model1", "document", "chunk2")
+    assert key1 != key2
+    assert key1 != get_context_summary_cache_key("model2", "document", "chunk1")
+
+    cache_store.save_summaries({key1: "summary1"})
+    cache_store.save_summaries({key1: "summary1 new", key2: "summary2"})
+    assert cache_store.get_summaries([key1, key2, "missing"]) == {
+        key1: "summary1 new",
+        key2: "summary2",
+    }
+    assert cache_store.get_summaries([]) == {}
+
+
+def test_context_summary_cache_store_evict():
+    temp_setup = TempSetup()
+    context = temp_setup.context
+
+    cache_store = create_context_summary_cache_store(context.settings)
+    keys = [get_context_summary_cache_key("model1", "evict", f"{i}") for i in range(4)]
+    for key in keys:
+        cache_store.save_summaries({key: f"summary of {key}"})
+        time.sleep(0.002)
+
+    # the entries created before the timestamp are evicted first
+    timestamp_in_ms = time_utils.cur_timestamp_in_ms()
+    cache_store.save_summaries({keys[0]: "summary new"})
+    cache_store.evict_summaries(max_entries=100, min_timestamp_in_ms=timestamp_in_ms)
+    assert cache_store.get_summaries(keys) == {keys[0]: "summary new"}
+
+    # then the oldest entries over the max number of entries
+    for key in keys[1:]:
+        time.sleep(0.002)
+        cache_store.save_summaries({key: f"summary of {key}"})
+    cache_store.evict_summaries(max_entries=2, min_timestamp_in_ms=0)
+    assert sorted(cache_store.get_summaries(keys)) == sorted(keys[2:])
+
+
+def test_splitter_cached_context_summaries():
+    temp_setup = TempSetup()
+    context = temp_setup.context
+    org, kb, user = temp_setup.create_tmp_org_kb_user()
+    try:
+        splitter = Splitter(context=context, org=org, kb=kb)
+        model_name = api_utils.get_default_inference_model_for_user(
+            context=context, user=splitter.user
+        )
+        system_prompt = CONTEXTUAL_RETRIEVAL_SYSTEM_PROMPT.format(
+            document_content="the document"
+        )
+        cache_store = get_context_summary_cache_store(context.settings)
+        cache_store.save_summaries(
+            {
+                get_context_summary_cache_key(
+                    model_name,
+                    system_prompt,
+                    CONTEXTUAL_RETRIEVAL_USER_PROMPT.format(chunk_content=chunk),
+                ): f"summary of {chunk}"
+                for chunk in ["chunk1", "chunk2"]
+            }
+        )
+
+        # all the summaries are cached, so no LLM call is made
+        assert splitter._add_context_summary_to_chunks(
+            ["chunk1", "chunk2", "chunk1"], "the document"
+        ) == [
+            "\n<context>\nsummary of chunk1\n</context>\nchunk1",
+            "\n<context>\nsummary of chunk2\n</context>\nchunk2",
+            "\n<context>\nsummary of chunk1\n</context>\nchunk1",
+        ]
+        assert splitter._add_context_summary_to_chunks([], "the document") == []
+    finally:
+        temp_setup.clear_tmp_org_kb_user(org, kb, user)
@@ -0,0 +1,87 @@
+from leettools.core.repo.vector_store import VectorSearchResult, VectorType
+from leettools.core.strategy.schemas.strategy_conf import (
+    SEARCH_OPTION_DENSE_WEIGHT,
+    SEARCH_OPTION_FUSION_METHOD,
+    SEARCH_OPTION_OVERFETCH_FACTOR,
+)
+from leettools.eds.rag.search.fusion import (
+    FUSION_RRF,
+    FUSION_Z_SCORE,
+    SEARCH_PARAM_FUSION_OPTIONS,
+    FusionOptions,
+    fuse_search_results,
+)
+
+
+def _results(vector_type: VectorType, scores: dict) -> list:
+    return [
+        VectorSearchResult(
+            segment_uuid=segment_uuid, search_score=score, vector_type=vector_type
+        )
+        for segment_uuid, score in scores.items()
+    ]
+
+
+DENSE = _results(VectorType.DENSE, {"a": 0.9, "b": 0.5, "c": 0.1})
+SPARSE = _results(VectorType.SPARSE, {"c": 12.0, "d": 8.0, "a": 2.0})
+
+
+def test_min_max_fusion():
+    results = fuse_search_results(DENSE, SPARSE)
+    scores = {r.segment_uuid: r.search_score for r in results}
+    # the same weighted sum of the min-max normalized scores as before
+    assert abs(scores["a"] - 0.6) < 1e-9
+    assert abs(scores["b"] - 0.6 * 0.5) < 1e-9
+    assert abs(scores["c"] - 0.4) < 1e-9
+    assert abs(scores["d"] - 0.4 * 0.6) < 1e-9
+    assert [r.segment_uuid for r in results] == ["a", "c", "b", "d"]
+    vector_types = {r.segment_uuid: r.vector_type for r in results}
+    assert vector_types == {
+        "a": VectorType.COMMON,
+        "b": VectorType.DENSE,
+        "c": VectorType.COMMON,
+        "d": VectorType.SPARSE,
+    }
+
+    limited = fuse_search_results(DENSE, SPARSE, limit=2)
+    assert [r.segment_uuid for r in limited] == [r.segment_uuid for r in results[:2]]
+    assert fuse_search_results([], []) == []
+    assert [r.segment_uuid for r in fuse_search_results(DENSE, [])] == ["a", "b", "c"]
+
+
+def test_rrf_and_z_score_fusion():
+    options = FusionOptions(method=FUSION_RRF, dense_weight=1.0, sparse_weight=1.0)
+    results = fuse_search_results(DENSE, SPARSE, options=options)
+    scores = {r.segment_uuid: r.search_score for r in results}
+    assert abs(scores["a"] - (1 / 61 + 1 / 63)) < 1e-9
+    assert abs(scores["d"] - 1 / 62) < 1e-9
+    assert [r.segment_uuid for r in results] == ["a", "c", "b", "d"]
+
+    options = FusionOptions(method=FUSION_Z_SCORE)
+    results = fuse_search_results(DENSE, SPARSE, options=options)
+    assert len(results) == 4
+    assert results[0].search_score >= results[-1].search_score
+
+
+def test_fusion_options():
+    options = FusionOptions.from_strategy_options(
+        {
+            SEARCH_OPTION_FUSION_METHOD: "RRF",
+            SEARCH_OPTION_DENSE_WEIGHT: "0.8",
+            SEARCH_OPTION_OVERFETCH_FACTOR: 2.5,
+        }
+    )
+    assert options.method == FUSION_RRF
+    assert options.dense_weight == 0.8
+    assert options.sparse_weight == 0.4
+    assert options.get_fetch_k(10) == 25
+
+    assert FusionOptions.from_strategy_options({SEARCH_OPTION_FUSION_METHOD: "x"}) == (
+        FusionOptions()
+    )
+    assert FusionOptions().get_fetch_k(10) == 10
+    assert (
+        FusionOptions.from_search_params({SEARCH_PARAM_FUSION_OPTIONS: options})
+        == options
+    )
+    assert FusionOptions.from_search_params(None) == FusionOptions()
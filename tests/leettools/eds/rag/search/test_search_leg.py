@@ -0,0 +1,60 @@
+import time
+
+from leettools.common.temp_setup import TempSetup
+from leettools.eds.rag.search.search_leg import (
+    LEG_DENSE,
+    LEG_KEYWORDS,
+    LEG_SPARSE,
+    SearchLeg,
+    get_search_executor,
+    report_search_legs,
+)
+
+
+def _fail() -> list:
+    raise ValueError("search failed")
+
+
+def test_search_leg():
+    temp_setup = TempSetup()
+    executor = get_search_executor(temp_setup.context.settings)
+    assert get_search_executor(temp_setup.context.settings) is executor
+
+    start = time.perf_counter()
+    slow_leg = SearchLeg(
+        executor=executor,
+        name=LEG_DENSE,
+        func=lambda: time.sleep(0.5) or ["dense"],
+        timeout=2.0,
+    )
+    fast_leg = SearchLeg(
+        executor=executor,
+        name=LEG_SPARSE,
+        func=lambda: time.sleep(0.5) or ["sparse"],
+        timeout=2.0,
+    )
+    # the two legs run concurrently
+    assert slow_leg.result(default=[]) == ["dense"]
+    assert fast_leg.result(default=[]) == ["sparse"]
+    assert time.perf_counter() - start < 0.9
+    assert slow_leg.latency_ms >= 500
+    assert slow_leg.status == "ok"
+
+    timeout_leg = SearchLeg(
+        executor=executor,
+        name=LEG_KEYWORDS,
+        func=lambda: time.sleep(1.0) or "keywords",
+        timeout=0.1,
+    )
+    assert timeout_leg.result(default="query") == "query"
+    assert timeout_leg.status == "timeout"
+    assert timeout_leg.report() == "keywords=timeout(100ms)"
+
+    failed_leg = SearchLeg(executor=executor, name=LEG_SPARSE, func=_fail, timeout=1.0)
+    assert failed_leg.result(default=[]) == []
+    assert failed_leg.status == "failed"
+
+    report_search_legs(
+        legs=[slow_leg, fast_leg, timeout_leg, failed_leg],
+        total_ms=(time.perf_counter() - start) * 1000,
+    )
@@ -137,3 +137,23 @@ def _test_function(context: Context, org: Org, kb: KnowledgeBase):
 
     jobs = jobstore.get_all_jobs_for_task(task.task_uuid)
     assert len(jobs) == 1
+
+    # only one owner can hold the lease of a job
+    claimed_job = jobstore.claim_job(job2.job_uuid, "owner1", 60)
+    assert claimed_job is not None
+    assert claimed_job.lease_owner == "owner1"
+    assert claimed_job.lease_expires_at is not None
+    assert jobstore.claim_job(job2.job_uuid, "owner2", 60) is None
+    assert jobstore.renew_lease(job2.job_uuid, "owner2", 60) is False
+    assert jobstore.renew_lease(job2.job_uuid, "owner1", 60) is True
+    assert jobstore.claim_job(job2.job_uuid, "owner1", 60) is not None
+
+    # the released lease can be taken by another owner
+    jobstore.release_lease(job2.job_uuid, "owner1")
+    assert jobstore.get_job(job2.job_uuid).lease_owner is None
+    assert jobstore.claim_job(job2.job_uuid, "owner2", -1) is not None
+
+    # the expired lease can be taken by another owner
+    claimed_job = jobstore.claim_job(job2.job_uuid, "owner1", 60)
+    assert claimed_job is not None
+    assert claimed_job.lease_owner == "owner1"
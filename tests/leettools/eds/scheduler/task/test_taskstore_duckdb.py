@@ -1,3 +1,6 @@
+import json
+import uuid
+
 from leettools.common.temp_setup import TempSetup
 from leettools.context_manager import Context, ContextManager
 from leettools.core.consts.docsource_type import DocSourceType
@@ -9,10 +12,12 @@ from leettools.eds.scheduler.schemas.job_status import JobStatus
 from leettools.eds.scheduler.schemas.program import (
     ConnectorProgramSpec,
     ConvertProgramSpec,
+    EmbedProgramSpec,
     ProgramSpec,
     ProgramType,
+    SplitProgramSpec,
 )
-from leettools.eds.scheduler.schemas.task import TaskCreate
+from leettools.eds.scheduler.schemas.task import Task, TaskCreate, TaskInDB
 from leettools.eds.scheduler.task._impl.duckdb.taskstore_duckdb import TaskStoreDuckDB
 
 
@@ -145,3 +150,116 @@ def _test_function(context: Context, org: Org, kb: KnowledgeBase):
     task2_deleted = taskstore.get_task_by_uuid(task_2.task_uuid)
     assert task2_deleted is not None
     assert task2_deleted.is_deleted == True
+
+
+def test_migrate_program_specs():
+    context = ContextManager().get_context()  # type: Context
+
+    temp_setup = TempSetup()
+    org, kb, user = temp_setup.create_tmp_org_kb_user()
+
+    try:
+        _test_migrate_program_specs(context, org, kb)
+    finally:
+        temp_setup.clear_tmp_org_kb_user(org, kb)
+
+
+def _test_migrate_program_specs(context: Context, org: Org, kb: KnowledgeBase):
+    settings = context.settings
+    settings.DUCKDB_FILE = "duckdb_test.db"
+    taskstore = TaskStoreDuckDB(settings)
+    taskstore._reset_for_test()
+
+    # the specs stored before the id-only specs carry the whole source
+    legacy_specs = {
+        ProgramType.SPLIT: {
+            "org_id": org.org_id,
+            "kb_id": kb.kb_id,
+            "source": {"document_uuid": "doc-1", "content": "# title\n" * 1000},
+        },
+        ProgramType.EMBED: {
+            "org_id": org.org_id,
+            "kb_id": kb.kb_id,
+            "source": [
+                {"segment_uuid": f"seg-{i}", "document_uuid": "doc-1", "content": "x"}
+                for i in range(3)
+            ],
+        },
+    }
+    task_uuids = {}
+    for program_type, legacy_spec in legacy_specs.items():
+        task_in_db = TaskInDB.from_task_create(
+            TaskCreate(
+                org_id=org.org_id,
+                kb_id=kb.kb_id,
+                docsource_uuid="docsource-1",
+                document_uuid="doc-1",
+                program_spec=ProgramSpec(
+                    program_type=program_type,
+                    real_program_spec=SplitProgramSpec(
+                        org_id=org.org_id, kb_id=kb.kb_id, document_uuid="doc-1"
+                    ),
+                ),
+            )
+        )
+        task_dict = taskstore._task_to_dict(task_in_db)
+        task_dict[Task.FIELD_TASK_UUID] = str(uuid.uuid4())
+        task_dict[Task.FIELD_PROGRAM_SPEC] = json.dumps(
+            {"program_type": program_type.value, "real_program_spec": legacy_spec}
+        )
+        taskstore.duckdb_client.insert_into_table(
+            table_name=taskstore.table_name,
+            column_list=list(task_dict.keys()),
+            value_list=list(task_dict.values()),
+        )
+        task_uuids[program_type] = task_dict[Task.FIELD_TASK_UUID]
+
+    # a legacy spec that can't be validated and a value that is not JSON
+    invalid_task_uuids = []
+    for program_spec in [
+        json.dumps(
+            {
+                "program_type": ProgramType.SPLIT.value,
+                "real_program_spec": {"source": {"document_uuid": "doc-2"}},
+            }
+        ),
+        "not json",
+    ]:
+        task_dict[Task.FIELD_TASK_UUID] = str(uuid.uuid4())
+        task_dict[Task.FIELD_PROGRAM_SPEC] = program_spec
+        taskstore.duckdb_client.insert_into_table(
+            table_name=taskstore.table_name,
+            column_list=list(task_dict.keys()),
+            value_list=list(task_dict.values()),
+        )
+        invalid_task_uuids.append(task_dict[Task.FIELD_TASK_UUID])
+
+    # the legacy specs can still be read before the migration
+    split_task = taskstore.get_task_by_uuid(task_uuids[ProgramType.SPLIT])
+    assert split_task.program_spec.real_program_spec == SplitProgramSpec(
+        org_id=org.org_id, kb_id=kb.kb_id, document_uuid="doc-1"
+    )
+
+    # the invalid rows are skipped
+    assert taskstore.migrate_program_specs() == 2
+    assert taskstore.migrate_program_specs() == 0
+
+    rtn_list = taskstore.duckdb_client.fetch_all_from_table(
+        table_name=taskstore.table_name,
+        column_list=[Task.FIELD_TASK_UUID, Task.FIELD_PROGRAM_SPEC],
+    )
+    for rtn_dict in rtn_list:
+        if rtn_dict[Task.FIELD_TASK_UUID] in invalid_task_uuids:
+            continue
+        assert "source" not in rtn_dict[Task.FIELD_PROGRAM_SPEC]
+
+    embed_task = taskstore.get_task_by_uuid(task_uuids[ProgramType.EMBED])
+    assert embed_task.program_spec.real_program_spec == EmbedProgramSpec(
+        org_id=org.org_id,
+        kb_id=kb.kb_id,
+        document_uuid="doc-1",
+        segment_uuids=["seg-0", "seg-1", "seg-2"],
+    )
+
+    # the invalid rows can't be read as tasks by the other tests
+    taskstore._reset_for_test()
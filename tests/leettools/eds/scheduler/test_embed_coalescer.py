@@ -0,0 +1,100 @@
+import threading
+import time
+from typing import List, Optional
+
+from leettools.common.logging.event_logger import EventLogger
+from leettools.core.consts.return_code import ReturnCode
+from leettools.core.schemas.segment import Segment
+from leettools.eds.pipeline.embed.segment_embedder import AbstractSegmentEmbedder
+from leettools.eds.scheduler._impl.embed_coalescer import EmbedCoalescer
+
+
+class _RecordingEmbedder(AbstractSegmentEmbedder):
+    def __init__(self, bad_content: Optional[str] = None) -> None:
+        self.calls: List[List[str]] = []
+        self.bad_content = bad_content
+
+    def embed_segment_list(
+        self, segments: List[Segment], display_logger: Optional[EventLogger] = None
+    ) -> ReturnCode:
+        self.calls.append([segment.content for segment in segments])
+        if any(segment.content == self.bad_content for segment in segments):
+            return ReturnCode.FAILURE_ABORT
+        return ReturnCode.SUCCESS
+
+
+def _create_segments(document_uuid: str, count: int) -> List[Segment]:
+    return [
+        Segment(
+            segment_uuid=f"{document_uuid}-{i}",
+            content=f"{document_uuid}-{i}",
+            document_uuid=document_uuid,
+            doc_uri=f"https://www.example.com/{document_uuid}",
+            docsink_uuid=f"docsink-{document_uuid}",
+            kb_id="kb1",
+            position_in_doc=f"{i + 1}",
+        )
+        for i in range(count)
+    ]
+
+
+def _run_jobs(
+    coalescer: EmbedCoalescer, embedder: AbstractSegmentEmbedder, job_count: int
+) -> List[ReturnCode]:
+    results: List[ReturnCode] = [None] * job_count
+    # all the jobs are registered before any of them submits its segments
+    barrier = threading.Barrier(job_count)
+
+    def _job(i: int) -> None:
+        with coalescer.job(org_id="org1", kb_id="kb1") as embed_job:
+            barrier.wait()
+            results[i] = embed_job.embed_segment_lists(
+                embedder=embedder,
+                segment_lists=[_create_segments(f"doc{i}", 2)],
+            )[0]
+
+    threads = [threading.Thread(target=_job, args=(i,)) for i in range(job_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_embed_coalescer():
+    # the jobs are combined into batches of at most 4 segments
+    coalescer = EmbedCoalescer(batch_size=4, max_wait_in_seconds=5)
+    embedder = _RecordingEmbedder()
+    results = _run_jobs(coalescer, embedder, 4)
+    assert results == [ReturnCode.SUCCESS] * 4
+    assert [len(call) for call in embedder.calls] == [4, 4]
+    assert sorted(c for call in embedder.calls for c in call) == sorted(
+        f"doc{i}-{j}" for i in range(4) for j in range(2)
+    )
+
+    # a job alone in its KB does not wait for the max wait
+    coalescer = EmbedCoalescer(batch_size=100, max_wait_in_seconds=10)
+    embedder = _RecordingEmbedder()
+    start = time.perf_counter()
+    assert _run_jobs(coalescer, embedder, 1) == [ReturnCode.SUCCESS]
+    assert time.perf_counter() - start < 1
+    assert len(embedder.calls) == 1
+
+    # the segment lists of several documents are embedded in one call
+    with coalescer.job(org_id="org1", kb_id="kb1") as embed_job:
+        results = embed_job.embed_segment_lists(
+            embedder=embedder,
+            segment_lists=[_create_segments(f"doc{i}", 3) for i in range(3)],
+        )
+    assert results == [ReturnCode.SUCCESS] * 3
+    assert [len(call) for call in embedder.calls] == [2, 9]
+
+
+def test_embed_coalescer_failure():
+    coalescer = EmbedCoalescer(batch_size=4, max_wait_in_seconds=5)
+    embedder = _RecordingEmbedder(bad_content="doc1-0")
+    results = _run_jobs(coalescer, embedder, 2)
+
+    # the failed batch is retried job by job, only the bad job fails
+    assert results == [ReturnCode.SUCCESS, ReturnCode.FAILURE_ABORT]
+    assert [len(call) for call in embedder.calls] == [4, 2, 2]
@@ -0,0 +1,120 @@
+import pytest
+
+from leettools.eds.scheduler._impl.job_queue import JobQueue
+from leettools.eds.scheduler.schemas.job import Job
+from leettools.eds.scheduler.schemas.job_status import JobStatus
+from leettools.eds.scheduler.schemas.program import (
+    EmbedProgramSpec,
+    ProgramSpec,
+    ProgramType,
+)
+
+
+def _create_job(org_id: str, kb_id: str, program_type: ProgramType, name: str) -> Job:
+    # the queue only reads the org, the KB, and the program type of the spec
+    program_spec = ProgramSpec.model_construct(
+        program_type=program_type,
+        real_program_spec=EmbedProgramSpec(
+            org_id=org_id, kb_id=kb_id, document_uuid=f"doc-{name}"
+        ),
+    )
+    return Job(
+        task_uuid=f"task-{name}",
+        program_spec=program_spec,
+        job_uuid=name,
+        job_status=JobStatus.PENDING,
+    )
+
+
+def _drain(queue: JobQueue) -> list[str]:
+    names = []
+    while queue.qsize() > 0:
+        names.append(queue.get(timeout=1).job_uuid)
+    return names
+
+
+def test_job_queue_fair_share():
+    queue = JobQueue(org_quantum=4.0)
+    for i in range(8):
+        queue.put(_create_job("org1", "kb1", ProgramType.EMBED, f"a{i}"))
+    for i in range(2):
+        queue.put(_create_job("org2", "kb2", ProgramType.EMBED, f"b{i}"))
+
+    # the second org does not wait for the backlog of the first one
+    assert _drain(queue) == ["a0", "a1", "a2", "a3", "b0", "b1"] + [
+        f"a{i}" for i in range(4, 8)
+    ]
+
+    # the KBs of the same org split the share of the org
+    for i in range(4):
+        queue.put(_create_job("org1", "kb1", ProgramType.EMBED, f"a{i}"))
+    for i in range(4):
+        queue.put(_create_job("org1", "kb2", ProgramType.EMBED, f"b{i}"))
+    assert _drain(queue) == ["a0", "a1", "b0", "b1", "a2", "a3", "b2", "b3"]
+
+
+def test_job_queue_priority_and_cost():
+    queue = JobQueue(org_quantum=4.0)
+    queue.put(_create_job("org1", "kb1", ProgramType.CONNECTOR, "connector"))
+    queue.put(_create_job("org1", "kb1", ProgramType.CONVERT, "convert"))
+    queue.put(_create_job("org1", "kb1", ProgramType.SPLIT, "split"))
+    queue.put(_create_job("org1", "kb1", ProgramType.EMBED, "embed"))
+    assert _drain(queue) == ["embed", "split", "convert", "connector"]
+
+    # a conversion uses the whole share of the KB in a round
+    queue.put(_create_job("org1", "kb1", ProgramType.CONVERT, "c0"))
+    queue.put(_create_job("org1", "kb1", ProgramType.CONVERT, "c1"))
+    queue.put(_create_job("org2", "kb2", ProgramType.EMBED, "e0"))
+    assert _drain(queue) == ["c0", "e0", "c1"]
+
+
+def test_job_queue_stop_and_clear():
+    queue = JobQueue()
+    queue.put(_create_job("org1", "kb1", ProgramType.EMBED, "embed"))
+    queue.put(_create_job("org1", "kb1", ProgramType.SPLIT, "split"))
+    queue.put(None)
+    assert queue.get(timeout=1) is None
+
+    stats = queue.get_stats()
+    assert stats.depth == 2
+    assert stats.active_flow_count == 1
+    assert stats.job_classes[ProgramType.EMBED.value].depth == 1
+
+    assert queue.get(timeout=1).job_uuid == "embed"
+    stats = queue.get_stats()
+    assert stats.job_classes[ProgramType.EMBED.value].depth == 0
+    assert stats.job_classes[ProgramType.EMBED.value].dequeued_count == 1
+    assert stats.job_classes[ProgramType.SPLIT.value].depth == 1
+
+    removed = queue.clear()
+    assert [job.job_uuid for job in removed] == ["split"]
+    assert queue.qsize() == 0
+    assert queue.get_stats().active_flow_count == 0
+    with pytest.raises(TimeoutError):
+        queue.get(timeout=0.01)
+
+
+def test_job_queue_get_more_like():
+    queue = JobQueue(org_quantum=4.0)
+    for i in range(5):
+        queue.put(_create_job("org1", "kb1", ProgramType.EMBED, f"a{i}"))
+    queue.put(_create_job("org1", "kb1", ProgramType.SPLIT, "split"))
+    queue.put(_create_job("org2", "kb2", ProgramType.EMBED, "b0"))
+
+    job = queue.get(timeout=1)
+    assert job.job_uuid == "a0"
+    # only the embed jobs of the same KB are taken
+    more_jobs = queue.get_more_like(job, max_count=10)
+    assert [j.job_uuid for j in more_jobs] == ["a1", "a2", "a3", "a4"]
+    assert queue.qsize() == 2
+    assert queue.get_stats().job_classes[ProgramType.EMBED.value].depth == 1
+
+    # the KB has used its share, so the other org goes first
+    assert _drain(queue) == ["b0", "split"]
+
+    queue.put(_create_job("org1", "kb1", ProgramType.EMBED, "c0"))
+    queue.put(_create_job("org1", "kb1", ProgramType.EMBED, "c1"))
+    job = queue.get(timeout=1)
+    assert [j.job_uuid for j in queue.get_more_like(job, max_count=1)] == ["c1"]
+    assert queue.qsize() == 0
+    assert queue.get_more_like(job, max_count=1) == []
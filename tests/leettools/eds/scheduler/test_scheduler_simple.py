@@ -7,7 +7,16 @@ from leettools.core.consts.docsource_type import DocSourceType
 from leettools.core.schemas.docsource import DocSourceCreate
 from leettools.core.schemas.knowledgebase import KnowledgeBase
 from leettools.core.schemas.organization import Org
+from leettools.eds.scheduler._impl.scheduler_simple import SchedulerSimple
 from leettools.eds.scheduler.scheduler_manager import run_scheduler
+from leettools.eds.scheduler.schemas.job import JobCreate
+from leettools.eds.scheduler.schemas.job_status import JobStatus
+from leettools.eds.scheduler.schemas.program import (
+    EmbedProgramSpec,
+    ProgramSpec,
+    ProgramType,
+)
+from leettools.eds.scheduler.schemas.task import TaskCreate
 
 
 # TODO: make task_scanner take org / kb as a parameter
@@ -78,3 +87,58 @@ def _test_function(tmp_path, context: Context, org: Org, kb: KnowledgeBase):
     run_scheduler(context, org=org, kb=kb, docsources=[docsource_02])
 
     logger().info("Finished running the task for docsource 02.")
+
+
+def test_simple_scheduler_leased_job() -> None:
+    temp_setup = TempSetup()
+    context = temp_setup.context
+    org, kb, user = temp_setup.create_tmp_org_kb_user()
+
+    try:
+        task_manager = context.get_task_manager()
+        taskstore = task_manager.get_taskstore()
+        jobstore = task_manager.get_jobstore()
+
+        program_spec = ProgramSpec(
+            program_type=ProgramType.EMBED,
+            real_program_spec=EmbedProgramSpec(
+                org_id=org.org_id, kb_id=kb.kb_id, document_uuid="doc-leased"
+            ),
+        )
+        task = taskstore.create_task(
+            TaskCreate(
+                org_id=org.org_id,
+                kb_id=kb.kb_id,
+                docsource_uuid="docsource-leased",
+                program_spec=program_spec,
+            )
+        )
+        job = jobstore.create_job(
+            JobCreate(task_uuid=task.task_uuid, program_spec=program_spec)
+        )
+        assert jobstore.claim_job(job.job_uuid, "other-scheduler", 60) is not None
+
+        scheduler = SchedulerSimple(context=context)
+
+        # the job running in another scheduler is skipped
+        assert scheduler._create_job_for_task_if_needed(task) is None
+        assert jobstore.get_job(job.job_uuid).job_status == job.job_status
+        assert len(jobstore.get_all_jobs_for_task(task.task_uuid)) == 1
+
+        # a queued job claimed by another scheduler is dropped from the todo list,
+        # so that a later scan picks up its task again
+        scheduler.tasks_todo[task.task_uuid] = job.job_status
+        assert not scheduler._worker_initializes_job("worker-0", job)
+        assert task.task_uuid not in scheduler.tasks_todo
+
+        # the job is run again after the lease of the other scheduler expires
+        assert jobstore.claim_job(job.job_uuid, "other-scheduler", -1) is not None
+        new_job = scheduler._create_job_for_task_if_needed(task)
+        assert new_job is not None
+        assert new_job.job_uuid != job.job_uuid
+        assert jobstore.get_job(job.job_uuid).job_status == JobStatus.ABORTED
+        assert (
+            jobstore.claim_job(new_job.job_uuid, scheduler.lease_owner, 60) is not None
+        )
+    finally:
+        temp_setup.clear_tmp_org_kb_user(org, kb, user)
@@ -92,7 +92,7 @@ def _test_function(context: Context, org: Org, kb: KnowledgeBase, user: User):
     real_spec = SplitProgramSpec(
         org_id=org.org_id,
         kb_id=kb_id,
-        source=doc,
+        document_uuid=doc.document_uuid,
     )
     program_spec = ProgramSpec(
         program_type=ProgramType.SPLIT, real_program_spec=real_spec
@@ -107,7 +107,12 @@ def _test_function(context: Context, org: Org, kb: KnowledgeBase, user: User):
 
     # create a embed task
     segment = segstore.get_segments_for_docsource(org, kb, docsource)[0]
-    real_spec = EmbedProgramSpec(org_id=org.org_id, kb_id=kb_id, source=[segment])
+    real_spec = EmbedProgramSpec(
+        org_id=org.org_id,
+        kb_id=kb_id,
+        document_uuid=segment.document_uuid,
+        segment_uuids=[segment.segment_uuid],
+    )
     program_spec = ProgramSpec(
         program_type=ProgramType.EMBED, real_program_spec=real_spec
     )
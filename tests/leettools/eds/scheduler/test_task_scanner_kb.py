@@ -0,0 +1,104 @@
+import time
+
+from leettools.common.temp_setup import TempSetup
+from leettools.context_manager import Context
+from leettools.core.consts.docsource_type import DocSourceType
+from leettools.core.repo.change_feed import ChangeFeed
+from leettools.core.schemas.docsource import DocSourceCreate
+from leettools.core.schemas.knowledgebase import KBCreate, KnowledgeBase
+from leettools.core.schemas.organization import Org
+from leettools.eds.scheduler._impl.task_scanner_kb import TaskScannerKB
+from leettools.eds.scheduler.schemas.program import ProgramType
+
+
+def test_task_scanner_kb():
+    temp_setup = TempSetup()
+    org, kb, user = temp_setup.create_tmp_org_kb_user()
+
+    # the temp KB is not scheduled, so the scanner would skip it
+    kb_manager = temp_setup.context.get_kb_manager()
+    scheduled_kb = kb_manager.add_kb(
+        org=org,
+        kb_create=KBCreate(
+            name=f"{kb.name}_scheduled", user_uuid=user.user_uuid, auto_schedule=True
+        ),
+    )
+    try:
+        _test_function(temp_setup.context, org, scheduled_kb)
+    finally:
+        kb_manager.delete_kb_by_name(org, scheduled_kb.name)
+        temp_setup.clear_tmp_org_kb_user(org, kb, user)
+
+
+def _test_function(context: Context, org: Org, kb: KnowledgeBase):
+    assert kb.auto_schedule is True
+
+    taskstore = context.get_task_manager().get_taskstore()
+    taskstore._reset_for_test()
+    docsource_store = context.get_repo_manager().get_docsource_store()
+
+    task_scanner = TaskScannerKB(context)
+    # the first scan visits all the docsources
+    assert task_scanner.scan_changes_for_tasks(target_org=org, target_kb=kb) == []
+    assert task_scanner.get_last_scan_stats().full_scan_count == 1
+
+    docsource = docsource_store.create_docsource(
+        org,
+        kb,
+        DocSourceCreate(
+            org_id=org.org_id,
+            kb_id=kb.kb_id,
+            source_type=DocSourceType.URL,
+            uri="https://www.example.com/",
+        ),
+    )
+
+    # only the docsource marked as changed by the store is visited
+    new_tasks = task_scanner.scan_changes_for_tasks(target_org=org, target_kb=kb)
+    assert len(new_tasks) == 1
+    assert new_tasks[0].docsource_uuid == docsource.docsource_uuid
+    assert new_tasks[0].program_spec.program_type == ProgramType.CONNECTOR
+    stats = task_scanner.get_last_scan_stats()
+    assert stats.full_scan_count == 0
+    assert stats.dirty_docsource_count == 1
+    assert stats.docsources_visited == 1
+    assert stats.new_task_count == 1
+
+    # the status updates by the scanner itself do not mark the docsource again
+    assert task_scanner.scan_changes_for_tasks(target_org=org, target_kb=kb) == []
+    stats = task_scanner.get_last_scan_stats()
+    assert stats.dirty_docsource_count == 0
+    assert stats.docsources_visited == 0
+
+    # a docsource created by another process is not in the change feed of this
+    # process, it is found by its updated_at time
+    with ChangeFeed().muted():
+        other_docsource = docsource_store.create_docsource(
+            org,
+            kb,
+            DocSourceCreate(
+                org_id=org.org_id,
+                kb_id=kb.kb_id,
+                source_type=DocSourceType.URL,
+                uri="https://www.example.com/other",
+            ),
+        )
+    new_tasks = task_scanner.scan_changes_for_tasks(target_org=org, target_kb=kb)
+    assert [t.docsource_uuid for t in new_tasks] == [other_docsource.docsource_uuid]
+    assert task_scanner.get_last_scan_stats().dirty_docsource_count == 1
+
+    # the reconciliation scan still finds the unfinished task
+    task_scanner.last_full_scan_time = (
+        time.monotonic() - task_scanner.reconcile_interval_in_seconds
+    )
+    new_tasks = task_scanner.scan_changes_for_tasks(target_org=org, target_kb=kb)
+    assert sorted(t.task_uuid for t in new_tasks) == sorted(
+        t.task_uuid
+        for ds in [docsource, other_docsource]
+        for t in taskstore.get_tasks_for_docsource(ds.docsource_uuid)
+    )
+    assert task_scanner.get_last_scan_stats().full_scan_count == 1
+
+    total_stats = task_scanner.get_total_scan_stats()
+    assert total_stats.scan_count == 5
+    assert total_stats.full_scan_count == 2
@@ -0,0 +1,79 @@
+import time
+import uuid
+
+from leettools.common.temp_setup import TempSetup
+from leettools.eds.str_embedder.embedding_cache_store import (
+    create_embedding_cache_store,
+)
+from leettools.eds.str_embedder.query_embedding_cache import (
+    QUERY_EMBEDDING_CACHE_NAME,
+    QueryEmbeddingCache,
+    get_embedding_cache_key,
+)
+
+
+def test_query_embedding_cache():
+    key1 = get_embedding_cache_key("Embedder", "model", 3, "what is  duckdb ")
+    assert key1 == get_embedding_cache_key("Embedder", "model", 3, "what is duckdb")
+    assert key1 != get_embedding_cache_key("Embedder", "model", 4, "what is duckdb")
+    assert key1 != get_embedding_cache_key("Other", "model", 3, "what is duckdb")
+
+    cache = QueryEmbeddingCache(max_size=2, ttl_in_seconds=60)
+    assert cache.get("k1") is None
+    cache.put("k1", [1.0, 0.0])
+    cache.put("k2", [0.0, 1.0])
+    assert cache.get("k1") == [1.0, 0.0]
+    # k2 is the least recently used one
+    cache.put("k3", [1.0, 1.0])
+    assert cache.get("k2") is None
+    assert cache.get("k3") == [1.0, 1.0]
+
+    stats = cache.get_stats()
+    assert stats.hits == 2
+    assert stats.misses == 2
+    assert stats.hit_rate() == 0.5
+
+    expiring_cache = QueryEmbeddingCache(max_size=2, ttl_in_seconds=0)
+    expiring_cache.put("k1", [1.0])
+    time.sleep(0.01)
+    assert expiring_cache.get("k1") is None
+
+
+def test_query_embedding_cache_persistent():
+    temp_setup = TempSetup()
+    cache_store = create_embedding_cache_store(temp_setup.context.settings)
+
+    cache_key = f"key-{uuid.uuid4()}"
+    cache = QueryEmbeddingCache(max_size=2, ttl_in_seconds=60, cache_store=cache_store)
+    cache.put(cache_key, [0.5, 0.25])
+
+    embeddings = cache_store.get_embeddings(QUERY_EMBEDDING_CACHE_NAME, [cache_key])
+    assert embeddings[cache_key] == [0.5, 0.25]
+
+    # a new process starts with an empty memory tier
+    new_cache = QueryEmbeddingCache(
+        max_size=2, ttl_in_seconds=60, cache_store=cache_store
+    )
+    assert new_cache.get(cache_key) == [0.5, 0.25]
+    assert new_cache.get(cache_key) == [0.5, 0.25]
+    stats = new_cache.get_stats()
+    assert stats.persistent_hits == 1
+    assert stats.hits == 1
+    assert stats.misses == 0
+
+    # saving the same key again keeps one entry and refreshes its timestamp
+    time.sleep(0.01)
+    saved_at = int(time.time() * 1000)
+    cache_store.save_embeddings(QUERY_EMBEDDING_CACHE_NAME, {cache_key: [0.5, 0.25]})
+    embeddings = cache_store.get_embeddings(
+        QUERY_EMBEDDING_CACHE_NAME, [cache_key], min_timestamp_in_ms=saved_at
+    )
+    assert embeddings[cache_key] == [0.5, 0.25]
+    assert (
+        cache_store.get_embeddings(
+            QUERY_EMBEDDING_CACHE_NAME,
+            [cache_key],
+            min_timestamp_in_ms=int(time.time() * 1000) + 60000,
+        )
+        == {}
+    )
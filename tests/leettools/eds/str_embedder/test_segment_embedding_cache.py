@@ -0,0 +1,192 @@
+import uuid
+from typing import Any, Dict, List
+
+import pytest
+
+from leettools.common.temp_setup import TempSetup
+from leettools.common.utils import file_utils, time_utils
+from leettools.core.consts.return_code import ReturnCode
+from leettools.core.schemas.chunk import Chunk
+from leettools.core.schemas.docsink import DocSinkCreate
+from leettools.core.schemas.document import DocumentCreate
+from leettools.eds.pipeline.chunk.chunker import AbstractChunker
+from leettools.eds.pipeline.split import splitter
+from leettools.eds.str_embedder.dense_embedder import AbstractDenseEmbedder
+from leettools.eds.str_embedder.embedding_cache_store import (
+    create_embedding_cache_store,
+)
+from leettools.eds.str_embedder.schemas.schema_dense_embedder import (
+    DenseEmbeddingRequest,
+    DenseEmbeddings,
+)
+from leettools.eds.str_embedder.segment_embedding_cache import SegmentEmbeddingCache
+
+
+class _LengthEmbedder(AbstractDenseEmbedder):
+    """Embeds a string as its length, enough to check the cache keys."""
+
+    def __init__(self, model_name: str) -> None:
+        self.model_name = model_name
+
+    def embed(self, embed_requests: DenseEmbeddingRequest) -> DenseEmbeddings:
+        return DenseEmbeddings(
+            dense_embeddings=[[float(len(s)), 1.0] for s in embed_requests.sentences]
+        )
+
+    def get_dimension(self) -> int:
+        return 2
+
+    def get_model_name(self) -> str:
+        return self.model_name
+
+    @classmethod
+    def get_default_params(cls, context, user) -> Dict[str, Any]:
+        return {}
+
+
+class _Chunker(AbstractChunker):
+    """Returns the whole text as one chunk, no tokenizer needed."""
+
+    def chunk(self, text: str) -> List[Chunk]:
+        return [
+            Chunk(
+                content=text,
+                heading="",
+                position_in_doc="1",
+                start_offset=0,
+                end_offset=len(text),
+            )
+        ]
+
+
+def test_segment_embedding_cache():
+    temp_setup = TempSetup()
+    settings = temp_setup.context.settings
+    cache_store = create_embedding_cache_store(settings)
+    cache = SegmentEmbeddingCache(settings=settings, cache_store=cache_store)
+
+    embedder = _LengthEmbedder(model_name=f"model-{uuid.uuid4()}")
+    texts = [f"segment content {i}" for i in range(3)]
+    assert cache.get_embeddings(embedder, texts) == [None, None, None]
+
+    cache.save_embeddings(embedder, texts[:2], [[1.0, 0.0], [0.0, 1.0]])
+    assert cache.get_embeddings(embedder, texts) == [[1.0, 0.0], [0.0, 1.0], None]
+
+    # the same text embedded by another model is not reused
+    other_embedder = _LengthEmbedder(model_name=f"model-{uuid.uuid4()}")
+    assert cache.get_embeddings(other_embedder, texts[:1]) == [None]
+
+    stats = cache.record(cached_texts=texts[:2], embedded_count=1)
+    assert stats.cached_segment_count == 2
+    assert stats.embedded_segment_count == 1
+    assert stats.saved_token_count > 0
+    assert cache.get_stats().cached_segment_count >= 2
+
+
+def test_embedding_cache_store_eviction():
+    temp_setup = TempSetup()
+    cache_store = create_embedding_cache_store(temp_setup.context.settings)
+    cache_name = f"test_cache_{uuid.uuid4().hex}"
+
+    for i in range(5):
+        cache_store.save_embeddings(cache_name, {f"key-{i}": [float(i)]})
+
+    # nothing is older than the min timestamp, keep the 3 newest entries
+    evicted = cache_store.evict_embeddings(
+        cache_name=cache_name, max_entries=3, min_timestamp_in_ms=0
+    )
+    assert evicted >= 2
+    remaining = cache_store.get_embeddings(cache_name, [f"key-{i}" for i in range(5)])
+    assert len(remaining) <= 3
+    assert "key-4" in remaining
+
+    # evict by age
+    evicted = cache_store.evict_embeddings(
+        cache_name=cache_name,
+        max_entries=100,
+        min_timestamp_in_ms=time_utils.cur_timestamp_in_ms() + 1000,
+    )
+    assert evicted == len(remaining)
+    assert cache_store.get_embeddings(cache_name, ["key-4"]) == {}
+
+
+def test_segment_embedding_cache_maybe_evict():
+    temp_setup = TempSetup()
+    settings = temp_setup.context.settings
+    cache = SegmentEmbeddingCache(
+        settings=settings, cache_store=create_embedding_cache_store(settings)
+    )
+    evict_count = 0
+
+    def _evict() -> int:
+        nonlocal evict_count
+        evict_count += 1
+        return 0
+
+    cache.evict = _evict
+    # the first call in the process evicts, the next ones wait for the interval
+    cache.maybe_evict()
+    cache.maybe_evict()
+    assert evict_count == 1
+
+    interval = settings.SEGMENT_EMBEDDING_CACHE_EVICT_INTERVAL_IN_SECONDS
+    settings.SEGMENT_EMBEDDING_CACHE_EVICT_INTERVAL_IN_SECONDS = 0
+    try:
+        cache.maybe_evict()
+    finally:
+        settings.SEGMENT_EMBEDDING_CACHE_EVICT_INTERVAL_IN_SECONDS = interval
+    assert evict_count == 2
+
+
+def test_segment_embedding_cache_reingest(monkeypatch: pytest.MonkeyPatch):
+    temp_setup = TempSetup()
+    context = temp_setup.context
+    org, kb, user = temp_setup.create_tmp_org_kb_user()
+    monkeypatch.setattr(splitter, "create_chunker", lambda settings: _Chunker())
+    repo_manager = context.get_repo_manager()
+    cache = SegmentEmbeddingCache(
+        settings=context.settings,
+        cache_store=create_embedding_cache_store(context.settings),
+    )
+    embedder = _LengthEmbedder(model_name=f"model-{uuid.uuid4()}")
+
+    try:
+        docsource = temp_setup.create_docsource(org, kb)
+        segment_contents: List[List[str]] = []
+        # the same URL scraped twice is saved in files with different timestamps
+        for _ in range(2):
+            raw_doc_uri = (
+                f"/tmp/www.example.com_page.{file_utils.filename_timestamp()}.html"
+            )
+            docsink = repo_manager.get_docsink_store().create_docsink(
+                org,
+                kb,
+                DocSinkCreate(
+                    docsource=docsource,
+                    original_doc_uri="https://www.example.com/page",
+                    raw_doc_uri=raw_doc_uri,
+                ),
+            )
+            document = repo_manager.get_document_store().create_document(
+                org,
+                kb,
+                DocumentCreate(
+                    docsink=docsink,
+                    content="# Page\n\nThe content of the page.",
+                    doc_uri=f"{raw_doc_uri}.md",
+                ),
+            )
+            assert splitter.Splitter(context, org, kb).split(document) == (
+                ReturnCode.SUCCESS
+            )
+            segments = repo_manager.get_segment_store().get_all_segments_for_document(
+                org, kb, document.document_uuid
+            )
+            segment_contents.append(sorted(segment.content for segment in segments))
+
+        assert segment_contents[0] == segment_contents[1]
+        embeddings = [[float(i), 1.0] for i in range(len(segment_contents[0]))]
+        cache.save_embeddings(embedder, segment_contents[0], embeddings)
+        assert cache.get_embeddings(embedder, segment_contents[1]) == embeddings
+    finally:
+        temp_setup.clear_tmp_org_kb_user(org, kb, user)
@@ -0,0 +1,144 @@
+import json
+import time
+from typing import List
+
+import httpx
+import openai
+
+from leettools.common.temp_setup import TempSetup
+from leettools.eds.str_embedder._impl.dense_embedder_openai import DenseEmbedderOpenAI
+from leettools.eds.str_embedder.schemas.schema_dense_embedder import (
+    DenseEmbeddingRequest,
+)
+from leettools.eds.str_embedder.utils.embedding_rate_limiter import (
+    EmbeddingRateLimiter,
+    est_token_count,
+    split_by_token_budget,
+)
+
+
+def test_split_by_token_budget():
+    sentences = ["a" * 40, "b" * 40, "c" * 400, "d" * 4]
+    tokens = est_token_count("a" * 40)
+    assert split_by_token_budget(sentences, max_tokens=2 * tokens, max_inputs=10) == [
+        sentences[:2],
+        [sentences[2]],
+        [sentences[3]],
+    ]
+    assert split_by_token_budget(sentences, max_tokens=10000, max_inputs=3) == [
+        sentences[:3],
+        sentences[3:],
+    ]
+    assert split_by_token_budget([], max_tokens=10, max_inputs=10) == []
+
+
+def test_embedding_rate_limiter():
+    rate_limiter = EmbeddingRateLimiter(
+        max_concurrency=2, requests_per_minute=0, tokens_per_minute=0
+    )
+    with rate_limiter.acquire(100):
+        pass
+
+    rate_limiter.update_from_headers(
+        {"x-ratelimit-limit-requests": "600", "x-ratelimit-limit-tokens": "60000"}
+    )
+    assert rate_limiter.requests_per_minute_limit == 600
+    assert rate_limiter.request_bucket.rate_per_second == 600 * 0.9 / 60
+    assert rate_limiter.token_bucket.rate_per_second == 60000 * 0.9 / 60
+
+    rate_limiter.on_rate_limited()
+    assert rate_limiter.request_bucket.rate_per_second == 600 * 0.9 / 60 / 2
+    # the limits are applied again after a successful response
+    rate_limiter.update_from_headers(
+        {"x-ratelimit-limit-requests": "600", "x-ratelimit-limit-tokens": "60000"}
+    )
+    assert rate_limiter.request_bucket.rate_per_second == 600 * 0.9 / 60
+
+    assert rate_limiter.get_backoff_in_seconds(1, {"retry-after-ms": "20"}) == 0.02
+    assert rate_limiter.get_backoff_in_seconds(1, {"retry-after": "3"}) == 3
+    assert 0.5 <= rate_limiter.get_backoff_in_seconds(3) <= 4
+
+
+def test_embedding_rate_limiter_large_request():
+    # one second of the token budget is 100 tokens
+    rate_limiter = EmbeddingRateLimiter(
+        max_concurrency=2, requests_per_minute=0, tokens_per_minute=6000
+    )
+    with rate_limiter.acquire(150):
+        pass
+
+    # the full estimated cost of the large request is charged
+    start = time.monotonic()
+    with rate_limiter.acquire(1):
+        pass
+    assert time.monotonic() - start >= 0.4
+
+
+def test_dense_embedder_openai_retry_and_split():
+    temp_setup = TempSetup()
+    org, kb, user = temp_setup.create_tmp_org_kb_user()
+    try:
+        requests: List[List[str]] = []
+
+        def _handler(request: httpx.Request) -> httpx.Response:
+            inputs = json.loads(request.content)["input"]
+            requests.append(inputs)
+            if len(requests) == 1:
+                return httpx.Response(
+                    429,
+                    headers={"retry-after-ms": "10"},
+                    json={"error": {"message": "Rate limit reached", "code": None}},
+                )
+            if len(inputs) > 2:
+                return httpx.Response(
+                    400,
+                    json={
+                        "error": {
+                            "message": "This model's maximum context length is "
+                            "8192 tokens.",
+                            "code": None,
+                        }
+                    },
+                )
+            return httpx.Response(
+                200,
+                headers={
+                    "x-ratelimit-limit-requests": "3000",
+                    "x-ratelimit-limit-tokens": "1000000",
+                },
+                json={
+                    "object": "list",
+                    "data": [
+                        {"object": "embedding", "index": i, "embedding": [float(i)]}
+                        for i in range(len(inputs))
+                    ],
+                    "model": "test-model",
+                    "usage": {"prompt_tokens": 1, "total_tokens": 1},
+                },
+            )
+
+        # the temp KB uses another embedder, so the default model is used
+        embedder = DenseEmbedderOpenAI(
+            context=temp_setup.context, org=org, kb=None, user=user
+        )
+        embedder.api_client = openai.OpenAI(
+            api_key="test-key",
+            base_url="http://embedding.test/v1",
+            http_client=httpx.Client(transport=httpx.MockTransport(_handler)),
+            max_retries=0,
+        )
+        embeddings = embedder.embed(
+            DenseEmbeddingRequest(sentences=["s1", "s2", "s3", "s4"])
+        )
+
+        # retried after the 429, then split into halves after the 400
+        assert len(embeddings.dense_embeddings) == 4
+        assert requests == [
+            ["s1", "s2", "s3", "s4"],
+            ["s1", "s2", "s3", "s4"],
+            ["s1", "s2"],
+            ["s3", "s4"],
+        ]
+        assert embedder.rate_limiter.requests_per_minute_limit == 3000
+    finally:
+        temp_setup.clear_tmp_org_kb_user(org, kb, user)
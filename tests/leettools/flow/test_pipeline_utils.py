@@ -0,0 +1,188 @@
+import time
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+import pytest
+
+from leettools.chat import chat_utils
+from leettools.common.logging.event_logger import EventLogger
+from leettools.common.temp_setup import TempSetup
+from leettools.core.consts.docsink_status import DocSinkStatus
+from leettools.core.consts.document_status import DocumentStatus
+from leettools.core.consts.return_code import ReturnCode
+from leettools.core.schemas.docsink import DocSinkCreate
+from leettools.core.schemas.docsource import DocSource
+from leettools.core.schemas.document import Document
+from leettools.core.schemas.segment import Segment
+from leettools.eds.pipeline.embed.segment_embedder import AbstractSegmentEmbedder
+from leettools.flow.utils import pipeline_utils
+
+
+class _CountingEmbedder(AbstractSegmentEmbedder):
+    def __init__(self) -> None:
+        self.call_count = 0
+
+    def embed_segment_list(
+        self, segments: List[Segment], display_logger: Optional[EventLogger] = None
+    ) -> ReturnCode:
+        self.call_count += 1
+        return ReturnCode.SUCCESS
+
+
+class _Splitter:
+    # the documents named slow are split after the latency budget
+    def __init__(self, **kwargs) -> None:
+        pass
+
+    def split(self, doc: Document, log_file_location: Optional[str]) -> ReturnCode:
+        if "slow" in doc.original_uri:
+            time.sleep(2)
+        if "bad" in doc.original_uri:
+            return ReturnCode.FAILURE
+        return ReturnCode.SUCCESS
+
+
+def _create_docsink(tmp_path: Path, docsource: DocSource, name: str) -> DocSinkCreate:
+    file_path = tmp_path / f"{name}.md"
+    file_path.write_text(
+        f"# {name}\n\nThe content of the document {name}.\n", encoding="utf-8"
+    )
+    return DocSinkCreate(
+        docsource=docsource,
+        original_doc_uri=f"https://www.example.com/{name}",
+        raw_doc_uri=str(file_path),
+    )
+
+
+def test_run_adhoc_pipeline_for_docsinks(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    temp_setup = TempSetup()
+    context = temp_setup.context
+    org, kb, user = temp_setup.create_tmp_org_kb_user()
+
+    embedder = _CountingEmbedder()
+    monkeypatch.setattr(
+        pipeline_utils, "create_segment_embedder_for_kb", lambda **kwargs: embedder
+    )
+    monkeypatch.setattr(pipeline_utils, "Splitter", _Splitter)
+
+    try:
+        docsource = temp_setup.create_docsource(org, kb)
+        exec_info = chat_utils.setup_exec_info(
+            context=context,
+            query="adhoc pipeline",
+            org_name=org.name,
+            kb_name=kb.name,
+            username=user.username,
+        )
+
+        completed: List[List[Document]] = []
+        start = time.perf_counter()
+        documents = pipeline_utils.run_adhoc_pipeline_for_docsinks(
+            exec_info=exec_info,
+            docsink_create_list=[
+                _create_docsink(tmp_path, docsource, name)
+                for name in ["fast1", "fast2", "slow1"]
+            ],
+            latency_budget_in_seconds=0.5,
+            on_complete=completed.append,
+        )
+        # the slow document is processed in the background after the budget
+        assert time.perf_counter() - start < 1.8
+        assert sorted(doc.original_uri for doc in documents) == [
+            "https://www.example.com/fast1",
+            "https://www.example.com/fast2",
+        ]
+        assert pipeline_utils.wait_for_background_pipelines(timeout=30)
+        assert len(completed) == 1
+        assert len(completed[0]) == 3
+
+        # the budget does not apply before min_document_count documents are ready
+        completed = []
+        documents = pipeline_utils.run_adhoc_pipeline_for_docsinks(
+            exec_info=exec_info,
+            docsink_create_list=[
+                _create_docsink(tmp_path, docsource, name)
+                for name in ["slow2", "slow3"]
+            ],
+            latency_budget_in_seconds=0.1,
+            min_document_count=2,
+            on_complete=completed.append,
+        )
+        assert len(documents) == 2
+        assert len(completed) == 1
+
+        # the failed documents are marked as completed for the adhoc query
+        docsink_creates = [_create_docsink(tmp_path, docsource, "bad1")]
+        documents = pipeline_utils.run_adhoc_pipeline_for_docsinks(
+            exec_info=exec_info, docsink_create_list=docsink_creates
+        )
+        assert documents == []
+        docsink_store = context.get_repo_manager().get_docsink_store()
+        docsinks = [
+            docsink
+            for docsink in docsink_store.get_docsinks_for_docsource(org, kb, docsource)
+            if docsink.original_doc_uri == "https://www.example.com/bad1"
+        ]
+        assert len(docsinks) == 1
+        docsink = docsinks[0]
+        assert docsink.docsink_status == DocSinkStatus.COMPLETED
+        docstore = context.get_repo_manager().get_document_store()
+        docs = docstore.get_documents_for_docsink(org, kb, docsink)
+        assert len(docs) == 1
+        assert docs[0].split_status == DocumentStatus.FAILED
+        assert docs[0].embed_status == DocumentStatus.COMPLETED
+    finally:
+        temp_setup.clear_tmp_org_kb_user(org, kb, user)
+
+
+def test_run_adhoc_pipeline_for_docsinks_iterator(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    temp_setup = TempSetup()
+    context = temp_setup.context
+    org, kb, user = temp_setup.create_tmp_org_kb_user()
+
+    embedder = _CountingEmbedder()
+    monkeypatch.setattr(
+        pipeline_utils, "create_segment_embedder_for_kb", lambda **kwargs: embedder
+    )
+    monkeypatch.setattr(pipeline_utils, "Splitter", _Splitter)
+
+    try:
+        docsource = temp_setup.create_docsource(org, kb)
+        exec_info = chat_utils.setup_exec_info(
+            context=context,
+            query="adhoc pipeline iterator",
+            org_name=org.name,
+            kb_name=kb.name,
+            username=user.username,
+        )
+
+        def _slow_docsink_creates() -> Iterator[DocSinkCreate]:
+            # the second page is scraped long after the first one
+            yield _create_docsink(tmp_path, docsource, "page1")
+            time.sleep(2)
+            yield _create_docsink(tmp_path, docsource, "page2")
+
+        completed: List[List[Document]] = []
+        start = time.perf_counter()
+        documents = pipeline_utils.run_adhoc_pipeline_for_docsinks(
+            exec_info=exec_info,
+            docsink_create_list=_slow_docsink_creates(),
+            latency_budget_in_seconds=0.5,
+            on_complete=completed.append,
+        )
+        # the first page is processed without waiting for the iterator
+        assert time.perf_counter() - start < 1.8
+        assert [doc.original_uri for doc in documents] == [
+            "https://www.example.com/page1"
+        ]
+        assert pipeline_utils.wait_for_background_pipelines(timeout=30)
+        assert sorted(doc.original_uri for doc in completed[0]) == [
+            "https://www.example.com/page1",
+            "https://www.example.com/page2",
+        ]
+    finally:
+        temp_setup.clear_tmp_org_kb_user(org, kb, user)
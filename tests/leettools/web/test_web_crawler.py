@@ -0,0 +1,133 @@
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator
+
+import pytest
+
+from leettools.context_manager import Context, ContextManager
+from leettools.web.web_crawler import WebCrawler, extract_links, get_crawl_key
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        # new paths in each run so that no saved file is reused
+        self.run_id = uuid.uuid4().hex
+        self.pages: Dict[str, str] = {}
+        self.requested = []
+
+    def url(self, name: str) -> str:
+        host, port = self.server_address
+        return f"http://{host}:{port}/{self.run_id}-{name}.html"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: _Server
+
+    def do_GET(self) -> None:
+        self.server.requested.append(self.path)
+        content_type = "text/html; charset=utf-8"
+        if self.path == "/robots.txt":
+            content = f"User-agent: *\nDisallow: /{self.server.run_id}-private.html\n"
+            content_type = "text/plain"
+        elif self.path == "/sitemap.xml":
+            content = (
+                '<?xml version="1.0" encoding="UTF-8"?>'
+                '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                f"<url><loc>{self.server.url('orphan')}</loc></url>"
+                "</urlset>"
+            )
+            content_type = "application/xml"
+        else:
+            name = self.path.split("-", 1)[-1].split(".")[0]
+            if name not in self.server.pages:
+                self.send_error(404)
+                return
+            links = "".join(
+                f'<a href="{link}">{link}</a>' for link in self.server.pages[name]
+            )
+            content = f"<html><body><p>{name}</p>{links}</body></html>"
+        data = content.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def server() -> Iterator[_Server]:
+    server = _Server()
+    run_id = server.run_id
+    server.pages = {
+        "index": [
+            f"{run_id}-a.html",
+            f"{run_id}-b.html#section",
+            f"{run_id}-private.html",
+            "https://www.example.com/outside.html",
+        ],
+        "a": [f"{run_id}-b.html?ref=a", f"{run_id}-c.html", f"{run_id}-index.html"],
+        "b": [f"{run_id}-a.html"],
+        "c": [f"{run_id}-d.html"],
+        "d": [],
+        "orphan": [],
+        "private": [],
+    }
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_get_crawl_key():
+    assert get_crawl_key("HTTPS://WWW.Example.com:443") == "https://www.example.com/"
+    assert (
+        get_crawl_key("http://example.com:80/a.html?q=1#top")
+        == "http://example.com/a.html"
+    )
+
+
+def test_extract_links():
+    content = (
+        '<html><body><a href="/a.html">a</a><a href="b.html#x">b</a>'
+        '<a href="mailto:info@example.com">mail</a><a>no href</a></body></html>'
+    )
+    assert extract_links("https://example.com/docs/index.html", content) == [
+        "https://example.com/a.html",
+        "https://example.com/docs/b.html#x",
+    ]
+
+
+def test_web_crawler(server: _Server):
+    context = ContextManager().get_context()  # type: Context
+    context.reset(is_test=True)
+
+    web_crawler = WebCrawler(context=context)
+    results = web_crawler.crawl(server.url("index"), max_depth=3, max_urls=20)
+
+    # d is at depth 4, private is disallowed by the robots.txt
+    assert sorted(result.url for result in results) == sorted(
+        server.url(name) for name in ["index", "orphan", "a", "b", "c"]
+    )
+    pages = [path for path in server.requested if path.endswith(".html")]
+    assert len(pages) == len(set(pages)) == 5
+
+
+def test_web_crawler_max_urls(server: _Server):
+    context = ContextManager().get_context()  # type: Context
+    context.reset(is_test=True)
+
+    web_crawler = WebCrawler(context=context)
+    results = web_crawler.crawl(server.url("index"), max_depth=3, max_urls=3)
+
+    # the start URL and the sitemap URL, then one URL of the next depth
+    assert len(results) == 3
+    assert results[0].url in (server.url("index"), server.url("orphan"))
+    assert results[2].url in (server.url("a"), server.url("b"))
@@ -0,0 +1,95 @@
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, List
+
+import pytest
+
+from leettools.context_manager import Context, ContextManager
+from leettools.web.web_scraper import WebScraper
+
+_PAGE = "<html><body><p>{path}</p></body></html>"
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: _Server
+
+    def do_GET(self) -> None:
+        with self.server.lock:
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(
+                self.server.max_in_flight, self.server.in_flight
+            )
+        try:
+            time.sleep(3 if "slow" in self.path else 0.2)
+            content = _PAGE.format(path=self.path).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+        finally:
+            with self.server.lock:
+                self.server.in_flight -= 1
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def server() -> Iterator[_Server]:
+    server = _Server()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _urls(server: _Server, names: List[str]) -> List[str]:
+    # new paths in each run so that no saved file is reused
+    run_id = uuid.uuid4().hex
+    host, port = server.server_address
+    return [f"http://{host}:{port}/{run_id}-{name}.html" for name in names]
+
+
+def test_scrape_urls_per_host_limit(server: _Server):
+    context = ContextManager().get_context()  # type: Context
+    context.reset(is_test=True)
+    max_concurrency_per_host = context.settings.web_scrape_max_concurrency_per_host
+    context.settings.web_scrape_max_concurrency_per_host = 2
+    try:
+        web_scraper = WebScraper(context=context, scraper_type="beautiful_soup")
+        urls = _urls(server, [f"page{i}" for i in range(6)])
+        results = web_scraper.scrape_urls_to_file(urls)
+    finally:
+        context.settings.web_scrape_max_concurrency_per_host = max_concurrency_per_host
+
+    assert sorted(result.url for result in results) == sorted(urls)
+    assert server.max_in_flight == 2
+
+
+def test_scrape_urls_deadline(server: _Server):
+    context = ContextManager().get_context()  # type: Context
+    context.reset(is_test=True)
+
+    web_scraper = WebScraper(context=context, scraper_type="beautiful_soup")
+    urls = _urls(server, ["page1", "slow", "page2"])
+
+    start = time.perf_counter()
+    results = list(web_scraper.scrape_urls_iter(urls, deadline_in_seconds=1))
+    assert time.perf_counter() - start < 2.5
+
+    # the slow page is dropped when the deadline is reached
+    assert sorted(result.url for result in results) == sorted([urls[0], urls[2]])